@@ -0,0 +1,64 @@
+"""Offline helpers shared by the benchmark scripts.
+
+The benchmarks run against the stand-in TBMD services of the tests, in
+tests/utils/standin.py, so they measure the client side only and never need
+access to ws.ssb.no. The scripts are run from the repository root, but only this
+folder is on sys.path, so the root is added here.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tests.utils.load_harness import Call
+from tests.utils.load_harness import run_async
+from tests.utils.load_harness import run_threads
+from tests.utils.load_harness import workload
+from tests.utils.standin import CannedTransport
+from tests.utils.standin import StandinServer
+from tests.utils.standin import concept_variables_chunks
+from tests.utils.standin import file_description_response
+from tests.utils.standin import serve_canned
+from tests.utils.standin import serve_chunked
+from tests.utils.standin import standin_wsdls
+
+__all__ = [
+    "Call",
+    "CannedTransport",
+    "StandinServer",
+    "concept_variables_chunks",
+    "file_description_response",
+    "report",
+    "run_async",
+    "run_threads",
+    "serve_canned",
+    "serve_chunked",
+    "standin_wsdls",
+    "timed",
+    "workload",
+]
+
+
+def timed(func: Any, repeat: int) -> list[float]:
+    """Call func repeat times, returning the wall time of each call in ms."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: list[float]) -> None:
+    """Print mean and median of a list of timings in ms."""
+    ordered = sorted(timings)
+    mean = sum(ordered) / len(ordered)
+    median = ordered[len(ordered) // 2]
+    print(f"{label:<40} n={len(ordered):<5} mean={mean:8.3f} ms  p50={median:8.3f} ms")
@@ -0,0 +1,101 @@
+"""Time to resolve a folder of flatfiles, one path at a time or in bulk.
+
+Run from the repository root:
+
+    python benchmarks/bench_bulk_resolve.py [latency_ms]
+
+The paths are resolved against the local stand-in of the TBMD services,
+answering every call after the given latency. Some of the files are in datadok
+under another period than they are asked for by, one is not there at all, and
+some are asked for twice, by their full path and by their dollar-stamme.
+
+Before: datadok_file_description_by_path for each path, one after another.
+After: resolve_datadok_paths, 8 paths and 4 variations of each at a time.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from _standin import StandinServer
+
+import ssb_tbmd_apis.paths.bulk_resolve as br
+import ssb_tbmd_apis.paths.try_variations as tv
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.operations.operations_datadok import datadok_file_description_by_path
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from ssb_tbmd_apis.response_cache import invalidate_response_cache
+from ssb_tbmd_apis.tbmd_logger import logger
+
+STAMMER = StammeRegistry({"STANDIN": Path("/ssb/standin")})
+
+
+def paths() -> list[Path]:
+    """The folder of flatfiles to resolve."""
+    folder = []
+    for year in range(2020, 2023):
+        folder += [
+            Path(f"/ssb/standin/arkiv/personfil/g{year}.dat"),
+            Path(f"$STANDIN/arkiv/personfil/g{year}"),
+            Path(f"/ssb/standin/arkiv/bedriftsfil/g{year}.dat"),
+        ]
+    return [*folder, Path("/ssb/standin/arkiv/annen/g2020.dat")]
+
+
+def main(latency_ms: float = 5.0) -> None:
+    """Run the benchmark and print the timings."""
+    os.environ["SSB_TBMD_CACHE_DIR"] = tempfile.mkdtemp()
+    # Every miss is logged
+    logger.setLevel(logging.WARNING)
+    tv.get_stamme_registry = lambda: STAMMER
+    br.get_stamme_registry = lambda: STAMMER
+    folder = paths()
+    with StandinServer(latency=latency_ms / 1000) as server:
+        zc.WSDLS.update(server.wsdl_urls())
+        zc.get_cached_client("datadok")
+        print(f"{len(folder)} paths, {latency_ms:.0f} ms latency")
+
+        invalidate_response_cache()
+        server.calls.clear()
+        start = time.perf_counter()
+        statuses: Counter[str] = Counter()
+        for path in folder:
+            try:
+                datadok_file_description_by_path(path)
+                statuses["found"] += 1
+            except FileNotFoundError:
+                statuses["not found"] += 1
+        elapsed = time.perf_counter() - start
+        calls = server.calls["datadok", "GetFileDescriptionByPath"]
+        print(
+            f"{'before: one at a time':<22} {elapsed * 1000:8.1f} ms  "
+            f"{calls:5d} calls  {dict(statuses)}"
+        )
+
+        invalidate_response_cache()
+        server.calls.clear()
+        start = time.perf_counter()
+        results = []
+        for result in br.resolve_datadok_paths(folder, parallel_probes=4):
+            if not results:
+                first = time.perf_counter() - start
+            results.append(result)
+        table = br.resolutions_table(results)
+        elapsed = time.perf_counter() - start
+        calls = server.calls["datadok", "GetFileDescriptionByPath"]
+        print(
+            f"{'after: in bulk':<22} {elapsed * 1000:8.1f} ms  "
+            f"{calls:5d} calls  {table['status'].value_counts().to_dict()}  "
+            f"first result after {first * 1000:.1f} ms"
+        )
+    zc.close_zeep_clients()
+
+
+if __name__ == "__main__":
+    main(*(float(arg) for arg in sys.argv[1:2]))
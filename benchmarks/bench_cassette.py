@@ -0,0 +1,54 @@
+"""Replay recorded SOAP calls with injected latency, at different concurrencies.
+
+Run from the repository root:
+
+    python benchmarks/bench_cassette.py [calls] [latency_ms]
+
+The calls are first recorded from a local stand-in server into a temporary
+cassette. The server is then shut down, and get_zeep_serialize_many replays them
+with the given latency and 20% jitter, so the timings cover the whole client,
+parsing included, with a realistic wait for each reply.
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+
+from _standin import serve_canned
+from _standin import standin_wsdls
+
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.cassette import use_cassette
+from ssb_tbmd_apis.response_cache import bypass_response_cache
+
+
+def main(calls: int = 64, latency_ms: int = 50) -> None:
+    """Run the benchmark and print the timings."""
+    server, address = serve_canned()
+    zc.WSDLS.update(standin_wsdls(address))
+    cassette = tempfile.mkdtemp(prefix="tbmd_cassette_")
+    args_list = [(i,) for i in range(calls)]
+
+    with bypass_response_cache():
+        with use_cassette(cassette, mode="record"):
+            zc.get_zeep_serialize_many("datadok", "GetCodelistById", args_list)
+        server.shutdown()
+
+        latency = latency_ms / 1000
+        with use_cassette(cassette, latency=latency, jitter=latency / 5, seed=1):
+            for workers in (1, 4, 8, 16):
+                start = time.perf_counter()
+                zc.get_zeep_serialize_many(
+                    "datadok", "GetCodelistById", args_list, workers
+                )
+                elapsed = time.perf_counter() - start
+                print(
+                    f"max_workers={workers:<3} {calls} calls in {elapsed * 1000:8.1f} ms"
+                    f"  {calls / elapsed:7.1f} calls/s"
+                )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,50 @@
+"""Per-call latency with a fresh Zeep client per call versus the shared registry.
+
+Run from the repository root:
+
+    python benchmarks/bench_client_registry.py [calls]
+
+Before: every call enters a new ZeepClientManager, which parses the WSDL again.
+After: get_zeep_serialize reuses the process-wide client from the registry.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any
+
+import requests
+from _standin import CannedTransport
+from _standin import report
+from _standin import standin_wsdls
+from _standin import timed
+
+import ssb_tbmd_apis.zeep_client as zc
+
+
+def _canned_transport(session: requests.Session) -> Any:
+    return CannedTransport(session=session)
+
+
+def main(calls: int = 200) -> None:
+    """Run the benchmark and print the timings."""
+    zc.WSDLS.update(standin_wsdls())
+    zc._mk_transport = _canned_transport  # type: ignore[assignment]
+
+    def before() -> None:
+        with zc.get_zeep_client("datadok") as client:
+            response = client.service.GetCodelistById(228589)
+        zc._serialize_object_ntc(response)
+
+    def after() -> None:
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 228589)
+
+    zc.close_zeep_clients()
+    report("before: client per call", timed(before, calls))
+    zc.close_zeep_clients()
+    report("after: first call (builds client)", timed(after, 1))
+    report("after: cached client", timed(after, calls))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
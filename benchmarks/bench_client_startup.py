@@ -0,0 +1,52 @@
+"""Client start-up time: cold, from the on-disk schema cache, and in-process.
+
+Run from the repository root:
+
+    python benchmarks/bench_client_startup.py [repeat]
+
+cold: the WSDL is compiled from scratch (empty schema cache).
+warm-cache: the compiled document is loaded from the schema cache on disk.
+in-process: the client is already held by the registry.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+import requests
+from _standin import report
+from _standin import standin_wsdls
+from _standin import timed
+
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.schema_cache import clear_schema_cache
+
+
+def main(repeat: int = 50) -> None:
+    """Run the benchmark and print the timings."""
+    os.environ["SSB_TBMD_CACHE_DIR"] = tempfile.mkdtemp(prefix="tbmd_bench_")
+    zc.WSDLS.update(standin_wsdls())
+    wsdl = zc.WSDLS["datadok"]
+
+    def build() -> None:
+        zc._mk_client(wsdl, zc.LocalResolverTransport(session=requests.Session()))
+
+    def cold() -> None:
+        clear_schema_cache()
+        build()
+
+    report("cold (compile WSDL)", timed(cold, repeat))
+    build()
+    report("warm-cache (load compiled from disk)", timed(build, repeat))
+    zc.close_zeep_clients()
+    zc.get_cached_client("datadok")
+    report(
+        "in-process (registry)",
+        timed(lambda: zc.get_cached_client("datadok"), repeat),
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
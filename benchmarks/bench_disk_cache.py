@@ -0,0 +1,65 @@
+"""Per-call latency in a new process, with and without the SQLite response cache.
+
+Run from the repository root:
+
+    python benchmarks/bench_disk_cache.py [calls]
+
+Each round starts with an empty in-memory cache, like a new notebook or nightly job.
+Before: every lookup goes to the service. After: the lookups were cached on disk
+by an earlier run, so they are read from the SQLite file instead.
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import requests
+from _standin import CannedTransport
+from _standin import report
+from _standin import standin_wsdls
+from _standin import timed
+
+import ssb_tbmd_apis.response_cache as rc
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.disk_cache import DiskResponseCache
+
+
+def _canned_transport(session: requests.Session) -> Any:
+    return CannedTransport(session=session)
+
+
+def main(calls: int = 200) -> None:
+    """Run the benchmark and print the timings."""
+    zc.WSDLS.update(standin_wsdls())
+    zc._mk_transport = _canned_transport  # type: ignore[assignment]
+    disk = DiskResponseCache(Path(tempfile.mkdtemp()) / "responses.sqlite")
+    ids = range(calls)
+
+    def new_process(with_disk: bool) -> None:
+        tiers: list[Any] = [rc.ResponseCache()] + ([disk] if with_disk else [])
+        rc.set_response_cache(rc.TieredResponseCache(*tiers))
+
+    def run(with_disk: bool) -> list[float]:
+        timings = []
+        for _ in range(5):
+            new_process(with_disk)
+            timings += timed(lambda: _lookup_all(ids), 1)
+        return timings
+
+    zc.get_zeep_serialize("datadok", "GetCodelistById", -1)  # Build the client
+    report("before: memory cache only", run(False))
+    new_process(True)
+    _lookup_all(ids)  # The earlier run filling the disk cache
+    report("after: disk cache from earlier run", run(True))
+
+
+def _lookup_all(ids: range) -> None:
+    for i in ids:
+        zc.get_zeep_serialize("datadok", "GetCodelistById", i)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,106 @@
+"""Time to find files on disk with look_for_file_on_disk, in a folder of 10k files.
+
+Run from the repository root:
+
+    python benchmarks/bench_disk_lookup.py [entries] [lookups]
+
+A temporary folder is filled with generations of a flatfile, g2000 to g9999 with
+the extensions of KNOWN_EXTENSIONS. Each lookup asks for one of them without its
+extension, the way datadok names them, and a few ask for files that are not
+there. On a network filesystem every stat and listing costs a round trip, so the
+system calls are counted too.
+
+Before: is_file on the path and on each extension, then glob("*") of the folder,
+    and again after flipping _pii.
+After: one os.scandir of the folder, kept for LISTING_TTL seconds while the
+    modification time of the folder, one stat per lookup, stays the same.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import ssb_tbmd_apis.paths.try_variations as tv
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from ssb_tbmd_apis.tbmd_logger import logger
+
+
+def before(path: Path) -> Path:
+    """look_for_file_on_disk as it was, with a stat per check and a glob per folder."""
+    if path.is_file():
+        return path
+    path_no_ext = path.with_suffix("")
+    for ext in tv.KNOWN_EXTENSIONS:
+        check_path = path_no_ext.with_suffix(ext)
+        if check_path.is_file():
+            return check_path
+    for folder in (path_no_ext.parent, tv._flip_pii(path_no_ext).parent):
+        glob_result = list(folder.glob("*"))
+        if len(glob_result) == 1:
+            return glob_result[0]
+    raise FileNotFoundError(path)
+
+
+def counted(name: str, calls: Counter[str]) -> Callable[..., Any]:
+    """Wrap os.stat or os.scandir, counting the calls."""
+    real = getattr(os, name)
+
+    def call(*args: Any, **kwargs: Any) -> Any:
+        calls[name] += 1
+        return real(*args, **kwargs)
+
+    return call
+
+
+def main(entries: int = 10000, lookups: int = 2000) -> None:
+    """Run the benchmark and print the timings."""
+    logger.setLevel(logging.WARNING)
+    tv.get_stamme_registry = lambda: StammeRegistry({})
+    root = Path(tempfile.mkdtemp()) / "ssb" / "stamme01" / "fob" / "arkiv"
+    root.mkdir(parents=True)
+    extensions = [ext for ext in tv.KNOWN_EXTENSIONS if ext] or [""]
+    for number in range(entries):
+        (root / f"g{2000 + number}{extensions[number % len(extensions)]}").touch()
+    # Filled a while ago, as a folder changed just now is listed every time
+    hour_ago = time.time_ns() - 3600 * 10**9
+    os.utime(root, ns=(hour_ago, hour_ago))
+    rng = random.Random(2024)
+    paths = [
+        root / f"g{rng.randint(2000, 2000 + entries + 100)}" for _ in range(lookups)
+    ]
+    calls: Counter[str] = Counter()
+    for name in ("stat", "scandir"):
+        setattr(os, name, counted(name, calls))
+    print(f"{entries} entries in the folder, {lookups} lookups")
+    for label, look in (
+        ("before: stat and glob", before),
+        ("after", tv.look_for_file_on_disk),
+    ):
+        tv.clear_listing_cache()
+        calls.clear()
+        found = 0
+        start = time.perf_counter()
+        for path in paths:
+            try:
+                look(path)
+                found += 1
+            except FileNotFoundError:
+                pass
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:<22} {elapsed * 1000:8.1f} ms  {found} found  "
+            f"{calls['stat']} stats  {calls['scandir']} listings"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
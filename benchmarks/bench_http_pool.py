@@ -0,0 +1,43 @@
+"""Per-call latency with a new HTTP session per call versus the pooled session.
+
+Run from the repository root:
+
+    python benchmarks/bench_http_pool.py [calls]
+
+A local HTTP/1.1 server answers every POST with a canned SOAP response. On
+localhost the saved TCP handshake is small; against ws.ssb.no (and with TLS)
+the difference per call is larger.
+"""
+
+from __future__ import annotations
+
+import sys
+
+import requests
+from _standin import report
+from _standin import serve_canned
+from _standin import timed
+
+from ssb_tbmd_apis.zeep_client import get_http_session
+
+
+def main(calls: int = 500) -> None:
+    """Run the benchmark and print the timings."""
+    server, address = serve_canned()
+    url = f"{address}/DatadokService.asmx"
+    body = b"<soap:Envelope/>"
+
+    def session_per_call() -> None:
+        with requests.Session() as session:
+            session.post(url, data=body).raise_for_status()
+
+    def pooled() -> None:
+        get_http_session().post(url, data=body).raise_for_status()
+
+    report("before: new session per call", timed(session_per_call, calls))
+    report("after: pooled keep-alive session", timed(pooled, calls))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,62 @@
+"""Import time of the package and its light modules, from python -X importtime.
+
+Run from the repository root:
+
+    python benchmarks/bench_import_time.py [repeat]
+
+Each import runs in a fresh interpreter, repeat times, and the median cumulative
+time of the module is compared to its budget. The script exits with status 1 if
+any module is over budget, so it can guard against heavy imports sneaking back.
+
+Before: importing ssb_tbmd_apis.paths.try_variations pulled in zeep and requests
+(~250 ms), and oracle_direct.oracle_paths pulled in fagfunksjoner (~1.7 s).
+After: the heavy libraries are imported by the functions that use them.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+
+# Budgets in ms, generous enough for slow machines, far below the heavy imports
+BUDGETS = {
+    "ssb_tbmd_apis": 5,
+    "ssb_tbmd_apis.paths.try_variations": 80,
+    "ssb_tbmd_apis.tbmd_logger": 40,
+    "ssb_tbmd_apis.oracle_direct.oracle_paths": 20,
+    "ssb_tbmd_apis.imports.datadok_open_flatfile": 80,
+    "ssb_tbmd_apis.zeep_client": 1000,
+}
+
+
+def import_time(module: str) -> float:
+    """Cumulative import time of a module in a fresh interpreter, in ms."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in reversed(result.stderr.splitlines()):
+        _, cumulative, name = line.split("|")
+        if name.strip() == module and cumulative.strip().isdigit():
+            return int(cumulative) / 1000
+    raise LookupError(f"No import time for {module}")
+
+
+def main(repeat: int = 5) -> None:
+    """Run the benchmark and print the timings."""
+    over = []
+    for module, budget in BUDGETS.items():
+        timings = sorted(import_time(module) for _ in range(repeat))
+        median = timings[len(timings) // 2]
+        status = "ok" if median <= budget else "OVER BUDGET"
+        print(f"{module:<48} p50={median:8.1f} ms  budget={budget:5} ms  {status}")
+        if median > budget:
+            over.append(module)
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
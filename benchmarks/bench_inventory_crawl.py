@@ -0,0 +1,82 @@
+"""Time to crawl a stamme tree into a FileInventory, and to crawl it again.
+
+Run from the repository root:
+
+    python benchmarks/bench_inventory_crawl.py [folders] [files_per_folder]
+
+A temporary stamme is filled with substammer, arkiv folders and generations of
+flatfiles, some with __MIGRERDOK_v*.json next to them. On a network filesystem
+every listing costs round trips, which the threads overlap; on a local disk the
+first crawls are bound by writing the inventory.
+
+Before: every crawl lists every folder, like a first crawl with one thread.
+After: the first crawl lists 8 folders at a time, and crawling again only lists
+    the folders whose mtime has changed.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import ssb_tbmd_apis.paths.inventory as inv
+import ssb_tbmd_apis.paths.try_variations as tv
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from ssb_tbmd_apis.tbmd_logger import logger
+
+
+def stamme_tree(root: Path, folders: int, files_per_folder: int) -> list[Path]:
+    """Fill the stamme with folders of flatfiles, returning the folders."""
+    leaves = []
+    for number in range(folders):
+        folder = root / f"sub{number % 10}" / "arkiv" / f"fil{number}"
+        folder.mkdir(parents=True)
+        for year in range(2000, 2000 + files_per_folder):
+            (folder / f"g{year}.dat").touch()
+            if year % 5 == 0:
+                (folder / f"g{year}__MIGRERDOK_v1.json").touch()
+        leaves.append(folder)
+    return leaves
+
+
+def timed(label: str, crawl: inv.CrawlStats) -> None:
+    """Print what a crawl did."""
+    print(
+        f"{label:<32} {crawl.seconds * 1000:8.1f} ms  {crawl.folders} folders  "
+        f"{crawl.listed} listed  {crawl.files} files"
+    )
+
+
+def main(folders: int = 500, files_per_folder: int = 40) -> None:
+    """Run the benchmark and print the timings."""
+    logger.setLevel(logging.WARNING)
+    tmp = Path(tempfile.mkdtemp())
+    root = tmp / "ssb" / "stamme01" / "fob"
+    leaves = stamme_tree(root, folders, files_per_folder)
+    registry = StammeRegistry({"FOB": root})
+    inv.get_stamme_registry = lambda: registry
+    tv.get_stamme_registry = lambda: registry
+    print(f"{folders} folders of {files_per_folder} flatfiles")
+
+    before = inv.FileInventory(tmp / "before.sqlite")
+    timed("before: one thread", before.crawl(max_workers=1))
+    timed("before: crawling again", before.crawl(max_workers=1, full=True))
+
+    after = inv.FileInventory(tmp / "after.sqlite")
+    timed("after: 8 threads", after.crawl(max_workers=8))
+    timed("after: crawling again", after.crawl(max_workers=8))
+    for folder in leaves[:: max(1, folders // 10)]:
+        (folder / "g2100.dat").touch()
+        # Some filesystems only keep the mtime to the second
+        stat = folder.stat()
+        os.utime(folder, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    timed("after: 10 folders changed", after.crawl(max_workers=8))
+    before.close()
+    after.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,69 @@
+"""Overhead of recording metrics, and the per-operation report of a small job.
+
+Run from the repository root:
+
+    python benchmarks/bench_metrics.py [calls]
+
+The calls go to a local server answering with a canned codelist, so they include
+the HTTP round trip. Recording a call costs a few microseconds, far below the
+cost of the call itself.
+"""
+
+from __future__ import annotations
+
+import sys
+from contextlib import contextmanager
+from typing import Any
+
+from _standin import report
+from _standin import serve_canned
+from _standin import standin_wsdls
+from _standin import timed
+
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis import tbmd_metrics
+from ssb_tbmd_apis.tbmd_metrics import CallSample
+from ssb_tbmd_apis.tbmd_metrics import metrics_snapshot
+
+
+@contextmanager
+def _not_measured(*args: Any) -> Any:
+    yield CallSample()
+
+
+def main(calls: int = 300) -> None:
+    """Run the benchmark and print the timings."""
+    server, address = serve_canned()
+    zc.WSDLS.update(standin_wsdls(address))
+
+    def call() -> None:
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 228589, use_cache=False)
+
+    def empty() -> None:
+        with tbmd_metrics.measure_call("datadok", "Empty"):
+            pass
+
+    call()  # Build the client outside the timings
+    report("recording an empty call", timed(empty, calls * 10))
+    report("after: call with metrics", timed(call, calls))
+    measure_call = zc.measure_call
+    zc.measure_call = _not_measured  # type: ignore[assignment]
+    report("before: call without metrics", timed(call, calls))
+    zc.measure_call = measure_call
+
+    print()
+    for (service, operation), metrics in metrics_snapshot().items():
+        print(
+            f"{service}.{operation:<20} calls={metrics.calls:<5} "
+            f"mean={metrics.mean_seconds * 1000:7.3f} ms  "
+            f"connect={metrics.connect_seconds:6.3f} s  "
+            f"transfer={metrics.transfer_seconds:6.3f} s  "
+            f"parse={metrics.parse_seconds:6.3f} s  "
+            f"serialize={metrics.serialize_seconds:6.3f} s  "
+            f"bytes={metrics.response_bytes}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,225 @@
+"""Time to list the datadok paths of 1, 10 and 200 stamme/substamme pairs.
+
+Run from the repository root:
+
+    python benchmarks/bench_oracle_paths.py [calls]
+
+There is no Oracle here, so the stand-in is an SQLite database with a
+DATADOK.FILNIVAA table of stammer, substammer, filklasser and generasjoner. All
+the calls share one connection, whose statement cache stands in for the shared
+pool: a statement text seen before is reused, a new one is parsed and planned.
+The collection bind is passed to SQLite as JSON, and TABLE(:pairs) is read with
+json_each. SQLite keeps the tables in the order of a CROSS JOIN, which stands in
+for the hint on the order of the joins. Each call asks for other pairs, like
+users looking at other folders.
+
+SQLite parses and plans cheaply, so the time per call is about the same. What
+counts on Oracle is the statements to hard parse and the SQL sent:
+
+Before: paths_in_substamme put the stammer and substammer into the SQL text,
+    one block of nested subqueries per pair joined with UNION ALL, so every set
+    of pairs was a new statement: 50 statements for 50 calls, and 295 KiB of
+    SQL per call with 200 pairs.
+After: one statement for any number of pairs, with the pairs bound as a
+    collection: 1 statement for all the calls, 1.2 KiB per call.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import sqlite3
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+from typing import ClassVar
+
+from ssb_tbmd_apis.oracle_direct import oracle_paths
+
+STAMMER = 40
+SUBSTAMMER = 10
+FILKLASSER = 8
+GENERASJONER = 12
+
+
+def build_datadok() -> sqlite3.Connection:
+    """The stand-in database, with a tree of file levels like datadok's."""
+    connection = sqlite3.connect(":memory:", cached_statements=128)
+    connection.execute("ATTACH DATABASE ':memory:' AS DATADOK")
+    connection.execute("""
+        CREATE TABLE DATADOK.FILNIVAA (
+            filnivaa_id INTEGER PRIMARY KEY,
+            filnivaa_navn TEXT,
+            filnivaa_nivaa TEXT,
+            filnivaa_filnivaa_id INTEGER,
+            filnivaa_datatype TEXT
+        )
+        """)
+    connection.execute(
+        "CREATE INDEX DATADOK.filnivaa_parent "
+        "ON FILNIVAA (filnivaa_filnivaa_id, filnivaa_nivaa)"
+    )
+    rows: list[tuple[int, str, str, int | None, str | None]] = []
+
+    def add(name: str, level: str, parent: int | None, datatype: str | None) -> int:
+        rows.append((len(rows) + 1, name, level, parent, datatype))
+        return len(rows)
+
+    for s in range(STAMMER):
+        stamme = add(f"stm{s}", "Stamme", None, None)
+        for ss in range(SUBSTAMMER):
+            substamme = add(f"sub{ss}", "Substamme", stamme, None)
+            for f in range(FILKLASSER):
+                filklasse = add(f"klasse{f}", "Filklasse", substamme, None)
+                for g in range(GENERASJONER):
+                    add(f"g{2000 + g}g{2001 + g}", "Generasjon", filklasse, ".dat")
+    connection.executemany("INSERT INTO DATADOK.FILNIVAA VALUES (?, ?, ?, ?, ?)", rows)
+    connection.execute(
+        "CREATE INDEX DATADOK.filnivaa_navn "
+        "ON FILNIVAA (filnivaa_nivaa, LOWER(filnivaa_navn))"
+    )
+    return connection
+
+
+class StandinOracle:
+    """Stands in for an oracledb connection and cursor, on the SQLite database."""
+
+    database: sqlite3.Connection
+    statements: ClassVar[set[str]] = set()
+    sql_bytes = 0
+
+    def __init__(self, database: str, password: str | None = None) -> None:
+        """Open a cursor on the shared database."""
+        self._cursor = self.database.cursor()
+
+    def cursor(self) -> StandinOracle:
+        """The cursor, here itself."""
+        return self
+
+    @property
+    def connection(self) -> StandinOracle:
+        """The connection, here itself, to look up the collection type on."""
+        return self
+
+    def gettype(self, name: str) -> StandinOracle:
+        """The collection type, here itself."""
+        return self
+
+    def newobject(self, values: list[str]) -> str:
+        """A collection, here as JSON for json_each."""
+        return json.dumps(values)
+
+    def __enter__(self) -> StandinOracle:
+        """The connection or cursor."""
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        """Close the cursor."""
+        self._cursor.close()
+
+    def execute(self, query: str, **binds: Any) -> None:
+        """Run the Oracle query, rewritten to what SQLite understands."""
+        StandinOracle.statements.add(query)
+        StandinOracle.sql_bytes += len(query)
+        query = re.sub(
+            r"TABLE\(:pairs\)",
+            "(SELECT key + 1 AS rn, value AS column_value FROM json_each(:pairs))",
+            query,
+        )
+        query = query.replace("ROWNUM AS", "rn AS").replace("JOIN", "CROSS JOIN")
+        self._cursor.execute(query, binds)
+
+    def fetchmany(self, size: int) -> list[Any]:
+        """Fetch the next rows."""
+        return self._cursor.fetchmany(size)
+
+
+def before_query(pairs: list[tuple[str, str]]) -> str:
+    """The SQL text paths_in_substamme built before, one block per pair."""
+    return " UNION ALL ".join(f"""
+            SELECT
+                '${stamme.upper()}/{substamme}/arkiv/' || f.filklasse_navn || '/' || g.filnavn AS full_path
+            FROM (
+                SELECT filnivaa_id AS filklasse_id, filnivaa_navn AS filklasse_navn, filnivaa_filnivaa_id AS substamme_id
+                FROM DATADOK.FILNIVAA
+                WHERE filnivaa_nivaa = 'Filklasse'
+                  AND filnivaa_filnivaa_id = (
+                      SELECT filnivaa_id
+                      FROM DATADOK.FILNIVAA
+                      WHERE LOWER(filnivaa_navn) = LOWER('{substamme}')
+                        AND filnivaa_nivaa = 'Substamme'
+                        AND filnivaa_filnivaa_id = (
+                            SELECT filnivaa_id
+                            FROM DATADOK.FILNIVAA
+                            WHERE LOWER(filnivaa_navn) = LOWER('{stamme}')
+                              AND filnivaa_nivaa = 'Stamme'
+                        )
+                  )
+            ) f
+            JOIN (
+                SELECT
+                    filnivaa_navn,
+                    CASE
+                        WHEN filnivaa_datatype IS NOT NULL AND filnivaa_navn != filnivaa_datatype
+                        THEN filnivaa_navn || filnivaa_datatype
+                        ELSE filnivaa_navn
+                    END AS filnavn,
+                    filnivaa_filnivaa_id AS filklasse_id
+                FROM DATADOK.FILNIVAA
+                WHERE filnivaa_nivaa = 'Generasjon'
+            ) g
+            ON f.filklasse_id = g.filklasse_id
+        """ for stamme, substamme in pairs)
+
+
+def before(pairs: list[tuple[str, str]]) -> list[str]:
+    """The paths, with the pairs in the SQL text."""
+    with StandinOracle("DATADOK") as concur:
+        concur.execute(before_query(pairs))
+        return [row[0] for row in concur.fetchmany(10**9)]
+
+
+def after(pairs: list[tuple[str, str]]) -> list[str]:
+    """The paths, with the pairs bound."""
+    return oracle_paths.paths_in_substamme(pairs, database="DATADOK")
+
+
+@contextmanager
+def counting() -> Iterator[None]:
+    """Count the statements and SQL sent from here on."""
+    StandinOracle.statements = set()
+    StandinOracle.sql_bytes = 0
+    yield
+
+
+def main(calls: int = 50) -> None:
+    """Run the benchmark and print the timings."""
+    StandinOracle.database = build_datadok()
+    oracle_paths._connect = StandinOracle  # type: ignore[assignment]
+    everything = [
+        (f"stm{s}", f"sub{ss}") for s in range(STAMMER) for ss in range(SUBSTAMMER)
+    ]
+    print(f"{calls} calls each, {len(everything)} pairs in the stand-in datadok")
+    for size in (1, 10, 200):
+        rng = random.Random(size)
+        workload = [rng.sample(everything, size) for _ in range(calls)]
+        found: list[list[str]] = []
+        for label, run in (("before", before), ("after", after)):
+            with counting():
+                start = time.perf_counter()
+                paths = [run(pairs) for pairs in workload]
+                elapsed = time.perf_counter() - start
+            found.append([path for batch in paths for path in sorted(batch)])
+            print(
+                f"{size:>3} pairs {label:<7} {elapsed / calls * 1000:8.2f} ms/call  "
+                f"{len(StandinOracle.statements):3d} statements  "
+                f"{StandinOracle.sql_bytes / calls / 1024:7.1f} KiB SQL/call"
+            )
+        assert found[0] == found[1], "before and after found other paths"
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
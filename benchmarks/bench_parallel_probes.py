@@ -0,0 +1,67 @@
+"""Time to resolve datadok paths, probing 1, 2, 4 or 8 variations at once.
+
+Run from the repository root:
+
+    python benchmarks/bench_parallel_probes.py [latency_ms]
+
+The paths are resolved with try_zeep_serialize_path against the local stand-in
+of the TBMD services, answering every call after the given latency. Each path
+misses on many variations before its hit, like a yearly file asked for by a
+later year than it has in datadok.
+
+Before: parallel_probes=1, one variation at a time.
+After: parallel_probes=K, the next K variations in flight at once.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _standin import StandinServer
+
+import ssb_tbmd_apis.paths.try_variations as tv
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from ssb_tbmd_apis.response_cache import invalidate_response_cache
+from ssb_tbmd_apis.tbmd_logger import logger
+
+PATHS = [
+    Path("$STANDIN/arkiv/personfil/g2023"),
+    Path("$STANDIN/arkiv/personfil/g2024"),
+    Path("$STANDIN/arkiv/bedriftsfil/g2024"),
+]
+
+
+def main(latency_ms: float = 20.0) -> None:
+    """Run the benchmark and print the timings."""
+    os.environ["SSB_TBMD_CACHE_DIR"] = tempfile.mkdtemp()
+    # Every miss is logged
+    logger.setLevel(logging.WARNING)
+    tv.get_stamme_registry = lambda: StammeRegistry({})
+    with StandinServer(latency=latency_ms / 1000) as server:
+        zc.WSDLS.update(server.wsdl_urls())
+        zc.get_cached_client("datadok")
+        print(f"{len(PATHS)} paths, {latency_ms:.0f} ms latency")
+        for parallel_probes in (1, 2, 4, 8):
+            invalidate_response_cache()
+            server.calls.clear()
+            start = time.perf_counter()
+            for path in PATHS:
+                tv.try_zeep_serialize_path(path, parallel_probes=parallel_probes)
+            elapsed = time.perf_counter() - start
+            calls = server.calls["datadok", "GetFileDescriptionByPath"]
+            label = "before: one at a time" if parallel_probes == 1 else "after"
+            print(
+                f"{label:<22} parallel_probes={parallel_probes}  "
+                f"{elapsed * 1000:7.1f} ms  {calls} calls"
+            )
+    zc.close_zeep_clients()
+
+
+if __name__ == "__main__":
+    main(*(float(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,125 @@
+"""Probes needed to find a datadok path, with the old and new order of variations.
+
+Run from the repository root:
+
+    python benchmarks/bench_probes_to_hit.py [files]
+
+Each file in the corpus is asked for by one name and is in datadok by another,
+like an annual file asked for as g2021 and described as g2021g2022. The corpus
+is drawn with a fixed seed from the kinds of names seen in the arkiv folders:
+mostly exact names, then files covering more years, older files, and pairs of
+years shifted back. Every probe is one GetFileDescriptionByPath call.
+
+Before: period_variations_path built the whole list, by first year and then
+    from the current year backwards.
+After: period_variations_path yields the variations nearest the name first.
+"""
+
+from __future__ import annotations
+
+import datetime
+import random
+import statistics
+import sys
+from collections.abc import Callable
+from collections.abc import Iterable
+from pathlib import Path
+
+from ssb_tbmd_apis.paths import try_variations as tv
+
+KINDS = [
+    # (weight, how the name asked for and the name in datadok differ)
+    (40, "exact year"),
+    (15, "longer span"),
+    (15, "older year"),
+    (15, "exact years"),
+    (10, "wider span"),
+    (5, "shifted years"),
+]
+
+
+def corpus(files: int, seed: int = 2024) -> list[tuple[str, str]]:
+    """Draw (asked for, in datadok) pairs of file names."""
+    rng = random.Random(seed)
+    current_year = datetime.datetime.now().year
+    weights, kinds = zip(*KINDS, strict=True)
+    pairs = []
+    for kind in rng.choices(kinds, weights, k=files):
+        year = rng.randint(current_year - 15, current_year - 4)
+        k = rng.randint(1, 3)
+        pairs.append(
+            {
+                "exact year": (f"g{year}", f"g{year}"),
+                "longer span": (f"g{year}", f"g{year}g{year + k}"),
+                "older year": (f"g{year}", f"g{year - k}"),
+                "exact years": (f"g{year}g{year + 1}", f"g{year}g{year + 1}"),
+                "wider span": (f"g{year}g{year + 1}", f"g{year}g{year + 1 + k}"),
+                "shifted years": (
+                    f"g{year}g{year + 1}",
+                    f"g{year - k}g{year - k + 1}",
+                ),
+            }[kind]
+        )
+    return pairs
+
+
+def before(path: Path) -> list[Path]:
+    """The variations in the order of the eager list, before the scoring."""
+    periods = []
+    temp_name = path.stem
+    while temp_name and temp_name[0] == "g" and temp_name[1:5].isdigit():
+        periods += [int(temp_name[1:5])]
+        temp_name = temp_name[5:]
+    current_year = datetime.datetime.now().year
+    variations = []
+    diff = periods[-1] - periods[0]
+    for first_yr in range(periods[0], periods[0] - tv.TIME_TRAVEL, -1):
+        if len(periods) == 1:
+            variations += [path.parent / f"g{first_yr}{temp_name}"]
+        else:
+            variations += [path.parent / f"g{first_yr}g{first_yr + diff}{temp_name}"]
+        for second_yr in range(current_year, first_yr, -1):
+            variations += [path.parent / f"g{first_yr}g{second_yr}{temp_name}"]
+            if len(periods) == 2:
+                variations += [
+                    path.parent
+                    / f"g{first_yr}g{first_yr + diff}g{second_yr}g{second_yr + diff}{temp_name}"
+                ]
+    return variations
+
+
+def probes(variations: Iterable[Path], target: Path) -> int | None:
+    """Count the probes until the target, None if it is never tried."""
+    for number, variation in enumerate(variations, start=1):
+        if variation == target:
+            return number
+    return None
+
+
+def run(
+    label: str,
+    order: Callable[[Path], Iterable[Path]],
+    pairs: list[tuple[str, str]],
+) -> None:
+    """Print the probes to hit for every file in the corpus."""
+    folder = Path("$FOB/person/arkiv/personfil")
+    counts = [probes(order(folder / asked), folder / actual) for asked, actual in pairs]
+    hits = sorted(count for count in counts if count is not None)
+    p95 = hits[int(0.95 * (len(hits) - 1))]
+    print(
+        f"{label:<30} mean {statistics.mean(hits):7.1f}  median "
+        f"{statistics.median(hits):5.0f}  p95 {p95:5d}  max {hits[-1]:5d}  "
+        f"misses {len(counts) - len(hits)}"
+    )
+
+
+def main(files: int = 2000) -> None:
+    """Run the benchmark and print the probes to hit."""
+    pairs = corpus(files)
+    print(f"{files} files, TIME_TRAVEL={tv.TIME_TRAVEL}")
+    run("before: eager list", before, pairs)
+    run("after: nearest first", tv.period_variations_path, pairs)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,55 @@
+"""Parse time of a large file description, through zeep versus the raw lxml path.
+
+Run from the repository root:
+
+    python benchmarks/bench_raw_xml.py [variables]
+
+Both paths answer GetFileDescriptionByPath from the same canned response with the
+given number of ContextVariables, so the timings cover building the envelope and
+turning the reply into OrderedDicts, not the network.
+
+Before: zeep builds its objects and serialize_object copies them to OrderedDicts.
+After: raw_xml.call_raw parses the reply with lxml straight into OrderedDicts.
+"""
+
+from __future__ import annotations
+
+import sys
+import tracemalloc
+
+import zeep
+from _standin import CannedTransport
+from _standin import file_description_response
+from _standin import report
+from _standin import standin_wsdls
+from _standin import timed
+
+from ssb_tbmd_apis.raw_xml import call_raw
+from ssb_tbmd_apis.zeep_client import _serialize_object_ntc
+
+
+def main(variables: int = 500) -> None:
+    """Run the benchmark and print the timings."""
+    transport = CannedTransport(content=file_description_response(variables))
+    client = zeep.Client(standin_wsdls()["datadok"], transport=transport)
+    path = "$UTD/nudb/arkiv/stand_in/g2020"
+
+    def before() -> None:
+        _serialize_object_ntc(client.service.GetFileDescriptionByPath(path))
+
+    def after() -> None:
+        call_raw(client, "GetFileDescriptionByPath", path)
+
+    assert timed(before, 1) and timed(after, 1)  # Warm up both paths
+    print(f"{variables} ContextVariables, {len(transport.content)} bytes")
+    for label, func in [("before: zeep objects", before), ("after: raw lxml", after)]:
+        report(label, timed(func, 20))
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{'':<40} peak memory {peak / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,46 @@
+"""Per-call latency of a repeated lookup, with and without the response cache.
+
+Run from the repository root:
+
+    python benchmarks/bench_response_cache.py [calls]
+
+Before: every call goes to the service and serializes the response again.
+After: repeated calls are answered with a copy from the in-memory response cache.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any
+
+import requests
+from _standin import CannedTransport
+from _standin import report
+from _standin import standin_wsdls
+from _standin import timed
+
+import ssb_tbmd_apis.zeep_client as zc
+
+
+def _canned_transport(session: requests.Session) -> Any:
+    return CannedTransport(session=session)
+
+
+def main(calls: int = 500) -> None:
+    """Run the benchmark and print the timings."""
+    zc.WSDLS.update(standin_wsdls())
+    zc._mk_transport = _canned_transport  # type: ignore[assignment]
+
+    def before() -> None:
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 228589, use_cache=False)
+
+    def after() -> None:
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 228589)
+
+    before()  # Build the client outside the timings
+    report("before: no response cache", timed(before, calls))
+    report("after: response cache", timed(after, calls))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,45 @@
+"""Throughput of get_zeep_serialize_many against a local stub server.
+
+Run from the repository root:
+
+    python benchmarks/bench_serialize_many.py [calls] [latency_ms]
+
+The stub server waits latency_ms before answering each call, standing in for
+the time ws.ssb.no spends on a lookup. Throughput should grow close to linearly
+with max_workers, until the server or the client CPU is saturated.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+from _standin import serve_canned
+from _standin import standin_wsdls
+
+import ssb_tbmd_apis.zeep_client as zc
+
+
+def main(calls: int = 200, latency_ms: float = 20) -> None:
+    """Run the benchmark and print the throughput per concurrency level."""
+    server, address = serve_canned(latency=latency_ms / 1000)
+    zc.WSDLS.update(standin_wsdls(address))
+    zc.configure_http(pool_maxsize=64)
+    args_list = [(i,) for i in range(calls)]
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 0)  # build the client
+
+    baseline = None
+    for max_workers in (1, 2, 4, 8, 16, 32):
+        start = time.perf_counter()
+        zc.get_zeep_serialize_many("datadok", "GetCodelistById", args_list, max_workers)
+        per_sec = calls / (time.perf_counter() - start)
+        baseline = baseline or per_sec
+        print(
+            f"max_workers={max_workers:<3} {per_sec:8.1f} calls/s"
+            f"  speedup={per_sec / baseline:5.2f}x"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if i else int(arg) for i, arg in enumerate(sys.argv[1:3])))
@@ -0,0 +1,86 @@
+"""Time to swap full paths for their dollar-stamme, and back, for many files.
+
+Run from the repository root:
+
+    python benchmarks/bench_stamme_lookup.py [files]
+
+The stamme_variabel file is written to a temporary folder, with as many stammer
+as on the servers, some of them inside others. The paths are spread over the
+stammer, a few folders below each.
+
+Before: linux_stammer read and parsed the file for every path, and the flipped
+    dict was scanned in order with Path.is_relative_to.
+After: get_stamme_registry reads the file again only when its mtime changes,
+    and finds the longest stamme in a tree of the folders.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import ssb_tbmd_apis.paths.linux_stammer as ls
+
+STAMMER = 400
+
+
+def stamme_file(folder: Path) -> dict[str, Path]:
+    """Write a stamme_variabel file, returning its stammer."""
+    stammer = {}
+    for number in range(STAMMER):
+        stammer[f"STM{number:03d}"] = Path(f"/ssb/stamme{number % 20:02d}/stm{number}")
+        if number % 4 == 0:
+            stammer[f"STM{number:03d}_SUB"] = Path(
+                f"/ssb/stamme{number % 20:02d}/stm{number}/sub"
+            )
+    lines = [f"export {name}={path}" for name, path in stammer.items()]
+    (folder / "stamme_variabel").write_text("\n".join(lines) + "\n", encoding="latin1")
+    return stammer
+
+
+def before(path: Path) -> Path:
+    """The dollar-path, like datadok_path_candidates did before the registry."""
+    stm = {v: k for k, v in ls._read_stamme_file().items()}
+    for real_path, dollar_name in stm.items():
+        if path.is_relative_to(real_path):
+            return Path("$" + dollar_name) / "/".join(
+                path.parts[len(real_path.parts) :]
+            )
+    return path
+
+
+def after(path: Path) -> Path:
+    """The dollar-path, from the cached registry."""
+    return ls.get_stamme_registry().to_dollar(path)
+
+
+def main(files: int = 5000) -> None:
+    """Run the benchmark and print the timings."""
+    folder = Path(tempfile.mkdtemp())
+    stammer = stamme_file(folder)
+    ls.STAMME_FILE = folder / "stamme_variabel"
+    rng = random.Random(2024)
+    roots = list(stammer.values())
+    paths = [
+        rng.choice(roots) / "arkiv" / f"fil{number}" / f"g{2000 + number % 25}.dat"
+        for number in range(files)
+    ]
+    print(f"{files} paths, {len(stammer)} stammer")
+    for label, convert in (("before: read every time", before), ("after", after)):
+        start = time.perf_counter()
+        converted = [convert(path) for path in paths]
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:<24} {elapsed * 1000:8.1f} ms  "
+            f"{elapsed / files * 1e6:7.1f} µs/path"
+        )
+    # The longest stamme wins after, the first in the file before
+    subs = sum(str(path).split("/")[0].endswith("_SUB") for path in converted)
+    print(f"paths in a stamme inside another: {subs}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,84 @@
+"""Time to the first item, and peak memory, of a huge Vardok list response.
+
+Run from the repository root:
+
+    python benchmarks/bench_streaming.py [variables]
+
+A local server answers GetConceptVariablesByApproved with the given number of
+ConceptVariables, sent in chunked pieces, one variable per piece.
+
+Before: vardok_concept_variables_by_approved downloads and parses the whole reply
+before returning anything.
+After: iter_vardok_concept_variables_by_approved parses the reply while it
+arrives, yielding each variable and dropping it from the tree.
+
+Peak memory is what tracemalloc sees, so it leaves out lxml's own buffers.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from collections.abc import Iterable
+from typing import Any
+
+from _standin import concept_variables_chunks
+from _standin import serve_chunked
+from _standin import standin_wsdls
+
+from ssb_tbmd_apis import zeep_client
+from ssb_tbmd_apis.operations.operations_vardok import (
+    iter_vardok_concept_variables_by_approved,
+)
+from ssb_tbmd_apis.operations.operations_vardok import (
+    vardok_concept_variables_by_approved,
+)
+from ssb_tbmd_apis.response_cache import bypass_response_cache
+
+
+def _measure(func: Callable[[], Iterable[Any]]) -> tuple[float, float, int, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in func():
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (first or total) * 1000, total * 1000, peak, count
+
+
+def main(variables: int = 5000) -> None:
+    """Run the benchmark and print the timings."""
+    chunks = concept_variables_chunks(variables)
+    server, address = serve_chunked(chunks)
+    zeep_client.WSDLS["vardok"] = standin_wsdls(address)["vardok"]
+    print(f"{variables} ConceptVariables, {sum(map(len, chunks))} bytes")
+
+    def before() -> Iterable[Any]:
+        return vardok_concept_variables_by_approved() or []
+
+    def after() -> Iterable[Any]:
+        return iter_vardok_concept_variables_by_approved()
+
+    with bypass_response_cache():
+        list(after())  # Warm up the client
+        for label, func in [
+            ("before: whole reply", before),
+            ("after: streamed", after),
+        ]:
+            first, total, peak, count = _measure(func)
+            print(
+                f"{label:<24} first item {first:9.1f} ms  all {count} in "
+                f"{total:9.1f} ms  peak memory {peak / 1e6:7.1f} MB"
+            )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,94 @@
+"""Drive the local stand-in TBMD server with many concurrent clients.
+
+Run from the repository root:
+
+    python benchmarks/load_test.py [--clients 16] [--calls 50] [--latency-ms 20]
+
+or through nox, passing the options after --:
+
+    nox -s load -- --clients 32 --async
+
+Each client makes its calls one after the other, cycling through a mix of the
+operations of all four services, so the number of calls in flight is the number
+of clients. The latency of each call is measured in the client, and the p50, p95
+and p99 latencies and the throughput are printed at the end. Add --serve to only
+start the server, and point other tools at the printed WSDL addresses.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections.abc import Sequence
+
+from _standin import Call
+from _standin import StandinServer
+from _standin import run_async
+from _standin import run_threads
+from _standin import workload
+
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.coalesce import set_coalescing
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Start the stand-in server, run the load test against it and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=50, help="calls per client")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--variables", type=int, default=25)
+    parser.add_argument("--list-size", type=int, default=50)
+    parser.add_argument("--fault-every", type=int, default=0)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--async", dest="use_async", action="store_true")
+    parser.add_argument("--cache", action="store_true", help="use the response cache")
+    parser.add_argument(
+        "--no-coalesce", action="store_true", help="make every call, even if in flight"
+    )
+    parser.add_argument("--serve", action="store_true", help="only run the server")
+    options = parser.parse_args(argv)
+
+    server = StandinServer(
+        latency=options.latency_ms / 1000,
+        jitter=options.jitter_ms / 1000,
+        seed=1,
+        variables=options.variables,
+        list_size=options.list_size,
+        port=options.port,
+    )
+    with server:
+        if options.serve:
+            for service, url in server.wsdl_urls().items():
+                print(f"{service:<10} {url}")
+            print("Serving, stop with Ctrl-C")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                return
+
+        zc.WSDLS.update(server.wsdl_urls())
+        if options.no_coalesce:
+            set_coalescing(False)
+
+        def work(number: int) -> list[Call]:
+            return workload(options.calls, options.fault_every, number * options.calls)
+
+        label = (
+            f"{'async' if options.use_async else 'threads'} clients={options.clients}"
+        )
+        if options.use_async:
+            result = asyncio.run(run_async(options.clients, work, options.cache))
+        else:
+            # Build the clients before timing
+            for service in zc.WSDLS:
+                zc.get_cached_client(service)
+            result = run_threads(options.clients, work, options.cache)
+        result.report(label)
+
+
+if __name__ == "__main__":
+    main()
@@ -197,6 +197,13 @@ def coverage(session: Session) -> None:
     session.run("coverage", *args)
 
 
+@session(python=python_versions[0])
+def load(session: Session) -> None:
+    """Load test the clients against a local stand-in of the TBMD services."""
+    session.install(".")
+    session.run("python", "benchmarks/load_test.py", *session.posargs)
+
+
 @session(python=python_versions[0])
 def typeguard(session: Session) -> None:
     """Runtime type checking using Typeguard."""
@@ -1 +1,60 @@
-"""SSB Tbmd Apis Python."""
+"""SSB Tbmd Apis Python.
+
+The most used functions can be imported from the package itself, like
+``from ssb_tbmd_apis import swap_dollar_sign``. They are imported on first use,
+so importing the package stays cheap, and zeep, lxml, requests, pandas and
+fagfunksjoner are only loaded by the functions that need them.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+from typing import Any
+
+if TYPE_CHECKING:
+    from ssb_tbmd_apis.imports.datadok_meta import datadok_vars_dataframe_by_path
+    from ssb_tbmd_apis.imports.datadok_open_flatfile import (
+        datadok_open_flatfile_from_path,
+    )
+    from ssb_tbmd_apis.operations.operations_datadok import (
+        datadok_file_description_by_path,
+    )
+    from ssb_tbmd_apis.oracle_direct.oracle_paths import paths_in_substamme
+    from ssb_tbmd_apis.paths.bulk_resolve import resolve_datadok_paths
+    from ssb_tbmd_apis.paths.linux_stammer import linux_stammer
+    from ssb_tbmd_apis.paths.try_variations import datadok_path_candidates
+    from ssb_tbmd_apis.paths.try_variations import look_for_file_on_disk
+    from ssb_tbmd_apis.paths.try_variations import swap_dollar_sign
+    from ssb_tbmd_apis.zeep_client import get_zeep_serialize
+    from ssb_tbmd_apis.zeep_client import get_zeep_serialize_list
+    from ssb_tbmd_apis.zeep_client import get_zeep_serialize_many
+
+_LAZY_ATTRIBUTES = {
+    "datadok_file_description_by_path": "ssb_tbmd_apis.operations.operations_datadok",
+    "datadok_open_flatfile_from_path": "ssb_tbmd_apis.imports.datadok_open_flatfile",
+    "datadok_path_candidates": "ssb_tbmd_apis.paths.try_variations",
+    "datadok_vars_dataframe_by_path": "ssb_tbmd_apis.imports.datadok_meta",
+    "get_zeep_serialize": "ssb_tbmd_apis.zeep_client",
+    "get_zeep_serialize_list": "ssb_tbmd_apis.zeep_client",
+    "get_zeep_serialize_many": "ssb_tbmd_apis.zeep_client",
+    "linux_stammer": "ssb_tbmd_apis.paths.linux_stammer",
+    "look_for_file_on_disk": "ssb_tbmd_apis.paths.try_variations",
+    "paths_in_substamme": "ssb_tbmd_apis.oracle_direct.oracle_paths",
+    "resolve_datadok_paths": "ssb_tbmd_apis.paths.bulk_resolve",
+    "swap_dollar_sign": "ssb_tbmd_apis.paths.try_variations",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    # Keep it, so the next lookup does not go through here
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_LAZY_ATTRIBUTES})
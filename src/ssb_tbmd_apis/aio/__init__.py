@@ -0,0 +1,8 @@
+"""Asyncio versions of the clients and operations for the TBMD APIs."""
+
+from ssb_tbmd_apis.aio.zeep_client import AsyncZeepClientRegistry
+from ssb_tbmd_apis.aio.zeep_client import aclose_zeep_clients
+from ssb_tbmd_apis.aio.zeep_client import get_async_registry
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize_list
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize_many
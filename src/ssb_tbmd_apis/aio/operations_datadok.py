@@ -0,0 +1,154 @@
+"""Async versions of the operations supported by the Datadok TBMD API."""
+
+from collections import OrderedDict
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import zeep
+
+from ssb_tbmd_apis.aio.try_variations import try_zeep_serialize_path
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize_many
+
+
+async def datadok_codelist_by_id(codelist_id: int | str) -> OrderedDict[str, Any]:
+    """Async version of datadok_codelist_by_id.
+
+    Args:
+        codelist_id: Id for the codelist.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("datadok", "GetCodelistById", codelist_id)
+
+
+async def datadok_codelist_by_reference(codelist_ref: str) -> OrderedDict[str, Any]:
+    """Async version of datadok_codelist_by_reference.
+
+    Args:
+        codelist_ref: The path to check for datadok-files, usually using the dollar-stamme, and without file-extension.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("datadok", "GetCodelistByReference", codelist_ref)
+
+
+async def datadok_codelists() -> OrderedDict[str, Any]:
+    """Async version of datadok_codelists.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("datadok", "GetCodelists")
+
+
+async def datadok_context_variable_by_id(var_id: int | str) -> OrderedDict[str, Any]:
+    """Async version of datadok_context_variable_by_id.
+
+    Args:
+        var_id: The ID of the context variable.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("datadok", "GetContextVariableById", var_id)
+
+
+async def datadok_context_variable_by_reference(var_ref: str) -> OrderedDict[str, Any]:
+    """Async version of datadok_context_variable_by_reference.
+
+    Args:
+        var_ref: The file path, plus the variable name in the file.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("datadok", "GetContextVariableByReference", var_ref)
+
+
+async def datadok_file_description_by_id(file_id: int | str) -> OrderedDict[str, Any]:
+    """Async version of datadok_file_description_by_id.
+
+    Args:
+        file_id: The id the file.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("datadok", "GetFileDescriptionById", file_id)
+
+
+async def datadok_file_description_by_path(
+    file_path: Path, deadline: float | None = None, parallel_probes: int = 1
+) -> tuple[OrderedDict[str, Any], Path]:
+    """Async version of datadok_file_description_by_path.
+
+    Args:
+        file_path: The path to check for datadok-files, usually using the dollar-stamme, and without file-extension.
+        deadline: The most seconds to spend looking for the path, None for no limit.
+        parallel_probes: How many variations of the path to look for at once.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await try_zeep_serialize_path(
+        Path(file_path),
+        tbmd_service="datadok",
+        operation="GetFileDescriptionByPath",
+        deadline=deadline,
+        parallel_probes=parallel_probes,
+    )
+
+
+async def datadok_codelist_by_id_many(
+    codelist_ids: Iterable[str | int],
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Async version of datadok_codelist_by_id_many, capped by the registry's max_concurrency.
+
+    Args:
+        codelist_ids: The codelist ids to look up.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the codelist ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return await get_zeep_serialize_many(
+        "datadok", "GetCodelistById", [(codelist_id,) for codelist_id in codelist_ids]
+    )
+
+
+async def datadok_context_variable_by_id_many(
+    var_ids: Iterable[str | int],
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Async version of datadok_context_variable_by_id_many, capped by the registry's max_concurrency.
+
+    Args:
+        var_ids: The variable ids to look up.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the variable ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return await get_zeep_serialize_many(
+        "datadok", "GetContextVariableById", [(var_id,) for var_id in var_ids]
+    )
+
+
+async def datadok_file_description_by_id_many(
+    file_ids: Iterable[str | int],
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Async version of datadok_file_description_by_id_many, capped by the registry's max_concurrency.
+
+    Args:
+        file_ids: The file ids to look up.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the file ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return await get_zeep_serialize_many(
+        "datadok", "GetFileDescriptionById", [(file_id,) for file_id in file_ids]
+    )
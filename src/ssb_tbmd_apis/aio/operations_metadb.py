@@ -0,0 +1,106 @@
+"""Async versions of the operations supported by the MetaDB TBMD API."""
+
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+import zeep
+
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize_list
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize_many
+
+
+async def metadb_codelists() -> list[OrderedDict[str, Any]]:
+    """Async version of metadb_codelists.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize_list("metadb", "GetCodelists")
+
+
+async def metadb_codelist_by_id(codelist_id: int | str) -> OrderedDict[str, Any]:
+    """Async version of metadb_codelist_by_id.
+
+    Args:
+        codelist_id: Id for the codelist.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("metadb", "GetCodelistById", codelist_id)
+
+
+async def metadb_context_variable_by_id(var_id: int | str) -> OrderedDict[str, Any]:
+    """Async version of metadb_context_variable_by_id.
+
+    Args:
+        var_id: Id for the codelist.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("metadb", "GetContextVariableById", var_id)
+
+
+async def metadb_description_by_id(table_id: int | str) -> OrderedDict[str, Any]:
+    """Async version of metadb_description_by_id.
+
+    Args:
+        table_id: Id for the table.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("metadb", "GetDataDescriptionById", table_id)
+
+
+async def metadb_event_history_structure_by_id(
+    project_id: int | str,
+) -> OrderedDict[str, Any]:
+    """Async version of metadb_event_history_structure_by_id.
+
+    Args:
+        project_id: Id for the project.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize(
+        "metadb", "GetEventHistoryStructureById", project_id
+    )
+
+
+async def metadb_codelist_by_id_many(
+    codelist_ids: Iterable[str | int],
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Async version of metadb_codelist_by_id_many, capped by the registry's max_concurrency.
+
+    Args:
+        codelist_ids: The codelist ids to look up.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the codelist ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return await get_zeep_serialize_many(
+        "metadb", "GetCodelistById", [(codelist_id,) for codelist_id in codelist_ids]
+    )
+
+
+async def metadb_context_variable_by_id_many(
+    var_ids: Iterable[str | int],
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Async version of metadb_context_variable_by_id_many, capped by the registry's max_concurrency.
+
+    Args:
+        var_ids: The variable ids to look up.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the variable ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return await get_zeep_serialize_many(
+        "metadb", "GetContextVariableById", [(var_id,) for var_id in var_ids]
+    )
@@ -0,0 +1,69 @@
+"""Async versions of the operations supported by the Statbank TBMD API."""
+
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+import zeep
+
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize_many
+
+
+async def statbank_meta_by_table_id(table_id: str | int) -> OrderedDict[str, Any]:
+    """Async version of statbank_meta_by_table_id.
+
+    Args:
+        table_id: The id of the table.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("statbank", "GetStatbankMetaByTabelId", table_id)
+
+
+async def statbank_meta_by_table_name(table_name: str) -> OrderedDict[str, Any]:
+    """Async version of statbank_meta_by_table_name.
+
+    Args:
+        table_name: The name of the table.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize(
+        "statbank", "GetStatbankMetaByTabelName", table_name
+    )
+
+
+async def statbank_table_ids_by_concept_variable_id(
+    var_id: str,
+) -> OrderedDict[str, Any]:
+    """Async version of statbank_table_ids_by_concept_variable_id.
+
+    Args:
+        var_id: The id of the concept variable.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize(
+        "statbank", "GetTableIdsByConceptVariableId", var_id
+    )
+
+
+async def statbank_meta_by_table_id_many(
+    table_ids: Iterable[str | int],
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Async version of statbank_meta_by_table_id_many, capped by the registry's max_concurrency.
+
+    Args:
+        table_ids: The table ids to look up.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the table ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return await get_zeep_serialize_many(
+        "statbank", "GetStatbankMetaByTabelId", [(table_id,) for table_id in table_ids]
+    )
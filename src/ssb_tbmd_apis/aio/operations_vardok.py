@@ -0,0 +1,201 @@
+"""Async versions of the operations supported by the Vardok TBMD API."""
+
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+import zeep
+
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize_many
+
+
+async def vardok_codelist_by_id(codelist_id: str | int) -> OrderedDict[str, Any]:
+    """Async version of vardok_codelist_by_id.
+
+    Args:
+        codelist_id: The id of the codelist.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("vardok", "GetCodelistById", codelist_id)
+
+
+async def vardok_codelists() -> OrderedDict[str, Any]:
+    """Async version of vardok_codelists.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("vardok", "GetCodelists")
+
+
+async def vardok_concept_variable_by_id(var_id: str | int) -> OrderedDict[str, Any]:
+    """Async version of vardok_concept_variable_by_id.
+
+    Args:
+        var_id: The id of the variable.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("vardok", "GetConceptVariableById", var_id)
+
+
+async def vardok_concept_variables_by_approved(
+    internal: bool = False,
+) -> OrderedDict[str, Any]:
+    """Async version of vardok_concept_variables_by_approved.
+
+    Args:
+        internal: True if getting internal variables, False if external (internet).
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    if internal:
+        flag = "internal"
+    else:
+        flag = "internet"
+    return await get_zeep_serialize("vardok", "GetConceptVariablesByApproved", flag)
+
+
+async def vardok_concept_variables_by_external_source(
+    var_id: str | int,
+) -> OrderedDict[str, Any]:
+    """Async version of vardok_concept_variables_by_external_source.
+
+    Args:
+        var_id: The id of the variable.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize(
+        "vardok", "GetConceptVariablesByExternalSource", var_id
+    )
+
+
+async def vardok_concept_variables_by_internal_source(
+    var_id: str | int,
+) -> OrderedDict[str, Any]:
+    """Async version of vardok_concept_variables_by_internal_source.
+
+    Args:
+        var_id: The id of the variable.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize(
+        "vardok", "GetConceptVariablesByInternalSource", var_id
+    )
+
+
+async def vardok_concept_variables_by_name_def(var_ref: str) -> OrderedDict[str, Any]:
+    """Async version of vardok_concept_variables_by_name_def.
+
+    Args:
+        var_ref: The text to search for.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("vardok", "GetConceptVariablesByNameDef", var_ref)
+
+
+async def vardok_concept_variables_by_owner(
+    section_id: str | int,
+) -> OrderedDict[str, Any]:
+    """Async version of vardok_concept_variables_by_owner.
+
+    Args:
+        section_id: The ID of the owning section.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize("vardok", "GetConceptVariablesByOwner", section_id)
+
+
+async def vardok_concept_variables_by_statistical_unit(
+    statistical_unit: str | int,
+) -> OrderedDict[str, Any]:
+    """Async version of vardok_concept_variables_by_statistical_unit.
+
+    Args:
+        statistical_unit: The ID of the statistical unit.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize(
+        "vardok", "GetConceptVariablesByStatisticalUnit", statistical_unit
+    )
+
+
+async def vardok_concept_variables_by_subject_area(
+    subject_area: str | int,
+) -> OrderedDict[str, Any]:
+    """Async version of vardok_concept_variables_by_subject_area.
+
+    Args:
+        subject_area: The ID of the subject area.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize(
+        "vardok", "GetConceptVariablesBySubjectArea", subject_area
+    )
+
+
+async def vardok_version_by_concept_variable_id(
+    variable_id: str | int,
+) -> OrderedDict[str, Any]:
+    """Async version of vardok_version_by_concept_variable_id.
+
+    Args:
+        variable_id: The ID of the concept variable.
+
+    Returns:
+        OrderedDict: The serialized zeep OrderedDict.
+    """
+    return await get_zeep_serialize(
+        "vardok", "GetVersionsByConceptVariableId", variable_id
+    )
+
+
+async def vardok_codelist_by_id_many(
+    codelist_ids: Iterable[str | int],
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Async version of vardok_codelist_by_id_many, capped by the registry's max_concurrency.
+
+    Args:
+        codelist_ids: The codelist ids to look up.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the codelist ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return await get_zeep_serialize_many(
+        "vardok", "GetCodelistById", [(codelist_id,) for codelist_id in codelist_ids]
+    )
+
+
+async def vardok_concept_variable_by_id_many(
+    var_ids: Iterable[str | int],
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Async version of vardok_concept_variable_by_id_many, capped by the registry's max_concurrency.
+
+    Args:
+        var_ids: The variable ids to look up.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the variable ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return await get_zeep_serialize_many(
+        "vardok", "GetConceptVariableById", [(var_id,) for var_id in var_ids]
+    )
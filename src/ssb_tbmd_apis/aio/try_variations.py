@@ -0,0 +1,137 @@
+"""Async version of the probing for datadok paths in paths.try_variations."""
+
+import asyncio
+import itertools
+from collections import OrderedDict
+from collections import deque
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import zeep
+
+from ssb_tbmd_apis.aio.zeep_client import get_zeep_serialize
+from ssb_tbmd_apis.paths.try_variations import _PathLookup
+from ssb_tbmd_apis.paths.try_variations import datadok_path_candidates
+from ssb_tbmd_apis.resilience import check_deadline
+from ssb_tbmd_apis.resilience import deadline_scope
+from ssb_tbmd_apis.response_cache import ResponseCacheMiss
+
+
+async def try_zeep_serialize_path(
+    path: Path,
+    tbmd_service: str = "datadok",
+    operation: str = "GetFileDescriptionByPath",
+    deadline: float | None = None,
+    parallel_probes: int = 1,
+) -> tuple[OrderedDict[str, Any], Path]:
+    """Try many different paths to get the file description from the datadok API.
+
+    With the resolution cache on, see ssb_tbmd_apis.paths.resolution_cache, a path
+    resolved before is called for directly, and the paths that ended in a Fault
+    before are skipped.
+
+    In the "oracle" resolution mode, see ssb_tbmd_apis.paths.path_index, the path
+    is picked from the paths datadok has, and only that one is called for. The
+    paths are probed if Oracle has none of them.
+
+    With parallel_probes above 1, the next paths are probed while waiting for the
+    one before them, within the concurrency limit of the AsyncZeepClientRegistry.
+    The result is still that of the first path in the order that datadok has.
+
+    Args:
+        path: Path to the file (string or Path).
+        tbmd_service: The TBMD service to use (default is "datadok").
+        operation: The operation to perform (default is "GetFileDescriptionByPath").
+        deadline: The most seconds to spend trying paths, None for no limit other
+            than an enclosing deadline_scope. Past it, DeadlineExceeded is raised.
+        parallel_probes: How many paths to probe at once.
+
+    Returns:
+        tuple: A tuple containing the file description and the resolved Path.
+
+    Raises:
+        FileNotFoundError: If the file description cannot be found, or in offline
+            mode, if none of the paths tried are in the response cache, or if the
+            resolution cache has that none were found.
+        ValueError: If parallel_probes is less than 1.
+    """
+    if parallel_probes < 1:
+        raise ValueError("parallel_probes must be at least 1.")
+    # The bookkeeping may block on SQLite or Oracle, so it runs on a thread
+    lookup = await asyncio.to_thread(_PathLookup, Path(path), tbmd_service, operation)
+
+    async def call(variation: Path) -> OrderedDict[str, Any] | None:
+        try:
+            return await get_zeep_serialize(tbmd_service, operation, str(variation))
+        except (zeep.exceptions.Fault, ResponseCacheMiss) as e:
+            await asyncio.to_thread(lookup.missed, variation, e)
+            return None
+
+    async def probe(variation: Path) -> OrderedDict[str, Any] | None:
+        if lookup.cache is not None and await asyncio.to_thread(
+            lookup.is_miss, variation
+        ):
+            return None
+        return await call(variation)
+
+    with deadline_scope(deadline):
+        before = await asyncio.to_thread(lookup.resolved_before)
+        if before is not None and before.resolved is None:
+            raise FileNotFoundError(
+                f"Found no path in datadok-api the last time looking for: {path}"
+            )
+        found = None
+        shortcuts = lookup.shortcuts(before)
+        while (shortcut := await asyncio.to_thread(next, shortcuts, None)) is not None:
+            result = await call(shortcut)
+            if result is not None:
+                found = (result, shortcut)
+                break
+        if found is None:
+            found = await _first_hit(
+                datadok_path_candidates(lookup.path),
+                probe,
+                parallel_probes,
+                f"{lookup.path}",
+            )
+    await asyncio.to_thread(lookup.remember, found)
+    if found is None:
+        raise FileNotFoundError(f"Failed looking for path in datadok-api: {path}")
+    return found
+
+
+async def _first_hit(
+    candidates: Iterable[Path],
+    probe: Callable[[Path], Awaitable[OrderedDict[str, Any] | None]],
+    parallel_probes: int,
+    what: str,
+) -> tuple[OrderedDict[str, Any], Path] | None:
+    # Like paths.try_variations._first_hit, cancelling the probes left in flight
+    candidates = iter(candidates)
+    window: deque[tuple[Path, asyncio.Task[OrderedDict[str, Any] | None]]] = deque()
+    try:
+        while True:
+            for variation in itertools.islice(
+                candidates, parallel_probes - len(window)
+            ):
+                check_deadline(f"looking for {what} in datadok")
+                window.append((variation, asyncio.ensure_future(probe(variation))))
+            if not window:
+                return None
+            variation, task = window.popleft()
+            result = await task
+            if result is not None:
+                return result, Path(variation)
+    finally:
+        for _, task in window:
+            task.cancel()
+            # Do not warn about the errors of probes no one waits for
+            task.add_done_callback(_retrieve)
+
+
+def _retrieve(task: "asyncio.Task[Any]") -> None:
+    if not task.cancelled():
+        task.exception()
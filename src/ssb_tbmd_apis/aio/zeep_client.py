@@ -0,0 +1,360 @@
+"""Asyncio clients for the TBMD SOAP services, built on zeep's httpx transport.
+
+Each event loop gets its own AsyncZeepClientRegistry, holding one zeep.AsyncClient
+per service on a shared httpx.AsyncClient, and a semaphore capping the number of
+SOAP calls in flight. Use the registry as an async context manager to set the
+limit and close the connections when done:
+
+    async with AsyncZeepClientRegistry(max_concurrency=20):
+        results = await get_zeep_serialize_many("datadok", "GetCodelistById", ids)
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from collections.abc import Iterable
+from contextlib import asynccontextmanager
+from types import TracebackType
+from typing import Any
+from typing import no_type_check
+
+import httpx
+import zeep
+
+from ssb_tbmd_apis.coalesce import acoalesced_call
+from ssb_tbmd_apis.raw_xml import acall_raw
+from ssb_tbmd_apis.raw_xml import get_parse_mode
+from ssb_tbmd_apis.resilience import Timeout
+from ssb_tbmd_apis.resilience import acall_with_retry
+from ssb_tbmd_apis.resilience import deadline_timeout
+from ssb_tbmd_apis.resilience import get_service_policy
+from ssb_tbmd_apis.response_cache import cache_lookup
+from ssb_tbmd_apis.response_cache import cache_store
+from ssb_tbmd_apis.response_cache import response_cache_key
+from ssb_tbmd_apis.schema_cache import load_document
+from ssb_tbmd_apis.tbmd_metrics import current_sample
+from ssb_tbmd_apis.tbmd_metrics import measure_call
+from ssb_tbmd_apis.tbmd_metrics import record_http
+from ssb_tbmd_apis.zeep_client import DEFAULT_MAX_WORKERS
+from ssb_tbmd_apis.zeep_client import WSDLS
+from ssb_tbmd_apis.zeep_client import LocalResolverTransport
+from ssb_tbmd_apis.zeep_client import ZeepLikeClient
+from ssb_tbmd_apis.zeep_client import _serialize_object_ntc
+from ssb_tbmd_apis.zeep_client import _service_key
+from ssb_tbmd_apis.zeep_client import get_http_config
+
+DEFAULT_MAX_CONCURRENCY = DEFAULT_MAX_WORKERS
+
+
+def _timeout(timeout: Timeout) -> httpx.Timeout:
+    # The (connect, read) timeouts of requests, as httpx takes them
+    return httpx.Timeout(timeout[1], connect=timeout[0])
+
+
+class LocalResolverAsyncTransport(
+    LocalResolverTransport, zeep.transports.AsyncTransport
+):
+    """Async transport, resolving WSDLs and schemas from disk like LocalResolverTransport.
+
+    Loading the WSDL stays synchronous, as in zeep, only the operations are async.
+    """
+
+    async def post(self, address: str, message: bytes | str, headers: Any) -> Any:
+        """Post a SOAP message, with the timeouts cut short by the deadline if any.
+
+        Args:
+            address: The address of the service.
+            message: The SOAP envelope to post.
+            headers: The HTTP headers to send.
+
+        Returns:
+            httpx.Response: The reply of the service.
+        """
+        timeout = deadline_timeout(self.operation_timeout)
+        return await self.client.post(
+            address,
+            content=message,
+            headers=headers,
+            timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else _timeout(timeout),
+        )
+
+    async def post_xml(self, address: str, envelope: Any, headers: Any) -> Any:
+        """Post the SOAP envelope, recording the HTTP timings of the call.
+
+        Args:
+            address: The address of the service.
+            envelope: The SOAP envelope to post.
+            headers: The HTTP headers to send.
+
+        Returns:
+            requests.Response: The reply of the service, converted by zeep.
+        """
+        start = time.perf_counter()
+        response = await zeep.transports.AsyncTransport.post_xml(  # type: ignore[no-untyped-call]
+            self, address, envelope, headers
+        )
+        # httpx does not tell when the headers arrived
+        record_http(0.0, time.perf_counter() - start, len(response.content))
+        return response
+
+
+@no_type_check
+def _mk_async_client(
+    wsdl: str, http_client: httpx.AsyncClient, timeout: Timeout | None = None
+) -> Any:
+    transport = LocalResolverAsyncTransport(
+        client=http_client, timeout=300 if timeout is None else _timeout(timeout)
+    )
+    # Read by post, zeep's AsyncTransport only passes it on to its own client
+    transport.operation_timeout = timeout
+    settings = zeep.Settings()
+    document = load_document(wsdl, transport, settings)
+    return zeep.AsyncClient(wsdl=document, transport=transport, settings=settings)
+
+
+def _mk_http_client() -> httpx.AsyncClient:
+    config = get_http_config()
+    limits = httpx.Limits(
+        max_connections=config.pool_maxsize,
+        max_keepalive_connections=config.pool_maxsize if config.keep_alive else 0,
+    )
+    transport = httpx.AsyncHTTPTransport(limits=limits, retries=config.max_retries)
+    return httpx.AsyncClient(transport=transport, timeout=None)
+
+
+class AsyncZeepClientRegistry:
+    """The async clients, HTTP connections and concurrency limit of one event loop."""
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+        """Initialize an empty registry.
+
+        Args:
+            max_concurrency: The most SOAP calls to have in flight at once.
+
+        Raises:
+            ValueError: If max_concurrency is less than 1.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._clients: dict[str, ZeepLikeClient] = {}
+        self._build_lock = asyncio.Lock()
+        self._http_client: httpx.AsyncClient | None = None
+
+    async def get(self, tbmd_service: str = "datadok") -> ZeepLikeClient:
+        """Get the async client for a service, building it if needed.
+
+        The WSDL is loaded in a worker thread, so the event loop is not blocked.
+
+        Args:
+            tbmd_service: The TBMD service to use (default is "datadok").
+
+        Returns:
+            ZeepLikeClient: The shared zeep.AsyncClient for the service.
+        """
+        tbmd_service = _service_key(tbmd_service)
+        client = self._clients.get(tbmd_service)
+        if client is not None:
+            return client
+        async with self._build_lock:
+            # Another task might have built it while we waited for the lock
+            if tbmd_service not in self._clients:
+                if self._http_client is None:
+                    self._http_client = _mk_http_client()
+                self._clients[tbmd_service] = await asyncio.to_thread(
+                    _mk_async_client,
+                    WSDLS[tbmd_service],
+                    self._http_client,
+                    get_service_policy(tbmd_service).timeout,
+                )
+        return self._clients[tbmd_service]
+
+    async def aclose(self) -> None:
+        """Drop the clients and close the HTTP connections."""
+        self._clients.clear()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    async def __aenter__(self) -> "AsyncZeepClientRegistry":
+        """Make this the registry used by the running event loop."""
+        _registries[asyncio.get_running_loop()] = self
+        return self
+
+    async def __aexit__(
+        self,
+        type_: type[BaseException] | None,
+        value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the registry, and stop using it for the running event loop."""
+        await self.aclose()
+        loop = asyncio.get_running_loop()
+        if _registries.get(loop) is self:
+            del _registries[loop]
+
+
+_registries: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, AsyncZeepClientRegistry
+] = weakref.WeakKeyDictionary()
+_registries_lock = threading.Lock()
+
+
+def get_async_registry() -> AsyncZeepClientRegistry:
+    """Get the registry of the running event loop, creating it if needed.
+
+    Returns:
+        AsyncZeepClientRegistry: The registry used by the async functions.
+    """
+    loop = asyncio.get_running_loop()
+    with _registries_lock:
+        registry = _registries.get(loop)
+        if registry is None:
+            registry = AsyncZeepClientRegistry()
+            _registries[loop] = registry
+    return registry
+
+
+async def aclose_zeep_clients() -> None:
+    """Close the async clients and connections of the running event loop."""
+    loop = asyncio.get_running_loop()
+    registry = _registries.pop(loop, None)
+    if registry is not None:
+        await registry.aclose()
+
+
+@asynccontextmanager
+async def _slot(registry: AsyncZeepClientRegistry) -> AsyncIterator[None]:
+    # Wait for room under the concurrency limit, counting the wait as queue time
+    sample = current_sample()
+    start = time.perf_counter()
+    async with registry.semaphore:
+        if sample is not None:
+            sample.seconds["queue"] += time.perf_counter() - start
+        yield
+
+
+async def _call_operation(tbmd_service: str, operation: str, *args: str | int) -> Any:
+    registry = get_async_registry()
+    client = await registry.get(tbmd_service)
+    async with _slot(registry):
+        return await getattr(client.service, operation)(*args)
+
+
+async def _call_raw(tbmd_service: str, operation: str, *args: str | int) -> Any:
+    registry = get_async_registry()
+    client = await registry.get(tbmd_service)
+    async with _slot(registry):
+        return await acall_raw(client, operation, *args)
+
+
+async def _cached_serialize(
+    tbmd_service: str, operation: str, args: tuple[str | int, ...], use_cache: bool
+) -> Any:
+    key = response_cache_key(tbmd_service, operation, *args)
+
+    async def fetch() -> Any:
+        with measure_call(tbmd_service, operation) as sample:
+            if get_parse_mode() == "raw":
+                return await _call_raw(tbmd_service, operation, *args)
+            response = await _call_operation(tbmd_service, operation, *args)
+            with sample.timing("serialize"):
+                return _serialize_object_ntc(response)
+
+    result = cache_lookup(key, use_cache)
+    if result is None:
+        result = await acoalesced_call(
+            key, lambda: acall_with_retry(tbmd_service, fetch)
+        )
+        cache_store(key, result, use_cache)
+    return result
+
+
+async def get_zeep_serialize(
+    tbmd_service: str = "datadok",
+    operation: str = "GetFileDescriptionByPath",
+    *args: str | int,
+    use_cache: bool = True,
+) -> OrderedDict[str, Any]:
+    """Get serialized response from the async Zeep client for the specified operation.
+
+    Args:
+        tbmd_service: The TBMD service to use (default is "datadok").
+        operation: The operation to perform (default is "GetFileDescriptionByPath").
+        *args: Arguments for the operation.
+        use_cache: False to always call the service, skipping the response cache.
+
+    Returns:
+        OrderedDict: The serialized response from the Zeep client.
+    """
+    result: OrderedDict[str, Any] = await _cached_serialize(
+        tbmd_service, operation, args, use_cache
+    )
+    return result
+
+
+async def get_zeep_serialize_list(
+    tbmd_service: str = "metadb",
+    operation: str = "GetCodelists",
+    *args: str | int,
+    use_cache: bool = True,
+) -> list[OrderedDict[str, Any]]:
+    """Get serialized response from the async Zeep client for an operation that returns a list.
+
+    Args:
+        tbmd_service: The TBMD service to use (default is "metadb").
+        operation: The operation to perform (default is "GetCodelists").
+        *args: Arguments for the operation.
+        use_cache: False to always call the service, skipping the response cache.
+
+    Returns:
+        list[OrderedDict]: The serialized response from the Zeep client.
+    """
+    result_list: list[OrderedDict[str, Any]] = await _cached_serialize(
+        tbmd_service, operation, args, use_cache
+    )
+    return result_list
+
+
+async def get_zeep_serialize_many(
+    tbmd_service: str,
+    operation: str,
+    args_list: Iterable[tuple[str | int, ...]],
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Run the same operation for many argument tuples, concurrently.
+
+    How many calls are in flight at once is capped by the max_concurrency of the
+    registry of the running event loop.
+
+    Args:
+        tbmd_service: The TBMD service to use.
+        operation: The operation to perform.
+        args_list: One tuple of arguments for each call, like [(1,), (2,)].
+
+    Returns:
+        list: For each argument tuple, in the same order, the serialized
+            response, or the zeep.exceptions.Fault the service answered with.
+            Any other error is raised, once the other calls are cancelled.
+    """
+
+    async def call(
+        args: tuple[str | int, ...],
+    ) -> OrderedDict[str, Any] | zeep.exceptions.Fault:
+        try:
+            return await get_zeep_serialize(tbmd_service, operation, *args)
+        except zeep.exceptions.Fault as e:
+            return e
+
+    tasks = [asyncio.ensure_future(call(args)) for args in args_list]
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        # On an error, stop the other calls, and wait for them to give back
+        # their connections. Done calls are left as they are.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
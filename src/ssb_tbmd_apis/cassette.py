@@ -0,0 +1,235 @@
+"""Record the SOAP calls made to disk, and replay them without the services.
+
+A cassette is a folder with two files for each call: the reply as it came from the
+service, in <key>.xml, and the request, address, HTTP status and headers in
+<key>.json. The key is a hash of the address and the request, so the same call
+always gets the same reply.
+
+Record the calls of a job once, where ws.ssb.no can be reached:
+
+    with use_cassette("cassettes/nightly", mode="record"):
+        run_the_job()
+
+Then replay them anywhere, optionally with the latency of the real services, to
+benchmark the client end to end:
+
+    with use_cassette("cassettes/nightly", latency=0.05, jitter=0.02, seed=1):
+        run_the_job()
+
+Only the sync clients use cassettes. Loading the WSDLs is not recorded, use the
+WSDL snapshots for that, see ssb_tbmd_apis.wsdl_snapshots.
+"""
+
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+import requests
+
+from ssb_tbmd_apis.tbmd_logger import logger
+from ssb_tbmd_apis.zeep_client import LocalResolverTransport
+from ssb_tbmd_apis.zeep_client import set_transport_factory
+
+CASSETTE_MODES = ("record", "replay", "auto")
+
+
+class CassetteMiss(LookupError):
+    """Raised when replaying a call that is not in the cassette."""
+
+
+def cassette_key(address: str, message: bytes | str) -> str:
+    """Get the key a call is stored under in a cassette.
+
+    Args:
+        address: The address the request is posted to.
+        message: The SOAP envelope posted.
+
+    Returns:
+        str: The hex SHA-256 of the address and the request.
+    """
+    if isinstance(message, str):
+        message = message.encode("utf-8")
+    return hashlib.sha256(address.encode("utf-8") + b"\n" + message).hexdigest()
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    # Write to a temporary file first, so readers never see half a file
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+class CassetteTransport(LocalResolverTransport):
+    """Transport recording the SOAP calls to a cassette, or replaying them from it."""
+
+    # Replies come from files, so raw_xml.iter_raw parses them whole
+    streaming = False
+
+    def __init__(
+        self,
+        *args: Any,
+        cassette_dir: Path | str,
+        mode: str = "replay",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the transport.
+
+        Args:
+            *args: Passed on to LocalResolverTransport.
+            cassette_dir: The folder of the cassette, created when recording.
+            mode: "record" to call the services and store the replies, "replay" to
+                answer from the cassette only, or "auto" to replay the calls that
+                are in the cassette and record the rest.
+            latency: Seconds to wait before answering a replayed call.
+            jitter: Up to this many seconds are added to or taken from the latency,
+                at random.
+            seed: Seed for the random jitter, to get the same delays every run.
+            **kwargs: Passed on to LocalResolverTransport.
+
+        Raises:
+            ValueError: If the mode is unknown, or latency or jitter are negative.
+        """
+        super().__init__(*args, **kwargs)
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Cassette mode must be one of {CASSETTE_MODES}.")
+        if latency < 0 or jitter < 0:
+            raise ValueError("latency and jitter can not be negative.")
+        self.cassette_dir = Path(cassette_dir)
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.recorded = 0
+        self.replayed = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        if mode != "replay":
+            self.cassette_dir.mkdir(parents=True, exist_ok=True)
+
+    def post(self, address: str, message: bytes | str, headers: Any) -> Any:
+        """Answer a SOAP call from the cassette, or from the service while recording.
+
+        Args:
+            address: The address of the service.
+            message: The SOAP envelope to post.
+            headers: The HTTP headers to send.
+
+        Returns:
+            requests.Response: The reply of the service, or the replayed reply.
+
+        Raises:
+            CassetteMiss: If replaying, and the call is not in the cassette.
+        """
+        key = cassette_key(address, message)
+        body_path = self.cassette_dir / f"{key}.xml"
+        meta_path = self.cassette_dir / f"{key}.json"
+        if self.mode != "record" and meta_path.is_file():
+            return self._replay(address, body_path, meta_path)
+        if self.mode == "replay":
+            raise CassetteMiss(
+                f"No call to {address} with key {key} in {self.cassette_dir}"
+            )
+        response = super().post(address, message, headers)
+        self._record(address, message, response, body_path, meta_path)
+        return response
+
+    def _delay(self) -> float:
+        with self._lock:
+            offset = (
+                self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+            )
+        return max(self.latency + offset, 0.0)
+
+    def _replay(self, address: str, body_path: Path, meta_path: Path) -> Any:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        response = requests.Response()
+        response.status_code = meta["status_code"]
+        response.headers.update(meta["headers"])
+        response.url = address
+        response._content = body_path.read_bytes()
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        response.elapsed = timedelta(seconds=delay)
+        with self._lock:
+            self.replayed += 1
+        return response
+
+    def _record(
+        self,
+        address: str,
+        message: bytes | str,
+        response: Any,
+        body_path: Path,
+        meta_path: Path,
+    ) -> None:
+        if isinstance(message, bytes):
+            message = message.decode("utf-8")
+        meta = {
+            "address": address,
+            "request": message,
+            "status_code": response.status_code,
+            "headers": {"Content-Type": response.headers.get("Content-Type", "")},
+            "recorded": datetime.now().isoformat(timespec="seconds"),
+        }
+        # The reply first, so a call with metadata always has its reply
+        _write_atomic(body_path, response.content)
+        _write_atomic(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+        with self._lock:
+            self.recorded += 1
+        logger.debug(f"Recorded call to {address} in {meta_path}")
+
+
+@contextmanager
+def use_cassette(
+    cassette_dir: Path | str,
+    mode: str = "replay",
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    seed: int | None = None,
+) -> Iterator[list[CassetteTransport]]:
+    """Make the sync clients record to, or replay from, a cassette in the with block.
+
+    Args:
+        cassette_dir: The folder of the cassette.
+        mode: "record", "replay" or "auto", see CassetteTransport.
+        latency: Seconds to wait before answering a replayed call.
+        jitter: Up to this many seconds are added to or taken from the latency.
+        seed: Seed for the random jitter.
+
+    Yields:
+        list[CassetteTransport]: The transports built in the block, one per
+            service used, to read their recorded and replayed counters.
+    """
+    transports: list[CassetteTransport] = []
+
+    def factory(session: requests.Session) -> LocalResolverTransport:
+        transport = CassetteTransport(
+            session=session,
+            cassette_dir=cassette_dir,
+            mode=mode,
+            latency=latency,
+            jitter=jitter,
+            seed=seed,
+        )
+        transports.append(transport)
+        return transport
+
+    previous = set_transport_factory(factory)
+    try:
+        yield transports
+    finally:
+        set_transport_factory(previous)
@@ -0,0 +1,331 @@
+"""Share one SOAP call between concurrent callers asking for the same thing.
+
+When many workers export at once, they often ask for the same codelist or file
+description at the same time, before any of them has put it in the response
+cache. get_zeep_serialize and get_zeep_serialize_list, in threads or in asyncio
+tasks, make a single call for each (service, operation, args) in flight: the
+first caller calls the service, and the callers arriving while it is in flight
+wait for it and get copies of its response, or of its error. A caller waiting
+for another's call still keeps to its own deadline_scope.
+
+Only calls actually in flight are shared, nothing is kept after they finish, that
+is what the response cache is for. Calls are shared between threads, and between
+the tasks of one event loop.
+
+Turn it off with set_coalescing(False) or SSB_TBMD_COALESCE=0. See how many calls
+were shared with coalesce_stats.
+"""
+
+import asyncio
+import copy
+import threading
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import Any
+from typing import NoReturn
+
+from ssb_tbmd_apis.resilience import DeadlineExceeded
+from ssb_tbmd_apis.resilience import remaining_time
+from ssb_tbmd_apis.response_cache import _env_flag
+
+_enabled: bool | None = None
+
+
+@dataclass(frozen=True)
+class CoalesceStats:
+    """Counters of the shared calls since the process started or they were reset."""
+
+    calls: int = 0
+    coalesced: int = 0
+    in_flight: int = 0
+
+    @property
+    def coalesce_rate(self) -> float:
+        """The share of callers that waited for another call, from 0.0 to 1.0."""
+        callers = self.calls + self.coalesced
+        return self.coalesced / callers if callers else 0.0
+
+
+class _Flight:
+    """A call in flight in a thread, and its outcome once done."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.finished = False
+        self.result: Any = None
+        self.error: Exception | None = None
+        self.waiters = 0
+
+
+class _AsyncFlight:
+    """A call in flight in an event loop, and the callers waiting for it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.future: asyncio.Future[Any] = loop.create_future()
+        self.waiters = 0
+
+
+def _raise_shared(error: BaseException) -> NoReturn:
+    # Each waiter raises its own copy, as raising an error sets its traceback
+    try:
+        copied = copy.copy(error)
+    except Exception:
+        raise error from None
+    raise copied.with_traceback(error.__traceback__)
+
+
+def _wait_timeout() -> float | None:
+    # The seconds a waiter may wait, by its own deadline
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("The deadline for the shared SOAP call has passed.")
+    return remaining
+
+
+class SingleFlight:
+    """Thread-safe register of the calls in flight, by key."""
+
+    def __init__(self) -> None:
+        """Initialize with nothing in flight."""
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._futures: dict[tuple[int, Hashable], _AsyncFlight] = {}
+        self._calls = 0
+        self._coalesced = 0
+
+    def call(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """Fetch the value for the key, or wait for the fetch already in flight.
+
+        A caller waits no longer than its own deadline. If the call in flight
+        ran out of time for its deadline, or was interrupted, the waiters make
+        their own call.
+
+        Args:
+            key: Identifies the call, like the key from response_cache_key.
+            fetch: Gets the value, called only if no call for the key is in flight.
+
+        Returns:
+            Any: The value, or a deep copy of it for the callers that waited.
+
+        Raises:
+            DeadlineExceeded: If the deadline of the caller passed while waiting.
+            Exception: Whatever fetch raised, for the caller making the call and
+                as a copy for the callers that waited.
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = _Flight()
+                    self._calls += 1
+                    break
+                flight.waiters += 1
+                self._coalesced += 1
+            if not flight.done.wait(_wait_timeout()):
+                raise DeadlineExceeded(
+                    "The deadline passed while waiting for the shared SOAP call."
+                )
+            if flight.finished:
+                return copy.deepcopy(flight.result)
+            if flight.error is not None and not isinstance(
+                flight.error, DeadlineExceeded
+            ):
+                _raise_shared(flight.error)
+            # The call was interrupted, like by KeyboardInterrupt, or ran out of
+            # time for the deadline of its caller, so make our own
+
+        try:
+            result = fetch()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            flight.finished = True
+            return result
+        finally:
+            with self._lock:
+                del self._flights[key]
+                waiters = flight.waiters
+            if flight.finished and waiters:
+                # Copied before anyone gets it, so the caller may change its own
+                flight.result = copy.deepcopy(result)
+            flight.done.set()
+
+    async def acall(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Fetch the value for the key, or wait for the fetch in flight in this event loop.
+
+        A caller waits no longer than its own deadline. If the call in flight
+        ran out of time for its deadline, or was cancelled, the waiters make
+        their own call.
+
+        Args:
+            key: Identifies the call, like the key from response_cache_key.
+            fetch: Gets the value, called only if no call for the key is in flight.
+
+        Returns:
+            Any: The value, or a deep copy of it for the callers that waited.
+
+        Raises:
+            DeadlineExceeded: If the deadline of the caller passed while waiting.
+            Exception: Whatever fetch raised, for the caller making the call and
+                as a copy for the callers that waited.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        while True:
+            with self._lock:
+                flight = self._futures.get(loop_key)
+                if flight is None:
+                    flight = self._futures[loop_key] = _AsyncFlight(loop)
+                    self._calls += 1
+                    break
+                flight.waiters += 1
+                self._coalesced += 1
+            future = flight.future
+            # Unlike awaiting the future, cancelling this caller leaves it alone
+            await asyncio.wait([future], timeout=_wait_timeout())
+            if not future.done():
+                raise DeadlineExceeded(
+                    "The deadline passed while waiting for the shared SOAP call."
+                )
+            if not future.cancelled():
+                error = future.exception()
+                if error is None:
+                    return copy.deepcopy(future.result())
+                if not isinstance(error, DeadlineExceeded):
+                    _raise_shared(error)
+            # The call was cancelled, or ran out of time for the deadline of its
+            # caller, so make our own
+
+        future = flight.future
+        try:
+            result = await fetch()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it as retrieved, in case no one was waiting for it
+            future.exception()
+            raise
+        else:
+            # Copied before anyone gets it, so the caller may change its own
+            future.set_result(copy.deepcopy(result) if flight.waiters else result)
+            return result
+        finally:
+            if not future.done():
+                # Cancelled, or interrupted like by KeyboardInterrupt
+                future.cancel()
+            with self._lock:
+                del self._futures[loop_key]
+
+    def stats(self) -> CoalesceStats:
+        """Get the counters.
+
+        Returns:
+            CoalesceStats: The calls made, the callers that waited for them, and
+                the calls in flight now.
+        """
+        with self._lock:
+            return CoalesceStats(
+                calls=self._calls,
+                coalesced=self._coalesced,
+                in_flight=len(self._flights) + len(self._futures),
+            )
+
+    def reset_stats(self) -> CoalesceStats:
+        """Start counting from zero again.
+
+        Returns:
+            CoalesceStats: The counters until now.
+        """
+        with self._lock:
+            stats = CoalesceStats(
+                calls=self._calls,
+                coalesced=self._coalesced,
+                in_flight=len(self._flights) + len(self._futures),
+            )
+            self._calls = self._coalesced = 0
+        return stats
+
+
+_SINGLE_FLIGHT = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the register of the SOAP calls in flight.
+
+    Returns:
+        SingleFlight: The register of the process.
+    """
+    return _SINGLE_FLIGHT
+
+
+def coalescing_enabled() -> bool:
+    """Check whether concurrent identical calls are shared.
+
+    Returns:
+        bool: The value from set_coalescing, or else False if SSB_TBMD_COALESCE is
+            set to 0, false or no.
+    """
+    if _enabled is not None:
+        return _enabled
+    return _env_flag("SSB_TBMD_COALESCE", "1")
+
+
+def set_coalescing(enabled: bool | None) -> None:
+    """Turn sharing of concurrent identical calls on or off, overriding the environment.
+
+    Args:
+        enabled: True to share calls, False to always make a call for each caller,
+            or None to go back to reading SSB_TBMD_COALESCE.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def coalesced_call(key: Hashable, fetch: Callable[[], Any]) -> Any:
+    """Fetch a value, sharing the call with concurrent callers of the same key.
+
+    Args:
+        key: Identifies the call, like the key from response_cache_key.
+        fetch: Gets the value.
+
+    Returns:
+        Any: The value.
+    """
+    if not coalescing_enabled():
+        return fetch()
+    return _SINGLE_FLIGHT.call(key, fetch)
+
+
+async def acoalesced_call(key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Fetch a value, sharing the call with concurrent tasks awaiting the same key.
+
+    Args:
+        key: Identifies the call, like the key from response_cache_key.
+        fetch: Gets the value.
+
+    Returns:
+        Any: The value.
+    """
+    if not coalescing_enabled():
+        return await fetch()
+    return await _SINGLE_FLIGHT.acall(key, fetch)
+
+
+def coalesce_stats() -> CoalesceStats:
+    """Get the counters of the shared calls.
+
+    Returns:
+        CoalesceStats: The calls made, and the callers that waited for one instead.
+    """
+    return _SINGLE_FLIGHT.stats()
+
+
+def reset_coalesce_stats() -> CoalesceStats:
+    """Start counting the shared calls from zero again.
+
+    Returns:
+        CoalesceStats: The counters until now.
+    """
+    return _SINGLE_FLIGHT.reset_stats()
@@ -0,0 +1,266 @@
+"""Persistent cache of serialized SOAP responses in a SQLite file.
+
+Responses are pickled and zlib-compressed, and stored with the time they were
+fetched, so they are shared between processes and survive restarts. They expire
+after the TTL of their operation, counted from when they were fetched, so changing
+the TTLs also applies to responses already stored. In offline mode, expired
+responses are still served, as they are the best there is.
+
+Turn it on for the process with SSB_TBMD_DISK_CACHE=1, or with enable_disk_cache.
+The file is responses.sqlite in SSB_TBMD_CACHE_DIR (or ~/.cache/ssb_tbmd_apis).
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from ssb_tbmd_apis.response_cache import CacheKey
+from ssb_tbmd_apis.response_cache import CacheStats
+from ssb_tbmd_apis.response_cache import ResponseCache
+from ssb_tbmd_apis.response_cache import ResponseCacheProto
+from ssb_tbmd_apis.response_cache import TieredResponseCache
+from ssb_tbmd_apis.response_cache import get_response_cache
+from ssb_tbmd_apis.response_cache import offline_mode
+from ssb_tbmd_apis.response_cache import set_response_cache
+from ssb_tbmd_apis.schema_cache import cache_dir
+from ssb_tbmd_apis.tbmd_logger import logger
+
+DEFAULT_DISK_TTL = 7 * 24 * 3600.0
+# Files described by path can be moved or replaced, so look them up again daily
+DEFAULT_DISK_OPERATION_TTLS: dict[str, float] = {
+    "GetFileDescriptionByPath": 24 * 3600.0,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    service TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    args TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (service, operation, args)
+)
+"""
+
+
+def disk_cache_path() -> Path:
+    """Get the default location of the SQLite response cache.
+
+    Returns:
+        Path: responses.sqlite in the cache directory.
+    """
+    return cache_dir() / "responses.sqlite"
+
+
+def _args_column(args: tuple[str, ...]) -> str:
+    # The unit separator does not show up in ids or paths
+    return "\x1f".join(args)
+
+
+class DiskResponseCache:
+    """Thread-safe response cache in a SQLite file, with compressed payloads."""
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        ttl: float = DEFAULT_DISK_TTL,
+        operation_ttls: dict[str, float] | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Open, or create, the cache file.
+
+        Args:
+            path: The SQLite file. Defaults to disk_cache_path().
+            ttl: Seconds to keep responses of operations missing from operation_ttls.
+            operation_ttls: Seconds to keep responses, by operation name. A TTL of 0
+                means the operation is never cached. Defaults to
+                DEFAULT_DISK_OPERATION_TTLS.
+            clock: Function returning the current time in seconds since the epoch.
+        """
+        self.path = Path(path) if path is not None else disk_cache_path()
+        self.ttl = ttl
+        self.operation_ttls = dict(
+            DEFAULT_DISK_OPERATION_TTLS if operation_ttls is None else operation_ttls
+        )
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+
+    def ttl_for(self, operation: str) -> float:
+        """Get how many seconds responses of an operation are kept.
+
+        Args:
+            operation: The name of the operation.
+
+        Returns:
+            float: The TTL in seconds, 0 if the operation is not cached.
+        """
+        return self.operation_ttls.get(operation, self.ttl)
+
+    def get(self, key: CacheKey) -> Any:
+        """Look up a response.
+
+        Args:
+            key: The key from response_cache_key.
+
+        Returns:
+            Any: The cached response, or None if missing, unreadable or expired
+                (unless in offline mode).
+        """
+        service, operation, args = key
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched, payload FROM responses"
+                " WHERE service = ? AND operation = ? AND args = ?",
+                (service, operation, _args_column(args)),
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            if row[0] + self.ttl_for(operation) <= self._clock() and not offline_mode():
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._hits += 1
+        try:
+            return pickle.loads(zlib.decompress(row[1]))
+        except (zlib.error, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logger.debug(f"Unreadable cached response for {key}: {e}")
+            return None
+
+    def set(self, key: CacheKey, value: Any) -> None:
+        """Store a response, unless its operation has a TTL of 0.
+
+        Args:
+            key: The key from response_cache_key.
+            value: The serialized response.
+        """
+        service, operation, args = key
+        if self.ttl_for(operation) <= 0:
+            return
+        payload = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (service, operation, _args_column(args), self._clock(), payload),
+            )
+
+    def invalidate(
+        self, tbmd_service: str | None = None, operation: str | None = None
+    ) -> int:
+        """Delete cached responses.
+
+        Args:
+            tbmd_service: Only delete responses from this service.
+            operation: Only delete responses from this operation.
+
+        Returns:
+            int: The number of responses deleted.
+        """
+        service = tbmd_service.lower() if tbmd_service is not None else None
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE (:service IS NULL OR service = :service)"
+                " AND (:operation IS NULL OR operation = :operation)",
+                {"service": service, "operation": operation},
+            )
+        return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        """Delete the responses that are past their TTL, to shrink the file.
+
+        Returns:
+            int: The number of responses deleted.
+        """
+        now = self._clock()
+        deleted = 0
+        with self._lock:
+            operations = self._conn.execute(
+                "SELECT DISTINCT operation FROM responses"
+            ).fetchall()
+            for (operation,) in operations:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE operation = ? AND fetched <= ?",
+                    (operation, now - self.ttl_for(operation)),
+                )
+                deleted += cursor.rowcount
+            self._expirations += deleted
+        return deleted
+
+    def stats(self) -> CacheStats:
+        """Get the counters of the cache.
+
+        Returns:
+            CacheStats: Hits, misses and expirations since the cache was opened,
+                and the number of responses in the file.
+        """
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                expirations=self._expirations,
+                size=size,
+            )
+
+    def close(self) -> None:
+        """Close the connection to the SQLite file."""
+        with self._lock:
+            self._conn.close()
+
+
+def enable_disk_cache(
+    path: Path | str | None = None,
+    ttl: float = DEFAULT_DISK_TTL,
+    operation_ttls: dict[str, float] | None = None,
+) -> DiskResponseCache:
+    """Put a SQLite response cache behind the in-memory one.
+
+    Args:
+        path: The SQLite file. Defaults to disk_cache_path().
+        ttl: Seconds to keep responses of operations missing from operation_ttls.
+        operation_ttls: Seconds to keep responses, by operation name, merged over
+            DEFAULT_DISK_OPERATION_TTLS. Use 0 to never cache an operation.
+
+    Returns:
+        DiskResponseCache: The new disk cache.
+    """
+    disk = DiskResponseCache(
+        path,
+        ttl=ttl,
+        operation_ttls={**DEFAULT_DISK_OPERATION_TTLS, **(operation_ttls or {})},
+    )
+    set_response_cache(TieredResponseCache(_memory_tier(), disk))
+    return disk
+
+
+def disable_disk_cache() -> None:
+    """Go back to only caching responses in memory."""
+    current = get_response_cache()
+    set_response_cache(_memory_tier())
+    if isinstance(current, TieredResponseCache):
+        for tier in current.tiers:
+            if isinstance(tier, DiskResponseCache):
+                tier.close()
+
+
+def _memory_tier() -> ResponseCacheProto:
+    current = get_response_cache()
+    if isinstance(current, TieredResponseCache):
+        current = current.tiers[0]
+    if isinstance(current, DiskResponseCache):
+        return ResponseCache()
+    return current
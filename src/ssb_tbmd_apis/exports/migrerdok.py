@@ -2,9 +2,6 @@ import json
 from pathlib import Path
 from typing import Any
 
-from fagfunksjoner.paths.versions import latest_version_path
-from fagfunksjoner.paths.versions import next_version_path
-
 from ssb_tbmd_apis.operations.operations_datadok import datadok_file_description_by_path
 from ssb_tbmd_apis.paths.try_variations import swap_dollar_sign
 from ssb_tbmd_apis.tbmd_logger import logger
@@ -43,6 +40,10 @@ def save_migrerdok_for_flatfile(
         logger.info(f"Wrote datadok contents to {ddok_path}")
     # File exists, and we want to version up
     elif version_up:
+        # fagfunksjoner is slow to import, and only needed when versioning up
+        from fagfunksjoner.paths.versions import latest_version_path
+        from fagfunksjoner.paths.versions import next_version_path
+
         # Get highest available version path on disk
         path_highest_version = latest_version_path(str(ddok_path))
 
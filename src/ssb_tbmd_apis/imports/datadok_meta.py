@@ -1,10 +1,12 @@
+from __future__ import annotations
+
 import json
 import os
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
-
-from ssb_tbmd_apis.operations.operations_datadok import datadok_file_description_by_path
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def datadok_vars_dataframe_by_path(path: Path) -> pd.DataFrame:
@@ -16,7 +18,14 @@ def datadok_vars_dataframe_by_path(path: Path) -> pd.DataFrame:
     Returns:
         pd.DataFrame: DataFrame containing the datadok variables.
     """
+    import pandas as pd
+
     if os.environ.get("DAPLA_REGION", "") == "ON_PREM":
+        # The SOAP client is only needed on prem
+        from ssb_tbmd_apis.operations.operations_datadok import (
+            datadok_file_description_by_path,
+        )
+
         gjfor_ddok, _path = datadok_file_description_by_path(Path(path))
     else:
         with open(path) as migrerdok:
@@ -1,13 +1,17 @@
+from __future__ import annotations
+
 import os
 from pathlib import Path
+from typing import TYPE_CHECKING
 from typing import Any
 
-import pandas as pd
-
 from ssb_tbmd_apis.imports.datadok_meta import datadok_vars_dataframe_by_path
 from ssb_tbmd_apis.imports.dtype_mapping import dtypes_datadok_to_pandas
 from ssb_tbmd_apis.paths.try_variations import look_for_file_on_disk
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 def datadok_open_flatfile_from_path(
     path: Path, ddok_path: Path | None = None, **read_fwf_params: Any
@@ -22,6 +26,8 @@ def datadok_open_flatfile_from_path(
     Returns:
         pd.DataFrame: DataFrame containing the data from the flat file.
     """
+    import pandas as pd
+
     if "encoding" not in read_fwf_params:
         read_fwf_params["encoding"] = "latin1"
 
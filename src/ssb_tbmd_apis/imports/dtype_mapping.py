@@ -1,4 +1,9 @@
-import pandas as pd
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def dtypes_datadok_to_pandas(ddok_var_df: pd.DataFrame) -> dict[str, str]:
@@ -1,11 +1,16 @@
 """Operations supported by the Datadok TBMD API."""
 
 from collections import OrderedDict
+from collections.abc import Iterable
 from pathlib import Path
 from typing import Any
 
+import zeep
+
 from ssb_tbmd_apis.paths.try_variations import try_zeep_serialize_path
+from ssb_tbmd_apis.zeep_client import DEFAULT_MAX_WORKERS
 from ssb_tbmd_apis.zeep_client import get_zeep_serialize
+from ssb_tbmd_apis.zeep_client import get_zeep_serialize_many
 
 
 def datadok_codelist_by_id(codelist_id: int | str) -> OrderedDict[str, Any]:
@@ -93,7 +98,7 @@ def datadok_file_description_by_id(file_id: int | str) -> OrderedDict[str, Any]:
 
 
 def datadok_file_description_by_path(
-    file_path: Path,
+    file_path: Path, deadline: float | None = None, parallel_probes: int = 1
 ) -> tuple[OrderedDict[str, Any], Path]:
     """Rutinen skal returnere én filbeskrivelse basert på gitt Datadok sti.
 
@@ -101,6 +106,8 @@ def datadok_file_description_by_path(
 
     Args:
         file_path: The path to check for datadok-files, usually using the dollar-stamme, and without file-extension.
+        deadline: The most seconds to spend looking for the path, None for no limit.
+        parallel_probes: How many variations of the path to look for at once.
 
     Returns:
         OrderedDict: The serialized zeep OrderedDict.
@@ -109,4 +116,69 @@ def datadok_file_description_by_path(
         Path(file_path),
         tbmd_service="datadok",
         operation="GetFileDescriptionByPath",
+        deadline=deadline,
+        parallel_probes=parallel_probes,
+    )
+
+
+def datadok_codelist_by_id_many(
+    codelist_ids: Iterable[str | int], max_workers: int = DEFAULT_MAX_WORKERS
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Same as datadok_codelist_by_id, for many codelist ids at once, fetched concurrently.
+
+    Args:
+        codelist_ids: The codelist ids to look up.
+        max_workers: The most calls to have in flight at once.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the codelist ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return get_zeep_serialize_many(
+        "datadok",
+        "GetCodelistById",
+        [(codelist_id,) for codelist_id in codelist_ids],
+        max_workers,
+    )
+
+
+def datadok_context_variable_by_id_many(
+    var_ids: Iterable[str | int], max_workers: int = DEFAULT_MAX_WORKERS
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Same as datadok_context_variable_by_id, for many variable ids at once, fetched concurrently.
+
+    Args:
+        var_ids: The variable ids to look up.
+        max_workers: The most calls to have in flight at once.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the variable ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return get_zeep_serialize_many(
+        "datadok",
+        "GetContextVariableById",
+        [(var_id,) for var_id in var_ids],
+        max_workers,
+    )
+
+
+def datadok_file_description_by_id_many(
+    file_ids: Iterable[str | int], max_workers: int = DEFAULT_MAX_WORKERS
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Same as datadok_file_description_by_id, for many file ids at once, fetched concurrently.
+
+    Args:
+        file_ids: The file ids to look up.
+        max_workers: The most calls to have in flight at once.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the file ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return get_zeep_serialize_many(
+        "datadok",
+        "GetFileDescriptionById",
+        [(file_id,) for file_id in file_ids],
+        max_workers,
     )
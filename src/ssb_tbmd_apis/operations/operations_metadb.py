@@ -1,10 +1,15 @@
 """Operations supported by the MetaDB TBMD API."""
 
 from collections import OrderedDict
+from collections.abc import Iterable
 from typing import Any
 
+import zeep
+
+from ssb_tbmd_apis.zeep_client import DEFAULT_MAX_WORKERS
 from ssb_tbmd_apis.zeep_client import get_zeep_serialize
 from ssb_tbmd_apis.zeep_client import get_zeep_serialize_list
+from ssb_tbmd_apis.zeep_client import get_zeep_serialize_many
 
 
 def metadb_codelists() -> list[OrderedDict[str, Any]]:
@@ -77,3 +82,45 @@ def metadb_event_history_structure_by_id(
         OrderedDict: The serialized zeep OrderedDict.
     """
     return get_zeep_serialize("metadb", "GetEventHistoryStructureById", project_id)
+
+
+def metadb_codelist_by_id_many(
+    codelist_ids: Iterable[str | int], max_workers: int = DEFAULT_MAX_WORKERS
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Same as metadb_codelist_by_id, for many codelist ids at once, fetched concurrently.
+
+    Args:
+        codelist_ids: The codelist ids to look up.
+        max_workers: The most calls to have in flight at once.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the codelist ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return get_zeep_serialize_many(
+        "metadb",
+        "GetCodelistById",
+        [(codelist_id,) for codelist_id in codelist_ids],
+        max_workers,
+    )
+
+
+def metadb_context_variable_by_id_many(
+    var_ids: Iterable[str | int], max_workers: int = DEFAULT_MAX_WORKERS
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Same as metadb_context_variable_by_id, for many variable ids at once, fetched concurrently.
+
+    Args:
+        var_ids: The variable ids to look up.
+        max_workers: The most calls to have in flight at once.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the variable ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return get_zeep_serialize_many(
+        "metadb",
+        "GetContextVariableById",
+        [(var_id,) for var_id in var_ids],
+        max_workers,
+    )
@@ -1,9 +1,14 @@
 """Operations supported by the Statbank TBMD API."""
 
 from collections import OrderedDict
+from collections.abc import Iterable
 from typing import Any
 
+import zeep
+
+from ssb_tbmd_apis.zeep_client import DEFAULT_MAX_WORKERS
 from ssb_tbmd_apis.zeep_client import get_zeep_serialize
+from ssb_tbmd_apis.zeep_client import get_zeep_serialize_many
 
 
 def statbank_meta_by_table_id(table_id: str | int) -> OrderedDict[str, Any]:
@@ -40,3 +45,24 @@ def statbank_table_ids_by_concept_variable_id(var_id: str) -> OrderedDict[str, A
         OrderedDict: The serialized zeep OrderedDict.
     """
     return get_zeep_serialize("statbank", "GetTableIdsByConceptVariableId", var_id)
+
+
+def statbank_meta_by_table_id_many(
+    table_ids: Iterable[str | int], max_workers: int = DEFAULT_MAX_WORKERS
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Same as statbank_meta_by_table_id, for many table ids at once, fetched concurrently.
+
+    Args:
+        table_ids: The table ids to look up.
+        max_workers: The most calls to have in flight at once.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the table ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return get_zeep_serialize_many(
+        "statbank",
+        "GetStatbankMetaByTabelId",
+        [(table_id,) for table_id in table_ids],
+        max_workers,
+    )
@@ -1,9 +1,16 @@
 """Operations supported by the Vardok TBMD API."""
 
 from collections import OrderedDict
+from collections.abc import Iterable
+from collections.abc import Iterator
 from typing import Any
 
+import zeep
+
+from ssb_tbmd_apis.zeep_client import DEFAULT_MAX_WORKERS
 from ssb_tbmd_apis.zeep_client import get_zeep_serialize
+from ssb_tbmd_apis.zeep_client import get_zeep_serialize_many
+from ssb_tbmd_apis.zeep_client import iter_zeep_serialize
 
 
 def vardok_codelist_by_id(codelist_id: str | int) -> OrderedDict[str, Any]:
@@ -187,3 +194,109 @@ def vardok_version_by_concept_variable_id(
         OrderedDict: The serialized zeep OrderedDict.
     """
     return get_zeep_serialize("vardok", "GetVersionsByConceptVariableId", variable_id)
+
+
+def vardok_codelist_by_id_many(
+    codelist_ids: Iterable[str | int], max_workers: int = DEFAULT_MAX_WORKERS
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Same as vardok_codelist_by_id, for many codelist ids at once, fetched concurrently.
+
+    Args:
+        codelist_ids: The codelist ids to look up.
+        max_workers: The most calls to have in flight at once.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the codelist ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return get_zeep_serialize_many(
+        "vardok",
+        "GetCodelistById",
+        [(codelist_id,) for codelist_id in codelist_ids],
+        max_workers,
+    )
+
+
+def vardok_concept_variable_by_id_many(
+    var_ids: Iterable[str | int], max_workers: int = DEFAULT_MAX_WORKERS
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Same as vardok_concept_variable_by_id, for many variable ids at once, fetched concurrently.
+
+    Args:
+        var_ids: The variable ids to look up.
+        max_workers: The most calls to have in flight at once.
+
+    Returns:
+        list: The serialized zeep OrderedDict for each of the variable ids, in the same
+            order, or the zeep.exceptions.Fault the service answered with.
+    """
+    return get_zeep_serialize_many(
+        "vardok",
+        "GetConceptVariableById",
+        [(var_id,) for var_id in var_ids],
+        max_workers,
+    )
+
+
+def iter_vardok_concept_variables_by_approved(
+    internal: bool = False,
+) -> Iterator[OrderedDict[str, Any]]:
+    """Same as vardok_concept_variables_by_approved, streaming the variables one at a time.
+
+    The response is parsed while it downloads, so the first variables are available
+    long before the whole response has arrived, and memory use stays flat.
+
+    Args:
+        internal: True if getting internal variables, False if external (internet).
+
+    Yields:
+        OrderedDict: Each of the serialized variables.
+    """
+    flag = "internal" if internal else "internet"
+    yield from iter_zeep_serialize("vardok", "GetConceptVariablesByApproved", flag)
+
+
+def iter_vardok_concept_variables_by_owner(
+    section_id: str | int,
+) -> Iterator[OrderedDict[str, Any]]:
+    """Same as vardok_concept_variables_by_owner, streaming the variables one at a time.
+
+    Args:
+        section_id: The ID of the owning section.
+
+    Yields:
+        OrderedDict: Each of the serialized variables.
+    """
+    yield from iter_zeep_serialize("vardok", "GetConceptVariablesByOwner", section_id)
+
+
+def iter_vardok_concept_variables_by_statistical_unit(
+    statistical_unit: str | int,
+) -> Iterator[OrderedDict[str, Any]]:
+    """Same as vardok_concept_variables_by_statistical_unit, streaming the variables one at a time.
+
+    Args:
+        statistical_unit: The ID of the statistical unit.
+
+    Yields:
+        OrderedDict: Each of the serialized variables.
+    """
+    yield from iter_zeep_serialize(
+        "vardok", "GetConceptVariablesByStatisticalUnit", statistical_unit
+    )
+
+
+def iter_vardok_concept_variables_by_subject_area(
+    subject_area: str | int,
+) -> Iterator[OrderedDict[str, Any]]:
+    """Same as vardok_concept_variables_by_subject_area, streaming the variables one at a time.
+
+    Args:
+        subject_area: The ID of the subject area.
+
+    Yields:
+        OrderedDict: Each of the serialized variables.
+    """
+    yield from iter_zeep_serialize(
+        "vardok", "GetConceptVariablesBySubjectArea", subject_area
+    )
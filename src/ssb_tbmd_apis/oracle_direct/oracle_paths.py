@@ -1,12 +1,24 @@
 from __future__ import annotations
 
+import getpass
 from collections.abc import Iterable
-
-from fagfunksjoner.prodsone.oradb import Oracle
+from typing import Any
 
 Pair = tuple[str, str]
 
 
+def _connect(database: str, password: str | None) -> Any:
+    # Not fagfunksjoner's Oracle, whose __exit__ swallows the errors of the query,
+    # which then looks like a substamme without paths. oracledb is imported on
+    # first use, as it is slow to import.
+    import oracledb
+
+    user = getpass.getuser()
+    if password is None:
+        password = getpass.getpass(f"Oracle password for {user}: ")
+    return oracledb.connect(user=user, password=password, dsn=database)
+
+
 def _normalize_stamme_input(stamme_substamme: list[Pair] | Pair | str) -> list[Pair]:
     """Normalize the input into a list of (stamme, substamme) pairs.
 
@@ -55,59 +67,61 @@ def _normalize_stamme_input(stamme_substamme: list[Pair] | Pair | str) -> list[P
     return [(t[0].lstrip("$"), t[1]) for t in stamme_substamme]
 
 
-def _build_single_query(stamme: str, substamme: str) -> str:
-    """Build the SQL that yields full datadok paths for one (stamme, substamme)."""
-    # NOTE: Keep exact structure/spacing to preserve behavior and tests.
-    return f"""
-            SELECT
-                '${stamme.upper()}/{substamme}/arkiv/' || f.filklasse_navn || '/' || g.filnavn AS full_path
-            FROM (
-                SELECT filnivaa_id AS filklasse_id, filnivaa_navn AS filklasse_navn, filnivaa_filnivaa_id AS substamme_id
-                FROM DATADOK.FILNIVAA
-                WHERE filnivaa_nivaa = 'Filklasse'
-                  AND filnivaa_filnivaa_id = (
-                      SELECT filnivaa_id
-                      FROM DATADOK.FILNIVAA
-                      WHERE LOWER(filnivaa_navn) = LOWER('{substamme}')
-                        AND filnivaa_nivaa = 'Substamme'
-                        AND filnivaa_filnivaa_id = (
-                            SELECT filnivaa_id
-                            FROM DATADOK.FILNIVAA
-                            WHERE LOWER(filnivaa_navn) = LOWER('{stamme}')
-                              AND filnivaa_nivaa = 'Stamme'
-                        )
-                  )
-            ) f
-            JOIN (
-                SELECT
-                    filnivaa_navn,
-                    CASE
-                        WHEN filnivaa_datatype IS NOT NULL AND filnivaa_navn != filnivaa_datatype
-                        THEN filnivaa_navn || filnivaa_datatype
-                        ELSE filnivaa_navn
-                    END AS filnavn,
-                    filnivaa_filnivaa_id AS filklasse_id
-                FROM DATADOK.FILNIVAA
-                WHERE filnivaa_nivaa = 'Generasjon'
-            ) g
-            ON f.filklasse_id = g.filklasse_id
-        """
-
-
-def _build_union_query(pairs: Iterable[Pair]) -> str:
-    """Combine per-pair queries with UNION ALL."""
-    return " UNION ALL ".join(
-        _build_single_query(stamme, substamme) for stamme, substamme in pairs
+# One statement for any number of pairs, so Oracle parses it once and then reuses
+# it from the shared pool. The pairs are bound as one collection of "stamme/substamme".
+# Oracle has no statistics on the collection, so the hint has it start from the
+# few pairs and follow the levels down, like the subqueries per pair did before.
+PATHS_QUERY = """
+    SELECT /*+ LEADING(p s ss f g) USE_NL(s ss f g) */
+        '$' || UPPER(p.stamme) || '/' || p.substamme || '/arkiv/' || f.filnivaa_navn || '/' ||
+        CASE
+            WHEN g.filnivaa_datatype IS NOT NULL AND g.filnivaa_navn != g.filnivaa_datatype
+            THEN g.filnivaa_navn || g.filnivaa_datatype
+            ELSE g.filnivaa_navn
+        END AS full_path
+    FROM (
+        SELECT
+            pair_no,
+            SUBSTR(pair, 1, INSTR(pair, '/') - 1) AS stamme,
+            SUBSTR(pair, INSTR(pair, '/') + 1) AS substamme
+        FROM (SELECT ROWNUM AS pair_no, column_value AS pair FROM TABLE(:pairs))
+    ) p
+    JOIN DATADOK.FILNIVAA s
+        ON s.filnivaa_nivaa = 'Stamme'
+        AND LOWER(s.filnivaa_navn) = LOWER(p.stamme)
+    JOIN DATADOK.FILNIVAA ss
+        ON ss.filnivaa_nivaa = 'Substamme'
+        AND ss.filnivaa_filnivaa_id = s.filnivaa_id
+        AND LOWER(ss.filnivaa_navn) = LOWER(p.substamme)
+    JOIN DATADOK.FILNIVAA f
+        ON f.filnivaa_nivaa = 'Filklasse'
+        AND f.filnivaa_filnivaa_id = ss.filnivaa_id
+    JOIN DATADOK.FILNIVAA g
+        ON g.filnivaa_nivaa = 'Generasjon'
+        AND g.filnivaa_filnivaa_id = f.filnivaa_id
+    ORDER BY p.pair_no
+"""
+# A collection of strings that every Oracle database has
+PAIRS_TYPE = "SYS.ODCIVARCHAR2LIST"
+
+
+def _pairs_bind(cursor: Any, pairs: Iterable[Pair]) -> Any:
+    """Build the collection of "stamme/substamme" to bind as :pairs."""
+    pairs_type = cursor.connection.gettype(PAIRS_TYPE)
+    return pairs_type.newobject(
+        [f"{stamme}/{substamme}" for stamme, substamme in pairs]
     )
 
 
-def _execute_full_query(database: str, full_query: str) -> list[str]:
-    """Execute query and stream results in batches, returning flattened paths."""
+def _execute_paths_query(
+    database: str, pairs: list[Pair], password: str | None
+) -> list[str]:
+    """Execute the query for the pairs and stream results in batches."""
     results: list[str] = []
-    with Oracle(db=database) as concur:
-        concur.execute(full_query)
+    with _connect(database, password) as connection, connection.cursor() as cursor:
+        cursor.execute(PATHS_QUERY, pairs=_pairs_bind(cursor, pairs))
         while True:
-            rows = concur.fetchmany(1000)
+            rows = cursor.fetchmany(1000)
             if not rows:
                 break
             results.extend(x[0] for x in rows)
@@ -117,12 +131,16 @@ def _execute_full_query(database: str, full_query: str) -> list[str]:
 def paths_in_substamme(
     stamme_substamme: list[Pair] | Pair | str,
     database: str,
+    password: str | None = None,
 ) -> list[str]:
     """Try to recreate the paths used by Datadok under a stamme and substamme.
 
+    Errors from Oracle, like a wrong password, are raised as oracledb errors.
+
     Args:
         stamme_substamme: Stamme/substamme input in string, tuple, or list form.
         database: Database name or DSN for the Oracle connection.
+        password: Oracle password of the user, asked for if None.
 
     Accepts:
       - "$stamme/substamme" or "stamme/substamme"
@@ -133,5 +151,4 @@ def paths_in_substamme(
       list[str]: Full datadok paths (with a single leading '$').
     """
     pairs = _normalize_stamme_input(stamme_substamme)
-    full_query = _build_union_query(pairs)
-    return _execute_full_query(database, full_query)
+    return _execute_paths_query(database, pairs, password)
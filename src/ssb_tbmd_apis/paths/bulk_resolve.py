@@ -0,0 +1,191 @@
+"""Resolve many flatfile paths to their datadok file descriptions at once.
+
+resolve_datadok_paths takes the paths of a whole folder tree, converts each to its
+dollar-stamme once, and looks them up with try_zeep_serialize_path on a pool of
+threads. The paths are read CHUNK_SIZE at a time, so a generator over a large
+inventory is never held in memory at once. Within a chunk, the paths of the same
+stamme and substamme are looked up together, so they share the path index of the
+"oracle" resolution mode and the entries of the response and resolution caches
+while they are fresh. The results come out as the lookups finish, and
+resolutions_table turns them into a DataFrame.
+"""
+
+import contextvars
+import copy
+import itertools
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Literal
+
+from ssb_tbmd_apis.paths.linux_stammer import get_stamme_registry
+from ssb_tbmd_apis.paths.path_index import _pair
+from ssb_tbmd_apis.paths.try_variations import try_zeep_serialize_path
+from ssb_tbmd_apis.tbmd_logger import logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Same as zeep_client.DEFAULT_MAX_WORKERS, without importing zeep
+DEFAULT_MAX_WORKERS = 8
+# The most paths to read ahead of the lookups, and to have waiting for one
+CHUNK_SIZE = 1000
+
+Status = Literal["found", "not found", "error"]
+# The file description, resolved path, status, error and seconds of a lookup
+_Outcome = tuple[OrderedDict[str, Any] | None, Path | None, Status, str | None, float]
+
+
+@dataclass(frozen=True)
+class PathResolution:
+    """The outcome of looking up one path.
+
+    Attributes:
+        path: The path as given.
+        resolved: The datadok path found, or None.
+        status: "found", "not found" if datadok has none of the variations of the
+            path, or "error" if looking failed, like on a timeout.
+        error: The error, for the paths not found.
+        seconds: How long the lookup took.
+        file_description: The serialized file description, for the paths found.
+    """
+
+    path: Path
+    resolved: Path | None
+    status: Status
+    error: str | None
+    seconds: float
+    file_description: OrderedDict[str, Any] | None = None
+
+
+def resolve_datadok_paths(
+    paths: Iterable[Path | str],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    parallel_probes: int = 1,
+    deadline: float | None = None,
+) -> Iterator[PathResolution]:
+    """Look up the datadok file descriptions of many paths, concurrently.
+
+    Each path is looked up like datadok_file_description_by_path, once even if
+    given more than once while the first lookup is waiting or running. An error
+    for one path does not stop the others. The paths are read as the lookups go,
+    so they may come from a generator of any length.
+
+    Args:
+        paths: The paths of the files, full or with the dollar-stamme.
+        max_workers: The most paths to look up at once.
+        parallel_probes: How many variations of each path to look for at once.
+        deadline: The most seconds to spend on each path, None for no limit.
+
+    Yields:
+        PathResolution: The outcome for each path, as the lookups finish.
+
+    Raises:
+        ValueError: If max_workers is less than 1.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    registry = get_stamme_registry()
+    paths = iter(paths)
+
+    def resolve(dollar_path: Path) -> _Outcome:
+        start = time.perf_counter()
+        try:
+            description, resolved = try_zeep_serialize_path(
+                dollar_path, deadline=deadline, parallel_probes=parallel_probes
+            )
+        except FileNotFoundError as e:
+            return None, None, "not found", str(e), time.perf_counter() - start
+        except Exception as e:
+            logger.warning(f"Failed looking for {dollar_path} in datadok: {e!r}")
+            return None, None, "error", repr(e), time.perf_counter() - start
+        return description, resolved, "found", None, time.perf_counter() - start
+
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="tbmd-bulk"
+    )
+    # The given paths of each dollar-path waiting for or in a lookup
+    waiting: dict[Path, tuple[Future[_Outcome], list[Path]]] = {}
+    try:
+        while True:
+            chunk = list(itertools.islice(paths, CHUNK_SIZE))
+            # The given paths for each dollar-path, grouped by stamme and substamme
+            groups: dict[tuple[str, str], dict[Path, list[Path]]] = {}
+            for given in chunk:
+                path = Path(given)
+                # Without the extension, like datadok has it
+                dollar_path = registry.to_dollar(path).with_suffix("")
+                pair = _pair(dollar_path) or ("", "")
+                groups.setdefault(pair, {}).setdefault(dollar_path, []).append(path)
+            for group in groups.values():
+                for dollar_path, given_paths in group.items():
+                    if dollar_path in waiting:
+                        waiting[dollar_path][1].extend(given_paths)
+                        continue
+                    # Threads do not inherit context variables, like deadline_scope
+                    context = contextvars.copy_context()
+                    future = executor.submit(context.run, resolve, dollar_path)
+                    waiting[dollar_path] = (future, given_paths)
+            # Read on when fewer than a chunk are waiting, or when all are done
+            while waiting and (len(waiting) >= CHUNK_SIZE or not chunk):
+                done, _ = wait(
+                    [future for future, _ in waiting.values()],
+                    return_when=FIRST_COMPLETED,
+                )
+                for dollar_path, (future, given_paths) in list(waiting.items()):
+                    if future not in done:
+                        continue
+                    del waiting[dollar_path]
+                    yield from _resolutions(future.result(), given_paths)
+            if not chunk:
+                return
+    finally:
+        # Stopped early, or done
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _resolutions(
+    outcome: _Outcome, given_paths: list[Path]
+) -> Iterator[PathResolution]:
+    # One for each given path, with a file description of its own
+    description, resolved, status, error, seconds = outcome
+    for i, path in enumerate(given_paths):
+        if i > 0 and description is not None:
+            description = copy.deepcopy(description)
+        yield PathResolution(path, resolved, status, error, seconds, description)
+
+
+def resolutions_table(results: Iterable[PathResolution]) -> "pd.DataFrame":
+    """Put the outcomes of resolve_datadok_paths in a table.
+
+    Args:
+        results: The outcomes.
+
+    Returns:
+        pd.DataFrame: One row per path, with the columns path, resolved, status,
+            error and seconds.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(
+        [
+            {
+                "path": str(result.path),
+                "resolved": str(result.resolved) if result.resolved else None,
+                "status": result.status,
+                "error": result.error,
+                "seconds": result.seconds,
+            }
+            for result in results
+        ],
+        columns=["path", "resolved", "status", "error", "seconds"],
+    )
@@ -0,0 +1,437 @@
+"""Inventory of the flatfiles under the stammer, in a SQLite file other tools can query.
+
+FileInventory.crawl walks the folders of the stammer in linux_stammer on a pool of
+threads, one os.scandir per folder, and stores every flatfile with its
+dollar-path, stamme and substamme, the periods in its name (g2019, g2019g2020)
+and the newest __MIGRERDOK_v*.json next to it. Crawling again only lists the
+folders whose mtime has changed, the others cost one stat. A file rewritten in
+place does not change its folder, so its size and mtime are only updated with
+full=True. FileInventory.check_datadok then looks up which of the files datadok
+has, with resolve_datadok_paths.
+
+The tables are folders, files and datadok, and the view inventory joins the files
+with what datadok has for them:
+
+    sqlite3 inventory.sqlite "SELECT path FROM inventory WHERE migrerdok IS NULL"
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Any
+
+from ssb_tbmd_apis.paths.bulk_resolve import DEFAULT_MAX_WORKERS
+from ssb_tbmd_apis.paths.bulk_resolve import resolve_datadok_paths
+from ssb_tbmd_apis.paths.linux_stammer import get_stamme_registry
+from ssb_tbmd_apis.paths.path_index import _pair
+from ssb_tbmd_apis.paths.try_variations import KNOWN_EXTENSIONS
+from ssb_tbmd_apis.paths.try_variations import _split_periods
+from ssb_tbmd_apis.paths.try_variations import swap_dollar_sign
+from ssb_tbmd_apis.tbmd_logger import logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_MIGRERDOK = re.compile(r"(?P<stem>.+)__MIGRERDOK_v(?P<version>\d+)\.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    folder TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL,
+    scanned REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    dollar_path TEXT NOT NULL,
+    stamme TEXT,
+    substamme TEXT,
+    periods INTEGER NOT NULL,
+    first_period INTEGER,
+    last_period INTEGER,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    migrerdok TEXT,
+    migrerdok_version INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_folder ON files (folder);
+CREATE INDEX IF NOT EXISTS files_dollar_path ON files (dollar_path);
+CREATE TABLE IF NOT EXISTS datadok (
+    dollar_path TEXT PRIMARY KEY,
+    resolved TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    checked REAL NOT NULL
+);
+CREATE VIEW IF NOT EXISTS inventory AS
+SELECT files.*, datadok.resolved AS datadok_path, datadok.status AS datadok_status
+FROM files LEFT JOIN datadok USING (dollar_path);
+"""
+
+
+@dataclass(frozen=True)
+class CrawlStats:
+    """What a crawl did.
+
+    Attributes:
+        folders: The folders visited.
+        listed: The folders listed, as they were new or had changed.
+        files: The flatfiles in the folders listed.
+        removed: The folders gone since the last crawl.
+        seconds: How long the crawl took.
+    """
+
+    folders: int
+    listed: int
+    files: int
+    removed: int
+    seconds: float
+
+
+@dataclass(frozen=True)
+class _Scan:
+    # A folder visited, its files None if it was not listed, and None if it is gone
+    folder: str
+    mtime_ns: int | None
+    subfolders: list[str]
+    files: list[tuple[str, int, int]] | None
+
+
+def _scan(
+    folder: str, known_mtime_ns: int | None, known_subfolders: list[str]
+) -> _Scan:
+    try:
+        mtime_ns = os.stat(folder).st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        return _Scan(folder, None, [], None)
+    except OSError as e:
+        return _unreadable(folder, known_mtime_ns, known_subfolders, e)
+    if mtime_ns == known_mtime_ns:
+        return _Scan(folder, mtime_ns, known_subfolders, None)
+    subfolders: list[str] = []
+    files: list[tuple[str, int, int]] = []
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                # Not following symlinks, so no folder is walked twice
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        # Removed while listing, or not ours to stat
+                        continue
+                    files.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    except (FileNotFoundError, NotADirectoryError):
+        return _Scan(folder, None, [], None)
+    except OSError as e:
+        return _unreadable(folder, known_mtime_ns, known_subfolders, e)
+    return _Scan(folder, mtime_ns, subfolders, files)
+
+
+def _unreadable(
+    folder: str,
+    known_mtime_ns: int | None,
+    known_subfolders: list[str],
+    error: OSError,
+) -> _Scan:
+    # Like a folder that has not changed, so one restricted folder neither stops
+    # the crawl nor loses the files stored from it
+    logger.warning(f"Skipping {folder}, it could not be read: {error!r}")
+    return _Scan(
+        folder,
+        known_mtime_ns if known_mtime_ns is not None else 0,
+        known_subfolders,
+        None,
+    )
+
+
+def _like_prefix(folder: str) -> str:
+    # A LIKE pattern for everything below the folder
+    escaped = folder.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.rstrip("/") + "/%"
+
+
+class FileInventory:
+    """The flatfiles under the stammer, stored in a SQLite file."""
+
+    def __init__(self, path: Path | str | None = None) -> None:
+        """Open, or create, the inventory file.
+
+        Args:
+            path: The SQLite file. Defaults to inventory.sqlite in the cache
+                directory.
+        """
+        if path is None:
+            # Imported here, as schema_cache pulls in zeep and lxml
+            from ssb_tbmd_apis.schema_cache import cache_dir
+
+            path = cache_dir() / "inventory.sqlite"
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def crawl(
+        self,
+        stammer: Iterable[str | Path] | None = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        full: bool = False,
+    ) -> CrawlStats:
+        """Walk the folders of the stammer, storing the flatfiles in them.
+
+        Args:
+            stammer: The folders to walk, like "FOB", "$FOB/person" or
+                "/ssb/stamme01/fob/person". Defaults to all the stammer in
+                linux_stammer.
+            max_workers: The most folders to list at once.
+            full: List every folder, even those that have not changed.
+
+        Returns:
+            CrawlStats: What the crawl did.
+
+        Raises:
+            ValueError: If max_workers is less than 1.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        start = time.perf_counter()
+        roots = self._roots(stammer)
+        with self._lock:
+            known = {
+                folder: mtime_ns
+                for folder, mtime_ns in self._conn.execute(
+                    "SELECT folder, mtime_ns FROM folders"
+                )
+            }
+            children: dict[str, list[str]] = {}
+            for folder, parent in self._conn.execute(
+                "SELECT folder, parent FROM folders WHERE parent IS NOT NULL"
+            ):
+                children.setdefault(parent, []).append(folder)
+
+        visited: set[str] = set()
+        listed = files = removed = 0
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tbmd-crawl"
+        ) as executor:
+            pending: dict[Future[_Scan], str | None] = {}
+
+            def submit(folder: str, parent: str | None) -> None:
+                if folder in visited:
+                    return
+                visited.add(folder)
+                known_mtime_ns = None if full else known.get(folder)
+                future = executor.submit(
+                    _scan, folder, known_mtime_ns, children.get(folder, [])
+                )
+                pending[future] = parent
+
+            for root in roots:
+                submit(root, None)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    parent = pending.pop(future)
+                    scan = future.result()
+                    if scan.mtime_ns is None:
+                        removed += self._remove_tree(scan.folder)
+                        continue
+                    if scan.files is not None:
+                        listed += 1
+                        gone = set(children.get(scan.folder, [])) - set(scan.subfolders)
+                        for folder in gone:
+                            removed += self._remove_tree(folder)
+                        files += self._store(scan, parent)
+                    for subfolder in scan.subfolders:
+                        submit(subfolder, scan.folder)
+        stats = CrawlStats(
+            len(visited), listed, files, removed, time.perf_counter() - start
+        )
+        logger.info(f"Crawled {roots}: {stats}")
+        return stats
+
+    @staticmethod
+    def _roots(stammer: Iterable[str | Path] | None) -> list[str]:
+        if stammer is None:
+            paths = list(get_stamme_registry().stammer.values())
+        else:
+            paths = []
+            for stamme in stammer:
+                path = Path(stamme)
+                if not path.is_absolute() and not str(stamme).startswith("$"):
+                    path = Path("$" + str(stamme))
+                paths.append(swap_dollar_sign(path))
+        # The stammer inside another stamme are walked with it
+        roots: list[str] = []
+        for path in sorted(set(paths), key=lambda path: len(path.parts)):
+            if not any(path.is_relative_to(root) for root in roots):
+                roots.append(str(path))
+        return roots
+
+    def _store(self, scan: _Scan, parent: str | None) -> int:
+        registry = get_stamme_registry()
+        companions: dict[str, tuple[int, str]] = {}
+        for name, _, _ in scan.files or []:
+            match = _MIGRERDOK.fullmatch(name)
+            if match is not None:
+                version = int(match["version"])
+                stem = match["stem"]
+                if version >= companions.get(stem, (0, ""))[0]:
+                    companions[stem] = (version, name)
+        rows = []
+        for name, size, mtime_ns in scan.files or []:
+            path = Path(scan.folder) / name
+            if path.suffix not in KNOWN_EXTENSIONS:
+                continue
+            dollar_path = registry.to_dollar(path).with_suffix("")
+            stamme, substamme = _pair(dollar_path) or (None, None)
+            periods, _ = _split_periods(path.stem)
+            companion = companions.get(path.stem)
+            rows.append(
+                (
+                    str(path),
+                    scan.folder,
+                    name,
+                    path.suffix,
+                    str(dollar_path),
+                    stamme,
+                    substamme,
+                    len(periods),
+                    periods[0] if periods else None,
+                    periods[-1] if periods else None,
+                    size,
+                    mtime_ns,
+                    companion[1] if companion else None,
+                    companion[0] if companion else None,
+                )
+            )
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM files WHERE folder = ?", (scan.folder,))
+                self._conn.executemany(
+                    "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO folders VALUES (?, ?, ?, ?)",
+                    (scan.folder, parent, scan.mtime_ns, time.time()),
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(rows)
+
+    def _remove_tree(self, folder: str) -> int:
+        # Forget a folder that is gone, and everything below it
+        below = _like_prefix(folder)
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM files WHERE folder = ? OR folder LIKE ? ESCAPE '\\'",
+                (folder, below),
+            )
+            return self._conn.execute(
+                "DELETE FROM folders WHERE folder = ? OR folder LIKE ? ESCAPE '\\'",
+                (folder, below),
+            ).rowcount
+
+    def check_datadok(
+        self,
+        recheck: bool = False,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        parallel_probes: int = 1,
+    ) -> int:
+        """Look up which of the flatfiles datadok has, with resolve_datadok_paths.
+
+        The files that ended in an error, like a timeout or an open circuit, are
+        looked up again on the next check.
+
+        Args:
+            recheck: Look up the files found or not found before too.
+            max_workers: The most files to look up at once.
+            parallel_probes: How many variations of each path to look for at once.
+
+        Returns:
+            int: The number of dollar-paths looked up.
+        """
+        missing = (
+            ""
+            if recheck
+            else " WHERE dollar_path NOT IN"
+            " (SELECT dollar_path FROM datadok WHERE status != 'error')"
+        )
+        with self._lock:
+            dollar_paths = [
+                row[0]
+                for row in self._conn.execute(
+                    f"SELECT DISTINCT dollar_path FROM files{missing}"  # nosec
+                )
+            ]
+        checked = 0
+        for result in resolve_datadok_paths(
+            dollar_paths, max_workers=max_workers, parallel_probes=parallel_probes
+        ):
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO datadok VALUES (?, ?, ?, ?, ?)",
+                    (
+                        str(result.path),
+                        str(result.resolved) if result.resolved else None,
+                        result.status,
+                        result.error,
+                        time.time(),
+                    ),
+                )
+            checked += 1
+        return checked
+
+    def query(self, sql: str, parameters: Iterable[Any] = ()) -> list[tuple[Any, ...]]:
+        """Run a query against the inventory.
+
+        Args:
+            sql: The query, like "SELECT path FROM inventory WHERE periods = 2".
+            parameters: The values of the placeholders in the query.
+
+        Returns:
+            list: The rows.
+        """
+        with self._lock:
+            return self._conn.execute(sql, tuple(parameters)).fetchall()
+
+    def dataframe(self) -> "pd.DataFrame":
+        """Get the inventory view as a DataFrame, like for saving it as Parquet.
+
+        Returns:
+            pd.DataFrame: One row per flatfile.
+        """
+        import pandas as pd
+
+        with self._lock:
+            return pd.read_sql_query("SELECT * FROM inventory", self._conn)
+
+    def close(self) -> None:
+        """Close the connection to the SQLite file."""
+        with self._lock:
+            self._conn.close()
@@ -1,8 +1,15 @@
 import os
+import threading
 from pathlib import Path
 from typing import Literal
 from typing import overload
 
+STAMME_FILE = Path("/etc/profile.d/stamme_variabel")
+
+_registry: "StammeRegistry | None" = None
+_registry_stat: tuple[int, int, int] | None = None
+_registry_lock = threading.Lock()
+
 
 # Dependant on the flag flip there are two options for the return type
 @overload
@@ -20,6 +27,9 @@ def linux_stammer(
 ) -> dict[str, Path] | dict[Path, str]:
     """Manually load the "linux-forkortelser" in as dict.
 
+    The file is only read again when it has changed, see get_stamme_registry,
+    which raises ValueError when reading a wrongly formatted file.
+
     Args:
         insert_environ: Set to True if you want the dict to be inserted into the
             environment variables (os.environ).
@@ -29,12 +39,20 @@ def linux_stammer(
 
     Returns:
         dict[str, str]:  The "linux-forkortelser" as a dict
-
-    Raises:
-        ValueError: If the stamme_variabel file is wrongly formatted.
     """
+    stm = dict(get_stamme_registry().stammer)
+    if insert_environ:
+        for first, second in stm.items():
+            os.environ[first] = str(second)
+    if flip:
+        stm_flip: dict[Path, str] = {v: k for k, v in stm.items()}
+        return stm_flip
+    return stm
+
+
+def _read_stamme_file() -> dict[str, Path]:
     stm: dict[str, Path] = {}
-    with open("/etc/profile.d/stamme_variabel", encoding="latin1") as stam_var:
+    with open(STAMME_FILE, encoding="latin1") as stam_var:
         for line in stam_var:
             line = line.strip()
             if line.startswith("export") and "=" in line:
@@ -44,9 +62,125 @@ def linux_stammer(
                 first: str = line_parts[0]  # Helping mypy
                 second: Path = Path(line_parts[1])  # Helping mypy
                 stm[first] = second
-                if insert_environ:
-                    os.environ[first] = str(second)
-    if flip:
-        stm_flip: dict[Path, str] = {v: k for k, v in stm.items()}
-        return stm_flip
     return stm
+
+
+class _PrefixNode:
+    """A folder in the tree of the stamme paths, and the stamme it is, if any."""
+
+    __slots__ = ("children", "name")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _PrefixNode] = {}
+        self.name: str | None = None
+
+
+class StammeRegistry:
+    """The "linux-forkortelser", with lookups both ways.
+
+    The full paths are kept in a tree of their folders, so the stamme of a path is
+    found in as many steps as the path has folders, and the longest stamme wins
+    when one stamme is inside another.
+    """
+
+    def __init__(self, stammer: dict[str, Path]) -> None:
+        """Build the lookups.
+
+        Args:
+            stammer: The full path of each "linux-forkortelse", by name.
+        """
+        self.stammer = stammer
+        self._root = _PrefixNode()
+        for name, real_path in stammer.items():
+            node = self._root
+            for part in real_path.parts:
+                node = node.children.setdefault(part, _PrefixNode())
+            # Like the flipped dict, the last name for a path wins
+            node.name = name
+
+    def find_stamme(self, path: Path) -> tuple[str, Path] | None:
+        """Find the longest stamme the path is in.
+
+        Args:
+            path: The full path.
+
+        Returns:
+            tuple | None: The name and full path of the stamme, or None if the path
+                is not in any.
+        """
+        node = self._root
+        found: tuple[str, int] | None = None
+        parts = Path(path).parts
+        for depth, part in enumerate(parts, start=1):
+            child = node.children.get(part)
+            if child is None:
+                break
+            node = child
+            if node.name is not None:
+                found = node.name, depth
+        if found is None:
+            return None
+        name, depth = found
+        return name, Path(*parts[:depth])
+
+    def to_dollar(self, path: Path) -> Path:
+        """Swap the start of a full path for its "$STAMME".
+
+        Args:
+            path: The full path.
+
+        Returns:
+            Path: The path from its longest stamme, or the path itself if it is
+                not in any.
+        """
+        path = Path(path)
+        found = self.find_stamme(path)
+        if found is None:
+            return path
+        name, real_path = found
+        return Path("$" + name) / "/".join(path.parts[len(real_path.parts) :])
+
+    def to_real(self, path: Path) -> Path:
+        """Swap the "$STAMME" a path starts with for its full path.
+
+        Args:
+            path: The path, its first part being the stamme, with or without "$".
+
+        Returns:
+            Path: The full path, or the path itself if the stamme is unknown.
+        """
+        path = Path(path)
+        replace = self.stammer.get(path.parts[0].removeprefix("$"))
+        if replace is None:
+            return path
+        return Path(replace) / Path(*path.parts[1:])
+
+
+def get_stamme_registry() -> StammeRegistry:
+    """Get the "linux-forkortelser", reading the file again only if it has changed.
+
+    If the file can not be stat'ed, it is read without being kept. Reading it
+    raises ValueError if it is wrongly formatted, and OSError if it is missing.
+
+    Returns:
+        StammeRegistry: The stammer in the stamme_variabel file.
+    """
+    global _registry, _registry_stat
+    try:
+        stat = os.stat(STAMME_FILE)
+    except OSError:
+        # Read without keeping it, failing like before if it is really not there
+        return StammeRegistry(_read_stamme_file())
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _registry_lock:
+        if _registry is None or _registry_stat != key:
+            _registry = StammeRegistry(_read_stamme_file())
+            _registry_stat = key
+        return _registry
+
+
+def clear_stamme_cache() -> None:
+    """Forget the stammer read, so the file is read on the next lookup."""
+    global _registry, _registry_stat
+    with _registry_lock:
+        _registry = _registry_stat = None
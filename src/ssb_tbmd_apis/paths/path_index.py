@@ -0,0 +1,270 @@
+"""Resolve datadok paths from an index of the paths in Oracle, instead of probing.
+
+For a path like $FOB/person/arkiv/personfil/g2001, try_zeep_serialize_path tries
+hundreds of period variations with GetFileDescriptionByPath, most of them ending
+in a SOAP Fault. In the "oracle" resolution mode, the paths datadok has under the
+stamme and substamme are listed once with oracle_direct.paths_in_substamme, and
+the first variation in that list is looked up with a single SOAP call. If Oracle
+can not be reached, lists no paths, or has none of the variations, they are
+probed as before.
+
+Turn it on with set_resolution_mode("oracle", database="DB1", password=...), or
+with SSB_TBMD_RESOLUTION_MODE=oracle, the database in SSB_TBMD_ORACLE_DB and the
+password in SSB_TBMD_ORACLE_PASSWORD. The password is never asked for, as the
+lookups may run in batch jobs or worker threads.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from ssb_tbmd_apis.oracle_direct.oracle_paths import paths_in_substamme
+from ssb_tbmd_apis.tbmd_logger import logger
+
+RESOLUTION_MODES = ("probe", "oracle")
+# Seconds to keep the paths of a substamme, new files show up after this
+INDEX_MAX_AGE = 3600.0
+# Seconds to wait before asking Oracle again after it failed
+INDEX_RETRY_AFTER = 300.0
+
+Pair = tuple[str, str]
+
+_mode: str | None = None
+_database: str | None = None
+_password: str | None = None
+
+
+class PathIndexUnavailable(LookupError):
+    """Raised when the paths of a substamme could not be listed from Oracle."""
+
+
+def get_resolution_mode() -> str:
+    """Get how try_zeep_serialize_path finds the datadok path of a file.
+
+    Returns:
+        str: "probe" (default), trying the variations one by one, or "oracle".
+
+    Raises:
+        ValueError: If SSB_TBMD_RESOLUTION_MODE holds an unknown mode.
+    """
+    mode = _mode or os.environ.get("SSB_TBMD_RESOLUTION_MODE", "probe").lower()
+    if mode not in RESOLUTION_MODES:
+        raise ValueError(
+            f"Unknown resolution mode {mode}, use one of {RESOLUTION_MODES}."
+        )
+    return mode
+
+
+def set_resolution_mode(
+    mode: str | None, database: str | None = None, password: str | None = None
+) -> None:
+    """Set how datadok paths are found, overriding the environment.
+
+    Args:
+        mode: "probe" or "oracle", or None to go back to reading
+            SSB_TBMD_RESOLUTION_MODE.
+        database: The Oracle database to list the paths from, or None to read
+            SSB_TBMD_ORACLE_DB.
+        password: The Oracle password of the user, or None to read
+            SSB_TBMD_ORACLE_PASSWORD.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    global _mode, _database, _password
+    if mode is not None and mode.lower() not in RESOLUTION_MODES:
+        raise ValueError(
+            f"Unknown resolution mode {mode}, use one of {RESOLUTION_MODES}."
+        )
+    _mode = mode.lower() if mode is not None else None
+    _database = database
+    _password = password
+
+
+def get_index_database() -> str | None:
+    """Get the Oracle database the paths are listed from.
+
+    Returns:
+        str | None: The database from set_resolution_mode, or else from
+            SSB_TBMD_ORACLE_DB, or None if neither is set.
+    """
+    return _database or os.environ.get("SSB_TBMD_ORACLE_DB") or None
+
+
+def get_index_password() -> str | None:
+    """Get the Oracle password the paths are listed with.
+
+    Returns:
+        str | None: The password from set_resolution_mode, or else from
+            SSB_TBMD_ORACLE_PASSWORD, or None if neither is set.
+    """
+    return _password or os.environ.get("SSB_TBMD_ORACLE_PASSWORD") or None
+
+
+def index_key(path: Path | str) -> str:
+    """Normalize a datadok path for looking it up in the index.
+
+    Args:
+        path: A datadok path, like $FOB/person/arkiv/personfil/g2001.dat.
+
+    Returns:
+        str: The path in lowercase, without the file extension.
+    """
+    return Path(path).with_suffix("").as_posix().lower()
+
+
+def _pair(path: Path) -> Pair | None:
+    # The (stamme, substamme) of a datadok path, None if it is not one
+    parts = path.parts
+    if len(parts) < 3 or not parts[0].startswith("$") or len(parts[0]) < 2:
+        return None
+    return (parts[0][1:].upper(), parts[1].lower())
+
+
+class DatadokPathIndex:
+    """Thread-safe cache of the datadok paths of each substamme, listed from Oracle."""
+
+    def __init__(
+        self,
+        max_age: float = INDEX_MAX_AGE,
+        retry_after: float = INDEX_RETRY_AFTER,
+    ) -> None:
+        """Initialize an empty index.
+
+        Args:
+            max_age: Seconds to keep the paths of a substamme.
+            retry_after: Seconds to wait before asking Oracle again after it failed.
+        """
+        self.max_age = max_age
+        self.retry_after = retry_after
+        self.queries = 0
+        self._lock = threading.Lock()
+        self._listing_locks: dict[tuple[str, Pair], threading.Lock] = {}
+        self._paths: dict[tuple[str, Pair], tuple[float, frozenset[str] | None]] = {}
+
+    def paths(
+        self, pair: Pair, database: str, password: str | None = None
+    ) -> frozenset[str]:
+        """Get the paths of a substamme, listing them from Oracle if needed.
+
+        Args:
+            pair: The (stamme, substamme), like ("FOB", "person").
+            database: The Oracle database to list the paths from.
+            password: The Oracle password of the user.
+
+        Returns:
+            frozenset[str]: The paths, normalized with index_key.
+
+        Raises:
+            PathIndexUnavailable: If Oracle failed or listed no paths, now or less
+                than retry_after seconds ago.
+        """
+        key = (database, pair)
+        with self._lock:
+            lock = self._listing_locks.setdefault(key, threading.Lock())
+        # A lock per substamme, so it is not listed twice at once, and a slow
+        # listing holds up only the lookups in the same substamme
+        with lock:
+            entry = self._paths.get(key)
+            now = time.monotonic()
+            if entry is not None:
+                loaded, paths = entry
+                if paths is not None and now - loaded < self.max_age:
+                    return paths
+                if paths is None and now - loaded < self.retry_after:
+                    raise PathIndexUnavailable(
+                        f"Listing the paths of ${pair[0]}/{pair[1]} failed recently."
+                    )
+            with self._lock:
+                self.queries += 1
+            error: Exception | None = None
+            try:
+                listed = paths_in_substamme(pair, database=database, password=password)
+            except Exception as e:
+                listed, error = [], e
+            if not listed:
+                # A substamme in datadok has files, so an empty listing went wrong too
+                self._paths[key] = (now, None)
+                logger.warning(
+                    f"Could not list the paths of ${pair[0]}/{pair[1]} from Oracle: "
+                    f"{error or 'no paths listed'!r}"
+                )
+                raise PathIndexUnavailable(
+                    f"Could not list the paths of ${pair[0]}/{pair[1]}."
+                ) from error
+            paths = frozenset(index_key(path) for path in listed)
+            self._paths[key] = (now, paths)
+            logger.info(f"Listed {len(paths)} datadok paths in ${pair[0]}/{pair[1]}.")
+            return paths
+
+    def find(
+        self, candidates: Iterable[Path], database: str, password: str | None = None
+    ) -> Path | None:
+        """Find the first of the candidates that datadok has.
+
+        Args:
+            candidates: The datadok paths to look for, in the order to try them.
+            database: The Oracle database to list the paths from.
+            password: The Oracle password of the user.
+
+        Returns:
+            Path | None: The first candidate in the index, or None if none are.
+
+        Raises:
+            PathIndexUnavailable: If a candidate is not a datadok path with a
+                stamme and substamme, or the paths of one could not be listed.
+        """
+        for candidate in candidates:
+            pair = _pair(candidate)
+            if pair is None:
+                raise PathIndexUnavailable(f"{candidate} has no dollar-stamme.")
+            if index_key(candidate) in self.paths(pair, database, password):
+                return candidate
+        return None
+
+    def clear(self) -> None:
+        """Forget the listed paths, and the failures."""
+        with self._lock:
+            self._paths.clear()
+            self._listing_locks.clear()
+
+
+_PATH_INDEX = DatadokPathIndex()
+
+
+def get_path_index() -> DatadokPathIndex:
+    """Get the index of the datadok paths.
+
+    Returns:
+        DatadokPathIndex: The index of the process.
+    """
+    return _PATH_INDEX
+
+
+def find_indexed_candidate(candidates: Iterable[Path]) -> Path | None:
+    """Find the first candidate datadok has, in the index of the process.
+
+    Args:
+        candidates: The datadok paths to look for, in the order to try them.
+
+    Returns:
+        Path | None: The first candidate datadok has, or None if it has none.
+
+    Raises:
+        PathIndexUnavailable: If no database or password is set, or the index
+            could not be built for the candidates.
+    """
+    database = get_index_database()
+    if database is None:
+        raise PathIndexUnavailable(
+            "No Oracle database set, use set_resolution_mode or SSB_TBMD_ORACLE_DB."
+        )
+    password = get_index_password()
+    if password is None:
+        raise PathIndexUnavailable(
+            "No Oracle password set, use set_resolution_mode or "
+            "SSB_TBMD_ORACLE_PASSWORD."
+        )
+    return _PATH_INDEX.find(candidates, database, password)
@@ -0,0 +1,389 @@
+"""Persistent cache of which datadok path a file resolves to, in a SQLite file.
+
+try_zeep_serialize_path looks for a file under many datadok paths, most of them
+ending in a SOAP Fault. With this cache on, it first looks up what the path
+resolved to the last time, and calls for that path only. It also remembers the
+paths that ended in a Fault, and the files no path was found for, for miss_ttl
+seconds, so they are not called for again meanwhile. A file is stored under its
+dollar-path without the extension, however it was given, see resolution_key.
+
+Turn it on for the process with SSB_TBMD_RESOLUTION_CACHE=1, or with
+enable_resolution_cache. The file is resolutions.sqlite in SSB_TBMD_CACHE_DIR
+(or ~/.cache/ssb_tbmd_apis). Forget resolutions with invalidate_resolutions, like
+after a file description is added to datadok.
+"""
+
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from ssb_tbmd_apis.paths.linux_stammer import get_stamme_registry
+from ssb_tbmd_apis.response_cache import CacheStats
+from ssb_tbmd_apis.response_cache import _env_flag
+
+DEFAULT_RESOLUTION_TTL = 30 * 24 * 3600.0
+DEFAULT_MISS_TTL = 24 * 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resolutions (
+    service TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    path TEXT NOT NULL,
+    resolved TEXT,
+    stored REAL NOT NULL,
+    PRIMARY KEY (service, operation, path)
+);
+CREATE TABLE IF NOT EXISTS misses (
+    service TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    path TEXT NOT NULL,
+    stored REAL NOT NULL,
+    PRIMARY KEY (service, operation, path)
+);
+"""
+
+_enabled: bool | None = None
+_cache: "ResolutionCache | None" = None
+_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """What a path resolved to.
+
+    Attributes:
+        resolved: The datadok path, or None if no path was found for it.
+        stored: When it was resolved, in seconds since the epoch.
+    """
+
+    resolved: Path | None
+    stored: float
+
+
+def resolution_key(path: Path | str) -> Path:
+    """Get the path a file is stored under in the resolution cache.
+
+    The same file given with its full path or its dollar-stamme, with or without
+    its extension, shares one entry.
+
+    Args:
+        path: Path to the file, full or with the dollar-stamme.
+
+    Returns:
+        Path: The path with its dollar-stamme, without the extension.
+    """
+    path = Path(path)
+    if not path.parts or not path.parts[0].startswith("$"):
+        path = get_stamme_registry().to_dollar(path)
+    return path.with_suffix("")
+
+
+def resolution_cache_path() -> Path:
+    """Get the default location of the SQLite resolution cache.
+
+    Returns:
+        Path: resolutions.sqlite in the cache directory.
+    """
+    # Imported here, as schema_cache pulls in zeep and lxml
+    from ssb_tbmd_apis.schema_cache import cache_dir
+
+    return cache_dir() / "resolutions.sqlite"
+
+
+class ResolutionCache:
+    """Thread-safe cache of path resolutions and misses in a SQLite file."""
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        ttl: float = DEFAULT_RESOLUTION_TTL,
+        miss_ttl: float = DEFAULT_MISS_TTL,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Open, or create, the cache file.
+
+        Args:
+            path: The SQLite file. Defaults to resolution_cache_path().
+            ttl: Seconds to keep the datadok path a file resolved to.
+            miss_ttl: Seconds to keep the paths that ended in a Fault, and the
+                files no path was found for.
+            clock: Function returning the current time in seconds since the epoch.
+        """
+        self.path = Path(path) if path is not None else resolution_cache_path()
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def lookup(
+        self, tbmd_service: str, operation: str, path: Path
+    ) -> Resolution | None:
+        """Look up what a path resolved to.
+
+        Args:
+            tbmd_service: The TBMD service.
+            operation: The operation the path was looked up with.
+            path: The path as asked for.
+
+        Returns:
+            Resolution | None: The resolution, or None if unknown or expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT resolved, stored FROM resolutions"
+                " WHERE service = ? AND operation = ? AND path = ?",
+                (tbmd_service, operation, str(path)),
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            resolved, stored = row
+            ttl = self.ttl if resolved is not None else self.miss_ttl
+            if stored + ttl <= self._clock():
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._hits += 1
+        return Resolution(Path(resolved) if resolved is not None else None, stored)
+
+    def store(
+        self, tbmd_service: str, operation: str, path: Path, resolved: Path | None
+    ) -> None:
+        """Store what a path resolved to.
+
+        Args:
+            tbmd_service: The TBMD service.
+            operation: The operation the path was looked up with.
+            path: The path as asked for.
+            resolved: The datadok path found, or None if none was.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?, ?)",
+                (
+                    tbmd_service,
+                    operation,
+                    str(path),
+                    str(resolved) if resolved is not None else None,
+                    self._clock(),
+                ),
+            )
+
+    def is_miss(self, tbmd_service: str, operation: str, variation: Path) -> bool:
+        """Check whether a datadok path ended in a Fault less than miss_ttl ago.
+
+        Args:
+            tbmd_service: The TBMD service.
+            operation: The operation the path was called with.
+            variation: The datadok path.
+
+        Returns:
+            bool: True if the path is a remembered miss.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM misses"
+                " WHERE service = ? AND operation = ? AND path = ? AND stored > ?",
+                (
+                    tbmd_service,
+                    operation,
+                    str(variation),
+                    self._clock() - self.miss_ttl,
+                ),
+            ).fetchone()
+        return row is not None
+
+    def store_miss(self, tbmd_service: str, operation: str, variation: Path) -> None:
+        """Remember that a datadok path ended in a Fault.
+
+        Args:
+            tbmd_service: The TBMD service.
+            operation: The operation the path was called with.
+            variation: The datadok path.
+        """
+        if self.miss_ttl <= 0:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO misses VALUES (?, ?, ?, ?)",
+                (tbmd_service, operation, str(variation), self._clock()),
+            )
+
+    def invalidate(
+        self,
+        path: Path | str | None = None,
+        tbmd_service: str | None = None,
+        misses_only: bool = False,
+    ) -> int:
+        """Forget resolutions and misses.
+
+        Args:
+            path: Only forget this path, as asked for or as a datadok path.
+            tbmd_service: Only forget the paths of this service.
+            misses_only: Only forget the misses, and the files no path was found
+                for, keeping the paths found.
+
+        Returns:
+            int: The number of resolutions and misses forgotten.
+        """
+        params = {
+            "path": str(path) if path is not None else None,
+            "service": tbmd_service,
+        }
+        where = (
+            "(:service IS NULL OR service = :service)"
+            " AND (:path IS NULL OR path = :path)"
+        )
+        resolved = " AND resolved IS NULL" if misses_only else ""
+        with self._lock:
+            deleted = self._conn.execute(
+                f"DELETE FROM misses WHERE {where}", params  # nosec
+            ).rowcount
+            deleted += self._conn.execute(
+                f"DELETE FROM resolutions WHERE {where}{resolved}", params  # nosec
+            ).rowcount
+            if path is not None and not misses_only:
+                # The files resolved to it
+                deleted += self._conn.execute(
+                    "DELETE FROM resolutions WHERE"
+                    " (:service IS NULL OR service = :service) AND resolved = :path",
+                    params,
+                ).rowcount
+        return deleted
+
+    def purge_expired(self) -> int:
+        """Delete the resolutions and misses that are past their TTL.
+
+        Returns:
+            int: The number deleted.
+        """
+        now = self._clock()
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM misses WHERE stored <= ?", (now - self.miss_ttl,)
+            ).rowcount
+            deleted += self._conn.execute(
+                "DELETE FROM resolutions WHERE"
+                " (resolved IS NOT NULL AND stored <= ?)"
+                " OR (resolved IS NULL AND stored <= ?)",
+                (now - self.ttl, now - self.miss_ttl),
+            ).rowcount
+            self._expirations += deleted
+        return deleted
+
+    def stats(self) -> CacheStats:
+        """Get the counters of the cache.
+
+        Returns:
+            CacheStats: Hits, misses and expirations of the resolution lookups
+                since the cache was opened, and the number of resolutions in the
+                file.
+        """
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM resolutions").fetchone()
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                expirations=self._expirations,
+                size=size,
+            )
+
+    def close(self) -> None:
+        """Close the connection to the SQLite file."""
+        with self._lock:
+            self._conn.close()
+
+
+def get_resolution_cache() -> ResolutionCache | None:
+    """Get the resolution cache of the process, opening it on first use.
+
+    Returns:
+        ResolutionCache | None: The cache, or None if it is turned off.
+    """
+    global _cache
+    enabled = (
+        _enabled
+        if _enabled is not None
+        else _env_flag("SSB_TBMD_RESOLUTION_CACHE", "0")
+    )
+    if not enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResolutionCache()
+        return _cache
+
+
+def enable_resolution_cache(
+    path: Path | str | None = None,
+    ttl: float = DEFAULT_RESOLUTION_TTL,
+    miss_ttl: float = DEFAULT_MISS_TTL,
+) -> ResolutionCache:
+    """Turn on the resolution cache for the process.
+
+    Args:
+        path: The SQLite file. Defaults to resolution_cache_path().
+        ttl: Seconds to keep the datadok path a file resolved to.
+        miss_ttl: Seconds to keep the paths that ended in a Fault, and the files
+            no path was found for.
+
+    Returns:
+        ResolutionCache: The new cache.
+    """
+    global _enabled, _cache
+    cache = ResolutionCache(path, ttl=ttl, miss_ttl=miss_ttl)
+    with _cache_lock:
+        previous, _cache, _enabled = _cache, cache, True
+    if previous is not None:
+        previous.close()
+    return cache
+
+
+def disable_resolution_cache() -> None:
+    """Turn off the resolution cache for the process, overriding the environment."""
+    global _enabled, _cache
+    with _cache_lock:
+        previous, _cache, _enabled = _cache, None, False
+    if previous is not None:
+        previous.close()
+
+
+def invalidate_resolutions(
+    path: Path | str | None = None,
+    tbmd_service: str | None = None,
+    misses_only: bool = False,
+) -> int:
+    """Forget resolutions and misses, in the cache file even if the cache is off.
+
+    Args:
+        path: Only forget this path, as asked for or as a datadok path.
+        tbmd_service: Only forget the paths of this service.
+        misses_only: Only forget the misses, and the files no path was found for.
+
+    Returns:
+        int: The number of resolutions and misses forgotten.
+    """
+    if path is not None:
+        path = resolution_key(path)
+    cache = get_resolution_cache()
+    if cache is not None:
+        return cache.invalidate(path, tbmd_service, misses_only)
+    if not resolution_cache_path().is_file():
+        return 0
+    cache = ResolutionCache()
+    try:
+        return cache.invalidate(path, tbmd_service, misses_only)
+    finally:
+        cache.close()
@@ -1,52 +1,339 @@
+import contextvars
 import datetime
+import heapq
+import itertools
+import os
+import threading
+import time
 from collections import OrderedDict
+from collections import deque
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
-import zeep
-
-from ssb_tbmd_apis.paths.linux_stammer import linux_stammer
+from ssb_tbmd_apis.paths.linux_stammer import get_stamme_registry
+from ssb_tbmd_apis.paths.path_index import PathIndexUnavailable
+from ssb_tbmd_apis.paths.path_index import find_indexed_candidate
+from ssb_tbmd_apis.paths.path_index import get_resolution_mode
+from ssb_tbmd_apis.paths.resolution_cache import Resolution
+from ssb_tbmd_apis.paths.resolution_cache import get_resolution_cache
+from ssb_tbmd_apis.paths.resolution_cache import resolution_key
+from ssb_tbmd_apis.resilience import check_deadline
+from ssb_tbmd_apis.resilience import deadline_scope
+from ssb_tbmd_apis.response_cache import ResponseCacheMiss
+from ssb_tbmd_apis.response_cache import offline_mode
 from ssb_tbmd_apis.tbmd_logger import logger
-from ssb_tbmd_apis.zeep_client import get_zeep_serialize
 
 KNOWN_EXTENSIONS = ["", ".dat", ".txt"]
 TIME_TRAVEL = 20
+# The most period variations to try for each stamme, None for all of them
+MAX_VARIATIONS: int | None = None
+# The most probes in flight at once, for all the calls with parallel_probes
+PROBE_WORKERS = 8
+# Seconds to keep the listing of a folder in look_for_file_on_disk, and how many
+LISTING_TTL = 5.0
+LISTING_CACHE_SIZE = 256
+# Seconds between changes that may leave the modification time of a folder the
+# same, 1 second on some network filesystems
+MTIME_GRANULARITY = 2.0
+
+_probe_executor: ThreadPoolExecutor | None = None
+_probe_lock = threading.Lock()
+_listings: OrderedDict[str, tuple[float, int | None, dict[str, bool]]] = OrderedDict()
+_listing_lock = threading.Lock()
 
 
 def try_zeep_serialize_path(
     path: Path,
     tbmd_service: str = "datadok",
     operation: str = "GetFileDescriptionByPath",
+    deadline: float | None = None,
+    parallel_probes: int = 1,
 ) -> tuple[OrderedDict[str, Any], Path]:
     """Try many different paths to get the file description from the datadok API.
 
+    With the resolution cache on, see ssb_tbmd_apis.paths.resolution_cache, a path
+    resolved before is called for directly, and the paths that ended in a Fault
+    before are skipped.
+
+    In the "oracle" resolution mode, see ssb_tbmd_apis.paths.path_index, the path
+    is picked from the paths datadok has, and only that one is called for. The
+    paths are probed if Oracle has none of them.
+
+    With parallel_probes above 1, the next paths are probed while waiting for the
+    one before them, on threads shared by all calls, see set_probe_workers. The
+    result is still that of the first path in the order that datadok has.
+
     Args:
         path: Path to the file (string or Path).
         tbmd_service: The TBMD service to use (default is "datadok").
         operation: The operation to perform (default is "GetFileDescriptionByPath").
+        deadline: The most seconds to spend trying paths, None for no limit other
+            than an enclosing deadline_scope. Past it, DeadlineExceeded is raised.
+        parallel_probes: How many paths to probe at once.
 
     Returns:
         tuple: A tuple containing the file description and the resolved Path.
 
     Raises:
-        FileNotFoundError: If the file description cannot be found.
+        FileNotFoundError: If the file description cannot be found, or in offline
+            mode, if none of the paths tried are in the response cache, or if the
+            resolution cache has that none were found.
+        ValueError: If parallel_probes is less than 1.
     """
-    path = Path(path)
+    # Imported here, so the path helpers below do not pull in zeep and requests
+    import zeep
 
-    # Remove extension
-    file_path = path.with_suffix("")
-
-    # Swap for $-path
-    stm: dict[Path, str] = linux_stammer(flip=True)
-    for real_path, dollar_name in stm.items():
-        if file_path.is_relative_to(real_path):
-            file_path = Path("$" + dollar_name) / "/".join(
-                file_path.parts[len(real_path.parts) :]
+    from ssb_tbmd_apis.zeep_client import get_zeep_serialize
+
+    if parallel_probes < 1:
+        raise ValueError("parallel_probes must be at least 1.")
+    lookup = _PathLookup(Path(path), tbmd_service, operation)
+
+    def call(variation: Path) -> OrderedDict[str, Any] | None:
+        try:
+            return get_zeep_serialize(tbmd_service, operation, str(variation))
+        except (zeep.exceptions.Fault, ResponseCacheMiss) as e:
+            lookup.missed(variation, e)
+            return None
+
+    def probe(variation: Path) -> OrderedDict[str, Any] | None:
+        if lookup.is_miss(variation):
+            return None
+        return call(variation)
+
+    with deadline_scope(deadline):
+        before = lookup.resolved_before()
+        if before is not None and before.resolved is None:
+            raise FileNotFoundError(
+                f"Found no path in datadok-api the last time looking for: {path}"
             )
-            logger.info(
-                f"When looking in datadok, we will be using the dollar-stamme {real_path}: {file_path}"
+        found = None
+        for shortcut in lookup.shortcuts(before):
+            result = call(shortcut)
+            if result is not None:
+                found = (result, shortcut)
+                break
+        if found is None:
+            found = _first_hit(
+                datadok_path_candidates(lookup.path),
+                probe,
+                parallel_probes,
+                f"{lookup.path}",
             )
-            break
+    lookup.remember(found)
+    if found is None:
+        raise FileNotFoundError(f"Failed looking for path in datadok-api: {path}")
+    return found
+
+
+class _PathLookup:
+    """The bookkeeping of try_zeep_serialize_path, around the calls to datadok.
+
+    Shared with the async version in ssb_tbmd_apis.aio.try_variations, which runs
+    the methods on a thread, as they may block on the resolution cache or Oracle.
+    """
+
+    def __init__(self, path: Path, tbmd_service: str, operation: str) -> None:
+        self.path = path
+        self.tbmd_service = tbmd_service
+        self.operation = operation
+        self.cache = get_resolution_cache()
+        # The same for the full path and the dollar-path, see resolve_datadok_paths
+        self.key = resolution_key(path) if self.cache is not None else path
+
+    def resolved_before(self) -> Resolution | None:
+        """Look up what the path resolved to the last time.
+
+        Returns:
+            Resolution | None: The resolution, or None if the cache is off or does
+                not have it.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.lookup(self.tbmd_service, self.operation, self.key)
+
+    def shortcuts(self, before: Resolution | None) -> Iterator[Path]:
+        """Generate the paths to call for before probing.
+
+        The next one is only looked up when the one before was not found: first
+        what the path resolved to the last time, then the path in the Oracle index.
+
+        Args:
+            before: What the path resolved to the last time, from resolved_before.
+
+        Yields:
+            Path: The datadok paths to call for.
+        """
+        if before is not None and before.resolved is not None:
+            yield before.resolved
+            logger.warning(f"{self.path} was at {before.resolved}, probing.")
+        if self.tbmd_service == "datadok" and get_resolution_mode() == "oracle":
+            try:
+                hit = find_indexed_candidate(datadok_path_candidates(self.path))
+            except PathIndexUnavailable as e:
+                logger.warning(f"Probing for {self.path} in datadok instead: {e}")
+                return
+            if hit is None:
+                # The paths in Oracle are rebuilt from its levels, and may miss some
+                logger.info(f"No path in Oracle matches {self.path}, probing.")
+                return
+            yield hit
+            logger.warning(f"Datadok has {hit} in Oracle, but not in the API, probing.")
+
+    def is_miss(self, variation: Path) -> bool:
+        """Check whether a datadok path ended in a Fault recently.
+
+        Args:
+            variation: The datadok path.
+
+        Returns:
+            bool: True if the resolution cache has it as a miss.
+        """
+        return self.cache is not None and self.cache.is_miss(
+            self.tbmd_service, self.operation, variation
+        )
+
+    def missed(self, variation: Path, error: Exception) -> None:
+        """Record that a datadok path was not found.
+
+        Args:
+            variation: The datadok path.
+            error: The Fault, or ResponseCacheMiss in offline mode.
+        """
+        logger.info(f"Could not find datadok entry at {variation}: {error}")
+        # Only a Fault is an answer from datadok
+        if self.cache is not None and not isinstance(error, ResponseCacheMiss):
+            self.cache.store_miss(self.tbmd_service, self.operation, variation)
+
+    def remember(self, found: tuple[OrderedDict[str, Any], Path] | None) -> None:
+        """Remember what the path resolved to.
+
+        Args:
+            found: The file description and the datadok path, or None if none of
+                the paths had one.
+        """
+        if self.cache is None:
+            return
+        if found is not None:
+            self.cache.store(self.tbmd_service, self.operation, self.key, found[1])
+        elif not offline_mode():
+            # In offline mode, the paths not in the response cache may be in datadok
+            self.cache.store(self.tbmd_service, self.operation, self.key, None)
+
+
+def set_probe_workers(workers: int) -> None:
+    """Set the most probes in flight at once, for all calls with parallel_probes.
+
+    Args:
+        workers: The number of threads probing.
+
+    Raises:
+        ValueError: If workers is less than 1.
+    """
+    global PROBE_WORKERS, _probe_executor
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    with _probe_lock:
+        PROBE_WORKERS = workers
+        executor, _probe_executor = _probe_executor, None
+    if executor is not None:
+        # The probes already submitted finish on the old threads
+        executor.shutdown(wait=False)
+
+
+def _get_probe_executor() -> ThreadPoolExecutor:
+    global _probe_executor
+    with _probe_lock:
+        if _probe_executor is None:
+            _probe_executor = ThreadPoolExecutor(
+                max_workers=PROBE_WORKERS, thread_name_prefix="tbmd-probe"
+            )
+        return _probe_executor
+
+
+def _first_hit(
+    candidates: Iterable[Path],
+    probe: Callable[[Path], OrderedDict[str, Any] | None],
+    parallel_probes: int,
+    what: str,
+) -> tuple[OrderedDict[str, Any], Path] | None:
+    """Probe the candidates in order, returning the result of the first hit.
+
+    Args:
+        candidates: The paths to probe, in the order to try them.
+        probe: Gets the result for a path, None for a miss.
+        parallel_probes: How many candidates to have in flight at once.
+        what: What is looked for, for the error if the deadline passes.
+
+    Returns:
+        tuple | None: The result and the path of the first candidate that is a
+            hit, or None if none are.
+    """
+    candidates = iter(candidates)
+    if parallel_probes == 1:
+        for variation in candidates:
+            check_deadline(f"looking for {what} in datadok")
+            result = probe(variation)
+            if result is not None:
+                return result, Path(variation)
+        return None
+
+    executor = _get_probe_executor()
+    window: deque[tuple[Path, Future[OrderedDict[str, Any] | None]]] = deque()
+    try:
+        while True:
+            for variation in itertools.islice(
+                candidates, parallel_probes - len(window)
+            ):
+                check_deadline(f"looking for {what} in datadok")
+                # Threads do not inherit context variables, like the deadline
+                context = contextvars.copy_context()
+                window.append(
+                    (variation, executor.submit(context.run, probe, variation))
+                )
+            if not window:
+                return None
+            # A later candidate might answer first, but the first one decides
+            variation, future = window.popleft()
+            result = future.result()
+            if result is not None:
+                return result, Path(variation)
+    finally:
+        # The result is decided, so drop the probes not started
+        for _, future in window:
+            future.cancel()
+
+
+def datadok_path_candidates(path: Path) -> Iterator[Path]:
+    """Generate the paths to look for in datadok for a file, in the order to try them.
+
+    The path is converted to use its dollar-stamme, then the period variations are
+    generated, first without and then with "_PII" on the stamme, at most
+    MAX_VARIATIONS of each.
+
+    Args:
+        path: Path to the file (string or Path).
+
+    Yields:
+        Path: The datadok paths to try.
+    """
+    # Remove extension
+    file_path = Path(path).with_suffix("")
+
+    # Swap for $-path, from the longest stamme the path is in
+    registry = get_stamme_registry()
+    found = registry.find_stamme(file_path)
+    if found is not None:
+        real_path = found[1]
+        file_path = registry.to_dollar(file_path)
+        logger.info(
+            f"When looking in datadok, we will be using the dollar-stamme {real_path}: {file_path}"
+        )
 
     # Remove "_PII" at the start of the first part
     parts = list(file_path.parts)
@@ -54,30 +341,14 @@ def try_zeep_serialize_path(
     file_path = Path(*parts)
 
     # Try without PII
-    for variation in period_variations_path(file_path):
-        try:
-            return (
-                get_zeep_serialize(tbmd_service, operation, str(variation)),
-                Path(variation),
-            )
-        except zeep.exceptions.Fault as e:
-            logger.info(f"Could not find datadok entry at {variation}: {e}")
+    yield from period_variations_path(file_path, limit=MAX_VARIATIONS)
 
     # Try with "_PII" again
     parts = list(file_path.parts)
     parts[0] = parts[0] + "_PII"
     file_path = Path(*parts)
 
-    for variation in period_variations_path(file_path):
-        try:
-            return (
-                get_zeep_serialize(tbmd_service, operation, str(variation)),
-                Path(variation),
-            )
-        except zeep.exceptions.Fault as e:
-            logger.info(f"Could not find datadok entry at {variation}: {e}")
-
-    raise FileNotFoundError(f"Failed looking for path in datadok-api: {path}")
+    yield from period_variations_path(file_path, limit=MAX_VARIATIONS)
 
 
 def swap_dollar_sign(path: Path) -> Path:
@@ -89,22 +360,17 @@ def swap_dollar_sign(path: Path) -> Path:
     Returns:
         Path: The modified path with the dollar sign swapped.
     """
-    outpath = Path(path)
-
-    first_part = outpath.parts[0]
-    # Mypy - my love
-    first_part_not_none: str = first_part
-    if first_part_not_none.startswith("$"):
-        first_part_not_none = first_part_not_none[1:]
-    replace = linux_stammer().get(first_part_not_none, None)
-    if replace is not None:
-        outpath = Path(replace) / Path(*outpath.parts[1:])
-    return outpath
+    return get_stamme_registry().to_real(Path(path))
 
 
 def look_for_file_on_disk(path: Path) -> Path:
     """Look for a file on disk using various methods.
 
+    Each folder is listed once, and the listing is kept for up to LISTING_TTL
+    seconds, so looking for many files in the same folder lists it only once. A
+    listing is listed again as soon as the modification time of the folder
+    changes, like when a file is added to it.
+
     Args:
         path: Path to the file.
 
@@ -116,9 +382,10 @@ def look_for_file_on_disk(path: Path) -> Path:
     """
     # Swap dollar sign
     path = swap_dollar_sign(path)
+    listing = _list_folder(path.parent)
 
     # Attempt one, look for specific file
-    if path.is_file():
+    if listing.get(path.name):
         logger.info(f"Discovered file to open at {path}.")
         return path
 
@@ -126,87 +393,165 @@ def look_for_file_on_disk(path: Path) -> Path:
     path_no_ext = path.with_suffix("")
     for ext in KNOWN_EXTENSIONS:
         check_path = path_no_ext.with_suffix(ext)
-        if check_path.is_file():
+        if listing.get(check_path.name):
             logger.info(f"Discovered file to open at {check_path}.")
             return check_path
 
-    # Attempt three, look to see if we can find single match using glob
+    # Attempt three, look to see if we can find single match in the folder
     single_match = _exactly_one(path_no_ext.parent)
     if single_match:
         return single_match
 
     # Attempt four, flip pii
-    parts = list(path_no_ext.parts)
-    if parts[3].endswith("_pii"):
-        parts[3] = parts[3][:-4]
-    else:
-        parts[3] += "_pii"
-    single_match = _exactly_one(Path(*parts).parent)
+    single_match = _exactly_one(_flip_pii(path_no_ext).parent)
     if single_match:
         return single_match
 
     raise FileNotFoundError("Cant find single file with that path on local drive.")
 
 
+def clear_listing_cache() -> None:
+    """Forget the folder listings of look_for_file_on_disk."""
+    with _listing_lock:
+        _listings.clear()
+
+
+def _list_folder(folder: Path) -> dict[str, bool]:
+    # The names in the folder, and whether each is a file, listed again when the
+    # folder has changed or the TTL is out
+    key = str(folder)
+    try:
+        mtime: int | None = os.stat(folder).st_mtime_ns
+    except OSError:
+        mtime = None
+    now = time.monotonic()
+    with _listing_lock:
+        cached = _listings.get(key)
+        if cached is not None and cached[1] == mtime and now - cached[0] < LISTING_TTL:
+            _listings.move_to_end(key)
+            return cached[2]
+    listed_at = time.time_ns()
+    listing: dict[str, bool] = {}
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                # Only a symlink costs a stat here
+                listing[entry.name] = entry.is_file()
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    if mtime is not None and listed_at - mtime < MTIME_GRANULARITY * 1e9:
+        # Changed so recently that the next change may keep the same mtime
+        return listing
+    with _listing_lock:
+        _listings[key] = (now, mtime, listing)
+        _listings.move_to_end(key)
+        while len(_listings) > LISTING_CACHE_SIZE:
+            _listings.popitem(last=False)
+    return listing
+
+
+def _flip_pii(path: Path) -> Path:
+    # Add or remove "_pii" on the stamme folder, like /ssb/stamme01/fob_pii
+    parts = list(path.parts)
+    if parts[3].endswith("_pii"):
+        parts[3] = parts[3][:-4]
+    else:
+        parts[3] += "_pii"
+    return Path(*parts)
+
+
 def _exactly_one(path: Path) -> Path | None:
-    glob_result = list(path.glob("*"))
-    if len(glob_result) == 1:
-        logger.info(f"Discovered file to open at {glob_result[0]}.")
-        return glob_result[0]
-    f"Too many files discovered (more than one): {glob_result}"
+    # Like glob("*"), the hidden names are left out
+    names = [name for name in _list_folder(path) if not name.startswith(".")]
+    if len(names) == 1:
+        logger.info(f"Discovered file to open at {path / names[0]}.")
+        return path / names[0]
+    f"Too many files discovered (more than one): {names}"
     return None
 
 
-def period_variations_path(path: Path) -> list[Path]:
+def period_variations_path(path: Path, limit: int | None = None) -> Iterator[Path]:
     """Generate variations of the path based on periods in the filename.
 
+    The variations are generated lazily, the most likely first: by the distance of
+    their first and last periods from those in the filename, so the filename itself
+    comes first, then the ones off by a year, and so on. Ties go to fewer periods,
+    then to the later first period.
+
     Args:
         path: Path to the file.
+        limit: The most variations to generate, None for all of them.
 
-    Returns:
-        list[str]: List of variations of the path.
+    Yields:
+        Path: The variations of the path, each once.
     """
     # Find periods in path
-    periods = []
-    temp_name = Path(path).stem
-    while temp_name and temp_name[0] == "g" and temp_name[1:5].isdigit():
-        periods += [int(temp_name[1:5])]
-        temp_name = temp_name[5:]
+    periods, temp_name = _split_periods(Path(path).stem)
 
-    current_year = datetime.datetime.now().year
-
-    variations = []
-    # Build guesses for paths with single yead
-    if len(periods) == 1:
-        # Check back 20 years
-        for first_yr in range(periods[0], periods[0] - TIME_TRAVEL, -1):
-            variations += [Path(path).parent / f"g{first_yr}{temp_name}"]
-            for second_yr in range(current_year, first_yr, -1):
-                variations += [
-                    Path(path).parent / f"g{first_yr}g{second_yr}{temp_name}"
-                ]
-
-    # Build guesses for paths with 2 years
-    elif len(periods) == 2:
-        diff = periods[1] - periods[0]
-
-        for first_yr in range(periods[0], periods[0] - TIME_TRAVEL, -1):
-            variations += [
-                Path(path).parent / f"g{first_yr}g{first_yr+diff}{temp_name}"
-            ]
-            for second_yr in range(current_year, first_yr, -1):
-                variations += [
-                    Path(path).parent / f"g{first_yr}g{second_yr}{temp_name}"
-                ]
-                variations += [
-                    Path(path).parent
-                    / f"g{first_yr}g{first_yr+diff}g{second_yr}g{second_yr+diff}{temp_name}"
-                ]
-
-    else:
-        variations += [path]
+    if len(periods) not in (1, 2):
         logger.warning(
-            f"Dont know what to do with {len(periods)} periods in path. Not guessing much... Variations: {variations}"
+            f"Dont know what to do with {len(periods)} periods in path. Not guessing much... Variations: {[path]}"
         )
+        yield path
+        return
 
-    return variations
+    current_year = datetime.datetime.now().year
+    first = periods[0]
+    # Every family of variations is ordered, so merging them orders all of them
+    families = [
+        _period_family(periods, first_yr, current_year)
+        for first_yr in range(first, first - TIME_TRAVEL, -1)
+    ]
+    merged = (years for _, years in heapq.merge(*families, key=lambda item: item[0]))
+    for years in itertools.islice(_unique(merged), limit):
+        name = "".join(f"g{year}" for year in years)
+        yield Path(path).parent / f"{name}{temp_name}"
+
+
+def _split_periods(stem: str) -> tuple[list[int], str]:
+    # The years of the periods the name starts with, like g2019g2020, and the rest
+    periods = []
+    while stem and stem[0] == "g" and stem[1:5].isdigit():
+        periods += [int(stem[1:5])]
+        stem = stem[5:]
+    return periods, stem
+
+
+def _unique(items: Iterator[tuple[int, ...]]) -> Iterator[tuple[int, ...]]:
+    seen: set[tuple[int, ...]] = set()
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            yield item
+
+
+def _period_family(
+    periods: list[int], first_yr: int, current_year: int
+) -> Iterator[tuple[tuple[int, int, int], tuple[int, ...]]]:
+    # The variations starting at first_yr, with their sort keys, in order
+    first, last = periods[0], periods[-1]
+    diff = last - first
+
+    def keyed(years: tuple[int, ...]) -> tuple[tuple[int, int, int], tuple[int, ...]]:
+        distance = abs(years[0] - first) + abs(years[-1] - last)
+        return ((distance, len(years), first - first_yr), years)
+
+    def nearest(target: int) -> list[int]:
+        # The later years, nearest the target first
+        later = range(first_yr + 1, current_year + 1)
+        return sorted(later, key=lambda yr: (abs(yr - target), -yr))
+
+    # The year alone, or both years shifted back
+    single = (first_yr,) if len(periods) == 1 else (first_yr, first_yr + diff)
+    families = [
+        [keyed(single)],
+        # From first_yr to a later year
+        (keyed((first_yr, second_yr)) for second_yr in nearest(last)),
+    ]
+    if len(periods) == 2:
+        # Both years, and both years again from a later year
+        families.append(
+            keyed((first_yr, first_yr + diff, second_yr, second_yr + diff))
+            for second_yr in nearest(last - diff)
+        )
+    yield from heapq.merge(*families, key=lambda item: item[0])
@@ -0,0 +1,449 @@
+"""Fast path parsing SOAP responses with lxml, straight into OrderedDicts.
+
+The zeep path builds a zeep object for every element in the response, and
+serialize_object then copies the whole tree into OrderedDicts. For large responses,
+like file descriptions with hundreds of context variables, most of the time goes
+to that. The raw path sends the same envelope, but parses the reply directly into
+the OrderedDicts the zeep path ends up with: the same keys in the same order,
+None for missing elements and attributes, lists for repeating elements, and
+"_value_1" for the text of elements with simple content.
+
+What to parse is planned once per operation from the types zeep compiled from the
+WSDL. Operations with types the plan does not cover (xsd:any, choices, headers),
+replies with unexpected content and SOAP Faults are handled by zeep instead, so
+the results do not depend on the mode.
+
+Turn it on with set_parse_mode("raw") or SSB_TBMD_PARSE_MODE=raw.
+
+iter_raw uses the same plans to stream the items of a list response, parsing the
+reply with an incremental lxml parser while it downloads, and dropping each item
+once yielded.
+"""
+
+import os
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import cast
+from typing import no_type_check
+
+import zeep
+from lxml import etree  # type: ignore[import-untyped]
+from zeep.helpers import serialize_object
+from zeep.loader import parse_xml
+
+from ssb_tbmd_apis.resilience import deadline_timeout
+from ssb_tbmd_apis.tbmd_logger import logger
+from ssb_tbmd_apis.tbmd_metrics import record_http
+
+PARSE_MODES = ("zeep", "raw")
+
+_XSI_NS = "http://www.w3.org/2001/XMLSchema-instance"
+_SOAP_NS = (
+    "http://schemas.xmlsoap.org/soap/envelope/",
+    "http://www.w3.org/2003/05/soap-envelope",
+)
+
+_mode: str | None = None
+
+
+def get_parse_mode() -> str:
+    """Get how SOAP responses are parsed.
+
+    Returns:
+        str: "zeep" (default) or "raw".
+
+    Raises:
+        ValueError: If SSB_TBMD_PARSE_MODE holds an unknown mode.
+    """
+    mode = _mode or os.environ.get("SSB_TBMD_PARSE_MODE", "zeep").lower()
+    if mode not in PARSE_MODES:
+        raise ValueError(f"Unknown parse mode {mode}, use one of {PARSE_MODES}.")
+    return mode
+
+
+def set_parse_mode(mode: str | None) -> None:
+    """Set how SOAP responses are parsed, overriding the environment.
+
+    Args:
+        mode: "zeep" or "raw", or None to go back to reading SSB_TBMD_PARSE_MODE.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    global _mode
+    if mode is not None and mode.lower() not in PARSE_MODES:
+        raise ValueError(f"Unknown parse mode {mode}, use one of {PARSE_MODES}.")
+    _mode = mode.lower() if mode is not None else None
+
+
+class _Unsupported(Exception):
+    """The plan or the reply has something only zeep knows how to handle."""
+
+
+@dataclass(eq=False)
+class _ElementPlan:
+    name: str
+    localname: str
+    max_occurs: int | None  # None is unbounded
+    simple: Any = None
+    complex: "_TypePlan | None" = None
+    xsd: Any = None  # the zeep Element, to fall back on
+
+    @property
+    def many(self) -> bool:
+        return self.max_occurs != 1
+
+
+@dataclass(eq=False)
+class _TypePlan:
+    elements: list[_ElementPlan] = field(default_factory=list)
+    attributes: list[tuple[str, str, Any]] = field(default_factory=list)
+    text: tuple[str, Any] | None = None  # simple content, as "_value_1"
+
+
+@no_type_check
+def _type_plan(xsd_type: Any, seen: dict[int, _TypePlan]) -> _TypePlan:
+    if id(xsd_type) in seen:
+        return seen[id(xsd_type)]
+    plan = _TypePlan()
+    seen[id(xsd_type)] = plan
+
+    element = getattr(xsd_type, "_element", None)
+    if isinstance(element, zeep.xsd.Element) and isinstance(
+        element.type, zeep.xsd.AnySimpleType
+    ):
+        name, _ = xsd_type.elements_nested[0]
+        plan.text = (name, element.type)
+    else:
+        for _, nested in xsd_type.elements_nested:
+            if not isinstance(nested, zeep.xsd.Sequence | zeep.xsd.All):
+                raise _Unsupported(f"{type(nested).__name__} in {xsd_type.name}")
+        for name, child in xsd_type.elements:
+            if type(child) is not zeep.xsd.Element:
+                raise _Unsupported(f"{type(child).__name__} {name}")
+            max_occurs = None if child.max_occurs == "unbounded" else child.max_occurs
+            child_plan = _ElementPlan(
+                name, child.qname.localname, max_occurs, xsd=child
+            )
+            if isinstance(child.type, zeep.xsd.AnySimpleType):
+                child_plan.simple = child.type
+            elif isinstance(child.type, zeep.xsd.ComplexType):
+                if getattr(child.type, "_array_type", None):
+                    raise _Unsupported(f"SOAP array {name}")
+                child_plan.complex = _type_plan(child.type, seen)
+            else:
+                raise _Unsupported(f"Type of {name}")
+            plan.elements.append(child_plan)
+
+    for name, attribute in xsd_type.attributes:
+        if type(attribute) is not zeep.xsd.Attribute or not attribute.name:
+            raise _Unsupported(f"{type(attribute).__name__} {name}")
+        plan.attributes.append((name, attribute.qname.text, attribute.type))
+    return plan
+
+
+@no_type_check
+def _operation_plan(operation: Any) -> _TypePlan:
+    output = operation.output
+    if output.header.type._element or not isinstance(output.body, zeep.xsd.Element):
+        raise _Unsupported("Output with headers or several parts")
+    if not isinstance(output.body.type, zeep.xsd.ComplexType):
+        raise _Unsupported("Output without a complex type")
+    return _type_plan(output.body.type, {})
+
+
+_plans: "weakref.WeakKeyDictionary[Any, _TypePlan | None]" = weakref.WeakKeyDictionary()
+
+
+def _plan_for(operation: Any) -> _TypePlan | None:
+    """Get the plan of an operation, or None if zeep has to parse its replies."""
+    try:
+        return _plans[operation]
+    except KeyError:
+        pass
+    plan: _TypePlan | None
+    try:
+        plan = _operation_plan(operation)
+    except _Unsupported as e:
+        logger.debug(f"Parsing {operation.name} with zeep: {e}")
+        plan = None
+    _plans[operation] = plan
+    return plan
+
+
+def _localname(tag: str) -> str:
+    return tag[tag.rfind("}") + 1 :]
+
+
+def _simple_value(xsd_type: Any, text: str | None) -> Any:
+    if text is None:
+        return None
+    try:
+        return xsd_type.pythonvalue(text)
+    except (TypeError, ValueError):
+        logger.exception("Error during xml -> python translation")
+        return None
+
+
+def _parse_type(
+    node: etree._Element, plan: _TypePlan, allow_none: bool
+) -> OrderedDict[str, Any] | None:
+    attrib = node.attrib
+    if any(str(key).startswith(f"{{{_XSI_NS}}}") for key in attrib.keys()):
+        raise _Unsupported("xsi:type or xsi:nil")
+    result: OrderedDict[str, Any] = OrderedDict()
+
+    if plan.text is not None:
+        result[plan.text[0]] = _simple_value(plan.text[1], node.text)
+    else:
+        children = [child for child in node if isinstance(child.tag, str)]
+        if allow_none and not children and not attrib:
+            return None
+        i = 0
+        for element in plan.elements:
+            values: list[Any] = []
+            while (
+                i < len(children)
+                and (element.max_occurs is None or len(values) < element.max_occurs)
+                and _localname(children[i].tag) == element.localname
+            ):
+                values.append(_parse_element(children[i], element))
+                i += 1
+            if element.many:
+                result[element.name] = values
+            else:
+                result[element.name] = values[0] if values else None
+        if i < len(children):
+            raise _Unsupported(f"Unexpected element {children[i].tag}")
+
+    for name, qname, xsd_type in plan.attributes:
+        result[name] = _simple_value(xsd_type, attrib.get(qname))
+    return result
+
+
+def _parse_element(node: etree._Element, plan: _ElementPlan) -> Any:
+    if plan.complex is not None:
+        return _parse_type(node, plan.complex, allow_none=True)
+    if node.get(f"{{{_XSI_NS}}}type") is not None:
+        raise _Unsupported("xsi:type")
+    return _simple_value(plan.simple, node.text)
+
+
+def _unwrap(wrapper: OrderedDict[str, Any], plan: _TypePlan) -> Any:
+    """Unwrap the response like zeep does, to the single result if there is one."""
+    if len(wrapper) != 1:
+        return wrapper or None
+    (value,) = wrapper.values()
+    element = plan.elements[0] if plan.elements else None
+    if element is None or element.complex is None or value is None:
+        return value
+    nested = element.complex
+    if not nested.attributes and len(nested.elements) + (nested.text is not None) == 1:
+        (child,) = value.values()
+        return child
+    return value
+
+
+def _parse_reply(content: bytes, plan: _TypePlan, client: Any) -> Any:
+    doc = parse_xml(
+        content, client.transport, settings=client.settings  # type: ignore[arg-type]
+    )
+    body = None
+    for child in doc:
+        if etree.QName(child).localname == "Body" and child.tag.startswith(
+            tuple(f"{{{ns}}}" for ns in _SOAP_NS)
+        ):
+            body = child
+    if body is None:
+        raise _Unsupported("No SOAP Body")
+    parts = [child for child in body if isinstance(child.tag, str)]
+    if len(parts) != 1 or etree.QName(parts[0]).localname == "Fault":
+        raise _Unsupported("Fault or several parts in the Body")
+
+    wrapper = _parse_type(parts[0], plan, allow_none=False)
+    return _unwrap(wrapper, plan) if wrapper is not None else None
+
+
+def _prepare(client: Any, operation: str, args: tuple[Any, ...]) -> Any:
+    service = client.service
+    binding = service._binding
+    binding_operation = binding.get(operation)
+    envelope, headers = binding._create(
+        operation, args, {}, client=client, options=service._binding_options
+    )
+    return binding, binding_operation, envelope, headers
+
+
+def _process(
+    client: Any, binding: Any, binding_operation: Any, response: Any
+) -> OrderedDict[str, Any]:
+    plan = _plan_for(binding_operation)
+    result: OrderedDict[str, Any]
+    if plan is not None and response.status_code == 200:
+        try:
+            result = _parse_reply(response.content, plan, client)
+            return result
+        except _Unsupported as e:
+            logger.debug(f"Parsing reply to {binding_operation.name} with zeep: {e}")
+    # Faults and anything the plan does not cover, the same way as the zeep path
+    response_value = binding.process_reply(client, binding_operation, response)
+    result = serialize_object(response_value)  # type: ignore[no-untyped-call]
+    return result
+
+
+def call_raw(client: Any, operation: str, *args: Any) -> OrderedDict[str, Any]:
+    """Call an operation, parsing the reply with lxml instead of zeep.
+
+    Args:
+        client: The zeep.Client of the service.
+        operation: The operation to perform.
+        *args: Arguments for the operation.
+
+    Returns:
+        OrderedDict: The response, shaped like zeep.helpers.serialize_object would.
+    """
+    binding, binding_operation, envelope, headers = _prepare(client, operation, args)
+    response = client.transport.post_xml(
+        client.service._binding_options["address"], envelope, headers
+    )
+    return _process(client, binding, binding_operation, response)
+
+
+async def acall_raw(client: Any, operation: str, *args: Any) -> OrderedDict[str, Any]:
+    """Async version of call_raw, for a zeep.AsyncClient.
+
+    Args:
+        client: The zeep.AsyncClient of the service.
+        operation: The operation to perform.
+        *args: Arguments for the operation.
+
+    Returns:
+        OrderedDict: The response, shaped like zeep.helpers.serialize_object would.
+    """
+    binding, binding_operation, envelope, headers = _prepare(client, operation, args)
+    response = await client.transport.post_xml(
+        client.service._binding_options["address"], envelope, headers
+    )
+    return _process(client, binding, binding_operation, response)
+
+
+def _item_path(plan: _TypePlan) -> list[_ElementPlan] | None:
+    """Find the repeating element a response is a list of, through single children."""
+    path = []
+    current = plan
+    while current.text is None and len(current.elements) == 1:
+        element = current.elements[0]
+        path.append(element)
+        if element.many:
+            return path if element.complex is not None else None
+        if element.complex is None:
+            return None
+        current = element.complex
+    return None
+
+
+def _as_items(result: Any) -> list[Any]:
+    if result is None:
+        return []
+    return result if isinstance(result, list) else [result]
+
+
+def _depth(node: etree._Element) -> int:
+    depth = 0
+    current: etree._Element | None = node
+    while current is not None:
+        depth += 1
+        current = current.getparent()
+    return depth
+
+
+def iter_raw(client: Any, operation: str, *args: Any) -> Iterator[Any]:
+    """Call an operation returning a list, yielding the items as they are parsed.
+
+    The reply is streamed, and parsed with lxml's XMLPullParser as it arrives, so the
+    first items are yielded before the download is done. Each item is dropped from
+    the tree once yielded, so memory use does not grow with the size of the reply.
+    Only the items are yielded, any attributes on the elements around them are not.
+
+    Replies to operations whose plan is not a list of items, and replies from
+    transports that cannot stream, are parsed whole, yielding the items of the
+    result.
+
+    Args:
+        client: The zeep.Client of the service, with a requests based transport.
+        operation: The operation to perform.
+        *args: Arguments for the operation.
+
+    Yields:
+        OrderedDict: Each item, shaped like zeep.helpers.serialize_object would.
+
+    Raises:
+        zeep.exceptions.Fault: If the service answers with a SOAP Fault.
+    """
+    binding, binding_operation, envelope, headers = _prepare(client, operation, args)
+    transport = client.transport
+    plan = _plan_for(binding_operation)
+    path = _item_path(plan) if plan is not None else None
+    if not getattr(transport, "streaming", True):
+        response = transport.post_xml(
+            client.service._binding_options["address"], envelope, headers
+        )
+        yield from _as_items(_process(client, binding, binding_operation, response))
+        return
+    with transport.session.post(
+        client.service._binding_options["address"],
+        data=etree.tostring(envelope, xml_declaration=True, encoding="utf-8"),
+        headers=headers,
+        timeout=deadline_timeout(transport.operation_timeout),
+        stream=True,
+    ) as response:
+        if path is None or response.status_code != 200:
+            yield from _as_items(_process(client, binding, binding_operation, response))
+            return
+
+        item = path[-1]
+        # Envelope, Body and the wrapper, then the path down to the items
+        item_depth = 3 + len(path)
+        connect = response.elapsed.total_seconds()
+        start = time.perf_counter()
+        received = 0
+        parser = etree.XMLPullParser(
+            events=("end",),
+            tag=(f"{{*}}{item.localname}", "{*}Fault"),
+            remove_comments=True,
+            resolve_entities=False,
+            no_network=True,
+            huge_tree=client.settings.xml_huge_tree,
+        )
+        # Feed the chunks as they arrive, reading a file object would wait for
+        # a full buffer before parsing anything
+        for chunk in response.iter_content(chunk_size=None):
+            received += len(chunk)
+            parser.feed(chunk)
+            for _, event_node in parser.read_events():
+                # Only "end" events are asked for, so these are always elements
+                node = cast(etree._Element, event_node)
+                if _localname(node.tag) == "Fault" and _depth(node) == 3:
+                    raise zeep.exceptions.Fault(  # type: ignore[no-untyped-call]
+                        node.findtext("faultstring"), code=node.findtext("faultcode")
+                    )
+                if _depth(node) != item_depth:
+                    continue
+                try:
+                    value = _parse_element(node, item)
+                except _Unsupported:
+                    value = serialize_object(  # type: ignore[no-untyped-call]
+                        item.xsd.parse(node, client.wsdl.types)
+                    )
+                yield value
+                node.clear()
+                parent = node.getparent()
+                while parent is not None and node.getprevious() is not None:
+                    del parent[0]
+        parser.close()
+        record_http(connect, time.perf_counter() - start, received)
@@ -0,0 +1,491 @@
+"""Timeouts, retries, circuit breakers and deadlines for the SOAP calls.
+
+Each service has a ServicePolicy, changed with configure_service:
+
+- Connect and read timeouts for every HTTP request to the service.
+- Retries of calls failing in transport, like dropped connections, timeouts or
+  HTTP 5xx replies without a SOAP Fault, with exponential backoff and jitter.
+  A SOAP Fault is an answer from the service, like a path it does not know,
+  and is never retried. Other errors, like a reply that is not XML, are neither
+  retried nor counted for or against the service.
+- A circuit breaker, failing fast with CircuitOpenError after failure_threshold
+  calls in a row failed in transport. After reset_timeout seconds, a single call
+  is let through to test the service, closing the circuit again if it works.
+
+A deadline caps the total time of the calls made in a with block, including the
+waits between retries, and is honored by long loops like try_zeep_serialize_path:
+
+    with deadline_scope(60):
+        for path in paths:
+            datadok_file_description_by_path(path)
+
+Past the deadline, DeadlineExceeded is raised.
+"""
+
+import asyncio
+import random
+import sys
+import threading
+import time
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import replace
+from typing import Any
+
+from ssb_tbmd_apis.tbmd_logger import logger
+
+Timeout = tuple[float, float]
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling a service that failed too many times in a row."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the deadline of deadline_scope or a deadline argument has passed."""
+
+
+@dataclass(frozen=True)
+class ServicePolicy:
+    """How the calls to a service are timed out, retried and cut off.
+
+    Attributes:
+        connect_timeout: Seconds to wait for a connection to the service.
+        read_timeout: Seconds to wait for the service between bytes of the reply.
+        max_attempts: Tries for each call, 1 to never retry.
+        backoff_base: Seconds to wait at most before the first retry, doubled
+            for every retry after it. The wait is random, from 0 up to that.
+        backoff_max: The most seconds to wait before a retry.
+        failure_threshold: Calls in a row failing in transport before the circuit
+            opens. 0 to never open it.
+        reset_timeout: Seconds the circuit stays open before a call is let through
+            to test the service.
+    """
+
+    connect_timeout: float = 10.0
+    read_timeout: float = 300.0
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 10.0
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+    @property
+    def timeout(self) -> Timeout:
+        """The (connect, read) timeouts, as requests takes them."""
+        return (self.connect_timeout, self.read_timeout)
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before the retry after a failed attempt.
+
+        Args:
+            attempt: The number of the attempt that failed, from 1.
+
+        Returns:
+            float: A random wait, from 0 up to the exponential backoff.
+        """
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        )
+
+
+_DEFAULT_POLICY = ServicePolicy()
+_policies: dict[str, ServicePolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_service_policy(tbmd_service: str) -> ServicePolicy:
+    """Get the timeouts, retries and circuit breaker settings of a service.
+
+    Args:
+        tbmd_service: The TBMD service.
+
+    Returns:
+        ServicePolicy: The settings of the service.
+    """
+    return _policies.get(tbmd_service.lower(), _DEFAULT_POLICY)
+
+
+def configure_service(tbmd_service: str, **settings: Any) -> ServicePolicy:
+    """Change the timeouts, retries or circuit breaker settings of a service.
+
+    The cached clients of the service are dropped, so the next SOAP call gets the
+    new timeouts.
+
+    Args:
+        tbmd_service: The TBMD service.
+        **settings: Fields of ServicePolicy to change, like read_timeout=60.
+
+    Returns:
+        ServicePolicy: The new settings.
+
+    Raises:
+        ValueError: If max_attempts is less than 1, or a timeout is not positive.
+    """
+    tbmd_service = tbmd_service.lower()
+    with _policies_lock:
+        policy = replace(get_service_policy(tbmd_service), **settings)
+        if policy.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        if policy.connect_timeout <= 0 or policy.read_timeout <= 0:
+            raise ValueError("Timeouts must be positive.")
+        _policies[tbmd_service] = policy
+    # Imported here, as the clients are built on this module
+    from ssb_tbmd_apis.zeep_client import invalidate_zeep_clients
+
+    invalidate_zeep_clients(tbmd_service)
+    return policy
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker of one service."""
+
+    def __init__(self, tbmd_service: str) -> None:
+        """Initialize a closed circuit.
+
+        Args:
+            tbmd_service: The TBMD service, to read its ServicePolicy.
+        """
+        self.tbmd_service = tbmd_service
+        self.failures = 0
+        self.opened = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """The state, "closed", "open", or "half-open" when a call may test the service."""
+        with self._lock:
+            return self._state(get_service_policy(self.tbmd_service))
+
+    def _state(self, policy: ServicePolicy) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < policy.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def before_call(self) -> bool:
+        """Check that a call may be made.
+
+        Returns:
+            bool: True if the call is the one testing the service. Its outcome must
+                then be recorded, or the test released with release_trial.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with the call
+                testing the service still in flight.
+        """
+        policy = get_service_policy(self.tbmd_service)
+        with self._lock:
+            state = self._state(policy)
+            if state == "closed":
+                return False
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            assert self._opened_at is not None  # nosec
+            retry_in = policy.reset_timeout - (time.monotonic() - self._opened_at)
+        raise CircuitOpenError(
+            f"The {self.tbmd_service} service failed {self.failures} times in a row, "
+            f"not calling it for another {max(retry_in, 0):.1f} seconds."
+        )
+
+    def record_success(self) -> None:
+        """Close the circuit, the service answered."""
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Let another call test the service, leaving the state as it is.
+
+        For the call testing the service that neither succeeded nor failed in
+        transport, like when it was cancelled.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a call failing in transport, opening the circuit if too many did."""
+        policy = get_service_policy(self.tbmd_service)
+        with self._lock:
+            self.failures += 1
+            reopen = self._trial_in_flight
+            self._trial_in_flight = False
+            threshold = policy.failure_threshold
+            if reopen or (threshold and self.failures >= threshold):
+                if self._opened_at is None:
+                    self.opened += 1
+                self._opened_at = time.monotonic()
+                logger.warning(
+                    f"Opened the circuit of the {self.tbmd_service} service after "
+                    f"{self.failures} failures in a row."
+                )
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(tbmd_service: str) -> CircuitBreaker:
+    """Get the circuit breaker of a service.
+
+    Args:
+        tbmd_service: The TBMD service.
+
+    Returns:
+        CircuitBreaker: The circuit breaker, shared by the sync and async clients.
+    """
+    tbmd_service = tbmd_service.lower()
+    with _breakers_lock:
+        breaker = _breakers.get(tbmd_service)
+        if breaker is None:
+            breaker = _breakers[tbmd_service] = CircuitBreaker(tbmd_service)
+        return breaker
+
+
+def reset_circuit_breakers() -> None:
+    """Close the circuits of all services, forgetting their failures."""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+_deadline: ContextVar[float | None] = ContextVar("tbmd_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float | None) -> Iterator[None]:
+    """Cap the time of the SOAP calls made in the with block.
+
+    Deadlines nest, the earliest one applies. Works per thread and per asyncio
+    task.
+
+    Args:
+        seconds: Seconds from now until the deadline, or None for no deadline.
+
+    Yields:
+        None: Nothing, use it as a with-statement.
+    """
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> float | None:
+    """Get the seconds left until the deadline.
+
+    Returns:
+        float | None: The seconds left, negative if past it, or None without one.
+    """
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def check_deadline(what: str = "the SOAP calls") -> None:
+    """Raise if the deadline has passed.
+
+    Args:
+        what: Named in the error message.
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed.
+    """
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"The deadline for {what} has passed.")
+
+
+def deadline_timeout(timeout: Timeout | None) -> Timeout | None:
+    """Cap the (connect, read) timeouts of a request to the time left until the deadline.
+
+    Args:
+        timeout: The timeouts of the service.
+
+    Returns:
+        Timeout | None: The capped timeouts, or the timeouts as they were without
+            a deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("The deadline for the SOAP calls has passed.")
+    if timeout is None:
+        return (remaining, remaining)
+    return (min(timeout[0], remaining), min(timeout[1], remaining))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Check whether a call failed in transport, and may work if tried again.
+
+    Args:
+        error: The error the call raised.
+
+    Returns:
+        bool: True for connection errors, timeouts and HTTP 429 or 5xx replies
+            without a SOAP Fault. False for SOAP Faults and everything else.
+    """
+    # A call has been made, so both are already imported
+    import requests
+    import zeep
+
+    if isinstance(error, zeep.exceptions.TransportError):
+        return bool(error.status_code == 429 or error.status_code >= 500)
+    if isinstance(
+        error,
+        requests.exceptions.ConnectionError
+        | requests.exceptions.Timeout
+        | requests.exceptions.ChunkedEncodingError,
+    ):
+        return True
+    # Only the async clients use httpx, so it is imported if they raised
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+
+def is_service_answer(error: BaseException) -> bool:
+    """Check whether a call failed with an answer from the service.
+
+    Args:
+        error: The error the call raised.
+
+    Returns:
+        bool: True for SOAP Faults, showing the service is up.
+    """
+    # A call has been made, so zeep is already imported
+    import zeep
+
+    return isinstance(error, zeep.exceptions.Fault)
+
+
+def _give_up(
+    tbmd_service: str, attempt: int, error: Exception, policy: ServicePolicy
+) -> float | None:
+    # Count the failure, and get the wait before the next try, None to stop
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        # Likely timed out for the deadline, not for the service being slow
+        raise DeadlineExceeded(
+            f"The deadline for the call to the {tbmd_service} service has passed."
+        ) from error
+    breaker = get_circuit_breaker(tbmd_service)
+    breaker.record_failure()
+    if attempt >= policy.max_attempts or breaker.state != "closed":
+        return None
+    delay = policy.backoff(attempt)
+    if remaining is not None and remaining <= delay:
+        return None
+    logger.warning(
+        f"Call to the {tbmd_service} service failed ({error!r}), "
+        f"try {attempt + 1} of {policy.max_attempts} in {delay:.2f} seconds."
+    )
+    return delay
+
+
+def call_with_retry(tbmd_service: str, fetch: Callable[[], Any]) -> Any:
+    """Make a call to a service, retrying and breaking the circuit by its policy.
+
+    Before each try, CircuitOpenError is raised if the circuit of the service is
+    open, and DeadlineExceeded if the deadline has passed.
+
+    Args:
+        tbmd_service: The TBMD service called.
+        fetch: Makes the call.
+
+    Returns:
+        Any: What fetch returned.
+
+    Raises:
+        Exception: What the last try of fetch raised, if it was not retried.
+    """
+    policy = get_service_policy(tbmd_service)
+    breaker = get_circuit_breaker(tbmd_service)
+    attempt = 0
+    while True:
+        attempt += 1
+        check_deadline(f"the call to the {tbmd_service} service")
+        trial = breaker.before_call()
+        settled = False
+        try:
+            result = fetch()
+            breaker.record_success()
+            settled = True
+            return result
+        except Exception as e:
+            if is_service_answer(e):
+                breaker.record_success()
+                settled = True
+                raise
+            if not is_retryable(e):
+                raise
+            delay = _give_up(tbmd_service, attempt, e, policy)
+            settled = True
+            if delay is None:
+                raise
+            time.sleep(delay)
+        finally:
+            if trial and not settled:
+                # Cancelled, or failed in a way saying nothing about the service
+                breaker.release_trial()
+
+
+async def acall_with_retry(
+    tbmd_service: str, fetch: Callable[[], Awaitable[Any]]
+) -> Any:
+    """Same as call_with_retry, for the async clients.
+
+    Args:
+        tbmd_service: The TBMD service called.
+        fetch: Makes the call.
+
+    Returns:
+        Any: What fetch returned.
+
+    Raises:
+        Exception: What the last try of fetch raised, if it was not retried.
+    """
+    policy = get_service_policy(tbmd_service)
+    breaker = get_circuit_breaker(tbmd_service)
+    attempt = 0
+    while True:
+        attempt += 1
+        check_deadline(f"the call to the {tbmd_service} service")
+        trial = breaker.before_call()
+        settled = False
+        try:
+            result = await fetch()
+            breaker.record_success()
+            settled = True
+            return result
+        except Exception as e:
+            if is_service_answer(e):
+                breaker.record_success()
+                settled = True
+                raise
+            if not is_retryable(e):
+                raise
+            delay = _give_up(tbmd_service, attempt, e, policy)
+            settled = True
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+        finally:
+            if trial and not settled:
+                breaker.release_trial()
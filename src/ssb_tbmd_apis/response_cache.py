@@ -0,0 +1,531 @@
+"""In-memory cache of serialized SOAP responses, with per-operation TTLs.
+
+The TBMD operations only read metadata, and much of it, like the codelists,
+changes rarely. get_zeep_serialize and get_zeep_serialize_list look up each call
+here, keyed by (service, operation, args), before going to the service. Entries
+expire after the TTL of their operation, and the least recently used entries are
+evicted when the cache is full.
+
+Callers get deep copies of the cached responses, so changing a returned
+OrderedDict never changes what the next caller gets.
+
+Turn the cache off for a block of code with bypass_response_cache(), for a single
+call with use_cache=False, or for the whole process with SSB_TBMD_RESPONSE_CACHE=0.
+Another cache implementing the ResponseCacheProto methods can be plugged in with
+set_response_cache, like the SQLite cache in ssb_tbmd_apis.disk_cache, which is
+put behind the in-memory cache when SSB_TBMD_DISK_CACHE=1.
+
+In offline mode (set_offline_mode or SSB_TBMD_OFFLINE=1) the services are never
+called: responses only come from the cache, and a miss raises ResponseCacheMiss.
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+from typing import Protocol
+
+CacheKey = tuple[str, str, tuple[str, ...]]
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_SIZE = 1024
+# The full listings change the least, and cost the most to fetch and serialize
+DEFAULT_OPERATION_TTLS: dict[str, float] = {
+    "GetCodelists": 3600.0,
+    "GetConceptVariablesByApproved": 3600.0,
+}
+
+_bypass: ContextVar[bool] = ContextVar("ssb_tbmd_response_cache_bypass", default=False)
+_offline: bool | None = None
+
+
+class ResponseCacheMiss(LookupError):
+    """Raised in offline mode, when a response is not in the cache."""
+
+
+def response_cache_key(tbmd_service: str, operation: str, *args: str | int) -> CacheKey:
+    """Make the cache key for a call.
+
+    Arguments are compared as strings, as the services receive them, so
+    datadok_codelist_by_id(228589) and datadok_codelist_by_id("228589") share an entry.
+
+    Args:
+        tbmd_service: The TBMD service called.
+        operation: The operation called.
+        *args: Arguments for the operation.
+
+    Returns:
+        CacheKey: A hashable key for the call.
+    """
+    return (tbmd_service.lower(), operation, tuple(str(arg) for arg in args))
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Counters of a response cache since it was created or last cleared."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of lookups answered from the cache, from 0.0 to 1.0."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseCacheProto(Protocol):
+    """The methods the serialize functions use on a response cache."""
+
+    def get(self, key: CacheKey) -> Any:
+        """Return a copy of the cached response for the key, or None."""
+        ...
+
+    def set(self, key: CacheKey, value: Any) -> None:
+        """Store a copy of the response for the key."""
+        ...
+
+    def invalidate(
+        self, tbmd_service: str | None = None, operation: str | None = None
+    ) -> int:
+        """Drop the matching responses, returning how many were dropped."""
+        ...
+
+    def stats(self) -> CacheStats:
+        """Return the counters of the cache."""
+        ...
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.environ.get(name, default).lower() not in ("0", "false", "no", "")
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of serialized responses, expiring by operation TTL."""
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl: float = DEFAULT_TTL,
+        operation_ttls: dict[str, float] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize an empty cache.
+
+        Args:
+            max_size: The most responses to keep before evicting the least recently used.
+            ttl: Seconds to keep responses of operations missing from operation_ttls.
+            operation_ttls: Seconds to keep responses, by operation name. A TTL of 0
+                means the operation is never cached. Defaults to DEFAULT_OPERATION_TTLS.
+            clock: Function returning the current time in seconds.
+
+        Raises:
+            ValueError: If max_size is less than 1.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.operation_ttls = dict(
+            DEFAULT_OPERATION_TTLS if operation_ttls is None else operation_ttls
+        )
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[CacheKey, tuple[float, Any]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def ttl_for(self, operation: str) -> float:
+        """Get how many seconds responses of an operation are kept.
+
+        Args:
+            operation: The name of the operation.
+
+        Returns:
+            float: The TTL in seconds, 0 if the operation is not cached.
+        """
+        return self.operation_ttls.get(operation, self.ttl)
+
+    def get(self, key: CacheKey) -> Any:
+        """Look up a response.
+
+        Args:
+            key: The key from response_cache_key.
+
+        Returns:
+            Any: A copy of the cached response, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def set(self, key: CacheKey, value: Any) -> None:
+        """Store a response, unless its operation has a TTL of 0.
+
+        Args:
+            key: The key from response_cache_key.
+            value: The serialized response, copied before storing.
+        """
+        ttl = self.ttl_for(key[1])
+        if ttl <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(
+        self, tbmd_service: str | None = None, operation: str | None = None
+    ) -> int:
+        """Drop cached responses.
+
+        Args:
+            tbmd_service: Only drop responses from this service.
+            operation: Only drop responses from this operation.
+
+        Returns:
+            int: The number of responses dropped.
+        """
+        service = tbmd_service.lower() if tbmd_service is not None else None
+        with self._lock:
+            keys = [
+                key
+                for key in self._entries
+                if (service is None or key[0] == service)
+                and (operation is None or key[1] == operation)
+            ]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Drop every cached response and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = self._expirations = 0
+
+    def stats(self) -> CacheStats:
+        """Get the counters of the cache.
+
+        Returns:
+            CacheStats: Hits, misses, evictions, expirations and current size.
+        """
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                size=len(self._entries),
+            )
+
+
+class TieredResponseCache:
+    """Chain of response caches, looked up in order, like memory before disk.
+
+    A hit in a later tier is copied into the tiers before it, and new responses
+    are stored in every tier.
+    """
+
+    def __init__(self, *tiers: ResponseCacheProto) -> None:
+        """Chain the caches.
+
+        Args:
+            *tiers: The caches, fastest first.
+
+        Raises:
+            ValueError: If no caches are given.
+        """
+        if not tiers:
+            raise ValueError("At least one cache tier is needed.")
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: CacheKey) -> Any:
+        """Look up a response in each tier, until found.
+
+        Args:
+            key: The key from response_cache_key.
+
+        Returns:
+            Any: A copy of the cached response, or None if no tier has it.
+        """
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:i]:
+                    faster.set(key, value)
+                with self._lock:
+                    self._hits += 1
+                return value
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key: CacheKey, value: Any) -> None:
+        """Store a response in every tier.
+
+        Args:
+            key: The key from response_cache_key.
+            value: The serialized response.
+        """
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    def invalidate(
+        self, tbmd_service: str | None = None, operation: str | None = None
+    ) -> int:
+        """Drop cached responses from every tier.
+
+        Args:
+            tbmd_service: Only drop responses from this service.
+            operation: Only drop responses from this operation.
+
+        Returns:
+            int: The most responses dropped from any one tier.
+        """
+        return max(tier.invalidate(tbmd_service, operation) for tier in self.tiers)
+
+    def stats(self) -> CacheStats:
+        """Get the counters of the chain as a whole.
+
+        Returns:
+            CacheStats: Hits and misses of the chain, with evictions, expirations
+                and size of the last, most complete, tier.
+        """
+        last = self.tiers[-1].stats()
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=last.evictions,
+                expirations=last.expirations,
+                size=last.size,
+            )
+
+
+_RESPONSE_CACHE: ResponseCacheProto | None = None
+_cache_lock = threading.Lock()
+
+
+def _cache_from_environment() -> ResponseCacheProto:
+    memory = ResponseCache()
+    if not _env_flag("SSB_TBMD_DISK_CACHE", "0"):
+        return memory
+    # Imported here, as disk_cache builds on this module
+    from ssb_tbmd_apis.disk_cache import DiskResponseCache
+
+    return TieredResponseCache(memory, DiskResponseCache())
+
+
+def get_response_cache() -> ResponseCacheProto:
+    """Get the response cache used by the serialize functions.
+
+    Unless set with set_response_cache, it is made on first use: in memory, with
+    the SQLite cache from ssb_tbmd_apis.disk_cache behind it if SSB_TBMD_DISK_CACHE=1.
+
+    Returns:
+        ResponseCacheProto: The process-wide response cache.
+    """
+    global _RESPONSE_CACHE
+    if _RESPONSE_CACHE is None:
+        with _cache_lock:
+            if _RESPONSE_CACHE is None:
+                _RESPONSE_CACHE = _cache_from_environment()
+    return _RESPONSE_CACHE
+
+
+def set_response_cache(cache: ResponseCacheProto) -> ResponseCacheProto:
+    """Replace the response cache used by the serialize functions.
+
+    Args:
+        cache: The new cache, like a ResponseCache with other limits.
+
+    Returns:
+        ResponseCacheProto: The cache that was used before.
+    """
+    global _RESPONSE_CACHE
+    previous = get_response_cache()
+    _RESPONSE_CACHE = cache
+    return previous
+
+
+def configure_response_cache(
+    max_size: int = DEFAULT_MAX_SIZE,
+    ttl: float = DEFAULT_TTL,
+    operation_ttls: dict[str, float] | None = None,
+) -> ResponseCache:
+    """Start over with an empty in-memory response cache with new limits.
+
+    Args:
+        max_size: The most responses to keep before evicting the least recently used.
+        ttl: Seconds to keep responses of operations missing from operation_ttls.
+        operation_ttls: Seconds to keep responses, by operation name, merged over
+            DEFAULT_OPERATION_TTLS. Use 0 to never cache an operation.
+
+    Returns:
+        ResponseCache: The new cache.
+    """
+    cache = ResponseCache(
+        max_size=max_size,
+        ttl=ttl,
+        operation_ttls={**DEFAULT_OPERATION_TTLS, **(operation_ttls or {})},
+    )
+    set_response_cache(cache)
+    return cache
+
+
+def invalidate_response_cache(
+    tbmd_service: str | None = None, operation: str | None = None
+) -> int:
+    """Drop cached responses, so they are fetched again on next use.
+
+    Args:
+        tbmd_service: Only drop responses from this service.
+        operation: Only drop responses from this operation.
+
+    Returns:
+        int: The number of responses dropped.
+    """
+    return get_response_cache().invalidate(tbmd_service, operation)
+
+
+def response_cache_stats() -> CacheStats:
+    """Get the counters of the response cache.
+
+    Returns:
+        CacheStats: Hits, misses, evictions, expirations and current size.
+    """
+    return get_response_cache().stats()
+
+
+def response_cache_enabled() -> bool:
+    """Check whether responses are looked up in the cache in the current context.
+
+    Returns:
+        bool: False inside bypass_response_cache(), or if SSB_TBMD_RESPONSE_CACHE
+            is set to 0, false or no.
+    """
+    if _bypass.get():
+        return False
+    return _env_flag("SSB_TBMD_RESPONSE_CACHE", "1")
+
+
+def offline_mode() -> bool:
+    """Check whether responses may only come from the cache.
+
+    Returns:
+        bool: The value from set_offline_mode, or else whether SSB_TBMD_OFFLINE is
+            set to 1, true or yes.
+    """
+    if _offline is not None:
+        return _offline
+    return _env_flag("SSB_TBMD_OFFLINE", "0")
+
+
+def set_offline_mode(offline: bool | None) -> None:
+    """Turn offline mode on or off, overriding the environment.
+
+    Args:
+        offline: True to only answer from the cache, False to call the services on
+            a miss, or None to go back to reading SSB_TBMD_OFFLINE.
+    """
+    global _offline
+    _offline = offline
+
+
+@contextmanager
+def bypass_response_cache() -> Iterator[None]:
+    """Skip the response cache for the calls made inside the with-block.
+
+    Responses are neither read from nor written to the cache. Works per thread
+    and per asyncio task.
+
+    Yields:
+        None: Nothing, use it as a with-statement.
+    """
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def cache_lookup(key: CacheKey, use_cache: bool = True) -> Any:
+    """Look up a call in the response cache, if the cache is in use.
+
+    Args:
+        key: The key from response_cache_key.
+        use_cache: False to skip the cache for this call.
+
+    Returns:
+        Any: A copy of the cached response, or None if the service must be called.
+
+    Raises:
+        ResponseCacheMiss: If in offline mode, and the response is not cached.
+    """
+    use_cache = use_cache and response_cache_enabled()
+    value = get_response_cache().get(key) if use_cache else None
+    if value is None and offline_mode():
+        service, operation, args = key
+        raise ResponseCacheMiss(
+            f"Offline, and no cached response for {service} {operation}{args}."
+        )
+    return value
+
+
+def cache_store(key: CacheKey, value: Any, use_cache: bool = True) -> None:
+    """Store a response from the service, if the cache is in use.
+
+    Args:
+        key: The key from response_cache_key.
+        value: The serialized response.
+        use_cache: False to skip the cache for this call.
+    """
+    if use_cache and response_cache_enabled():
+        get_response_cache().set(key, value)
+
+
+def cached_call(key: CacheKey, fetch: Callable[[], Any], use_cache: bool = True) -> Any:
+    """Answer a call from the response cache, or fetch and store it.
+
+    Args:
+        key: The key from response_cache_key.
+        fetch: Gets the serialized response from the service.
+        use_cache: False to skip the cache for this call.
+
+    Returns:
+        Any: The serialized response.
+    """
+    value = cache_lookup(key, use_cache)
+    if value is None:
+        value = fetch()
+        cache_store(key, value, use_cache)
+    return value
@@ -0,0 +1,250 @@
+"""On-disk cache of compiled Zeep WSDL documents, for fast cold starts.
+
+Compiling the WSDL and its type graph is the main cost of building a zeep.Client.
+The compiled zeep.wsdl.Document is pickled to the cache directory, keyed by a hash
+of the WSDL content and of every document it imports or includes, together with
+the zeep and Python versions, and loaded from there the next time a client for the
+same WSDL is built, in any process.
+
+The cache lives in SSB_TBMD_CACHE_DIR (or ~/.cache/ssb_tbmd_apis) under "schemas",
+and can be turned off by setting SSB_TBMD_SCHEMA_CACHE=0.
+"""
+
+import hashlib
+import io
+import os
+import pickle
+import sys
+import threading
+from pathlib import Path
+from typing import Any
+
+import zeep
+from lxml import etree  # type: ignore[import-untyped]
+from zeep.loader import absolute_location
+
+from ssb_tbmd_apis.tbmd_logger import logger
+
+CACHE_FORMAT = 1
+
+# Elements pulling in other documents, and the attribute holding their location
+_IMPORT_LOCATIONS = {
+    "{http://schemas.xmlsoap.org/wsdl/}import": "location",
+    "{http://www.w3.org/2001/XMLSchema}import": "schemaLocation",
+    "{http://www.w3.org/2001/XMLSchema}include": "schemaLocation",
+    "{http://www.w3.org/2001/XMLSchema}redefine": "schemaLocation",
+}
+
+
+def cache_dir() -> Path:
+    """Get the root directory for the caches of this package.
+
+    Returns:
+        Path: SSB_TBMD_CACHE_DIR if set, otherwise ~/.cache/ssb_tbmd_apis.
+    """
+    if os.environ.get("SSB_TBMD_CACHE_DIR"):
+        return Path(os.environ["SSB_TBMD_CACHE_DIR"])
+    xdg_cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(xdg_cache) / "ssb_tbmd_apis"
+
+
+def schema_cache_dir() -> Path:
+    """Get the directory the compiled WSDL documents are stored in.
+
+    Returns:
+        Path: The "schemas" folder in the cache directory.
+    """
+    return cache_dir() / "schemas"
+
+
+def schema_cache_enabled() -> bool:
+    """Check whether the schema cache is turned on.
+
+    Returns:
+        bool: False if SSB_TBMD_SCHEMA_CACHE is set to 0, false or no.
+    """
+    setting = os.environ.get("SSB_TBMD_SCHEMA_CACHE", "1").lower()
+    return setting not in ("0", "false", "no")
+
+
+def schema_cache_key(wsdl_content: bytes, *imported: bytes) -> str:
+    """Make the cache key for a WSDL.
+
+    Args:
+        wsdl_content: The content of the WSDL document.
+        *imported: The content of the documents the WSDL imports or includes.
+
+    Returns:
+        str: A hex digest covering the content and everything that affects the pickle.
+    """
+    digest = hashlib.sha256()
+    for content in (wsdl_content, *imported):
+        # Prefixed by the length, so moving bytes between documents changes the key
+        digest.update(len(content).to_bytes(8, "big"))
+        digest.update(content)
+    versions = f"{CACHE_FORMAT}|{zeep.__version__}|{sys.version_info[:2]}"
+    digest.update(versions.encode())
+    return digest.hexdigest()
+
+
+def clear_schema_cache() -> int:
+    """Delete every compiled document from the cache.
+
+    Returns:
+        int: The number of files deleted.
+    """
+    deleted = 0
+    directory = schema_cache_dir()
+    if directory.is_dir():
+        for path in directory.glob("*.pickle"):
+            path.unlink(missing_ok=True)
+            deleted += 1
+    return deleted
+
+
+def _wsdl_documents(wsdl: str, transport: Any) -> dict[str, bytes]:
+    # The content of the WSDL, then of every document it imports, recursively
+    documents: dict[str, bytes] = {}
+    pending = [wsdl]
+    while pending:
+        location = pending.pop(0)
+        content = documents[location] = transport.load(location)
+        try:
+            root = etree.fromstring(content, etree.XMLParser(resolve_entities=False))
+        except etree.XMLSyntaxError:
+            continue
+        for tag, attribute in _IMPORT_LOCATIONS.items():
+            for element in root.iter(tag):
+                imported = element.get(attribute)
+                if not imported:
+                    continue
+                imported = absolute_location(imported, location)  # type: ignore[no-untyped-call]
+                if imported not in documents and imported not in pending:
+                    pending.append(imported)
+    return documents
+
+
+class _PreloadedTransport:
+    """Serves the documents already loaded for the cache key, then the transport.
+
+    Compiling with it loads each document once on a cache miss, not once for the
+    key and again for zeep. Everything but load is passed on to the transport.
+    """
+
+    def __init__(self, transport: Any, documents: dict[str, bytes]) -> None:
+        self.transport = transport
+        self.documents = documents
+
+    def load(self, url: str) -> bytes:
+        if url in self.documents:
+            return self.documents[url]
+        content: bytes = self.transport.load(url)
+        return content
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.transport, name)
+
+
+def _make_type(name: str, bases: tuple[type, ...], attrs: dict[str, Any]) -> type:
+    return type(name, bases, attrs)
+
+
+class _DocumentPickler(pickle.Pickler):
+    """Pickles a Zeep document, leaving out the transport and settings.
+
+    Zeep builds a class per XSD type at runtime, in the non-importable module
+    zeep.xsd.dynamic_types, so those classes are pickled by value instead.
+    """
+
+    def __init__(self, file: io.BytesIO, transport: Any, settings: Any) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.transport = transport
+        self.settings = settings
+
+    def persistent_id(self, obj: Any) -> str | None:
+        if obj is self.transport:
+            return "transport"
+        if obj is self.settings:
+            return "settings"
+        return None
+
+    def reducer_override(self, obj: Any) -> Any:
+        if type(obj) is threading.local:
+            return threading.local, ()
+        if type(obj) is etree.QName:
+            return etree.QName, (obj.text,)
+        if isinstance(obj, etree._Element):
+            return etree.fromstring, (etree.tostring(obj),)
+        if isinstance(obj, type) and obj.__module__ == "zeep.xsd.dynamic_types":
+            attrs = {
+                k: v
+                for k, v in vars(obj).items()
+                if k not in ("__dict__", "__weakref__")
+            }
+            return _make_type, (obj.__name__, obj.__bases__, attrs)
+        return NotImplemented
+
+
+class _DocumentUnpickler(pickle.Unpickler):
+    """Loads a document pickled by _DocumentPickler onto a new transport."""
+
+    def __init__(self, file: io.BytesIO, transport: Any, settings: Any) -> None:
+        super().__init__(file)
+        self.transport = transport
+        self.settings = settings
+
+    def persistent_load(self, pid: Any) -> Any:
+        if pid == "transport":
+            return self.transport
+        if pid == "settings":
+            return self.settings
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid}")
+
+
+def load_document(wsdl: str, transport: Any, settings: Any) -> Any:
+    """Get the compiled Zeep document for a WSDL, from the cache when possible.
+
+    A missing, stale or unreadable cache entry is never an error: the document is
+    then compiled as usual, and written to the cache for the next time.
+
+    Args:
+        wsdl: The URL or path of the WSDL.
+        transport: The transport to load the WSDL with, and to attach to the document.
+        settings: The zeep.Settings to attach to the document.
+
+    Returns:
+        zeep.wsdl.Document: The compiled WSDL document.
+    """
+    if not schema_cache_enabled():
+        return zeep.wsdl.Document(wsdl, transport, settings=settings)
+
+    documents = _wsdl_documents(wsdl, transport)
+    key = schema_cache_key(*documents.values())
+    path = schema_cache_dir() / f"{key}.pickle"
+    if path.is_file():
+        try:
+            with open(path, "rb") as cached:
+                unpickler = _DocumentUnpickler(
+                    io.BytesIO(cached.read()), transport, settings
+                )
+                return unpickler.load()
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable schema cache {path}: {e}")
+
+    preloaded = _PreloadedTransport(transport, documents)
+    # zeep annotates the transport as a class, but wants an instance
+    document = zeep.wsdl.Document(wsdl, preloaded, settings=settings)  # type: ignore[arg-type]
+    # Later loads, if any, go to the transport
+    documents.clear()
+    try:
+        buffer = io.BytesIO()
+        # Pickled as the transport, so a cached document is loaded onto the real one
+        _DocumentPickler(buffer, preloaded, settings).dump(document)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so readers never see a half-written cache
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(buffer.getvalue())
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.debug(f"Could not write schema cache {path}: {e}")
+    return document
@@ -2,12 +2,11 @@ from __future__ import annotations
 
 import logging
 import sys
+from collections.abc import Iterator
+from collections.abc import Mapping
+from functools import cached_property
 from typing import Any
 
-from colorama import Back
-from colorama import Fore
-from colorama import Style
-
 
 class ColoredFormatter(logging.Formatter):
     """Colored log formatter."""
@@ -15,32 +14,55 @@ class ColoredFormatter(logging.Formatter):
     def __init__(
         self,
         *args: Any,
-        colors: dict[str, str] | None = None,
+        colors: Mapping[str, str] | None = None,
         **kwargs: Any,
     ) -> None:
         """Initialize the formatter with specified format strings."""
         super().__init__(*args, **kwargs)
 
-        self.colors = colors if colors else {}
+        self.colors = colors if colors is not None else {}
 
     def format(self, record: logging.LogRecord) -> str:
         """Format the specified record as text."""
+        from colorama import Style
+
         record.color = self.colors.get(record.levelname, "")
         record.reset = Style.RESET_ALL
 
         return super().format(record)
 
 
+class _LevelColors(Mapping[str, str]):
+    """The colors of each log level, importing colorama on first use."""
+
+    @cached_property
+    def _colors(self) -> dict[str, str]:
+        from colorama import Back
+        from colorama import Fore
+        from colorama import Style
+
+        return {
+            "DEBUG": Fore.CYAN,
+            "INFO": Fore.GREEN,
+            "WARNING": Fore.MAGENTA,
+            "ERROR": Fore.RED,
+            "CRITICAL": Fore.RED + Back.WHITE + Style.BRIGHT,
+        }
+
+    def __getitem__(self, level: str) -> str:
+        return self._colors[level]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._colors)
+
+    def __len__(self) -> int:
+        return len(self._colors)
+
+
 formatter = ColoredFormatter(
     "{color} {levelname:8} {reset}| {message}",
     style="{",
-    colors={
-        "DEBUG": Fore.CYAN,
-        "INFO": Fore.GREEN,
-        "WARNING": Fore.MAGENTA,
-        "ERROR": Fore.RED,
-        "CRITICAL": Fore.RED + Back.WHITE + Style.BRIGHT,
-    },
+    colors=_LevelColors(),
 )
 handler = logging.StreamHandler(sys.stdout)
 handler.setFormatter(formatter)
@@ -0,0 +1,305 @@
+"""Counters and timings of the SOAP calls made, per service and operation.
+
+Every call to a service that is not answered from the response cache is recorded:
+how long it took, split into the phases below, how many bytes the reply was, and
+whether it failed. Look at the totals with metrics_snapshot, to find the
+operations a job spends its time on:
+
+    snapshot = metrics_snapshot()
+    for (service, operation), metrics in sorted(
+        snapshot.items(), key=lambda item: item[1].total_seconds, reverse=True
+    ):
+        print(service, operation, metrics.calls, metrics.total_seconds)
+
+The phases of a call are:
+
+- queue: waiting for room under the max_concurrency of the async registry.
+- connect: from sending the request until the headers of the reply arrived,
+  so connecting and the time the service spends answering.
+- transfer: downloading the body of the reply.
+- parse: the rest of the time in the client, building the envelope and parsing
+  the reply, and building the client on the first call.
+- serialize: turning zeep's objects into OrderedDicts. In the raw parse mode
+  this is part of parsing.
+
+The async clients cannot tell connect from transfer, so all of it is counted as
+transfer. Streamed calls parse the reply while it downloads, so parsing the items,
+and the time the caller spends between them, are counted as transfer.
+
+Exporters can get each call as it finishes with add_metrics_callback.
+"""
+
+import dataclasses
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+
+from ssb_tbmd_apis.tbmd_logger import logger
+
+MetricsKey = tuple[str, str]
+
+PHASES = ("queue", "connect", "transfer", "parse", "serialize")
+
+
+@dataclass
+class CallSample:
+    """The measurements of a single SOAP call."""
+
+    seconds: dict[str, float] = field(
+        default_factory=lambda: dict.fromkeys(PHASES, 0.0)
+    )
+    total_seconds: float = 0.0
+    response_bytes: int = 0
+    error: BaseException | None = None
+
+    @property
+    def fault(self) -> bool:
+        """Whether the service answered with a SOAP Fault."""
+        if self.error is None:
+            return False
+        # A call has been made, so zeep is already imported
+        from zeep.exceptions import Fault
+
+        return isinstance(self.error, Fault)
+
+    @contextmanager
+    def timing(self, phase: str) -> Iterator[None]:
+        """Add the time spent in the with block to a phase.
+
+        Args:
+            phase: One of PHASES.
+
+        Yields:
+            None: Nothing, time the code inside the block.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[phase] += time.perf_counter() - start
+
+
+@dataclass
+class OperationMetrics:
+    """The totals of all the SOAP calls to one operation."""
+
+    calls: int = 0
+    errors: int = 0
+    faults: int = 0
+    total_seconds: float = 0.0
+    queue_seconds: float = 0.0
+    connect_seconds: float = 0.0
+    transfer_seconds: float = 0.0
+    parse_seconds: float = 0.0
+    serialize_seconds: float = 0.0
+    response_bytes: int = 0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        """Mean wall time of a call, 0 if there were none."""
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+    def add(self, sample: CallSample) -> None:
+        """Add the measurements of a call to the totals.
+
+        Args:
+            sample: The measurements of the call.
+        """
+        self.calls += 1
+        if sample.error is not None:
+            self.errors += 1
+            self.faults += sample.fault
+        self.total_seconds += sample.total_seconds
+        self.max_seconds = max(self.max_seconds, sample.total_seconds)
+        self.queue_seconds += sample.seconds["queue"]
+        self.connect_seconds += sample.seconds["connect"]
+        self.transfer_seconds += sample.seconds["transfer"]
+        self.parse_seconds += sample.seconds["parse"]
+        self.serialize_seconds += sample.seconds["serialize"]
+        self.response_bytes += sample.response_bytes
+
+
+MetricsCallback = Callable[[str, str, CallSample], None]
+
+
+class MetricsRegistry:
+    """Thread-safe totals of the SOAP calls, by service and operation."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._metrics: dict[MetricsKey, OperationMetrics] = {}
+        self._callbacks: list[MetricsCallback] = []
+
+    def record(self, tbmd_service: str, operation: str, sample: CallSample) -> None:
+        """Add a call to the totals, and pass it on to the callbacks.
+
+        Args:
+            tbmd_service: The service called.
+            operation: The operation called.
+            sample: The measurements of the call.
+        """
+        key = (tbmd_service.lower(), operation)
+        with self._lock:
+            self._metrics.setdefault(key, OperationMetrics()).add(sample)
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(key[0], operation, sample)
+            except Exception as e:
+                logger.warning(f"Metrics callback {callback!r} failed: {e}")
+
+    def snapshot(self) -> dict[MetricsKey, OperationMetrics]:
+        """Get a copy of the totals.
+
+        Returns:
+            dict: The totals of each (service, operation) called.
+        """
+        with self._lock:
+            return {
+                key: dataclasses.replace(metrics)
+                for key, metrics in self._metrics.items()
+            }
+
+    def reset(self) -> dict[MetricsKey, OperationMetrics]:
+        """Start counting from zero again.
+
+        Returns:
+            dict: The totals until now, like snapshot.
+        """
+        with self._lock:
+            metrics, self._metrics = self._metrics, {}
+        return metrics
+
+    def add_callback(self, callback: MetricsCallback) -> None:
+        """Call a function with the service, operation and CallSample of each call.
+
+        Args:
+            callback: The function to call. Exceptions from it are logged, not raised.
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback: MetricsCallback) -> None:
+        """Stop calling a function added with add_callback.
+
+        Args:
+            callback: The function to stop calling.
+        """
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+_REGISTRY = MetricsRegistry()
+_current_sample: ContextVar[CallSample | None] = ContextVar(
+    "tbmd_current_sample", default=None
+)
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the registry the SOAP calls are recorded in.
+
+    Returns:
+        MetricsRegistry: The registry of the process.
+    """
+    return _REGISTRY
+
+
+def metrics_snapshot() -> dict[MetricsKey, OperationMetrics]:
+    """Get a copy of the totals of the SOAP calls made.
+
+    Returns:
+        dict: The totals of each (service, operation) called.
+    """
+    return _REGISTRY.snapshot()
+
+
+def reset_metrics() -> dict[MetricsKey, OperationMetrics]:
+    """Start counting the SOAP calls from zero again.
+
+    Returns:
+        dict: The totals until now.
+    """
+    return _REGISTRY.reset()
+
+
+def add_metrics_callback(callback: MetricsCallback) -> None:
+    """Call a function with the service, operation and CallSample of each SOAP call.
+
+    Args:
+        callback: The function to call. Exceptions from it are logged, not raised.
+    """
+    _REGISTRY.add_callback(callback)
+
+
+def remove_metrics_callback(callback: MetricsCallback) -> None:
+    """Stop calling a function added with add_metrics_callback.
+
+    Args:
+        callback: The function to stop calling.
+    """
+    _REGISTRY.remove_callback(callback)
+
+
+def current_sample() -> CallSample | None:
+    """Get the measurements of the SOAP call in progress, for the transports to fill.
+
+    Returns:
+        CallSample | None: The measurements, or None outside of a measured call.
+    """
+    return _current_sample.get()
+
+
+def record_http(connect: float, transfer: float, response_bytes: int) -> None:
+    """Add the HTTP part of the SOAP call in progress to its measurements.
+
+    Args:
+        connect: Seconds until the headers of the reply arrived.
+        transfer: Seconds spent downloading the body of the reply.
+        response_bytes: The size of the body of the reply.
+    """
+    sample = _current_sample.get()
+    if sample is not None:
+        sample.seconds["connect"] += connect
+        sample.seconds["transfer"] += transfer
+        sample.response_bytes += response_bytes
+
+
+@contextmanager
+def measure_call(tbmd_service: str, operation: str) -> Iterator[CallSample]:
+    """Measure a SOAP call, recording it in the registry when done.
+
+    The time not spent connecting, transferring or serializing is counted as
+    parsing.
+
+    Args:
+        tbmd_service: The service called.
+        operation: The operation called.
+
+    Yields:
+        CallSample: The measurements of the call, to add serialize time to.
+
+    Raises:
+        Exception: Whatever the call raised, after recording it as failed.
+    """
+    sample = CallSample()
+    token = _current_sample.set(sample)
+    start = time.perf_counter()
+    try:
+        yield sample
+    except Exception as e:
+        sample.error = e
+        raise
+    finally:
+        _current_sample.reset(token)
+        sample.total_seconds = time.perf_counter() - start
+        other = sum(sample.seconds[phase] for phase in PHASES if phase != "parse")
+        sample.seconds["parse"] = max(sample.total_seconds - other, 0.0)
+        _REGISTRY.record(tbmd_service, operation, sample)
@@ -0,0 +1,194 @@
+"""Local snapshots of the WSDLs and schemas published by the TBMD services.
+
+Documents are looked up by URL in a manifest, first in the user snapshot
+directory, then in the snapshots bundled with the package. The user directory is
+named by the environment variable SSB_TBMD_WSDL_DIR, or else is the "wsdls"
+folder in the cache directory. How misses are handled depends on the WSDL mode:
+
+- "local" (default): use a snapshot when there is one, otherwise fetch over HTTP.
+- "offline": only use snapshots, raise FileNotFoundError on a miss.
+- "refresh": always fetch over HTTP and write the result to the user directory.
+
+The mode can be set with set_wsdl_mode or the environment variable
+SSB_TBMD_WSDL_MODE.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any
+
+BUNDLED_SNAPSHOT_DIR = Path(__file__).parent / "wsdls"
+MANIFEST_NAME = "manifest.json"
+WSDL_MODES = ("local", "offline", "refresh")
+
+_mode: str | None = None
+_manifests: dict[Path, dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def get_wsdl_mode() -> str:
+    """Get the current WSDL mode.
+
+    Returns:
+        str: One of "local", "offline" or "refresh".
+
+    Raises:
+        ValueError: If SSB_TBMD_WSDL_MODE holds an unknown mode.
+    """
+    mode = _mode or os.environ.get("SSB_TBMD_WSDL_MODE", "local").lower()
+    if mode not in WSDL_MODES:
+        raise ValueError(f"Unknown WSDL mode {mode}, use one of {WSDL_MODES}.")
+    return mode
+
+
+def set_wsdl_mode(mode: str | None) -> None:
+    """Set how WSDLs and schemas are resolved, overriding the environment.
+
+    Args:
+        mode: One of "local", "offline" or "refresh", or None to go back to
+            reading SSB_TBMD_WSDL_MODE.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    global _mode
+    if mode is not None and mode.lower() not in WSDL_MODES:
+        raise ValueError(f"Unknown WSDL mode {mode}, use one of {WSDL_MODES}.")
+    _mode = mode.lower() if mode is not None else None
+
+
+def user_snapshot_dir() -> Path:
+    """Get the directory refreshed snapshots are written to.
+
+    Returns:
+        Path: SSB_TBMD_WSDL_DIR if set, otherwise the "wsdls" folder in the cache
+            directory. Never the bundled snapshots, which may be read-only.
+    """
+    if os.environ.get("SSB_TBMD_WSDL_DIR"):
+        return Path(os.environ["SSB_TBMD_WSDL_DIR"])
+    # Imported here, as schema_cache pulls in zeep and lxml
+    from ssb_tbmd_apis.schema_cache import cache_dir
+
+    return cache_dir() / "wsdls"
+
+
+def snapshot_dirs() -> list[Path]:
+    """List the directories searched for snapshots, in priority order.
+
+    Returns:
+        list[Path]: The user directory from user_snapshot_dir, then the bundled
+            snapshots.
+    """
+    return [user_snapshot_dir(), BUNDLED_SNAPSHOT_DIR]
+
+
+def _read_manifest(directory: Path) -> dict[str, Any]:
+    manifest_path = directory / MANIFEST_NAME
+    with _lock:
+        if directory not in _manifests:
+            if manifest_path.is_file():
+                with open(manifest_path, encoding="utf-8") as manifest_file:
+                    _manifests[directory] = json.load(manifest_file)
+            else:
+                _manifests[directory] = {"version": None, "documents": {}}
+        return _manifests[directory]
+
+
+def _snapshot_filename(url: str) -> str:
+    name = re.sub(r"^https?://", "", url)
+    return re.sub(r"[^A-Za-z0-9.-]+", "_", name).strip("_") + ".xml"
+
+
+def load_snapshot(url: str) -> bytes | None:
+    """Read the snapshot of a document, if any directory has one.
+
+    Args:
+        url: The URL the document was fetched from.
+
+    Returns:
+        bytes | None: The content of the snapshot, or None if there is none.
+    """
+    for directory in snapshot_dirs():
+        entry = _read_manifest(directory)["documents"].get(url)
+        if entry is not None:
+            with open(directory / entry["file"], "rb") as snapshot:
+                return snapshot.read()
+    return None
+
+
+def save_snapshot(url: str, content: bytes, directory: Path | None = None) -> Path:
+    """Write a document to a snapshot directory and record it in the manifest.
+
+    Args:
+        url: The URL the document was fetched from.
+        content: The content of the document.
+        directory: Where to write, defaults to user_snapshot_dir.
+
+    Returns:
+        Path: The path to the written snapshot.
+    """
+    directory = Path(directory) if directory is not None else user_snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(directory)
+    filename = _snapshot_filename(url)
+    with open(directory / filename, "wb") as snapshot:
+        snapshot.write(content)
+    with _lock:
+        manifest["version"] = datetime.date.today().isoformat()
+        manifest["documents"][url] = {
+            "file": filename,
+            "sha256": hashlib.sha256(content).hexdigest(),
+        }
+        with open(directory / MANIFEST_NAME, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return directory / filename
+
+
+def snapshot_version(directory: Path | None = None) -> str | None:
+    """Get the date the snapshots in a directory were last refreshed.
+
+    Args:
+        directory: The snapshot directory, defaults to the bundled snapshots.
+
+    Returns:
+        str | None: The date as an ISO string, or None if nothing is snapshotted.
+    """
+    directory = Path(directory) if directory is not None else BUNDLED_SNAPSHOT_DIR
+    version: str | None = _read_manifest(directory)["version"]
+    return version
+
+
+def refresh_wsdl_snapshots(
+    services: list[str] | None = None, directory: Path | None = None
+) -> list[str]:
+    """Download the WSDLs, and every schema they import, into a snapshot directory.
+
+    Needs access to ws.ssb.no. Run it with the src/ssb_tbmd_apis/wsdls directory
+    to bump the bundled snapshots before a release, or without to keep your own.
+
+    Args:
+        services: The TBMD services to refresh, defaults to all of them.
+        directory: Where to write, defaults to user_snapshot_dir.
+
+    Returns:
+        list[str]: The URLs of the documents written.
+    """
+    import requests
+    import zeep
+
+    from ssb_tbmd_apis.zeep_client import WSDLS
+    from ssb_tbmd_apis.zeep_client import LocalResolverTransport
+
+    directory = Path(directory) if directory is not None else user_snapshot_dir()
+    with requests.Session() as session:
+        transport = LocalResolverTransport(session=session, refresh_to=directory)
+        for service in services or list(WSDLS):
+            # Not through the schema cache, every imported schema must be fetched.
+            # zeep annotates the transport as a class, but wants an instance.
+            zeep.wsdl.Document(WSDLS[service.lower()], transport)  # type: ignore[arg-type]
+    return transport.refreshed
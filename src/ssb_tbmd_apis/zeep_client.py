@@ -1,6 +1,16 @@
+import atexit
+import contextvars
 import os
+import threading
+import time
 from collections import OrderedDict
 from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import replace
+from pathlib import Path
 from types import TracebackType
 from typing import Any
 from typing import Protocol
@@ -9,12 +19,62 @@ from typing import no_type_check
 
 import requests
 import zeep
+from requests.adapters import HTTPAdapter
+from requests.adapters import Retry
+
+from ssb_tbmd_apis.coalesce import coalesced_call
+from ssb_tbmd_apis.raw_xml import call_raw
+from ssb_tbmd_apis.raw_xml import get_parse_mode
+from ssb_tbmd_apis.raw_xml import iter_raw
+from ssb_tbmd_apis.resilience import call_with_retry
+from ssb_tbmd_apis.resilience import deadline_timeout
+from ssb_tbmd_apis.resilience import get_service_policy
+from ssb_tbmd_apis.response_cache import cache_lookup
+from ssb_tbmd_apis.response_cache import cached_call
+from ssb_tbmd_apis.response_cache import response_cache_key
+from ssb_tbmd_apis.schema_cache import load_document
+from ssb_tbmd_apis.tbmd_logger import logger
+from ssb_tbmd_apis.tbmd_metrics import measure_call
+from ssb_tbmd_apis.tbmd_metrics import record_http
+from ssb_tbmd_apis.wsdl_snapshots import get_wsdl_mode
+from ssb_tbmd_apis.wsdl_snapshots import load_snapshot
+from ssb_tbmd_apis.wsdl_snapshots import save_snapshot
 
 SERIALIZE_T = Callable[[Any], OrderedDict[str, Any]]
 
+WSDLS: dict[str, str] = {
+    "datadok": "http://ws.ssb.no/DatadokService/DatadokService.asmx?WSDL",
+    "metadb": "http://ws.ssb.no/MetaDbService/MetaDbService.asmx?WSDL",
+    "vardok": "http://ws.ssb.no/VardokService/VardokService.asmx?WSDL",
+    "statbank": "http://ws.ssb.no/statbankmetaservice/Service.asmx?WSDL",
+}
+
 
 class LocalResolverTransport(zeep.transports.Transport):
-    """Custom transport class to load local XSD files for Zeep client."""
+    """Custom transport class to load local XSD and WSDL files for Zeep client.
+
+    Documents are resolved from disk when possible: the W3C schemas from the xsds
+    folder, and the service WSDLs with their imported schemas from the snapshots
+    in ssb_tbmd_apis.wsdl_snapshots.
+    """
+
+    # Whether replies can be streamed from the session, see raw_xml.iter_raw
+    streaming = True
+
+    def __init__(
+        self, *args: Any, refresh_to: Path | None = None, **kwargs: Any
+    ) -> None:
+        """Initialize the transport.
+
+        Args:
+            *args: Passed on to zeep.transports.Transport.
+            refresh_to: Fetch every document over HTTP and save it as a snapshot in
+                this directory. Defaults to the behaviour of the current WSDL mode.
+            **kwargs: Passed on to zeep.transports.Transport.
+        """
+        super().__init__(*args, **kwargs)  # type: ignore[no-untyped-call]
+        self.refresh_to = refresh_to
+        self.refreshed: list[str] = []
 
     def load(self, url: str) -> bytes:
         """Load XSD files from local directory instead of fetching them from the internet.
@@ -24,6 +84,10 @@ class LocalResolverTransport(zeep.transports.Transport):
 
         Returns:
             bytes: The content of the XSD file.
+
+        Raises:
+            FileNotFoundError: If the WSDL mode is "offline", and there is no
+                snapshot of the document.
         """
         base_dir = os.path.dirname(__file__)
         xsds_dir = os.path.join(base_dir, "xsds")
@@ -37,16 +101,75 @@ class LocalResolverTransport(zeep.transports.Transport):
             with open(xsd_path, "rb") as f:
                 return f.read()
 
+        remote = url.startswith(("http://", "https://"))
+        mode = get_wsdl_mode()
+        refresh = self.refresh_to is not None or mode == "refresh"
+        if remote and not refresh:
+            snapshot = load_snapshot(url)
+            if snapshot is not None:
+                return snapshot
+            if mode == "offline":
+                raise FileNotFoundError(
+                    f"No local snapshot of {url}, and the WSDL mode is offline."
+                )
+
         # Trying to please mypy
         parent = cast(_TransportProto, super())
         result: bytes = parent.load(url)
+        if remote and refresh:
+            try:
+                save_snapshot(url, result, self.refresh_to)
+            except OSError as e:
+                # The document was fetched, so the call can go on without a snapshot
+                logger.warning(f"Could not save a snapshot of {url}: {e!r}")
+            else:
+                self.refreshed.append(url)
         return result
 
+    def post(self, address: str, message: bytes | str, headers: Any) -> Any:
+        """Post a SOAP message, with the timeouts cut short by the deadline if any.
+
+        Args:
+            address: The address of the service.
+            message: The SOAP envelope to post.
+            headers: The HTTP headers to send.
+
+        Returns:
+            requests.Response: The reply of the service.
+        """
+        timeout = deadline_timeout(self.operation_timeout)
+        if timeout == self.operation_timeout:
+            return super().post(address, message, headers)  # type: ignore[no-untyped-call]
+        return self.session.post(
+            address, data=message, headers=headers, timeout=timeout
+        )
+
+    def post_xml(self, address: str, envelope: Any, headers: Any) -> Any:
+        """Post the SOAP envelope, recording the HTTP timings of the call.
+
+        Args:
+            address: The address of the service.
+            envelope: The SOAP envelope to post.
+            headers: The HTTP headers to send.
+
+        Returns:
+            requests.Response: The reply of the service.
+        """
+        start = time.perf_counter()
+        parent = cast(_TransportProto, super())
+        response = parent.post_xml(address, envelope, headers)
+        total = time.perf_counter() - start
+        connect = min(response.elapsed.total_seconds(), total)
+        record_http(connect, total - connect, len(response.content))
+        return response
+
 
 # Used to force type hinting for mypy
 class _TransportProto(Protocol):
     def load(self, url: str) -> bytes: ...
 
+    def post_xml(self, address: str, envelope: Any, headers: Any) -> Any: ...
+
 
 class ZeepLikeClient(Protocol):
     """A minimal protocol for the Zeep SOAP client.
@@ -72,21 +195,152 @@ class ZeepLikeClient(Protocol):
 def _mk_client(wsdl: str, transport: Any) -> Any:
     import zeep  # local import avoids global import-time typing issues
 
-    return zeep.Client(wsdl=wsdl, transport=transport)
+    settings = zeep.Settings()
+    document = load_document(wsdl, transport, settings)
+    return zeep.Client(wsdl=document, transport=transport, settings=settings)
+
+
+TransportFactory = Callable[[requests.Session], LocalResolverTransport]
+
+_transport_factory: TransportFactory | None = None
 
 
 @no_type_check
 def _mk_transport(session: requests.Session) -> LocalResolverTransport:
+    if _transport_factory is not None:
+        return _transport_factory(session)
     return LocalResolverTransport(session=session)
 
 
+def set_transport_factory(factory: TransportFactory | None) -> TransportFactory | None:
+    """Build the transports of the clients with a function, like a CassetteTransport.
+
+    The cached clients are dropped, so the next SOAP call builds its client with
+    the new transport.
+
+    Args:
+        factory: Function taking the shared requests.Session and returning the
+            transport, or None to go back to LocalResolverTransport.
+
+    Returns:
+        TransportFactory | None: The factory used until now.
+    """
+    global _transport_factory
+    previous, _transport_factory = _transport_factory, factory
+    invalidate_zeep_clients()
+    return previous
+
+
 @no_type_check
 def _serialize_object_ntc(obj: Any) -> OrderedDict[str, Any]:
     return zeep.helpers.serialize_object(obj)
 
 
+@dataclass(frozen=True)
+class HttpConfig:
+    """Settings for the HTTP session shared by every SOAP call.
+
+    Attributes:
+        pool_connections: Number of hosts to keep a connection pool for.
+        pool_maxsize: Connections kept alive per host, set it to at least the
+            number of threads calling the services at once.
+        max_retries: Retries on failed connections, before any data is sent.
+        keep_alive: Reuse connections between calls. If False, every call asks
+            the server to close the connection after the response.
+    """
+
+    pool_connections: int = 4
+    pool_maxsize: int = 16
+    max_retries: int = 0
+    keep_alive: bool = True
+
+
+DEFAULT_MAX_WORKERS = 8
+
+_http_config = HttpConfig()
+_http_session: requests.Session | None = None
+_http_lock = threading.Lock()
+
+
+def _mk_session(config: HttpConfig) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        max_retries=Retry(
+            total=config.max_retries,
+            connect=config.max_retries,
+            read=0,
+            status=0,
+            backoff_factor=0.1,
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not config.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Get the pooled HTTP session shared by all services and threads.
+
+    Returns:
+        requests.Session: The shared session, created on first use.
+    """
+    global _http_session
+    with _http_lock:
+        if _http_session is None:
+            _http_session = _mk_session(_http_config)
+        return _http_session
+
+
+def get_http_config() -> HttpConfig:
+    """Get the settings the shared HTTP session is built with.
+
+    Returns:
+        HttpConfig: The current settings.
+    """
+    return _http_config
+
+
+def configure_http(**settings: Any) -> HttpConfig:
+    """Change the settings of the shared HTTP session.
+
+    The current session is closed, and the cached clients dropped, so the next
+    SOAP call builds everything with the new settings.
+
+    Args:
+        **settings: Fields of HttpConfig to change, like pool_maxsize=32.
+
+    Returns:
+        HttpConfig: The new settings.
+    """
+    global _http_config, _http_session
+    new_config = replace(_http_config, **settings)
+    invalidate_zeep_clients()
+    with _http_lock:
+        _http_config = new_config
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+    return new_config
+
+
+def _close_http_session() -> None:
+    global _http_session
+    with _http_lock:
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+
+
 class ZeepClientManager:
-    """Context manager for Zeep client to handle WSDL and session management."""
+    """Context manager for Zeep client to handle WSDL and session management.
+
+    The client is built on the shared HTTP session from get_http_session, which
+    stays open after the context exits, so its connections can be reused.
+    """
 
     def __init__(self, wsdl: str) -> None:
         """Initialize the ZeepClientManager with the provided WSDL URL.
@@ -100,7 +354,7 @@ class ZeepClientManager:
 
     def __enter__(self) -> zeep.Client:
         """Create a Zeep client and return it."""
-        self.session = requests.Session()
+        self.session = get_http_session()
         transport = _mk_transport(self.session)
         self.client = _mk_client(self.wsdl, transport)
         return self.client
@@ -111,12 +365,29 @@ class ZeepClientManager:
         value: BaseException | None,
         traceback: TracebackType | None,
     ) -> None:
-        """Close the session and clean up resources."""
-        if self.session:
-            self.session.close()
+        """Clean up resources, leaving the shared session open for reuse."""
+        self.session = None
         self.client = None
 
 
+def _service_key(tbmd_service: str) -> str:
+    """Normalize and validate the name of a TBMD service.
+
+    Args:
+        tbmd_service: The TBMD service to use, case-insensitive.
+
+    Returns:
+        str: The lowercase service name, a key in WSDLS.
+
+    Raises:
+        NotImplementedError: If the specified TBMD service is not implemented.
+    """
+    tbmd_service = tbmd_service.lower()
+    if tbmd_service not in WSDLS:
+        raise NotImplementedError(f"{tbmd_service} not implemented yet.")
+    return tbmd_service
+
+
 def get_zeep_client(tbmd_service: str = "datadok") -> ZeepClientManager:
     """Get a Zeep client for the specified TBMD service.
 
@@ -125,43 +396,156 @@ def get_zeep_client(tbmd_service: str = "datadok") -> ZeepClientManager:
 
     Returns:
         ZeepClientManager: A context manager for the Zeep client.
+    """
+    return ZeepClientManager(wsdl=WSDLS[_service_key(tbmd_service)])
 
-    Raises:
-        NotImplementedError: If the specified TBMD service is not implemented.
+
+class ZeepClientRegistry:
+    """Thread-safe, process-wide store of one Zeep client per TBMD service.
+
+    Building a zeep.Client downloads and compiles the whole WSDL, which costs far
+    more than a single SOAP call. The registry builds each client once, on first
+    use, and hands out the same client until it is invalidated.
     """
-    wsdls = {
-        "datadok": "http://ws.ssb.no/DatadokService/DatadokService.asmx?WSDL",
-        "metadb": "http://ws.ssb.no/MetaDbService/MetaDbService.asmx?WSDL",
-        "vardok": "http://ws.ssb.no/VardokService/VardokService.asmx?WSDL",
-        "statbank": "http://ws.ssb.no/statbankmetaservice/Service.asmx?WSDL",
-    }
 
-    tbmd_service = tbmd_service.lower()
-    if tbmd_service not in wsdls:
-        raise NotImplementedError(f"{tbmd_service} not implemented yet.")
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._clients: dict[str, ZeepLikeClient] = {}
+
+    def get(self, tbmd_service: str = "datadok") -> ZeepLikeClient:
+        """Get the cached client for a service, building it if needed.
+
+        Args:
+            tbmd_service: The TBMD service to use (default is "datadok").
+
+        Returns:
+            ZeepLikeClient: The shared Zeep client for the service.
+        """
+        tbmd_service = _service_key(tbmd_service)
+        client = self._clients.get(tbmd_service)
+        if client is not None:
+            return client
+        with self._lock:
+            # Another thread might have built it while we waited for the lock
+            client = self._clients.get(tbmd_service)
+            if client is None:
+                transport = _mk_transport(get_http_session())
+                policy = get_service_policy(tbmd_service)
+                transport.operation_timeout = policy.timeout
+                transport.load_timeout = policy.timeout
+                client = _mk_client(WSDLS[tbmd_service], transport)
+                self._clients[tbmd_service] = client
+        return client
+
+    def invalidate(self, tbmd_service: str | None = None) -> None:
+        """Drop cached clients.
+
+        The next call for the service builds a fresh client, re-reading the WSDL.
+
+        Args:
+            tbmd_service: The service to drop, or None to drop all of them.
+        """
+        with self._lock:
+            if tbmd_service is None:
+                services = list(self._clients)
+            else:
+                services = [_service_key(tbmd_service)]
+            for service in services:
+                self._clients.pop(service, None)
+
+    def close(self) -> None:
+        """Drop every cached client and close the shared HTTP session."""
+        self.invalidate(None)
+        _close_http_session()
+
+    def cached_services(self) -> list[str]:
+        """List the services that currently have a client built.
+
+        Returns:
+            list[str]: The names of the services with a cached client.
+        """
+        return list(self._clients)
+
+
+_CLIENT_REGISTRY = ZeepClientRegistry()
+atexit.register(_CLIENT_REGISTRY.close)
 
-    return ZeepClientManager(wsdl=wsdls[tbmd_service])
+
+def get_cached_client(tbmd_service: str = "datadok") -> ZeepLikeClient:
+    """Get the process-wide Zeep client for the specified TBMD service.
+
+    Args:
+        tbmd_service: The TBMD service to use (default is "datadok").
+
+    Returns:
+        ZeepLikeClient: The shared Zeep client for the service.
+    """
+    return _CLIENT_REGISTRY.get(tbmd_service)
+
+
+def invalidate_zeep_clients(tbmd_service: str | None = None) -> None:
+    """Drop the cached Zeep client(s), so the WSDL is read again on next use.
+
+    Args:
+        tbmd_service: The service to drop, or None to drop all of them.
+    """
+    _CLIENT_REGISTRY.invalidate(tbmd_service)
+
+
+def close_zeep_clients() -> None:
+    """Close all cached Zeep clients and their HTTP sessions."""
+    _CLIENT_REGISTRY.close()
+
+
+def _call_operation(tbmd_service: str, operation: str, *args: str | int) -> Any:
+    client = get_cached_client(tbmd_service)
+    return getattr(client.service, operation)(*args)
+
+
+def _fetch_serialized(tbmd_service: str, operation: str, *args: str | int) -> Any:
+    with measure_call(tbmd_service, operation) as sample:
+        if get_parse_mode() == "raw":
+            return call_raw(get_cached_client(tbmd_service), operation, *args)
+        result = _call_operation(tbmd_service, operation, *args)
+        with sample.timing("serialize"):
+            return _serialize_object_ntc(result)
 
 
 def get_zeep_serialize(
     tbmd_service: str = "datadok",
     operation: str = "GetFileDescriptionByPath",
     *args: str | int,
+    use_cache: bool = True,
 ) -> OrderedDict[str, Any]:
     """Get serialized response from the Zeep client for the specified operation.
 
+    Responses are kept in the response cache, see ssb_tbmd_apis.response_cache,
+    and parsed as set by the parse mode, see ssb_tbmd_apis.raw_xml. Concurrent
+    identical calls share one call to the service, see ssb_tbmd_apis.coalesce.
+    Failed calls are retried, see ssb_tbmd_apis.resilience.
+
     Args:
         tbmd_service: The TBMD service to use (default is "datadok").
         operation: The operation to perform (default is "GetFileDescriptionByPath").
         *args: Arguments for the operation.
+        use_cache: False to always call the service, skipping the response cache.
 
     Returns:
         OrderedDict: The serialized response from the Zeep client.
     """
-    with get_zeep_client(tbmd_service) as client:
-        response = getattr(client.service, operation)(*args)
-
-    result: OrderedDict[str, Any] = _serialize_object_ntc(response)
+    key = response_cache_key(tbmd_service, operation, *args)
+    result: OrderedDict[str, Any] = cached_call(
+        key,
+        lambda: coalesced_call(
+            key,
+            lambda: call_with_retry(
+                tbmd_service,
+                lambda: _fetch_serialized(tbmd_service, operation, *args),
+            ),
+        ),
+        use_cache,
+    )
     return result
 
 
@@ -170,19 +554,115 @@ def get_zeep_serialize_list(
     tbmd_service: str = "metadb",
     operation: str = "GetCodelists",
     *args: str | int,
+    use_cache: bool = True,
 ) -> list[OrderedDict[str, Any]]:
     """Get serialized response from the Zeep client for the specified operation that returns a list.
 
+    Responses are kept in the response cache, see ssb_tbmd_apis.response_cache,
+    and parsed as set by the parse mode, see ssb_tbmd_apis.raw_xml. Concurrent
+    identical calls share one call to the service, see ssb_tbmd_apis.coalesce.
+    Failed calls are retried, see ssb_tbmd_apis.resilience.
+
     Args:
         tbmd_service: The TBMD service to use (default is "datadok").
         operation: The operation to perform (default is "GetFileDescriptionByPath").
         *args: Arguments for the operation.
+        use_cache: False to always call the service, skipping the response cache.
 
     Returns:
         list[OrderedDict]: The serialized response from the Zeep client.
     """
-    with get_zeep_client(tbmd_service) as client:
-        response = getattr(client.service, operation)(*args)
-
-    result_list: list[OrderedDict[str, Any]] = _serialize_object_ntc(response)
+    key = response_cache_key(tbmd_service, operation, *args)
+    result_list: list[OrderedDict[str, Any]] = cached_call(
+        key,
+        lambda: coalesced_call(
+            key,
+            lambda: call_with_retry(
+                tbmd_service,
+                lambda: _fetch_serialized(tbmd_service, operation, *args),
+            ),
+        ),
+        use_cache,
+    )
     return result_list
+
+
+def iter_zeep_serialize(
+    tbmd_service: str,
+    operation: str,
+    *args: str | int,
+    use_cache: bool = True,
+) -> Iterator[OrderedDict[str, Any]]:
+    """Stream the items of an operation that returns a list, one at a time.
+
+    The response is parsed while it downloads, see ssb_tbmd_apis.raw_xml.iter_raw,
+    so memory use stays flat however many items there are. A response already in
+    the response cache is used if there is one, but streamed responses are not
+    stored there. Streamed calls are not retried, as the items yielded before a
+    failure can not be taken back.
+
+    Args:
+        tbmd_service: The TBMD service to use.
+        operation: The operation to perform.
+        *args: Arguments for the operation.
+        use_cache: False to always call the service, skipping the response cache.
+
+    Yields:
+        OrderedDict: Each item of the list, serialized like get_zeep_serialize.
+    """
+    cached = cache_lookup(response_cache_key(tbmd_service, operation, *args), use_cache)
+    if cached is not None:
+        yield from cached if isinstance(cached, list) else [cached]
+        return
+    with measure_call(tbmd_service, operation):
+        yield from iter_raw(get_cached_client(tbmd_service), operation, *args)
+
+
+def get_zeep_serialize_many(
+    tbmd_service: str,
+    operation: str,
+    args_list: Iterable[tuple[str | int, ...]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> list[OrderedDict[str, Any] | zeep.exceptions.Fault]:
+    """Run the same operation for many argument tuples, concurrently.
+
+    The calls share the cached client and the pooled HTTP session, so keep
+    max_workers at or below the pool_maxsize from configure_http.
+
+    Args:
+        tbmd_service: The TBMD service to use.
+        operation: The operation to perform.
+        args_list: One tuple of arguments for each call, like [(1,), (2,)].
+        max_workers: The most calls to have in flight at once.
+
+    Returns:
+        list: For each argument tuple, in the same order, the serialized
+            response, or the zeep.exceptions.Fault the service answered with.
+            Any other error is raised.
+
+    Raises:
+        ValueError: If max_workers is less than 1.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    args_list = list(args_list)
+
+    def call(
+        args: tuple[str | int, ...],
+    ) -> OrderedDict[str, Any] | zeep.exceptions.Fault:
+        try:
+            return get_zeep_serialize(tbmd_service, operation, *args)
+        except zeep.exceptions.Fault as e:
+            return e
+
+    if len(args_list) <= 1 or max_workers == 1:
+        return [call(args) for args in args_list]
+    # Threads do not inherit context variables, like bypass_response_cache
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(args_list)),
+        thread_name_prefix=f"tbmd-{tbmd_service}",
+    ) as executor:
+        return list(
+            executor.map(lambda args: context.copy().run(call, args), args_list)
+        )
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+from typing import Any
+
+import httpx
+import pytest
+import zeep
+
+import ssb_tbmd_apis.aio.zeep_client as azc
+from tests.utils.standin import CODELIST_RESPONSE
+from tests.utils.standin import standin_wsdls
+
+
+class _FakeService:
+    def __init__(self, in_flight: list[int]) -> None:
+        self.in_flight = in_flight
+
+    async def GetCodelistById(self, codelist_id: str | int) -> dict[str, Any]:
+        self.in_flight[0] += 1
+        self.in_flight[1] = max(self.in_flight)
+        try:
+            if int(codelist_id) < 0:
+                raise ValueError(f"Broken id {codelist_id}")
+            # Later items finish first, to shuffle completion order
+            await asyncio.sleep(0.001 * (20 - int(codelist_id)))
+            if int(codelist_id) % 5 == 0:
+                raise zeep.exceptions.Fault(f"No such id {codelist_id}")
+            return {"id": codelist_id}
+        finally:
+            self.in_flight[0] -= 1
+
+
+class _FakeClient:
+    def __init__(self, wsdl: str, in_flight: list[int]) -> None:
+        self.wsdl = wsdl
+        self.service = _FakeService(in_flight)
+
+
+@pytest.fixture
+def built(monkeypatch: pytest.MonkeyPatch) -> Iterator[list[int]]:
+    """Fake the async clients, yielding the [current, max] calls in flight."""
+    in_flight = [0, 0]
+    monkeypatch.setattr(
+        azc,
+        "_mk_async_client",
+        lambda wsdl, http_client, timeout=None: _FakeClient(wsdl, in_flight),
+    )
+    monkeypatch.setattr(azc, "_serialize_object_ntc", lambda obj: obj)
+    yield in_flight
+
+
+def test_many_keeps_order_caps_concurrency_and_captures_faults(
+    built: list[int],
+) -> None:
+    async def main() -> list[Any]:
+        async with azc.AsyncZeepClientRegistry(max_concurrency=4):
+            return await azc.get_zeep_serialize_many(
+                "datadok", "GetCodelistById", [(i,) for i in range(20)]
+            )
+
+    results = asyncio.run(main())
+    assert len(results) == 20
+    for i, result in enumerate(results):
+        if i % 5 == 0:
+            assert isinstance(result, zeep.exceptions.Fault)
+        else:
+            assert result == {"id": i}
+    assert 1 < built[1] <= 4
+
+
+def test_many_cancels_the_other_calls_on_an_error(built: list[int]) -> None:
+    async def main() -> int:
+        async with azc.AsyncZeepClientRegistry(max_concurrency=4):
+            with pytest.raises(ValueError, match="Broken"):
+                await azc.get_zeep_serialize_many(
+                    "datadok", "GetCodelistById", [(1,), (2,), (-1,), (3,)]
+                )
+            # None are left running in the background
+            return built[0]
+
+    assert asyncio.run(main()) == 0
+
+
+def test_registry_is_per_loop_and_builds_once(built: list[int]) -> None:
+    async def main() -> tuple[Any, Any, list[Any]]:
+        registry = azc.get_async_registry()
+        clients = await asyncio.gather(*(registry.get("DATADOK") for _ in range(8)))
+        await azc.aclose_zeep_clients()
+        return registry, azc.get_async_registry(), clients
+
+    first, recreated, clients = asyncio.run(main())
+    assert all(c is clients[0] for c in clients)
+    assert recreated is not first
+
+    registry, _, _ = asyncio.run(main())
+    assert registry is not first
+
+
+def test_registry_rejects_bad_input(built: list[int]) -> None:
+    with pytest.raises(ValueError):
+        azc.AsyncZeepClientRegistry(max_concurrency=0)
+
+    async def main() -> None:
+        await azc.get_async_registry().get("klass")
+
+    with pytest.raises(NotImplementedError):
+        asyncio.run(main())
+
+
+def test_end_to_end_against_standin_wsdl(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Any
+) -> None:
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path))
+    monkeypatch.setitem(azc.WSDLS, "datadok", standin_wsdls()["datadok"])
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(
+            200, content=CODELIST_RESPONSE, headers={"Content-Type": "text/xml"}
+        )
+
+    monkeypatch.setattr(
+        azc,
+        "_mk_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+    async def main() -> list[Any]:
+        async with azc.AsyncZeepClientRegistry(max_concurrency=2):
+            return await azc.get_zeep_serialize_many(
+                "datadok", "GetCodelistById", [(1,), (2,), (3,)]
+            )
+
+    results = asyncio.run(main())
+    assert len(requests) == 3
+    assert sorted(r.content.count(b"<ns0:id>2</ns0:id>") for r in requests) == [0, 0, 1]
+    for result in results:
+        assert result["id"] == "urn:ssb:codelist:datadok:228589"
+        assert [c["CodeValue"] for c in result["Codes"]["Code"]] == ["17", "16"]
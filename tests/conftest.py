@@ -0,0 +1,17 @@
+"""Fixtures shared by the whole test suite."""
+
+from collections.abc import Iterator
+
+import pytest
+
+from ssb_tbmd_apis.response_cache import ResponseCache
+from ssb_tbmd_apis.response_cache import set_response_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache() -> Iterator[ResponseCache]:
+    """Give every test an empty response cache, so no responses leak between tests."""
+    cache = ResponseCache()
+    previous = set_response_cache(cache)
+    yield cache
+    set_response_cache(previous)
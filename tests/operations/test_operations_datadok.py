@@ -91,3 +91,22 @@ def test_codelist_by_reference_from_json(monkeypatch: pytest.MonkeyPatch) -> Non
     # Spot checks
     assert result["CodelistMeta"]["Title"]["_value_1"] == "spes_reg_type"
     assert codes[0]["CodeValue"] in {"0", "1"}
+
+
+def test_context_variable_by_id_many_delegates(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[tuple[Any, ...]] = []
+
+    def fake_many(
+        tbmd_service: str,
+        operation: str,
+        args_list: list[tuple[str | int, ...]],
+        max_workers: int,
+    ) -> list[OrderedDict[str, Any]]:
+        calls.append((tbmd_service, operation, args_list, max_workers))
+        return [OrderedDict(id=args[0]) for args in args_list]
+
+    monkeypatch.setattr(ops_mod, "get_zeep_serialize_many", fake_many, raising=True)
+
+    result = ops_mod.datadok_context_variable_by_id_many([865507, "865508"], 2)
+    assert calls == [("datadok", "GetContextVariableById", [(865507,), ("865508",)], 2)]
+    assert [r["id"] for r in result] == [865507, "865508"]  # type: ignore[index]
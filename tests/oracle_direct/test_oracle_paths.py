@@ -1,30 +1,73 @@
 # tests/oracle_direct/test_oracle_paths.py
 from __future__ import annotations
 
+from typing import Any
+
 import pytest
 from typeguard import TypeCheckError
 
 from ssb_tbmd_apis.oracle_direct import oracle_paths
 
 
-class _FakeOracleCM:
-    """A fake Oracle context manager with execute/fetchmany API."""
+class _FakeListType:
+    """A fake collection type, whose objects are plain lists."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def newobject(self, values: list[str]) -> list[str]:
+        return list(values)
+
+
+class _FakeConnection:
+    """A fake oracledb connection, handing out a fake cursor."""
+
+    def __init__(self, cursor: _FakeCursor) -> None:
+        self._cursor = cursor
+        cursor.connection = self
+        self.closed = False
+
+    def __enter__(self) -> _FakeConnection:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.closed = True
+
+    def cursor(self) -> _FakeCursor:
+        return self._cursor
+
+    def gettype(self, name: str) -> _FakeListType:
+        return _FakeListType(name)
+
+
+class _FakeCursor:
+    """A fake oracledb cursor with execute/fetchmany API."""
+
+    connection: _FakeConnection
 
     def __init__(
-        self, db: str, batches: list[list[tuple[str, ...]]], queries_sink: list[str]
+        self,
+        batches: list[list[tuple[str, ...]]],
+        queries_sink: list[str],
+        binds_sink: list[dict[str, Any]] | None = None,
+        error: Exception | None = None,
     ) -> None:
-        self.db = db
         self._batches = [list(batch) for batch in batches]
         self._queries_sink = queries_sink
+        self._binds_sink = binds_sink if binds_sink is not None else []
+        self._error = error
 
-    def __enter__(self) -> _FakeOracleCM:
+    def __enter__(self) -> _FakeCursor:
         return self
 
-    def __exit__(self, exc_type, exc, tb) -> bool:
-        return False
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
 
-    def execute(self, query: str) -> None:
+    def execute(self, query: str, **binds: Any) -> None:
+        if self._error is not None:
+            raise self._error
         self._queries_sink.append(query)
+        self._binds_sink.append(binds)
 
     def fetchmany(self, size: int) -> list[tuple[str, ...]]:
         if not self._batches:
@@ -36,12 +79,19 @@ def _patch_oracle(
     monkeypatch: pytest.MonkeyPatch,
     batches: list[list[tuple[str, ...]]],
     queries_sink: list[str],
-) -> None:
-    def _factory(*, db: str):
-        return _FakeOracleCM(db=db, batches=batches, queries_sink=queries_sink)
+    binds_sink: list[dict[str, Any]] | None = None,
+    error: Exception | None = None,
+) -> list[_FakeConnection]:
+    connections: list[_FakeConnection] = []
 
-    # Patch where Oracle is looked up
-    monkeypatch.setattr(oracle_paths, "Oracle", _factory, raising=True)
+    def _connect(database: str, password: str | None) -> _FakeConnection:
+        cursor = _FakeCursor(batches, queries_sink, binds_sink, error)
+        connections.append(_FakeConnection(cursor))
+        return connections[-1]
+
+    # Patch where the connection is made
+    monkeypatch.setattr(oracle_paths, "_connect", _connect, raising=True)
+    return connections
 
 
 def test_single_string_input_builds_uppercase_path_and_batches(
@@ -55,7 +105,8 @@ def test_single_string_input_builds_uppercase_path_and_batches(
         [],
     ]
     queries: list[str] = []
-    _patch_oracle(monkeypatch, batches=batches, queries_sink=queries)
+    binds: list[dict[str, Any]] = []
+    _patch_oracle(monkeypatch, batches=batches, queries_sink=queries, binds_sink=binds)
 
     out = oracle_paths.paths_in_substamme("$utd/nudb", database="DWH")
 
@@ -64,9 +115,10 @@ def test_single_string_input_builds_uppercase_path_and_batches(
         "$UTD/nudb/arkiv/avslutta/g2023g2024.dat",
     ]
     assert len(queries) == 1
-    q = queries[0]
-    # Expect SINGLE '$' and no braces
-    assert "'$UTD/nudb/arkiv/'" in q
+    # The stamme is bound without its '$', and upper-cased in the query
+    assert queries[0] == oracle_paths.PATHS_QUERY
+    assert binds == [{"pairs": ["utd/nudb"]}]
+    assert "'$' || UPPER(p.stamme)" in queries[0]
 
 
 def test_tuple_input_works_and_uses_same_code_path(
@@ -74,16 +126,16 @@ def test_tuple_input_works_and_uses_same_code_path(
 ) -> None:
     batches = [[("$FOB/person/arkiv/avslutta/g2020g2021.dat",)], []]
     queries: list[str] = []
-    _patch_oracle(monkeypatch, batches=batches, queries_sink=queries)
+    binds: list[dict[str, Any]] = []
+    _patch_oracle(monkeypatch, batches=batches, queries_sink=queries, binds_sink=binds)
 
     out = oracle_paths.paths_in_substamme(("fob", "person"), database="DWH")
     assert out == ["$FOB/person/arkiv/avslutta/g2020g2021.dat"]
-    assert len(queries) == 1
-    # Expect SINGLE '$' and no braces
-    assert "'$FOB/person/arkiv/'" in queries[0]
+    assert queries == [oracle_paths.PATHS_QUERY]
+    assert binds == [{"pairs": ["fob/person"]}]
 
 
-def test_list_of_pairs_produces_union_all_and_combines_results(
+def test_list_of_pairs_binds_all_pairs_in_one_statement(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     batches = [
@@ -93,19 +145,30 @@ def test_list_of_pairs_produces_union_all_and_combines_results(
         ]
     ]
     queries: list[str] = []
-    _patch_oracle(monkeypatch, batches=batches, queries_sink=queries)
+    binds: list[dict[str, Any]] = []
+    _patch_oracle(monkeypatch, batches=batches, queries_sink=queries, binds_sink=binds)
 
     out = oracle_paths.paths_in_substamme(
-        [("fob", "person"), ("utd", "nudb")], database="DWH"
+        [("$fob", "person"), ("utd", "nudb")], database="DWH"
     )
     assert out == [
         "$FOB/person/arkiv/avslutta/g2020g2021.dat",
         "$UTD/nudb/arkiv/avslutta/g2021g2022.dat",
     ]
-    assert " UNION ALL " in queries[0]
-    # Expect SINGLE '$' and no braces for both stammes
-    assert "'$FOB/person/arkiv/'" in queries[0]
-    assert "'$UTD/nudb/arkiv/'" in queries[0]
+    # The same statement as for one pair, so Oracle can reuse it
+    assert queries == [oracle_paths.PATHS_QUERY]
+    assert binds == [{"pairs": ["fob/person", "utd/nudb"]}]
+    assert "UNION" not in queries[0]
+
+
+def test_errors_from_oracle_are_raised(monkeypatch: pytest.MonkeyPatch) -> None:
+    error = RuntimeError("ORA-01017: invalid credential or not authorized")
+    connections = _patch_oracle(monkeypatch, batches=[], queries_sink=[], error=error)
+
+    # Not swallowed into an empty list, which looks like a substamme without paths
+    with pytest.raises(RuntimeError, match="ORA-01017"):
+        oracle_paths.paths_in_substamme("$utd/nudb", database="DWH")
+    assert connections[0].closed
 
 
 @pytest.mark.parametrize(
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import ssb_tbmd_apis.paths.bulk_resolve as br
+import ssb_tbmd_apis.paths.resolution_cache as rc
+import ssb_tbmd_apis.paths.try_variations as tv
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from ssb_tbmd_apis.response_cache import invalidate_response_cache
+from tests.utils.standin import StandinServer
+
+STAMMER = StammeRegistry({"STANDIN": Path("/ssb/standin")})
+
+
+@pytest.fixture
+def standin(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Any]:
+    """A stand-in server, with $STANDIN at /ssb/standin."""
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(tv, "get_stamme_registry", lambda: STAMMER)
+    monkeypatch.setattr(br, "get_stamme_registry", lambda: STAMMER)
+    server = StandinServer()
+    for service, url in server.wsdl_urls().items():
+        monkeypatch.setitem(zc.WSDLS, service, url)
+    zc.close_zeep_clients()
+    yield server
+    zc.close_zeep_clients()
+    server.shutdown()
+
+
+def test_resolves_every_path(standin: StandinServer) -> None:
+    paths = [
+        Path("/ssb/standin/arkiv/personfil/g2020.dat"),
+        "$STANDIN/arkiv/personfil/g2020",
+        Path("$STANDIN/arkiv/bedriftsfil/g2022"),
+        Path("$STANDIN/arkiv/annen/g2020"),
+    ]
+    results = {str(result.path): result for result in br.resolve_datadok_paths(paths)}
+    assert len(results) == 4
+    found = results["/ssb/standin/arkiv/personfil/g2020.dat"]
+    assert found.status == "found"
+    assert found.resolved == Path("$STANDIN/arkiv/personfil/g2020")
+    assert found.file_description is not None
+    assert found.error is None
+    # Looked up once for both spellings
+    assert results["$STANDIN/arkiv/personfil/g2020"].seconds == found.seconds
+    assert results["$STANDIN/arkiv/bedriftsfil/g2022"].resolved == Path(
+        "$STANDIN/arkiv/bedriftsfil/g2021g2022"
+    )
+    missing = results["$STANDIN/arkiv/annen/g2020"]
+    assert missing.status == "not found"
+    assert missing.resolved is None
+    assert "Failed looking" in (missing.error or "")
+
+    table = br.resolutions_table(results.values())
+    assert list(table.columns) == ["path", "resolved", "status", "error", "seconds"]
+    assert table["status"].value_counts().to_dict() == {"found": 3, "not found": 1}
+
+
+def _fake_lookup(delays: dict[str, float], started: list[str]) -> Any:
+    lock = threading.Lock()
+
+    def try_zeep_serialize_path(
+        path: Path, deadline: float | None = None, parallel_probes: int = 1
+    ) -> tuple[OrderedDict[str, Any], Path]:
+        with lock:
+            started.append(str(path))
+        time.sleep(delays.get(str(path), 0.0))
+        if str(path).endswith("broken"):
+            raise ConnectionError("reset")
+        return OrderedDict(Title=str(path)), path
+
+    return try_zeep_serialize_path
+
+
+def test_streams_as_the_lookups_finish(monkeypatch: pytest.MonkeyPatch) -> None:
+    started: list[str] = []
+    monkeypatch.setattr(br, "get_stamme_registry", lambda: STAMMER)
+    monkeypatch.setattr(
+        br, "try_zeep_serialize_path", _fake_lookup({"$A/x/slow": 0.3}, started)
+    )
+    results = br.resolve_datadok_paths(
+        ["$A/x/slow", "$A/x/fast", "$B/y/fast", "$A/x/broken"], max_workers=4
+    )
+    start = time.perf_counter()
+    first = next(results)
+    assert time.perf_counter() - start < 0.2
+    assert first.path != Path("$A/x/slow")
+    rest = {str(result.path): result for result in results}
+    assert rest.keys() | {str(first.path)} == {
+        "$A/x/slow",
+        "$A/x/fast",
+        "$B/y/fast",
+        "$A/x/broken",
+    }
+    assert rest["$A/x/broken"].status == "error"
+    assert "ConnectionError" in (rest["$A/x/broken"].error or "")
+
+    # Grouped by stamme and substamme
+    started.clear()
+    list(
+        br.resolve_datadok_paths(
+            ["$A/x/fast", "$B/y/fast", "$A/x/broken"], max_workers=1
+        )
+    )
+    assert started == ["$A/x/fast", "$A/x/broken", "$B/y/fast"]
+
+
+def test_stopping_early_cancels_the_rest(monkeypatch: pytest.MonkeyPatch) -> None:
+    started: list[str] = []
+    monkeypatch.setattr(br, "get_stamme_registry", lambda: STAMMER)
+    monkeypatch.setattr(br, "try_zeep_serialize_path", _fake_lookup({}, started))
+    paths = [f"$A/x/g{year}" for year in range(1900, 2000)]
+    results = br.resolve_datadok_paths(paths, max_workers=1)
+    next(results)
+    results.close()
+    time.sleep(0.05)
+    assert len(started) < len(paths)
+    with pytest.raises(ValueError, match="max_workers"):
+        next(br.resolve_datadok_paths(paths, max_workers=0))
+
+
+def test_reads_the_paths_as_the_lookups_go(monkeypatch: pytest.MonkeyPatch) -> None:
+    started: list[str] = []
+    monkeypatch.setattr(br, "CHUNK_SIZE", 2)
+    monkeypatch.setattr(br, "get_stamme_registry", lambda: STAMMER)
+    monkeypatch.setattr(br, "try_zeep_serialize_path", _fake_lookup({}, started))
+    read: list[str] = []
+
+    def paths() -> Iterator[str]:
+        for year in range(1900, 2000):
+            read.append(f"$A/x/g{year}")
+            yield read[-1]
+
+    results = br.resolve_datadok_paths(paths(), max_workers=1)
+    next(results)
+    assert len(read) <= 4
+    assert len(list(results)) == 99
+
+
+def test_duplicates_get_their_own_file_description(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    started: list[str] = []
+    monkeypatch.setattr(br, "get_stamme_registry", lambda: STAMMER)
+    monkeypatch.setattr(br, "try_zeep_serialize_path", _fake_lookup({}, started))
+    first, second = br.resolve_datadok_paths(
+        ["/ssb/standin/arkiv/x/g2020.dat", "$STANDIN/arkiv/x/g2020"]
+    )
+    assert started == ["$STANDIN/arkiv/x/g2020"]
+    assert first.file_description is not None
+    first.file_description["Title"] = "changed"
+    assert second.file_description == OrderedDict(Title="$STANDIN/arkiv/x/g2020")
+
+
+def test_shares_resolutions_with_single_lookups(
+    standin: StandinServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(rc, "get_stamme_registry", lambda: STAMMER)
+    monkeypatch.setattr(rc, "_enabled", None)
+    monkeypatch.setattr(rc, "_cache", None)
+    rc.enable_resolution_cache()
+    try:
+        path = Path("/ssb/standin/arkiv/bedriftsfil/g2022.dat")
+        (result,) = br.resolve_datadok_paths([path])
+        assert result.resolved == Path("$STANDIN/arkiv/bedriftsfil/g2021g2022")
+        invalidate_response_cache()
+        standin.calls.clear()
+        assert tv.try_zeep_serialize_path(path)[1] == result.resolved
+        # Straight to the path found in bulk
+        assert standin.calls["datadok", "GetFileDescriptionByPath"] == 1
+    finally:
+        rc.disable_resolution_cache()
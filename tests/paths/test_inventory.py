@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import os
+import shutil
+from collections.abc import Iterable
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import ssb_tbmd_apis.paths.inventory as inv
+import ssb_tbmd_apis.paths.try_variations as tv
+from ssb_tbmd_apis.paths.bulk_resolve import PathResolution
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+
+
+@pytest.fixture
+def stamme(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """A stamme FOB, with FOB_PERSON inside it, holding a few flatfiles."""
+    root = tmp_path / "ssb" / "stamme01" / "fob"
+    registry = StammeRegistry({"FOB": root, "FOB_PERSON": root / "person"})
+    monkeypatch.setattr(inv, "get_stamme_registry", lambda: registry)
+    monkeypatch.setattr(tv, "get_stamme_registry", lambda: registry)
+    personfil = root / "person" / "arkiv" / "personfil"
+    personfil.mkdir(parents=True)
+    for name in (
+        "g2019.dat",
+        "g2019g2020.dat",
+        "g2021.txt",
+        "g2019__MIGRERDOK_v1.json",
+        "g2019__MIGRERDOK_v2.json",
+        "notater.docx",
+        ".hidden.dat",
+    ):
+        (personfil / name).write_text(name)
+    (root / "annen" / "arkiv").mkdir(parents=True)
+    (root / "annen" / "arkiv" / "g2018").touch()
+    return root
+
+
+@pytest.fixture
+def inventory(tmp_path: Path) -> Iterator[inv.FileInventory]:
+    """An empty inventory."""
+    inventory = inv.FileInventory(tmp_path / "inventory.sqlite")
+    yield inventory
+    inventory.close()
+
+
+def test_classifies_the_flatfiles(stamme: Path, inventory: inv.FileInventory) -> None:
+    stats = inventory.crawl()
+    assert stats.files == 4
+    rows = inventory.query(
+        "SELECT name, dollar_path, stamme, substamme, periods, first_period,"
+        " last_period, migrerdok, migrerdok_version FROM files ORDER BY path"
+    )
+    assert rows == [
+        ("g2018", "$FOB/annen/arkiv/g2018", "FOB", "annen", 1, 2018, 2018, None, None),
+        (
+            "g2019.dat",
+            "$FOB_PERSON/arkiv/personfil/g2019",
+            "FOB_PERSON",
+            "arkiv",
+            1,
+            2019,
+            2019,
+            "g2019__MIGRERDOK_v2.json",
+            2,
+        ),
+        (
+            "g2019g2020.dat",
+            "$FOB_PERSON/arkiv/personfil/g2019g2020",
+            "FOB_PERSON",
+            "arkiv",
+            2,
+            2019,
+            2020,
+            None,
+            None,
+        ),
+        (
+            "g2021.txt",
+            "$FOB_PERSON/arkiv/personfil/g2021",
+            "FOB_PERSON",
+            "arkiv",
+            1,
+            2021,
+            2021,
+            None,
+            None,
+        ),
+    ]
+    assert inventory.dataframe()["size"].tolist() == [0, 9, 14, 9]
+
+
+def test_only_changed_folders_are_listed_again(
+    stamme: Path, inventory: inv.FileInventory
+) -> None:
+    first = inventory.crawl(["FOB"])
+    assert (first.folders, first.listed) == (6, 6)
+    again = inventory.crawl(["FOB"])
+    assert (again.folders, again.listed, again.files) == (6, 0, 0)
+
+    personfil = stamme / "person" / "arkiv" / "personfil"
+    (personfil / "g2022.dat").touch()
+    # Some filesystems only keep the mtime to the second
+    stat = personfil.stat()
+    os.utime(personfil, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    again = inventory.crawl(["FOB"])
+    assert (again.listed, again.files) == (1, 4)
+    assert len(inventory.query("SELECT * FROM files")) == 5
+
+    shutil.rmtree(stamme / "annen")
+    again = inventory.crawl(["FOB"])
+    assert again.removed == 2
+    assert inventory.query("SELECT COUNT(*) FROM files") == [(4,)]
+    assert inventory.crawl(["FOB"], full=True).listed == 4
+
+
+def test_unreadable_folders_are_skipped(
+    stamme: Path, inventory: inv.FileInventory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    inventory.crawl(["FOB"])
+    personfil = stamme / "person" / "arkiv" / "personfil"
+    # Changed, so it is listed again
+    stat = personfil.stat()
+    os.utime(personfil, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    scandir = os.scandir
+
+    def restricted(path: Any) -> Any:
+        if str(path) == str(personfil):
+            raise PermissionError(13, "Permission denied", str(path))
+        return scandir(path)
+
+    monkeypatch.setattr(inv.os, "scandir", restricted)
+    stats = inventory.crawl(["FOB"])
+    assert (stats.folders, stats.removed) == (6, 0)
+    # The files stored from it are kept
+    assert inventory.query("SELECT COUNT(*) FROM files") == [(4,)]
+
+
+def test_roots(stamme: Path) -> None:
+    assert inv.FileInventory._roots(["FOB_PERSON", "$FOB", str(stamme / "annen")]) == [
+        str(stamme)
+    ]
+    assert inv.FileInventory._roots(None) == [str(stamme)]
+    with pytest.raises(ValueError, match="max_workers"):
+        inv.FileInventory(stamme.parent / "x.sqlite").crawl(max_workers=0)
+
+
+def test_check_datadok(
+    stamme: Path, inventory: inv.FileInventory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    looked_up: list[str] = []
+
+    def resolve_datadok_paths(
+        paths: Iterable[str], **kwargs: Any
+    ) -> Iterator[PathResolution]:
+        for path in paths:
+            looked_up.append(path)
+            found = path.endswith("g2019")
+            if path.endswith("g2021"):
+                yield PathResolution(Path(path), None, "error", "CircuitOpenError", 0.1)
+                continue
+            yield PathResolution(
+                Path(path),
+                Path(path) if found else None,
+                "found" if found else "not found",
+                None if found else "Failed looking",
+                0.1,
+            )
+
+    monkeypatch.setattr(inv, "resolve_datadok_paths", resolve_datadok_paths)
+    inventory.crawl()
+    assert inventory.check_datadok() == 4
+    # Only the error is looked up again
+    looked_up.clear()
+    assert inventory.check_datadok() == 1
+    assert looked_up == ["$FOB_PERSON/arkiv/personfil/g2021"]
+    assert inventory.check_datadok(recheck=True) == 4
+    assert inventory.query(
+        "SELECT name, datadok_path FROM inventory WHERE datadok_status = 'found'"
+    ) == [("g2019.dat", "$FOB_PERSON/arkiv/personfil/g2019")]
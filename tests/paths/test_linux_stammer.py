@@ -5,15 +5,27 @@ import builtins
 import io
 import os
 from collections.abc import Callable
+from collections.abc import Iterator
 from pathlib import Path
 
 import pytest
 
+import ssb_tbmd_apis.paths.linux_stammer as ls
+import ssb_tbmd_apis.paths.try_variations as tv
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
 from ssb_tbmd_apis.paths.linux_stammer import linux_stammer
 
 STAMME_PATH = Path("/etc/profile.d/stamme_variabel")
 
 
+@pytest.fixture(autouse=True)
+def clear_stamme_cache() -> Iterator[None]:
+    """Read the stamme file in each test, and keep none of the fakes after it."""
+    ls.clear_stamme_cache()
+    yield
+    ls.clear_stamme_cache()
+
+
 def _patch_open_for_stamme(monkeypatch: pytest.MonkeyPatch, content: str) -> None:
     """Patch builtins.open so opening STAMME_PATH returns our StringIO."""
     real_open: Callable[..., object] = builtins.open
@@ -100,3 +112,67 @@ def test_linux_stammer_bad_format_raises(monkeypatch: pytest.MonkeyPatch) -> Non
 
     with pytest.raises(ValueError):
         linux_stammer()
+
+
+def test_read_again_only_when_changed(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    stamme_file = tmp_path / "stamme_variabel"
+    stamme_file.write_text("export FOO=/bar/baz\n", encoding="latin1")
+    monkeypatch.setattr(ls, "STAMME_FILE", stamme_file)
+    reads: list[int] = []
+    read = ls._read_stamme_file
+
+    def counting_read() -> dict[str, Path]:
+        reads.append(1)
+        return read()
+
+    monkeypatch.setattr(ls, "_read_stamme_file", counting_read)
+    assert linux_stammer() == {"FOO": Path("/bar/baz")}
+    # Changing what is returned does not change the cache
+    linux_stammer()["FOO"] = Path("/changed")
+    assert linux_stammer(flip=True) == {Path("/bar/baz"): "FOO"}
+    assert len(reads) == 1
+
+    stamme_file.write_text("export FOO=/bar/qux\n", encoding="latin1")
+    stat = stamme_file.stat()
+    os.utime(stamme_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert linux_stammer() == {"FOO": Path("/bar/qux")}
+    assert len(reads) == 2
+
+
+def test_longest_stamme_wins() -> None:
+    registry = StammeRegistry(
+        {
+            "FOB": Path("/ssb/stamme01/fob"),
+            "FOB_PERSON": Path("/ssb/stamme01/fob/person"),
+            "UTD": Path("/ssb/stamme02/utd"),
+        }
+    )
+    assert registry.to_dollar(Path("/ssb/stamme01/fob/person/arkiv/g2020")) == Path(
+        "$FOB_PERSON/arkiv/g2020"
+    )
+    assert registry.to_dollar(Path("/ssb/stamme01/fob/annen/g2020")) == Path(
+        "$FOB/annen/g2020"
+    )
+    assert registry.find_stamme(Path("/ssb/stamme01/fobx/g2020")) is None
+    assert registry.to_dollar(Path("/ssb/stamme01")) == Path("/ssb/stamme01")
+    assert registry.to_real(Path("$UTD/nudb/g2020")) == Path(
+        "/ssb/stamme02/utd/nudb/g2020"
+    )
+    assert registry.to_real(Path("UTD/nudb")) == Path("/ssb/stamme02/utd/nudb")
+    assert registry.to_real(Path("$ANNEN/nudb")) == Path("$ANNEN/nudb")
+
+
+def test_candidates_and_swap_use_the_registry(monkeypatch: pytest.MonkeyPatch) -> None:
+    content = (
+        "export FOB=/ssb/stamme01/fob\nexport FOB_PERSON=/ssb/stamme01/fob/person\n"
+    )
+    _patch_open_for_stamme(monkeypatch, content)
+    candidates = tv.datadok_path_candidates(
+        Path("/ssb/stamme01/fob/person/arkiv/g2020.dat")
+    )
+    assert next(candidates) == Path("$FOB_PERSON/arkiv/g2020")
+    assert tv.swap_dollar_sign(Path("$FOB/arkiv/g2020.dat")) == Path(
+        "/ssb/stamme01/fob/arkiv/g2020.dat"
+    )
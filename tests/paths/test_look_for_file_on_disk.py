@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import ssb_tbmd_apis.paths.try_variations as tv
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+
+
+@pytest.fixture(autouse=True)
+def listings(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[list[str]]:
+    """Count the folders listed, after pytest has made tmp_path."""
+    # Without the dollar-stammer of the host
+    monkeypatch.setattr(tv, "get_stamme_registry", lambda: StammeRegistry({}))
+    listed: list[str] = []
+    scandir = os.scandir
+
+    def counting_scandir(path: Any) -> Any:
+        listed.append(str(path))
+        return scandir(path)
+
+    monkeypatch.setattr(tv.os, "scandir", counting_scandir)
+    tv.clear_listing_cache()
+    yield listed
+    tv.clear_listing_cache()
+
+
+def _changed_a_minute_ago(folder: Path) -> None:
+    minute_ago = time.time_ns() - 60 * 10**9
+    os.utime(folder, ns=(minute_ago, minute_ago))
+
+
+def test_finds_the_file_and_its_extensions(tmp_path: Path, listings: list[str]) -> None:
+    for name in ("g2020.dat", "g2021.txt", "g2022", "g2023.csv"):
+        (tmp_path / name).touch()
+    (tmp_path / "g2024.dat").mkdir()
+    _changed_a_minute_ago(tmp_path)
+    assert tv.look_for_file_on_disk(tmp_path / "g2020.dat") == tmp_path / "g2020.dat"
+    assert tv.look_for_file_on_disk(tmp_path / "g2021") == tmp_path / "g2021.txt"
+    assert tv.look_for_file_on_disk(tmp_path / "g2022.dat") == tmp_path / "g2022"
+    # Not a known extension, and not the only file
+    with pytest.raises(FileNotFoundError):
+        tv.look_for_file_on_disk(tmp_path / "g2023")
+    # Folders are not files
+    with pytest.raises(FileNotFoundError):
+        tv.look_for_file_on_disk(tmp_path / "g2024.dat")
+    assert listings.count(str(tmp_path)) == 1
+
+
+def test_the_only_file_in_the_folder(tmp_path: Path) -> None:
+    folder = tmp_path / "arkiv"
+    folder.mkdir()
+    (folder / "g2020g2021.parquet").touch()
+    (folder / ".hidden").touch()
+    assert (
+        tv.look_for_file_on_disk(folder / "g2020.dat") == folder / "g2020g2021.parquet"
+    )
+
+
+def test_listings_are_kept_for_a_while(
+    tmp_path: Path, listings: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for year in range(2000, 2010):
+        (tmp_path / f"g{year}.dat").touch()
+    _changed_a_minute_ago(tmp_path)
+    for year in range(2000, 2010):
+        tv.look_for_file_on_disk(tmp_path / f"g{year}")
+    assert listings == [str(tmp_path)]
+
+    monkeypatch.setattr(tv, "LISTING_TTL", 0.0)
+    tv.look_for_file_on_disk(tmp_path / "g2000")
+    assert len(listings) == 2
+
+
+def test_new_files_are_found_at_once(tmp_path: Path, listings: list[str]) -> None:
+    (tmp_path / "g2000.dat").touch()
+    (tmp_path / "g2001.dat").touch()
+    _changed_a_minute_ago(tmp_path)
+    tv.look_for_file_on_disk(tmp_path / "g2000")
+    (tmp_path / "g2010.dat").touch()
+    assert tv.look_for_file_on_disk(tmp_path / "g2010") == tmp_path / "g2010.dat"
+    assert len(listings) == 2
+    # Listed again, as it changed too recently to trust its modification time
+    tv.look_for_file_on_disk(tmp_path / "g2010")
+    assert len(listings) == 3
+
+
+def test_missing_folders(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError, match="Cant find"):
+        tv.look_for_file_on_disk(tmp_path / "not" / "there" / "g2020.dat")
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import ssb_tbmd_apis.aio.try_variations as atv
+import ssb_tbmd_apis.aio.zeep_client as azc
+import ssb_tbmd_apis.paths.try_variations as tv
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from ssb_tbmd_apis.response_cache import invalidate_response_cache
+from tests.utils.standin import StandinServer
+
+CANDIDATES = [
+    Path(f"$FOB/person/arkiv/personfil/g{year}") for year in range(2000, 2030)
+]
+
+
+@pytest.fixture(autouse=True)
+def probe_workers() -> Iterator[None]:
+    """Give every test its own probe threads."""
+    tv.set_probe_workers(8)
+    yield
+    tv.set_probe_workers(8)
+
+
+class _Probe:
+    """Answers for the hits after a delay, counting the probes and how many overlap."""
+
+    def __init__(self, hits: dict[int, float], delay: float = 0.02) -> None:
+        self.hits = hits
+        self.delay = delay
+        self.started: list[Path] = []
+        self.in_flight = self.most_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, variation: Path) -> OrderedDict[str, Any] | None:
+        index = CANDIDATES.index(variation)
+        with self._lock:
+            self.started.append(variation)
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        time.sleep(self.hits.get(index, self.delay))
+        with self._lock:
+            self.in_flight -= 1
+        return OrderedDict(index=index) if index in self.hits else None
+
+
+def test_returns_the_first_hit_in_order_not_the_fastest() -> None:
+    probe = _Probe({5: 0.1, 6: 0.0})
+    result = tv._first_hit(CANDIDATES, probe, 4, "g2005")
+    assert result == (OrderedDict(index=5), CANDIDATES[5])
+
+
+def test_drops_the_probes_after_the_hit() -> None:
+    probe = _Probe({3: 0.05})
+    assert tv._first_hit(CANDIDATES, probe, 4, "g2003") is not None
+    # The window after the hit was submitted, but not all the candidates
+    assert len(probe.started) <= 3 + 4
+    assert probe.most_in_flight <= 4
+
+
+def test_no_hit() -> None:
+    probe = _Probe({}, delay=0.0)
+    assert tv._first_hit(CANDIDATES, probe, 8, "nothing") is None
+    assert len(probe.started) == len(CANDIDATES)
+
+
+def test_errors_are_raised() -> None:
+    def probe(variation: Path) -> OrderedDict[str, Any] | None:
+        if variation == CANDIDATES[2]:
+            raise ConnectionError("reset")
+        return None
+
+    with pytest.raises(ConnectionError):
+        tv._first_hit(CANDIDATES, probe, 4, "g2002")
+
+
+def test_global_limit() -> None:
+    tv.set_probe_workers(2)
+    probe = _Probe({20: 0.0}, delay=0.01)
+    threads = [
+        threading.Thread(target=tv._first_hit, args=(CANDIDATES, probe, 8, "g2020"))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert probe.most_in_flight <= 2
+    with pytest.raises(ValueError, match="workers"):
+        tv.set_probe_workers(0)
+
+
+def test_async_returns_the_first_hit_and_cancels_the_rest() -> None:
+    started: list[int] = []
+    cancelled: list[int] = []
+
+    async def probe(variation: Path) -> OrderedDict[str, Any] | None:
+        index = CANDIDATES.index(variation)
+        started.append(index)
+        try:
+            await asyncio.sleep(0.1 if index in (5, 8) else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        if index == 7:
+            raise ConnectionError("never waited for")
+        return OrderedDict(index=index) if index in (5, 6) else None
+
+    result = asyncio.run(atv._first_hit(CANDIDATES, probe, 4, "g2005"))
+    assert result == (OrderedDict(index=5), CANDIDATES[5])
+    # 6 and 7 were done by then, 8 was still in flight
+    assert max(started) == 8
+    assert cancelled == [8]
+
+
+@pytest.fixture
+def standin(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Any]:
+    """A stand-in server with some latency, without the dollar-stammer of the host."""
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(tv, "get_stamme_registry", lambda: StammeRegistry({}))
+    server = StandinServer(latency=0.03)
+    for service, url in server.wsdl_urls().items():
+        monkeypatch.setitem(zc.WSDLS, service, url)
+    zc.close_zeep_clients()
+    yield server
+    zc.close_zeep_clients()
+    server.shutdown()
+
+
+def _probes_until(path: Path, target: Path) -> int:
+    return list(tv.datadok_path_candidates(path)).index(target) + 1
+
+
+def test_parallel_probes_against_the_standin(standin: StandinServer) -> None:
+    path = Path("$STANDIN/arkiv/personfil/g2023")
+    target = Path("$STANDIN/arkiv/personfil/g2021")
+    probes = _probes_until(path, target)
+    assert probes > 10
+    zc.get_cached_client("datadok")
+
+    start = time.perf_counter()
+    assert tv.try_zeep_serialize_path(path)[1] == target
+    sequential = time.perf_counter() - start
+    assert standin.calls["datadok", "GetFileDescriptionByPath"] == probes
+
+    invalidate_response_cache()
+    standin.calls.clear()
+    start = time.perf_counter()
+    assert tv.try_zeep_serialize_path(path, parallel_probes=4)[1] == target
+    parallel = time.perf_counter() - start
+    # At most the probes after the hit in the window
+    assert standin.calls["datadok", "GetFileDescriptionByPath"] <= probes + 3
+    assert parallel < sequential / 2
+
+    with pytest.raises(ValueError, match="parallel_probes"):
+        tv.try_zeep_serialize_path(path, parallel_probes=0)
+
+
+def test_async_parallel_probes_against_the_standin(standin: StandinServer) -> None:
+    async def main() -> Any:
+        async with azc.AsyncZeepClientRegistry(max_concurrency=4):
+            return await atv.try_zeep_serialize_path(
+                Path("$STANDIN/arkiv/bedriftsfil/g2022"), parallel_probes=4
+            )
+
+    _, path = asyncio.run(main())
+    assert path == Path("$STANDIN/arkiv/bedriftsfil/g2021g2022")
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import ssb_tbmd_apis.aio.zeep_client as azc
+import ssb_tbmd_apis.paths.path_index as pi
+import ssb_tbmd_apis.paths.try_variations as tv
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.aio.try_variations import (
+    try_zeep_serialize_path as atry_zeep_serialize_path,
+)
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from tests.utils.standin import StandinServer
+
+ORACLE_PATHS = {
+    ("FOB", "person"): [
+        "$FOB/person/arkiv/personfil/g2001.dat",
+        "$FOB/person/arkiv/personfil/g2002g2003.dat",
+    ],
+    ("STANDIN", "arkiv"): [
+        "$STANDIN/arkiv/personfil/g2021",
+        "$STANDIN/arkiv/bedriftsfil/g2021g2022.dat",
+    ],
+    ("STANDIN_PII", "arkiv"): ["$STANDIN_PII/arkiv/personfil/g2022"],
+}
+
+
+@pytest.fixture
+def oracle(monkeypatch: pytest.MonkeyPatch) -> Iterator[list[tuple[str, str]]]:
+    """A fresh index, listing the paths from ORACLE_PATHS instead of Oracle."""
+    queries: list[tuple[str, str]] = []
+
+    def paths_in_substamme(
+        pair: tuple[str, str], database: str, password: str | None
+    ) -> list[str]:
+        assert (database, password) == ("DB1", "secret")
+        queries.append(pair)
+        return ORACLE_PATHS.get(pair, [])
+
+    monkeypatch.setattr(pi, "paths_in_substamme", paths_in_substamme)
+    monkeypatch.setattr(pi, "_PATH_INDEX", pi.DatadokPathIndex())
+    monkeypatch.setattr(tv, "get_stamme_registry", lambda: StammeRegistry({}))
+    pi.set_resolution_mode("oracle", database="DB1", password="secret")
+    yield queries
+    pi.set_resolution_mode(None)
+
+
+def test_resolution_mode(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("SSB_TBMD_ORACLE_DB", raising=False)
+    monkeypatch.setenv("SSB_TBMD_RESOLUTION_MODE", "ORACLE")
+    assert pi.get_resolution_mode() == "oracle"
+    assert pi.get_index_database() is None
+    monkeypatch.setenv("SSB_TBMD_ORACLE_DB", "DB2")
+    assert pi.get_index_database() == "DB2"
+    pi.set_resolution_mode("probe", database="DB1")
+    assert pi.get_resolution_mode() == "probe"
+    assert pi.get_index_database() == "DB1"
+    pi.set_resolution_mode(None)
+    monkeypatch.setenv("SSB_TBMD_RESOLUTION_MODE", "guess")
+    with pytest.raises(ValueError, match="resolution mode"):
+        pi.get_resolution_mode()
+    with pytest.raises(ValueError, match="resolution mode"):
+        pi.set_resolution_mode("guess")
+
+
+def test_finds_the_first_candidate_in_the_index(
+    oracle: list[tuple[str, str]],
+) -> None:
+    candidates = tv.datadok_path_candidates(Path("$FOB/person/arkiv/personfil/g2002"))
+    assert pi.find_indexed_candidate(candidates) == Path(
+        "$FOB/person/arkiv/personfil/g2002g2003"
+    )
+    assert pi.find_indexed_candidate(
+        [Path("$FOB/person/arkiv/personfil/G2001.txt")]
+    ) == Path("$FOB/person/arkiv/personfil/G2001.txt")
+    assert pi.find_indexed_candidate([Path("$FOB/person/arkiv/annen/g2001")]) is None
+    # Listed once
+    assert oracle == [("FOB", "person")]
+
+
+def test_unavailable_without_a_stamme_or_database(
+    oracle: list[tuple[str, str]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    with pytest.raises(pi.PathIndexUnavailable, match="dollar-stamme"):
+        pi.find_indexed_candidate([Path("/ssb/stamme01/fob/g2001")])
+    monkeypatch.delenv("SSB_TBMD_ORACLE_DB", raising=False)
+    pi.set_resolution_mode("oracle")
+    with pytest.raises(pi.PathIndexUnavailable, match="No Oracle database"):
+        pi.find_indexed_candidate([Path("$FOB/person/arkiv/personfil/g2001")])
+    # Without a password, rather than asking for one
+    monkeypatch.delenv("SSB_TBMD_ORACLE_PASSWORD", raising=False)
+    pi.set_resolution_mode("oracle", database="DB1")
+    with pytest.raises(pi.PathIndexUnavailable, match="No Oracle password"):
+        pi.find_indexed_candidate([Path("$FOB/person/arkiv/personfil/g2001")])
+    monkeypatch.setenv("SSB_TBMD_ORACLE_PASSWORD", "secret")
+    assert pi.get_index_password() == "secret"
+    assert pi.find_indexed_candidate([Path("$FOB/person/arkiv/personfil/g2001")])
+
+
+def test_failures_are_retried_later(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[int] = []
+
+    def paths_in_substamme(
+        pair: tuple[str, str], database: str, password: str | None
+    ) -> list[str]:
+        calls.append(1)
+        raise ConnectionError("ORA-12541: TNS:no listener")
+
+    monkeypatch.setattr(pi, "paths_in_substamme", paths_in_substamme)
+    index = pi.DatadokPathIndex(retry_after=0)
+    for _ in range(2):
+        with pytest.raises(pi.PathIndexUnavailable):
+            index.paths(("FOB", "person"), "DB1")
+    assert len(calls) == 2
+    index.retry_after = 60
+    with pytest.raises(pi.PathIndexUnavailable, match="failed recently"):
+        index.paths(("FOB", "person"), "DB1")
+    assert len(calls) == 2
+    index.clear()
+    with pytest.raises(pi.PathIndexUnavailable):
+        index.paths(("FOB", "person"), "DB1")
+    assert len(calls) == 3
+
+
+def test_empty_listing_is_a_failure(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(pi, "paths_in_substamme", lambda pair, database, password: [])
+    index = pi.DatadokPathIndex()
+    with pytest.raises(pi.PathIndexUnavailable):
+        index.find([Path("$FOB/person/arkiv/personfil/g2001")], "DB1")
+    with pytest.raises(pi.PathIndexUnavailable, match="failed recently"):
+        index.paths(("FOB", "person"), "DB1")
+
+
+def test_slow_listing_holds_up_only_its_substamme(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    started, release = threading.Event(), threading.Event()
+
+    def paths_in_substamme(
+        pair: tuple[str, str], database: str, password: str | None
+    ) -> list[str]:
+        if pair == ("FOB", "person"):
+            started.set()
+            release.wait(5)
+        return [f"${pair[0]}/{pair[1]}/arkiv/fil/g2001"]
+
+    monkeypatch.setattr(pi, "paths_in_substamme", paths_in_substamme)
+    index = pi.DatadokPathIndex()
+    slow = threading.Thread(target=index.paths, args=(("FOB", "person"), "DB1"))
+    slow.start()
+    try:
+        assert started.wait(5)
+        assert index.paths(("UTD", "nudb"), "DB1") == frozenset(
+            {"$utd/nudb/arkiv/fil/g2001"}
+        )
+    finally:
+        release.set()
+        slow.join()
+
+
+def test_old_paths_are_listed_again(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        pi, "paths_in_substamme", lambda pair, database, password: ["$A/b/c"]
+    )
+    index = pi.DatadokPathIndex(max_age=0)
+    assert index.paths(("A", "b"), "DB1") == frozenset({"$a/b/c"})
+    index.paths(("A", "b"), "DB1")
+    assert index.queries == 2
+
+
+@pytest.fixture
+def standin(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Any]:
+    """A stand-in server, answering for the paths in ORACLE_PATHS."""
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path / "cache"))
+    server = StandinServer()
+    for service, url in server.wsdl_urls().items():
+        monkeypatch.setitem(zc.WSDLS, service, url)
+    zc.close_zeep_clients()
+    yield server
+    zc.close_zeep_clients()
+    server.shutdown()
+
+
+def test_one_soap_call_for_the_hit(
+    oracle: list[tuple[str, str]], standin: StandinServer
+) -> None:
+    # Probing would try g2022 and its variations before g2021
+    result, path = tv.try_zeep_serialize_path(Path("$STANDIN/arkiv/personfil/g2022"))
+    assert path == Path("$STANDIN/arkiv/personfil/g2021")
+    assert result["Title"]["_value_1"] == "$STANDIN/arkiv/personfil/g2021"
+    assert standin.calls["datadok", "GetFileDescriptionByPath"] == 1
+
+
+def test_probes_when_the_index_has_no_match(
+    oracle: list[tuple[str, str]], standin: StandinServer
+) -> None:
+    # Oracle has g2021, which is not a variation of g2020
+    _, path = tv.try_zeep_serialize_path(Path("$STANDIN/arkiv/personfil/g2020"))
+    assert path == Path("$STANDIN/arkiv/personfil/g2020")
+    assert standin.calls["datadok", "GetFileDescriptionByPath"] == 1
+
+
+def test_probes_when_oracle_is_unavailable(
+    oracle: list[tuple[str, str]],
+    standin: StandinServer,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def unavailable(
+        pair: tuple[str, str], database: str, password: str | None
+    ) -> list[str]:
+        raise ImportError("No module named 'oracledb'")
+
+    monkeypatch.setattr(pi, "paths_in_substamme", unavailable)
+    _, path = tv.try_zeep_serialize_path(Path("$STANDIN/arkiv/personfil/g2020"))
+    assert path == Path("$STANDIN/arkiv/personfil/g2020")
+    assert standin.calls["datadok", "GetFileDescriptionByPath"] == 1
+    # The next path is probed without asking Oracle again
+    _, path = tv.try_zeep_serialize_path(Path("$STANDIN/arkiv/personfil/g2021.dat"))
+    assert path == Path("$STANDIN/arkiv/personfil/g2021")
+    assert standin.calls["datadok", "GetFileDescriptionByPath"] == 2
+
+
+def test_probes_when_the_index_is_wrong(
+    oracle: list[tuple[str, str]],
+    standin: StandinServer,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setitem(
+        ORACLE_PATHS, ("STANDIN", "arkiv"), ["$STANDIN/arkiv/personfil/g2020g2025"]
+    )
+    _, path = tv.try_zeep_serialize_path(Path("$STANDIN/arkiv/personfil/g2020"))
+    assert path == Path("$STANDIN/arkiv/personfil/g2020")
+    assert standin.calls["datadok", "GetFileDescriptionByPath"] == 2
+
+
+def test_async_one_soap_call_for_the_hit(
+    oracle: list[tuple[str, str]], standin: StandinServer
+) -> None:
+    async def main() -> Any:
+        async with azc.AsyncZeepClientRegistry():
+            return await atry_zeep_serialize_path(
+                Path("$STANDIN/arkiv/bedriftsfil/g2021")
+            )
+
+    _, path = asyncio.run(main())
+    assert path == Path("$STANDIN/arkiv/bedriftsfil/g2021g2022")
+    assert standin.calls["datadok", "GetFileDescriptionByPath"] == 1
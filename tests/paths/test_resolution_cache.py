@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import ssb_tbmd_apis.aio.zeep_client as azc
+import ssb_tbmd_apis.paths.path_index as pi
+import ssb_tbmd_apis.paths.resolution_cache as rc
+import ssb_tbmd_apis.paths.try_variations as tv
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.aio.try_variations import (
+    try_zeep_serialize_path as atry_zeep_serialize_path,
+)
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from ssb_tbmd_apis.response_cache import invalidate_response_cache
+from tests.utils.standin import StandinServer
+
+OP = "GetFileDescriptionByPath"
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_resolutions_and_misses_expire(tmp_path: Path) -> None:
+    clock = _Clock()
+    cache = rc.ResolutionCache(tmp_path / "r.sqlite", ttl=100, miss_ttl=10, clock=clock)
+    cache.store("datadok", OP, Path("$A/b/g2021"), Path("$A/b/g2020g2021"))
+    cache.store("datadok", OP, Path("$A/b/g1999"), None)
+    cache.store_miss("datadok", OP, Path("$A/b/g2021"))
+    assert cache.lookup("datadok", OP, Path("$A/b/g2021")) == rc.Resolution(
+        Path("$A/b/g2020g2021"), 1000.0
+    )
+    assert cache.lookup("datadok", OP, Path("$A/b/g1999")) == rc.Resolution(
+        None, 1000.0
+    )
+    assert cache.is_miss("datadok", OP, Path("$A/b/g2021"))
+    assert not cache.is_miss("datadok", "GetFileDescription", Path("$A/b/g2021"))
+
+    clock.now += 10
+    assert cache.lookup("datadok", OP, Path("$A/b/g1999")) is None
+    assert not cache.is_miss("datadok", OP, Path("$A/b/g2021"))
+    assert cache.lookup("datadok", OP, Path("$A/b/g2021")) is not None
+    assert cache.purge_expired() == 2
+    clock.now += 90
+    assert cache.lookup("datadok", OP, Path("$A/b/g2021")) is None
+    assert cache.stats().hits == 3
+    assert cache.stats().size == 1
+    cache.close()
+
+
+def test_persists_between_processes(tmp_path: Path) -> None:
+    cache = rc.ResolutionCache(tmp_path / "r.sqlite")
+    cache.store("datadok", OP, Path("$A/b/g2021"), Path("$A/b/g2021"))
+    cache.close()
+    cache = rc.ResolutionCache(tmp_path / "r.sqlite")
+    assert cache.lookup("datadok", OP, Path("$A/b/g2021")) is not None
+    cache.close()
+
+
+def test_invalidate(tmp_path: Path) -> None:
+    cache = rc.ResolutionCache(tmp_path / "r.sqlite")
+    cache.store("datadok", OP, Path("$A/b/g2021"), Path("$A/b/g2020g2021"))
+    cache.store("datadok", OP, Path("$A/b/g2020"), Path("$A/b/g2020g2021"))
+    cache.store("datadok", OP, Path("$A/b/g1999"), None)
+    cache.store_miss("datadok", OP, Path("$A/b/g2021"))
+    assert cache.invalidate(misses_only=True) == 2
+    assert cache.lookup("datadok", OP, Path("$A/b/g2021")) is not None
+    # Both files resolved to it
+    assert cache.invalidate(Path("$A/b/g2020g2021")) == 2
+    assert cache.stats().size == 0
+    cache.store("datadok", OP, Path("$A/b/g2021"), Path("$A/b/g2021"))
+    assert cache.invalidate(tbmd_service="vardok") == 0
+    assert cache.invalidate(tbmd_service="datadok") == 1
+    cache.close()
+
+
+def test_off_by_default(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(rc, "_enabled", None)
+    monkeypatch.setattr(rc, "_cache", None)
+    monkeypatch.delenv("SSB_TBMD_RESOLUTION_CACHE", raising=False)
+    assert rc.get_resolution_cache() is None
+    assert rc.invalidate_resolutions() == 0
+    monkeypatch.setenv("SSB_TBMD_RESOLUTION_CACHE", "1")
+    cache = rc.get_resolution_cache()
+    assert cache is not None
+    assert cache.path == tmp_path / "resolutions.sqlite"
+    cache.store("datadok", OP, Path("$A/b/g2021"), Path("$A/b/g2021"))
+    rc.disable_resolution_cache()
+    assert rc.get_resolution_cache() is None
+    # The file is there, even if the cache is off
+    assert rc.invalidate_resolutions(Path("$A/b/g2021")) == 1
+
+
+@pytest.fixture
+def standin(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Any]:
+    """A stand-in server, and a resolution cache of its own."""
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(tv, "get_stamme_registry", lambda: StammeRegistry({}))
+    monkeypatch.setattr(rc, "_enabled", None)
+    monkeypatch.setattr(rc, "_cache", None)
+    rc.enable_resolution_cache()
+    server = StandinServer()
+    for service, url in server.wsdl_urls().items():
+        monkeypatch.setitem(zc.WSDLS, service, url)
+    zc.close_zeep_clients()
+    yield server
+    zc.close_zeep_clients()
+    server.shutdown()
+    rc.disable_resolution_cache()
+
+
+def _calls(standin: StandinServer) -> int:
+    calls = standin.calls["datadok", OP]
+    invalidate_response_cache()
+    standin.calls.clear()
+    return calls
+
+
+def test_repeat_resolutions_are_one_call(standin: StandinServer) -> None:
+    path = Path("$STANDIN/arkiv/personfil/g2023")
+    assert tv.try_zeep_serialize_path(path)[1] == Path("$STANDIN/arkiv/personfil/g2021")
+    assert _calls(standin) > 10
+    result, resolved = tv.try_zeep_serialize_path(path)
+    assert resolved == Path("$STANDIN/arkiv/personfil/g2021")
+    assert result["Title"]["_value_1"] == "$STANDIN/arkiv/personfil/g2021"
+    assert _calls(standin) == 1
+
+    # The paths that ended in a Fault are skipped when resolving again
+    rc.invalidate_resolutions(path)
+    assert tv.try_zeep_serialize_path(path)[1] == resolved
+    # The path itself, forgotten with its resolution, and the hit
+    assert _calls(standin) == 2
+
+
+def test_files_not_found_are_remembered(standin: StandinServer) -> None:
+    path = Path("$STANDIN/arkiv/annen/g2022")
+    with pytest.raises(FileNotFoundError, match="Failed looking"):
+        tv.try_zeep_serialize_path(path)
+    assert _calls(standin) > 0
+    with pytest.raises(FileNotFoundError, match="the last time"):
+        tv.try_zeep_serialize_path(path)
+    assert _calls(standin) == 0
+    rc.invalidate_resolutions(misses_only=True)
+    with pytest.raises(FileNotFoundError, match="Failed looking"):
+        tv.try_zeep_serialize_path(path)
+
+
+def test_misses_in_the_path_index_are_not_remembered(
+    standin: StandinServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        pi,
+        "paths_in_substamme",
+        lambda pair, database, password: ["$STANDIN/arkiv/x/g1990"],
+    )
+    monkeypatch.setattr(pi, "_PATH_INDEX", pi.DatadokPathIndex())
+    pi.set_resolution_mode("oracle", database="DB1", password="secret")
+    path = Path("$STANDIN/arkiv/personfil/g2021")
+    try:
+        # Probed, as the index is missing it
+        assert tv.try_zeep_serialize_path(path)[1] == path
+        with pytest.raises(FileNotFoundError, match="Failed looking"):
+            tv.try_zeep_serialize_path(Path("$STANDIN/arkiv/annen/g2021"))
+    finally:
+        pi.set_resolution_mode(None)
+    cache = rc.get_resolution_cache()
+    assert cache is not None
+    known = cache.lookup("datadok", OP, path)
+    assert known is not None and known.resolved == path
+    # Only the miss confirmed by probing is remembered
+    known = cache.lookup("datadok", OP, Path("$STANDIN/arkiv/annen/g2021"))
+    assert known is not None and known.resolved is None
+
+
+def test_moved_files_are_probed_again(standin: StandinServer) -> None:
+    path = Path("$STANDIN/arkiv/personfil/g2020")
+    cache = rc.get_resolution_cache()
+    assert cache is not None
+    cache.store("datadok", OP, path, Path("$STANDIN/arkiv/personfil/g2019g2020"))
+    assert tv.try_zeep_serialize_path(path)[1] == path
+    assert _calls(standin) == 2
+    known = cache.lookup("datadok", OP, path)
+    assert known is not None and known.resolved == path
+    assert cache.is_miss("datadok", OP, Path("$STANDIN/arkiv/personfil/g2019g2020"))
+
+
+def test_async_repeat_resolutions_are_one_call(standin: StandinServer) -> None:
+    async def main() -> Any:
+        async with azc.AsyncZeepClientRegistry():
+            return await atry_zeep_serialize_path(
+                Path("$STANDIN/arkiv/bedriftsfil/g2022")
+            )
+
+    assert asyncio.run(main())[1] == Path("$STANDIN/arkiv/bedriftsfil/g2021g2022")
+    assert _calls(standin) > 1
+    assert asyncio.run(main())[1] == Path("$STANDIN/arkiv/bedriftsfil/g2021g2022")
+    assert _calls(standin) == 1
+
+
+def test_async_lookups_use_the_cache_off_the_event_loop(
+    standin: StandinServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = rc.get_resolution_cache()
+    assert cache is not None
+    on_loop: list[str] = []
+    for name in ("lookup", "store", "is_miss", "store_miss"):
+        method = getattr(cache, name)
+
+        def recording(*args: Any, _name: str = name, _method: Any = method) -> Any:
+            if threading.current_thread() is threading.main_thread():
+                on_loop.append(_name)
+            return _method(*args)
+
+        monkeypatch.setattr(cache, name, recording)
+
+    async def main() -> Any:
+        async with azc.AsyncZeepClientRegistry():
+            return await atry_zeep_serialize_path(
+                Path("$STANDIN/arkiv/bedriftsfil/g2022")
+            )
+
+    assert asyncio.run(main())[1] == Path("$STANDIN/arkiv/bedriftsfil/g2021g2022")
+    assert on_loop == []
+    # The misses were stored all the same
+    assert cache.is_miss("datadok", OP, Path("$STANDIN/arkiv/bedriftsfil/g2022"))
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import ssb_tbmd_apis.cassette as cs
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.operations.operations_vardok import (
+    iter_vardok_concept_variables_by_approved,
+)
+from tests.utils.standin import concept_variables_chunks
+from tests.utils.standin import serve_canned
+from tests.utils.standin import serve_chunked
+from tests.utils.standin import standin_wsdls
+
+
+@pytest.fixture
+def standin(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Any]:
+    """Point the services at a local server, returning a function to start it."""
+    servers = []
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path / "cache"))
+
+    def start(server_and_address: tuple[Any, str]) -> Any:
+        server, address = server_and_address
+        servers.append(server)
+        for service, wsdl in standin_wsdls(address).items():
+            monkeypatch.setitem(zc.WSDLS, service, wsdl)
+        zc.close_zeep_clients()
+        return server
+
+    yield start
+    zc.close_zeep_clients()
+    for server in servers:
+        server.shutdown()
+
+
+def _codelist(codelist_id: int) -> Any:
+    return zc.get_zeep_serialize(
+        "datadok", "GetCodelistById", codelist_id, use_cache=False
+    )
+
+
+def test_record_then_replay(standin: Any, tmp_path: Path) -> None:
+    server = standin(serve_canned())
+    cassette = tmp_path / "cassette"
+    with cs.use_cassette(cassette, mode="record") as transports:
+        recorded = [_codelist(1), _codelist(2)]
+    assert [t.recorded for t in transports] == [2]
+    assert len(list(cassette.glob("*.xml"))) == 2
+    [meta_path, *_] = sorted(cassette.glob("*.json"))
+    meta = json.loads(meta_path.read_text())
+    assert meta["status_code"] == 200
+    assert "GetCodelistById" in meta["request"]
+
+    server.shutdown()
+    with cs.use_cassette(cassette) as transports:
+        assert [_codelist(1), _codelist(2)] == recorded
+        with pytest.raises(cs.CassetteMiss):
+            _codelist(3)
+    assert [t.replayed for t in transports] == [2]
+    # The factory is restored after the block
+    assert zc._transport_factory is None
+
+
+def test_auto_records_only_missing_calls(standin: Any, tmp_path: Path) -> None:
+    standin(serve_canned())
+    with cs.use_cassette(tmp_path, mode="auto") as transports:
+        _codelist(1)
+        _codelist(1)
+    assert (transports[0].recorded, transports[0].replayed) == (1, 1)
+
+
+def test_replay_latency_and_jitter(
+    standin: Any, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    standin(serve_canned())
+    with cs.use_cassette(tmp_path, mode="record"):
+        _codelist(1)
+
+    def delays(seed: int) -> list[float]:
+        slept: list[float] = []
+        monkeypatch.setattr(cs.time, "sleep", slept.append)
+        with cs.use_cassette(tmp_path, latency=0.05, jitter=0.02, seed=seed):
+            for _ in range(5):
+                _codelist(1)
+        return slept
+
+    first = delays(seed=1)
+    assert len(first) == 5
+    assert all(0.03 <= delay <= 0.07 for delay in first)
+    assert len(set(first)) > 1
+    assert delays(seed=1) == first
+
+
+def test_streamed_calls_are_replayed_whole(standin: Any, tmp_path: Path) -> None:
+    standin(serve_chunked(concept_variables_chunks(4)))
+    with cs.use_cassette(tmp_path, mode="record"):
+        recorded = list(iter_vardok_concept_variables_by_approved())
+    with cs.use_cassette(tmp_path):
+        assert list(iter_vardok_concept_variables_by_approved()) == recorded
+    assert len(recorded) == 4
+
+
+def test_bad_settings(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        cs.CassetteTransport(cassette_dir=tmp_path, mode="rewind")
+    with pytest.raises(ValueError):
+        cs.CassetteTransport(cassette_dir=tmp_path, latency=-1)
+
+
+def test_cassette_key() -> None:
+    key = cs.cassette_key("http://x", b"<a/>")
+    assert key == cs.cassette_key("http://x", "<a/>")
+    assert key != cs.cassette_key("http://y", b"<a/>")
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+import zeep
+
+import ssb_tbmd_apis.aio.zeep_client as azc
+import ssb_tbmd_apis.coalesce as co
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.resilience import DeadlineExceeded
+from ssb_tbmd_apis.resilience import deadline_scope
+from tests.utils.standin import StandinServer
+
+
+@pytest.fixture(autouse=True)
+def fresh_single_flight(monkeypatch: pytest.MonkeyPatch) -> Iterator[co.SingleFlight]:
+    """Give every test its own register of calls in flight, with coalescing on."""
+    single_flight = co.SingleFlight()
+    monkeypatch.setattr(co, "_SINGLE_FLIGHT", single_flight)
+    co.set_coalescing(None)
+    monkeypatch.delenv("SSB_TBMD_COALESCE", raising=False)
+    yield single_flight
+    co.set_coalescing(None)
+
+
+def _gated_fetch(gate: threading.Event, calls: list[int], value: Any) -> Any:
+    def fetch() -> Any:
+        calls.append(1)
+        gate.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return {"codes": [1, 2]} if value is None else value
+
+    return fetch
+
+
+def _run_concurrently(
+    callers: int, fetch: Any, gate: threading.Event, key: Any = "key"
+) -> list[Any]:
+    """Call coalesced_call from many threads, opening the gate once all are waiting."""
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        futures = [executor.submit(co.coalesced_call, key, fetch)]
+        while co.coalesce_stats().in_flight == 0:
+            pass
+        futures += [
+            executor.submit(co.coalesced_call, key, fetch) for _ in range(callers - 1)
+        ]
+        while co.coalesce_stats().coalesced < callers - 1:
+            pass
+        gate.set()
+    return futures
+
+
+def test_concurrent_calls_share_one_fetch() -> None:
+    gate, calls = threading.Event(), []
+    futures = _run_concurrently(5, _gated_fetch(gate, calls, None), gate)
+    results = [future.result() for future in futures]
+    assert len(calls) == 1
+    assert all(result == {"codes": [1, 2]} for result in results)
+    # Each caller gets its own copy
+    results[1]["codes"].append(3)
+    assert results[2] == {"codes": [1, 2]}
+    assert co.coalesce_stats() == co.CoalesceStats(calls=1, coalesced=4, in_flight=0)
+
+
+def test_errors_are_shared() -> None:
+    gate, calls = threading.Event(), []
+    futures = _run_concurrently(3, _gated_fetch(gate, calls, ValueError("nope")), gate)
+    for future in futures:
+        with pytest.raises(ValueError, match="nope"):
+            future.result()
+    assert len(calls) == 1
+
+
+def test_later_calls_fetch_again() -> None:
+    calls: list[int] = []
+    gate = threading.Event()
+    gate.set()
+    fetch = _gated_fetch(gate, calls, "value")
+    assert co.coalesced_call("key", fetch) == "value"
+    assert co.coalesced_call("key", fetch) == "value"
+    assert len(calls) == 2
+    assert co.reset_coalesce_stats().calls == 2
+    assert co.coalesce_stats().calls == 0
+
+
+def test_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("SSB_TBMD_COALESCE", "0")
+    assert not co.coalescing_enabled()
+    co.set_coalescing(True)
+    assert co.coalescing_enabled()
+    co.set_coalescing(False)
+    calls: list[int] = []
+    gate = threading.Event()
+    gate.set()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        list(
+            executor.map(
+                lambda _: co.coalesced_call("key", _gated_fetch(gate, calls, "v")),
+                range(3),
+            )
+        )
+    assert len(calls) == 3
+    assert co.coalesce_stats().calls == 0
+
+
+def test_async_calls_share_one_fetch() -> None:
+    calls: list[int] = []
+
+    async def fetch() -> Any:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"codes": [1, 2]}
+
+    async def main() -> list[Any]:
+        return list(
+            await asyncio.gather(*(co.acoalesced_call("key", fetch) for _ in range(5)))
+        )
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert results == [{"codes": [1, 2]}] * 5
+    results[0]["codes"].append(3)
+    assert results[1] == {"codes": [1, 2]}
+    assert co.coalesce_stats() == co.CoalesceStats(calls=1, coalesced=4, in_flight=0)
+
+
+def test_async_errors_are_shared() -> None:
+    async def fetch() -> Any:
+        await asyncio.sleep(0.01)
+        raise ValueError("nope")
+
+    async def main() -> list[Any]:
+        return list(
+            await asyncio.gather(
+                *(co.acoalesced_call("key", fetch) for _ in range(3)),
+                return_exceptions=True,
+            )
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert co.coalesce_stats().calls == 1
+
+
+def test_async_waiters_retry_if_the_call_is_cancelled() -> None:
+    calls: list[int] = []
+
+    async def fetch() -> Any:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main() -> Any:
+        leader = asyncio.ensure_future(co.acoalesced_call("key", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(co.acoalesced_call("key", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(main()) == 2
+    assert co.coalesce_stats().in_flight == 0
+
+
+def test_leader_changing_its_result_leaves_the_waiters_alone() -> None:
+    gate, calls = threading.Event(), []
+    fetch = _gated_fetch(gate, calls, None)
+
+    def leader() -> Any:
+        result = co.coalesced_call("key", fetch)
+        result["codes"].append("MUTATED")
+        return result
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(leader)
+        while co.coalesce_stats().in_flight == 0:
+            pass
+        second = executor.submit(co.coalesced_call, "key", fetch)
+        while co.coalesce_stats().coalesced == 0:
+            pass
+        gate.set()
+    assert first.result() == {"codes": [1, 2, "MUTATED"]}
+    assert second.result() == {"codes": [1, 2]}
+
+
+def test_waiters_get_their_own_error() -> None:
+    gate, calls = threading.Event(), []
+    futures = _run_concurrently(3, _gated_fetch(gate, calls, ValueError("nope")), gate)
+    errors = [future.exception() for future in futures]
+    assert len({id(error) for error in errors}) == 3
+
+
+def test_waiters_keep_to_their_own_deadline() -> None:
+    gate, calls = threading.Event(), []
+    fetch = _gated_fetch(gate, calls, None)
+
+    def waiter() -> Any:
+        with deadline_scope(0.05):
+            return co.coalesced_call("key", fetch)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(co.coalesced_call, "key", fetch)
+        while co.coalesce_stats().in_flight == 0:
+            pass
+        with pytest.raises(DeadlineExceeded):
+            executor.submit(waiter).result(timeout=2)
+        gate.set()
+    assert leader.result() == {"codes": [1, 2]}
+
+
+def test_waiters_call_again_if_the_leader_ran_out_of_time() -> None:
+    gate, calls = threading.Event(), []
+    shared = _gated_fetch(gate, calls, DeadlineExceeded("the leader's deadline"))
+    retried = _gated_fetch(gate, calls, "own")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(co.coalesced_call, "key", shared)
+        while co.coalesce_stats().in_flight == 0:
+            pass
+        waiter = executor.submit(co.coalesced_call, "key", retried)
+        while co.coalesce_stats().coalesced == 0:
+            pass
+        gate.set()
+    with pytest.raises(DeadlineExceeded):
+        leader.result()
+    assert waiter.result() == "own"
+    assert len(calls) == 2
+
+
+def test_async_leader_changing_its_result_leaves_the_waiters_alone() -> None:
+    async def fetch() -> Any:
+        await asyncio.sleep(0.02)
+        return {"a": [1]}
+
+    async def leader() -> Any:
+        result = await co.acoalesced_call("key", fetch)
+        result["a"].append("MUTATED")
+        return result
+
+    async def main() -> list[Any]:
+        return list(await asyncio.gather(leader(), co.acoalesced_call("key", fetch)))
+
+    assert asyncio.run(main()) == [{"a": [1, "MUTATED"]}, {"a": [1]}]
+
+
+def test_async_waiters_keep_to_their_own_deadline() -> None:
+    async def fetch() -> Any:
+        await asyncio.sleep(0.2)
+        return "value"
+
+    async def waiter() -> Any:
+        with deadline_scope(0.02):
+            return await co.acoalesced_call("key", fetch)
+
+    async def main() -> list[Any]:
+        return list(
+            await asyncio.gather(
+                co.acoalesced_call("key", fetch), waiter(), return_exceptions=True
+            )
+        )
+
+    leader, waited = asyncio.run(main())
+    assert leader == "value"
+    assert isinstance(waited, DeadlineExceeded)
+
+
+@pytest.fixture
+def standin(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Any]:
+    """A stand-in server answering slowly enough for the calls to overlap."""
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path / "cache"))
+    server = StandinServer(latency=0.1, list_size=2)
+    for service, url in server.wsdl_urls().items():
+        monkeypatch.setitem(zc.WSDLS, service, url)
+    zc.close_zeep_clients()
+    yield server
+    zc.close_zeep_clients()
+    server.shutdown()
+
+
+def test_serialize_many_shares_duplicate_calls(standin: StandinServer) -> None:
+    args_list = [(1,), (2,), (1,), (1,), (2,), ("unknown/path",)]
+    results = zc.get_zeep_serialize_many(
+        "datadok", "GetCodelistById", args_list, max_workers=6
+    )
+    assert [result["id"] for result in results[:5]] == [
+        f"urn:ssb:codelist:datadok:{args[0]}" for args in args_list[:5]
+    ]
+    assert standin.calls["datadok", "GetCodelistById"] == 3
+    assert co.coalesce_stats().coalesced == 3
+
+
+def test_serialize_many_shares_faults(standin: StandinServer) -> None:
+    args_list = [("$UKJENT/a",)] * 4
+    results = zc.get_zeep_serialize_many(
+        "datadok", "GetFileDescriptionByPath", args_list, max_workers=4
+    )
+    assert all(isinstance(result, zeep.exceptions.Fault) for result in results)
+    assert standin.calls["datadok", "GetFileDescriptionByPath"] == 1
+
+
+def test_async_serialize_many_shares_duplicate_calls(standin: StandinServer) -> None:
+    async def main() -> list[Any]:
+        async with azc.AsyncZeepClientRegistry(max_concurrency=10):
+            return await azc.get_zeep_serialize_many(
+                "vardok", "GetConceptVariableById", [(7,), (7,), (8,), (7,)]
+            )
+
+    results = asyncio.run(main())
+    assert [result["Name"]["_value_1"] for result in results] == [
+        "Variabel 7",
+        "Variabel 7",
+        "Variabel 8",
+        "Variabel 7",
+    ]
+    assert standin.calls["vardok", "GetConceptVariableById"] == 2
+    assert co.coalesce_stats().coalesced == 2
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import sqlite3
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import ssb_tbmd_apis.response_cache as rc
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.disk_cache import DiskResponseCache
+from ssb_tbmd_apis.disk_cache import disable_disk_cache
+from ssb_tbmd_apis.disk_cache import enable_disk_cache
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from ssb_tbmd_apis.paths.try_variations import try_zeep_serialize_path
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def calls(monkeypatch: pytest.MonkeyPatch) -> list[tuple[Any, ...]]:
+    """Record the calls that reach the service."""
+    made: list[tuple[Any, ...]] = []
+
+    def fake_call_operation(tbmd_service: str, operation: str, *args: Any) -> Any:
+        made.append((tbmd_service, operation, *args))
+        return OrderedDict(id=str(args[0]), Title={"_value_1": "Kirkesamfunn"})
+
+    monkeypatch.setattr(zc, "_call_operation", fake_call_operation)
+    monkeypatch.setattr(zc, "_serialize_object_ntc", lambda obj: obj)
+    return made
+
+
+@pytest.fixture
+def offline() -> Iterator[None]:
+    rc.set_offline_mode(True)
+    yield
+    rc.set_offline_mode(None)
+
+
+def test_round_trip_compressed(tmp_path: Path) -> None:
+    cache = DiskResponseCache(tmp_path / "responses.sqlite")
+    key = rc.response_cache_key("datadok", "GetCodelistById", 228589)
+    value = OrderedDict(id="228589", Codes={"Code": [OrderedDict(CodeValue="17")]})
+    cache.set(key, value)
+
+    assert cache.get(key) == value
+    assert isinstance(cache.get(key), OrderedDict)
+    assert cache.get(rc.response_cache_key("datadok", "GetCodelistById", 1)) is None
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (2, 1, 1)
+
+    with sqlite3.connect(tmp_path / "responses.sqlite") as conn:
+        (payload,) = conn.execute("SELECT payload FROM responses").fetchone()
+    assert b"228589" not in payload  # zlib-compressed
+
+
+def test_shared_between_instances_like_processes(tmp_path: Path) -> None:
+    key = rc.response_cache_key("vardok", "GetConceptVariableById", "1")
+    DiskResponseCache(tmp_path / "r.sqlite").set(key, {"id": "1"})
+    assert DiskResponseCache(tmp_path / "r.sqlite").get(key) == {"id": "1"}
+
+
+def test_ttl_and_purge(tmp_path: Path) -> None:
+    clock = _Clock()
+    cache = DiskResponseCache(
+        tmp_path / "r.sqlite",
+        ttl=100,
+        operation_ttls={"GetCodelists": 1000, "GetFileDescriptionByPath": 0},
+        clock=clock,
+    )
+    short = rc.response_cache_key("metadb", "GetCodelistById", 1)
+    long = rc.response_cache_key("metadb", "GetCodelists")
+    never = rc.response_cache_key("datadok", "GetFileDescriptionByPath", "$UTD/x")
+    for key in (short, long, never):
+        cache.set(key, {"key": list(key)})
+    assert cache.get(never) is None
+
+    clock.now += 100
+    assert cache.get(short) is None
+    assert cache.get(long) is not None
+    assert cache.purge_expired() == 1
+    assert cache.stats().size == 1
+
+
+def test_invalidate(tmp_path: Path) -> None:
+    cache = DiskResponseCache(tmp_path / "r.sqlite")
+    for service, operation in [
+        ("datadok", "GetCodelistById"),
+        ("datadok", "GetContextVariableById"),
+        ("metadb", "GetCodelistById"),
+    ]:
+        cache.set(rc.response_cache_key(service, operation, 1), {"id": 1})
+
+    assert cache.invalidate(operation="GetCodelistById") == 2
+    assert cache.invalidate("DATADOK") == 1
+    assert cache.stats().size == 0
+
+
+def test_enabled_behind_memory(tmp_path: Path, calls: list[tuple[Any, ...]]) -> None:
+    disk = enable_disk_cache(tmp_path / "r.sqlite")
+    try:
+        cache = rc.get_response_cache()
+        assert isinstance(cache, rc.TieredResponseCache)
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+        assert disk.stats().size == 1
+
+        # A new process starts with an empty memory cache, but the disk remembers
+        rc.set_response_cache(rc.TieredResponseCache(rc.ResponseCache(), disk))
+        assert zc.get_zeep_serialize("datadok", "GetCodelistById", 1)["id"] == "1"
+        assert len(calls) == 1
+
+        assert rc.invalidate_response_cache("datadok") == 1
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+        assert len(calls) == 2
+    finally:
+        disable_disk_cache()
+    assert isinstance(rc.get_response_cache(), rc.ResponseCache)
+
+
+def test_enabled_from_environment(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("SSB_TBMD_DISK_CACHE", "1")
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(rc, "_RESPONSE_CACHE", None)
+    cache = rc.get_response_cache()
+    assert isinstance(cache, rc.TieredResponseCache)
+    assert isinstance(cache.tiers[1], DiskResponseCache)
+    assert cache.tiers[1].path == tmp_path / "responses.sqlite"
+    cache.tiers[1].close()
+
+
+def test_offline_serves_stale_and_raises_on_miss(
+    tmp_path: Path, calls: list[tuple[Any, ...]], offline: None
+) -> None:
+    clock = _Clock()
+    disk = DiskResponseCache(tmp_path / "r.sqlite", ttl=10, clock=clock)
+    rc.set_response_cache(rc.TieredResponseCache(rc.ResponseCache(), disk))
+    disk.set(rc.response_cache_key("datadok", "GetCodelistById", 1), {"id": "1"})
+    clock.now += 1000
+
+    assert zc.get_zeep_serialize("datadok", "GetCodelistById", 1) == {"id": "1"}
+    with pytest.raises(rc.ResponseCacheMiss):
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 2)
+    with pytest.raises(rc.ResponseCacheMiss):
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 1, use_cache=False)
+    assert calls == []
+
+
+def test_offline_path_lookup(
+    calls: list[tuple[Any, ...]], offline: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import ssb_tbmd_apis.paths.try_variations as tv
+
+    monkeypatch.setattr(tv, "get_stamme_registry", lambda: StammeRegistry({}))
+    with pytest.raises(FileNotFoundError):
+        try_zeep_serialize_path(Path("$UTD/nudb/arkiv/test/g2020"))
+    cached = Path("$UTD/nudb/arkiv/test/g2019")
+    rc.get_response_cache().set(
+        rc.response_cache_key("datadok", "GetFileDescriptionByPath", str(cached)),
+        {"id": "found"},
+    )
+    result, path = try_zeep_serialize_path(Path("$UTD/nudb/arkiv/test/g2020"))
+    assert result == {"id": "found"}
+    assert path == cached
+    assert calls == []
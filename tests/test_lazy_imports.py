@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+import ssb_tbmd_apis
+from ssb_tbmd_apis.paths import try_variations
+
+HEAVY = ("zeep", "lxml", "requests", "pandas", "fagfunksjoner", "oracledb", "colorama")
+
+
+def imported_by(statement: str) -> dict[str, int]:
+    """Run the statement in a fresh interpreter, timing each import in µs."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import ssb_tbmd_apis",
+        "from ssb_tbmd_apis import swap_dollar_sign, linux_stammer",
+        "import ssb_tbmd_apis.paths.try_variations",
+        "import ssb_tbmd_apis.tbmd_logger",
+        "import ssb_tbmd_apis.oracle_direct.oracle_paths",
+        "import ssb_tbmd_apis.imports.datadok_open_flatfile",
+    ],
+)
+def test_no_heavy_imports(statement: str) -> None:
+    heavy = [name for name in imported_by(statement) if name.split(".")[0] in HEAVY]
+    assert heavy == []
+
+
+def test_lazy_attributes() -> None:
+    assert ssb_tbmd_apis.swap_dollar_sign is try_variations.swap_dollar_sign
+    assert "swap_dollar_sign" in dir(ssb_tbmd_apis)
+    assert set(ssb_tbmd_apis.__all__) <= set(dir(ssb_tbmd_apis))
+    with pytest.raises(AttributeError):
+        ssb_tbmd_apis.not_a_function  # noqa: B018
+
+
+def test_lazy_attributes_all_resolve() -> None:
+    for name in ssb_tbmd_apis.__all__:
+        assert callable(getattr(ssb_tbmd_apis, name))
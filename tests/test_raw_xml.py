@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+import zeep
+
+import ssb_tbmd_apis.aio.zeep_client as azc
+import ssb_tbmd_apis.operations.operations_vardok as ov
+import ssb_tbmd_apis.raw_xml as rx
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.response_cache import ResponseCacheMiss
+from ssb_tbmd_apis.response_cache import get_response_cache
+from ssb_tbmd_apis.response_cache import response_cache_key
+from ssb_tbmd_apis.response_cache import set_offline_mode
+from tests.utils.standin import CODELIST_RESPONSE
+from tests.utils.standin import CannedTransport
+from tests.utils.standin import concept_variables_chunks
+from tests.utils.standin import file_description_response
+from tests.utils.standin import serve_chunked
+from tests.utils.standin import soap_envelope
+from tests.utils.standin import standin_wsdls
+
+NS = 'xmlns="urn:ssb:tbmd:standin:datadok"'
+XSI = 'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+
+PARITY_CASES = {
+    "codelist": ("GetCodelistById", CODELIST_RESPONSE),
+    "file_description": ("GetFileDescriptionByPath", file_description_response(25)),
+    "sparse": (
+        "GetFileDescriptionByPath",
+        soap_envelope(
+            f"<GetFileDescriptionByPathResponse {NS}><GetFileDescriptionByPathResult>"
+            '<Title lang="en"/><Description></Description>'
+            '<ContextVariable id="1"><Properties/><Codelist><Codes/></Codelist>'
+            "</ContextVariable>"
+            "<ContextVariable><Title>\n  spaced  \n</Title><Properties>"
+            "<Length>3</Length></Properties></ContextVariable>"
+            "</GetFileDescriptionByPathResult></GetFileDescriptionByPathResponse>"
+        ),
+    ),
+    "list": (
+        "GetCodelists",
+        soap_envelope(
+            f"<GetCodelistsResponse {NS}><GetCodelistsResult>"
+            + "".join(
+                f'<CodelistReference id="{i}"><Title>Liste {i}</Title>'
+                "</CodelistReference>"
+                for i in range(5)
+            )
+            + "</GetCodelistsResult></GetCodelistsResponse>"
+        ),
+    ),
+    "empty_list": (
+        "GetCodelists",
+        soap_envelope(
+            f"<GetCodelistsResponse {NS}><GetCodelistsResult/></GetCodelistsResponse>"
+        ),
+    ),
+    "no_result": (
+        "GetCodelistById",
+        soap_envelope(f"<GetCodelistByIdResponse {NS}/>"),
+    ),
+    "xsi_nil_falls_back": (
+        "GetCodelistById",
+        soap_envelope(
+            f"<GetCodelistByIdResponse {NS} {XSI}><GetCodelistByIdResult>"
+            '<CodelistMeta xsi:nil="true"/></GetCodelistByIdResult>'
+            "</GetCodelistByIdResponse>"
+        ),
+    ),
+}
+
+FAULT_RESPONSE = soap_envelope(
+    "<soap:Fault><faultcode>soap:Server</faultcode>"
+    "<faultstring>Fant ikke filbeskrivelse</faultstring></soap:Fault>"
+)
+
+
+def _client(content: bytes, status_code: int = 200) -> Any:
+    transport = CannedTransport(content=content, status_code=status_code)
+    return zeep.Client(standin_wsdls()["datadok"], transport=transport)
+
+
+@pytest.mark.parametrize("case", PARITY_CASES)
+def test_parity_with_zeep(case: str) -> None:
+    operation, content = PARITY_CASES[case]
+    client = _client(content)
+    args = () if operation == "GetCodelists" else ("x",)
+    expected = zc._serialize_object_ntc(getattr(client.service, operation)(*args))
+    result = rx.call_raw(client, operation, *args)
+    assert result == expected
+    # OrderedDict equality also compares the order of the keys
+    assert type(result) is type(expected)
+
+
+def test_plans_are_built_once_per_operation() -> None:
+    client = _client(CODELIST_RESPONSE)
+    operation = client.service._binding.get("GetCodelistById")
+    rx.call_raw(client, "GetCodelistById", 1)
+    plan = rx._plans[operation]
+    assert plan is not None
+    assert [element.name for element in plan.elements] == ["GetCodelistByIdResult"]
+    rx.call_raw(client, "GetCodelistById", 2)
+    assert rx._plans[operation] is plan
+
+
+def test_faults_are_raised_like_zeep() -> None:
+    client = _client(FAULT_RESPONSE, status_code=500)
+    with pytest.raises(zeep.exceptions.Fault, match="Fant ikke filbeskrivelse"):
+        rx.call_raw(client, "GetFileDescriptionByPath", "$UTD/x")
+
+
+def test_parse_mode(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert rx.get_parse_mode() == "zeep"
+    monkeypatch.setenv("SSB_TBMD_PARSE_MODE", "RAW")
+    assert rx.get_parse_mode() == "raw"
+    rx.set_parse_mode("zeep")
+    assert rx.get_parse_mode() == "zeep"
+    rx.set_parse_mode(None)
+    with pytest.raises(ValueError):
+        rx.set_parse_mode("lxml")
+    monkeypatch.setenv("SSB_TBMD_PARSE_MODE", "lxml")
+    with pytest.raises(ValueError):
+        rx.get_parse_mode()
+
+
+@pytest.fixture
+def raw_mode(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[None]:
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path))
+    monkeypatch.setitem(zc.WSDLS, "datadok", standin_wsdls()["datadok"])
+    rx.set_parse_mode("raw")
+    zc.close_zeep_clients()
+    yield
+    rx.set_parse_mode(None)
+    zc.close_zeep_clients()
+
+
+def test_get_zeep_serialize_in_raw_mode(
+    raw_mode: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    content = file_description_response(3)
+    monkeypatch.setattr(
+        zc, "_mk_transport", lambda session: CannedTransport(content=content)
+    )
+    monkeypatch.setattr(
+        zc, "_call_operation", lambda *args: pytest.fail("zeep path used")
+    )
+    result = zc.get_zeep_serialize("datadok", "GetFileDescriptionByPath", "$UTD/x")
+    assert isinstance(result, OrderedDict)
+    assert [v["Title"]["_value_1"] for v in result["ContextVariable"]] == [
+        "VAR0",
+        "VAR1",
+        "VAR2",
+    ]
+
+
+def test_async_raw_mode(raw_mode: None, monkeypatch: pytest.MonkeyPatch) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200, content=CODELIST_RESPONSE, headers={"Content-Type": "text/xml"}
+        )
+
+    monkeypatch.setitem(azc.WSDLS, "datadok", standin_wsdls()["datadok"])
+    monkeypatch.setattr(
+        azc,
+        "_mk_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+    async def main() -> Any:
+        async with azc.AsyncZeepClientRegistry():
+            return await azc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+
+    result = asyncio.run(main())
+    client = _client(CODELIST_RESPONSE)
+    assert result == zc._serialize_object_ntc(client.service.GetCodelistById(1))
+
+
+@pytest.fixture
+def vardok_server(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> Iterator[tuple[list[bytes], threading.Event]]:
+    chunks = concept_variables_chunks(10)
+    gate = threading.Event()
+    server, address = serve_chunked(chunks, gate)
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path))
+    monkeypatch.setitem(zc.WSDLS, "vardok", standin_wsdls(address)["vardok"])
+    zc.close_zeep_clients()
+    yield chunks, gate
+    gate.set()
+    zc.close_zeep_clients()
+    server.shutdown()
+
+
+def test_iter_raw_yields_before_the_response_is_complete(
+    vardok_server: tuple[list[bytes], threading.Event],
+) -> None:
+    _, gate = vardok_server
+    items = ov.iter_vardok_concept_variables_by_approved()
+    first = next(items)
+    # The server holds back the end of the envelope until the gate is set
+    assert not gate.is_set()
+    assert first["id"] == "urn:ssb:conceptvariable:vardok:0"
+    gate.set()
+    assert [item["id"][-1] for item in items] == list("123456789")
+
+
+def test_iter_raw_parity_with_zeep(
+    vardok_server: tuple[list[bytes], threading.Event],
+) -> None:
+    chunks, gate = vardok_server
+    gate.set()
+    client = zeep.Client(
+        standin_wsdls()["vardok"], transport=CannedTransport(content=b"".join(chunks))
+    )
+    expected = zc._serialize_object_ntc(
+        client.service.GetConceptVariablesByApproved("internal")
+    )
+    result = list(ov.iter_vardok_concept_variables_by_approved(internal=True))
+    assert result == expected
+    assert result[1]["OwnerSection"] == 301
+    assert result[1]["Sensitive"] is True
+    assert result[0]["LastChangedDate"].year == 2024
+    assert all(type(item) is OrderedDict for item in result)
+
+
+@pytest.mark.parametrize(
+    ("content", "expected"),
+    [
+        (
+            soap_envelope(
+                '<GetConceptVariablesByOwnerResponse xmlns="urn:ssb:tbmd:standin:vardok">'
+                "<GetConceptVariablesByOwnerResult/></GetConceptVariablesByOwnerResponse>"
+            ),
+            [],
+        ),
+        (
+            soap_envelope(
+                '<GetConceptVariablesByOwnerResponse xmlns="urn:ssb:tbmd:standin:vardok"/>'
+            ),
+            [],
+        ),
+    ],
+    ids=["empty_result", "no_result"],
+)
+def test_iter_raw_empty(content: bytes, expected: list[Any]) -> None:
+    server, address = serve_chunked([content])
+    try:
+        client = zeep.Client(
+            standin_wsdls(address)["vardok"],
+            transport=zc.LocalResolverTransport(),
+        )
+        assert list(rx.iter_raw(client, "GetConceptVariablesByOwner", 1)) == expected
+    finally:
+        server.shutdown()
+
+
+def test_iter_raw_fault() -> None:
+    server, address = serve_chunked([FAULT_RESPONSE])
+    try:
+        client = zeep.Client(
+            standin_wsdls(address)["vardok"],
+            transport=zc.LocalResolverTransport(),
+        )
+        with pytest.raises(zeep.exceptions.Fault, match="Fant ikke filbeskrivelse"):
+            list(rx.iter_raw(client, "GetConceptVariablesByOwner", 1))
+    finally:
+        server.shutdown()
+
+
+def test_iter_zeep_serialize_uses_cached_response(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(zc, "iter_raw", lambda *args: pytest.fail("called service"))
+    key = response_cache_key("vardok", "GetConceptVariablesByOwner", 1)
+    get_response_cache().set(key, [OrderedDict(id="1"), OrderedDict(id="2")])
+    assert list(ov.iter_vardok_concept_variables_by_owner(1)) == [
+        OrderedDict(id="1"),
+        OrderedDict(id="2"),
+    ]
+    set_offline_mode(True)
+    try:
+        with pytest.raises(ResponseCacheMiss):
+            list(ov.iter_vardok_concept_variables_by_owner(2))
+    finally:
+        set_offline_mode(None)
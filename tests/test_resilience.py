@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+import requests
+import zeep
+
+import ssb_tbmd_apis.aio.zeep_client as azc
+import ssb_tbmd_apis.paths.try_variations as tv
+import ssb_tbmd_apis.resilience as rs
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.aio.try_variations import (
+    try_zeep_serialize_path as atry_zeep_serialize_path,
+)
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from tests.utils.standin import StandinServer
+
+
+@pytest.fixture(autouse=True)
+def fresh_policies(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Give every test default policies, with short waits, and closed circuits."""
+    monkeypatch.setattr(rs, "_policies", {})
+    monkeypatch.setattr(rs, "_breakers", {})
+    monkeypatch.setattr(rs, "_DEFAULT_POLICY", rs.ServicePolicy(backoff_base=0.01))
+
+
+def _failing(errors: list[Exception], value: Any = "value") -> Any:
+    calls: list[int] = []
+
+    def fetch() -> Any:
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return value
+
+    fetch.calls = calls  # type: ignore[attr-defined]
+    return fetch
+
+
+def test_retries_transport_errors() -> None:
+    fetch = _failing([requests.ConnectionError("reset"), requests.ReadTimeout()])
+    assert rs.call_with_retry("datadok", fetch) == "value"
+    assert len(fetch.calls) == 3
+    assert rs.get_circuit_breaker("datadok").failures == 0
+
+
+def test_gives_up_after_max_attempts() -> None:
+    fetch = _failing([requests.ConnectionError(str(i)) for i in range(5)])
+    with pytest.raises(requests.ConnectionError, match="2"):
+        rs.call_with_retry("datadok", fetch)
+    assert len(fetch.calls) == 3
+
+
+def test_never_retries_faults() -> None:
+    fetch = _failing([zeep.exceptions.Fault("Fant ingen filbeskrivelse")] * 3)
+    with pytest.raises(zeep.exceptions.Fault):
+        rs.call_with_retry("datadok", fetch)
+    assert len(fetch.calls) == 1
+    assert rs.get_circuit_breaker("datadok").failures == 0
+
+
+@pytest.mark.parametrize(
+    ("error", "retryable"),
+    [
+        (zeep.exceptions.TransportError(status_code=503), True),
+        (zeep.exceptions.TransportError(status_code=429), True),
+        (zeep.exceptions.TransportError(status_code=404), False),
+        (requests.exceptions.ChunkedEncodingError(), True),
+        (rs.CircuitOpenError(), False),
+        (rs.DeadlineExceeded(), False),
+        (ValueError(), False),
+    ],
+)
+def test_is_retryable(error: Exception, retryable: bool) -> None:
+    assert rs.is_retryable(error) is retryable
+
+
+def test_circuit_opens_and_half_opens(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(zc, "invalidate_zeep_clients", lambda service=None: None)
+    rs.configure_service(
+        "metadb", max_attempts=1, failure_threshold=2, reset_timeout=0.1
+    )
+    breaker = rs.get_circuit_breaker("metadb")
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            rs.call_with_retry("metadb", _failing([requests.ConnectionError()]))
+    assert breaker.state == "open"
+    fetch = _failing([])
+    with pytest.raises(rs.CircuitOpenError, match="metadb"):
+        rs.call_with_retry("metadb", fetch)
+    assert not fetch.calls
+    # Other services are not affected
+    assert rs.call_with_retry("datadok", fetch) == "value"
+
+    time.sleep(0.1)
+    assert breaker.state == "half-open"
+    # A failing trial call opens the circuit again
+    with pytest.raises(requests.ConnectionError):
+        rs.call_with_retry("metadb", _failing([requests.ConnectionError()]))
+    assert breaker.state == "open"
+    time.sleep(0.1)
+    breaker.before_call()
+    # Only one trial call at a time
+    with pytest.raises(rs.CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.opened == 1
+
+
+def _half_open(monkeypatch: pytest.MonkeyPatch) -> rs.CircuitBreaker:
+    monkeypatch.setattr(zc, "invalidate_zeep_clients", lambda service=None: None)
+    rs.configure_service(
+        "metadb", max_attempts=1, failure_threshold=1, reset_timeout=0.05
+    )
+    with pytest.raises(requests.ConnectionError):
+        rs.call_with_retry("metadb", _failing([requests.ConnectionError()]))
+    time.sleep(0.05)
+    breaker = rs.get_circuit_breaker("metadb")
+    assert breaker.state == "half-open"
+    return breaker
+
+
+def test_cancelled_trial_lets_another_call_test(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    breaker = _half_open(monkeypatch)
+
+    async def main() -> None:
+        task = asyncio.ensure_future(
+            rs.acall_with_retry("metadb", lambda: asyncio.sleep(1))
+        )
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert breaker.state == "half-open"
+    assert rs.call_with_retry("metadb", _failing([])) == "value"
+    assert breaker.state == "closed"
+
+
+def test_other_errors_are_not_counted(monkeypatch: pytest.MonkeyPatch) -> None:
+    breaker = _half_open(monkeypatch)
+    with pytest.raises(ValueError):
+        rs.call_with_retry("metadb", _failing([ValueError("<html>")]))
+    # Neither closed nor opened again, and the next call may test the service
+    assert breaker.state == "half-open"
+    assert breaker.failures == 1
+    with pytest.raises(zeep.exceptions.Fault):
+        rs.call_with_retry("metadb", _failing([zeep.exceptions.Fault("Ukjent")]))
+    assert breaker.state == "closed"
+
+
+def test_configure_service(monkeypatch: pytest.MonkeyPatch) -> None:
+    dropped: list[str | None] = []
+    monkeypatch.setattr(zc, "invalidate_zeep_clients", dropped.append)
+    policy = rs.configure_service("Vardok", read_timeout=60)
+    assert policy.timeout == (10.0, 60)
+    assert rs.get_service_policy("vardok") is policy
+    assert rs.get_service_policy("datadok").read_timeout == 300
+    assert dropped == ["vardok"]
+    with pytest.raises(ValueError, match="max_attempts"):
+        rs.configure_service("vardok", max_attempts=0)
+
+
+def test_deadline_scope() -> None:
+    assert rs.remaining_time() is None
+    assert rs.deadline_timeout((10.0, 300.0)) == (10.0, 300.0)
+    with rs.deadline_scope(5):
+        with rs.deadline_scope(60):
+            remaining = rs.remaining_time()
+            assert remaining is not None and remaining <= 5
+            connect, read = rs.deadline_timeout((1.0, 300.0))  # type: ignore[misc]
+            assert connect == 1.0 and read <= 5
+    with rs.deadline_scope(0):
+        with pytest.raises(rs.DeadlineExceeded):
+            rs.call_with_retry("datadok", _failing([]))
+    assert rs.remaining_time() is None
+
+
+def test_backoff_stops_at_the_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(rs, "_DEFAULT_POLICY", rs.ServicePolicy(max_attempts=5))
+    monkeypatch.setattr(rs.ServicePolicy, "backoff", lambda self, attempt: 0.3)
+    fetch = _failing([requests.ConnectionError()] * 5)
+    with rs.deadline_scope(0.5), pytest.raises(requests.ConnectionError):
+        rs.call_with_retry("datadok", fetch)
+    # Tried again after 0.3 seconds, but not after 0.6
+    assert len(fetch.calls) == 2
+
+
+def test_async_retries() -> None:
+    errors = [requests.ConnectionError()]
+    calls: list[int] = []
+
+    async def fetch() -> Any:
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[0]
+        return "value"
+
+    assert asyncio.run(rs.acall_with_retry("datadok", fetch)) == "value"
+    assert len(calls) == 2
+
+
+@pytest.fixture
+def standin(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Any]:
+    """A slow stand-in server, without the dollar-stammer of the host."""
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(tv, "get_stamme_registry", lambda: StammeRegistry({}))
+    server = StandinServer(latency=0.2)
+    for service, url in server.wsdl_urls().items():
+        monkeypatch.setitem(zc.WSDLS, service, url)
+    zc.close_zeep_clients()
+    yield server
+    zc.close_zeep_clients()
+    server.shutdown()
+
+
+def test_read_timeout_is_retried(standin: StandinServer) -> None:
+    zc.get_cached_client("datadok")
+    rs.configure_service("datadok", read_timeout=0.05, max_attempts=2)
+    with pytest.raises(requests.ReadTimeout):
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 1, use_cache=False)
+    assert standin.calls["datadok", "GetCodelistById"] == 2
+    assert rs.get_circuit_breaker("datadok").failures == 2
+
+
+def test_async_read_timeout(standin: StandinServer) -> None:
+    import httpx
+
+    rs.configure_service("vardok", read_timeout=0.05, max_attempts=1)
+
+    async def main() -> Any:
+        async with azc.AsyncZeepClientRegistry():
+            return await azc.get_zeep_serialize("vardok", "GetCodelistById", 1)
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(main())
+
+
+def test_connection_refused_opens_the_circuit(standin: StandinServer) -> None:
+    zc.get_cached_client("datadok")
+    standin.shutdown()
+    # Drop the open connections, so the next call has to connect
+    zc.get_http_session().close()
+    rs.configure_service("datadok", failure_threshold=2)
+    with pytest.raises(requests.ConnectionError):
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    with pytest.raises(rs.CircuitOpenError):
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 2)
+
+
+def test_try_zeep_serialize_path_deadline(standin: StandinServer) -> None:
+    # Every variation of an unknown path is a Fault, after 0.2 seconds
+    start = time.perf_counter()
+    with pytest.raises(rs.DeadlineExceeded):
+        tv.try_zeep_serialize_path(Path("$UKJENT/fil/g2020"), deadline=0.5)
+    assert time.perf_counter() - start < 1
+    assert 2 <= standin.calls["datadok", "GetFileDescriptionByPath"] <= 4
+
+
+def test_async_try_zeep_serialize_path_deadline(standin: StandinServer) -> None:
+    async def main() -> Any:
+        async with azc.AsyncZeepClientRegistry():
+            return await atry_zeep_serialize_path(
+                Path("$UKJENT/fil/g2020"), deadline=0.5
+            )
+
+    with pytest.raises(rs.DeadlineExceeded):
+        asyncio.run(main())
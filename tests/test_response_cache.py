@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from typing import Any
+
+import pytest
+import zeep
+
+import ssb_tbmd_apis.aio.zeep_client as azc
+import ssb_tbmd_apis.response_cache as rc
+import ssb_tbmd_apis.zeep_client as zc
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def calls(monkeypatch: pytest.MonkeyPatch) -> list[tuple[Any, ...]]:
+    """Record the calls that reach the service, answering with a fresh payload."""
+    made: list[tuple[Any, ...]] = []
+
+    def fake_call_operation(tbmd_service: str, operation: str, *args: Any) -> Any:
+        made.append((tbmd_service, operation, *args))
+        if args and args[0] == "missing":
+            raise zeep.exceptions.Fault("Not found")
+        return OrderedDict(id=str(args[0]) if args else None, Codes={"Code": [1, 2]})
+
+    async def fake_async_call_operation(*args: Any) -> Any:
+        return fake_call_operation(*args)
+
+    monkeypatch.setattr(zc, "_call_operation", fake_call_operation)
+    monkeypatch.setattr(azc, "_call_operation", fake_async_call_operation)
+    monkeypatch.setattr(zc, "_serialize_object_ntc", lambda obj: obj)
+    monkeypatch.setattr(azc, "_serialize_object_ntc", lambda obj: obj)
+    return made
+
+
+def test_repeated_calls_hit_the_cache(
+    calls: list[tuple[Any, ...]], fresh_response_cache: rc.ResponseCache
+) -> None:
+    first = zc.get_zeep_serialize("datadok", "GetCodelistById", 228589)
+    second = zc.get_zeep_serialize("DATADOK", "GetCodelistById", "228589")
+    assert first == second
+    assert len(calls) == 1
+
+    zc.get_zeep_serialize_list("metadb", "GetCodelists")
+    zc.get_zeep_serialize_list("metadb", "GetCodelists")
+    assert len(calls) == 2
+
+    stats = rc.response_cache_stats()
+    assert (stats.hits, stats.misses, stats.size) == (2, 2, 2)
+    assert stats.hit_rate == 0.5
+
+
+def test_returned_responses_are_copies(calls: list[tuple[Any, ...]]) -> None:
+    first = zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    first["Codes"]["Code"].append(3)
+    first["id"] = "changed"
+
+    second = zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    assert second == OrderedDict(id="1", Codes={"Code": [1, 2]})
+    assert len(calls) == 1
+
+
+def test_faults_are_not_cached(calls: list[tuple[Any, ...]]) -> None:
+    for _ in range(2):
+        with pytest.raises(zeep.exceptions.Fault):
+            zc.get_zeep_serialize("datadok", "GetCodelistById", "missing")
+    assert len(calls) == 2
+
+
+def test_bypass(calls: list[tuple[Any, ...]], monkeypatch: pytest.MonkeyPatch) -> None:
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1, use_cache=False)
+    with rc.bypass_response_cache():
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 2)
+    monkeypatch.setenv("SSB_TBMD_RESPONSE_CACHE", "0")
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    assert len(calls) == 5
+    assert rc.response_cache_stats().size == 1
+
+    monkeypatch.delenv("SSB_TBMD_RESPONSE_CACHE")
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    assert len(calls) == 5
+
+
+def test_bypass_reaches_worker_threads(calls: list[tuple[Any, ...]]) -> None:
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    with rc.bypass_response_cache():
+        zc.get_zeep_serialize_many("datadok", "GetCodelistById", [(1,), (1,)], 2)
+    assert len(calls) == 3
+
+
+def test_ttl_per_operation() -> None:
+    clock = _Clock()
+    cache = rc.ResponseCache(
+        ttl=10, operation_ttls={"GetCodelists": 100, "GetFileDescriptionByPath": 0}
+    )
+    cache._clock = clock
+    short = rc.response_cache_key("datadok", "GetCodelistById", 1)
+    long = rc.response_cache_key("datadok", "GetCodelists")
+    never = rc.response_cache_key("datadok", "GetFileDescriptionByPath", "$UTD/x")
+    for key in (short, long, never):
+        cache.set(key, {"key": key})
+
+    assert cache.get(never) is None
+    clock.now = 10
+    assert cache.get(short) is None
+    assert cache.get(long) == {"key": long}
+    clock.now = 100
+    assert cache.get(long) is None
+    assert cache.stats().expirations == 2
+    assert cache.stats().size == 0
+
+
+def test_lru_eviction() -> None:
+    cache = rc.ResponseCache(max_size=2)
+    keys = [
+        rc.response_cache_key("vardok", "GetConceptVariableById", i) for i in range(3)
+    ]
+    cache.set(keys[0], 0)
+    cache.set(keys[1], 1)
+    assert cache.get(keys[0]) == 0  # Now keys[1] is the least recently used
+    cache.set(keys[2], 2)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == 0
+    assert cache.get(keys[2]) == 2
+    assert cache.stats().evictions == 1
+
+    with pytest.raises(ValueError):
+        rc.ResponseCache(max_size=0)
+
+
+def test_invalidate_and_configure(calls: list[tuple[Any, ...]]) -> None:
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    zc.get_zeep_serialize("datadok", "GetContextVariableById", 1)
+    zc.get_zeep_serialize("vardok", "GetCodelistById", 1)
+
+    assert rc.invalidate_response_cache("datadok", "GetCodelistById") == 1
+    assert rc.invalidate_response_cache("Datadok") == 1
+    assert rc.response_cache_stats().size == 1
+
+    previous = rc.get_response_cache()
+    try:
+        cache = rc.configure_response_cache(max_size=5, operation_ttls={"X": 0})
+        assert rc.get_response_cache() is cache
+        assert cache.ttl_for("X") == 0
+        assert (
+            cache.ttl_for("GetCodelists") == rc.DEFAULT_OPERATION_TTLS["GetCodelists"]
+        )
+        assert cache.stats().size == 0
+    finally:
+        rc.set_response_cache(previous)
+
+
+def test_async_functions_share_the_cache(calls: list[tuple[Any, ...]]) -> None:
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+
+    async def main() -> list[Any]:
+        return [
+            await azc.get_zeep_serialize("datadok", "GetCodelistById", 1),
+            await azc.get_zeep_serialize_list("metadb", "GetCodelists"),
+            await azc.get_zeep_serialize_list("metadb", "GetCodelists"),
+            await azc.get_zeep_serialize(
+                "datadok", "GetCodelistById", 1, use_cache=False
+            ),
+        ]
+
+    results = asyncio.run(main())
+    assert results[0] == results[3]
+    assert len(calls) == 3
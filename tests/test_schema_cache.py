@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+import requests
+import zeep
+from lxml import etree
+
+import ssb_tbmd_apis.schema_cache as sc
+from ssb_tbmd_apis.zeep_client import LocalResolverTransport
+from ssb_tbmd_apis.zeep_client import _mk_client
+
+STANDIN = str(Path("tests/data_test_wsdl/datadok.wsdl").resolve())
+
+
+@pytest.fixture(autouse=True)
+def tmp_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("SSB_TBMD_SCHEMA_CACHE", raising=False)
+    return tmp_path
+
+
+@pytest.fixture
+def compiled(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Count how many times a WSDL document is actually compiled."""
+    wsdls: list[str] = []
+    real_document = zeep.wsdl.Document
+
+    def counting_document(location: str, *args, **kwargs):
+        wsdls.append(location)
+        return real_document(location, *args, **kwargs)
+
+    monkeypatch.setattr(sc.zeep.wsdl, "Document", counting_document, raising=True)
+    return wsdls
+
+
+def _client():
+    return _mk_client(STANDIN, LocalResolverTransport(session=requests.Session()))
+
+
+def _body(client, operation: str, *args) -> bytes:
+    envelope = client.create_message(client.service, operation, *args)
+    return etree.tostring(envelope)
+
+
+def test_second_client_loads_from_cache(compiled: list[str]) -> None:
+    first = _client()
+    assert compiled == [STANDIN]
+    assert len(list(sc.schema_cache_dir().glob("*.pickle"))) == 1
+
+    second = _client()
+    assert compiled == [STANDIN]
+    assert second.wsdl is not first.wsdl
+    # The cached document produces the same messages as the compiled one
+    assert _body(second, "GetCodelistById", "228589") == _body(
+        first, "GetCodelistById", "228589"
+    )
+    # ...and is wired to the new client's transport
+    assert second.wsdl.transport is second.transport
+
+
+def test_unreadable_cache_is_rebuilt(compiled: list[str]) -> None:
+    _client()
+    (cached,) = sc.schema_cache_dir().glob("*.pickle")
+    cached.write_bytes(b"not a pickle")
+
+    client = _client()
+    assert len(compiled) == 2
+    assert "GetFileDescriptionByPath" in dir(client.service)
+    assert cached.read_bytes() != b"not a pickle"
+
+
+def test_cache_can_be_disabled(
+    compiled: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("SSB_TBMD_SCHEMA_CACHE", "0")
+    _client()
+    _client()
+    assert len(compiled) == 2
+    assert not sc.schema_cache_dir().exists()
+
+
+def test_key_follows_content_and_clear() -> None:
+    assert sc.schema_cache_key(b"<a/>") != sc.schema_cache_key(b"<b/>")
+    _client()
+    assert sc.clear_schema_cache() == 1
+    assert sc.clear_schema_cache() == 0
+
+
+def _importing_wsdl(tmp_path: Path) -> tuple[Path, Path]:
+    """Write a copy of the stand-in WSDL that imports a schema next to it."""
+    schema = tmp_path / "types.xsd"
+    schema.write_text(
+        '<s:schema xmlns:s="http://www.w3.org/2001/XMLSchema" '
+        'targetNamespace="urn:ssb:tbmd:standin:extra">'
+        '<s:element name="Extra" type="s:string"/></s:schema>',
+        encoding="utf-8",
+    )
+    wsdl = Path(STANDIN).read_text(encoding="utf-8")
+    marker = '<s:complexType name="LangText">'
+    importing = tmp_path / "datadok.wsdl"
+    importing.write_text(
+        wsdl.replace(
+            marker,
+            '<s:import namespace="urn:ssb:tbmd:standin:extra" '
+            'schemaLocation="types.xsd"/>' + marker,
+            1,
+        ),
+        encoding="utf-8",
+    )
+    return importing, schema
+
+
+def test_change_in_imported_schema_recompiles(
+    compiled: list[str], tmp_path: Path
+) -> None:
+    importing, schema = _importing_wsdl(tmp_path)
+
+    def client():
+        return _mk_client(
+            str(importing), LocalResolverTransport(session=requests.Session())
+        )
+
+    client()
+    client()
+    assert len(compiled) == 1
+
+    schema.write_text(
+        schema.read_text(encoding="utf-8").replace('"Extra"', '"Changed"'),
+        encoding="utf-8",
+    )
+    client()
+    assert len(compiled) == 2
+    assert len(list(sc.schema_cache_dir().glob("*.pickle"))) == 2
+
+
+def test_miss_loads_each_document_once(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    loaded: list[str] = []
+    real_load = LocalResolverTransport.load
+
+    def counting_load(self: LocalResolverTransport, url: str) -> bytes:
+        loaded.append(url)
+        return real_load(self, url)
+
+    monkeypatch.setattr(LocalResolverTransport, "load", counting_load, raising=True)
+    importing, schema = _importing_wsdl(tmp_path)
+
+    def client():
+        return _mk_client(
+            str(importing), LocalResolverTransport(session=requests.Session())
+        )
+
+    client()
+    assert sorted(loaded) == sorted([str(importing), str(schema)])
+    loaded.clear()
+    client()
+    assert sorted(loaded) == sorted([str(importing), str(schema)])
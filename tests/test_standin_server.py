@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+import requests
+import zeep
+
+import ssb_tbmd_apis.paths.try_variations as tv
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.operations import operations_datadok as datadok
+from ssb_tbmd_apis.operations import operations_metadb as metadb
+from ssb_tbmd_apis.operations import operations_statbank as statbank
+from ssb_tbmd_apis.operations import operations_vardok as vardok
+from ssb_tbmd_apis.paths.linux_stammer import StammeRegistry
+from tests.utils import load_harness
+from tests.utils.standin import STANDIN_PATHS
+from tests.utils.standin import StandinServer
+
+
+@pytest.fixture
+def standin(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> Iterator[Callable[..., StandinServer]]:
+    """Start stand-in servers, loading the WSDLs from them, returning a function to start one."""
+    servers: list[StandinServer] = []
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path / "cache"))
+
+    def start(**options: Any) -> StandinServer:
+        server = StandinServer(**options)
+        servers.append(server)
+        for service, url in server.wsdl_urls().items():
+            monkeypatch.setitem(zc.WSDLS, service, url)
+        zc.close_zeep_clients()
+        return server
+
+    yield start
+    zc.close_zeep_clients()
+    for server in servers:
+        server.shutdown()
+
+
+OPERATIONS: list[tuple[Callable[..., Any], tuple[Any, ...], str]] = [
+    (datadok.datadok_codelist_by_id, (228589,), "Codes"),
+    (datadok.datadok_codelist_by_reference, ("FOB/person/spes_reg_type",), "Codes"),
+    (datadok.datadok_codelists, (), "Title"),
+    (datadok.datadok_context_variable_by_id, (1,), "Properties"),
+    (datadok.datadok_context_variable_by_reference, ("FOB/person/kjonn",), "Title"),
+    (datadok.datadok_file_description_by_id, (1,), "ContextVariable"),
+    (metadb.metadb_codelists, (), "Title"),
+    (metadb.metadb_codelist_by_id, (10013,), "Codes"),
+    (metadb.metadb_context_variable_by_id, (14739,), "Datatype"),
+    (metadb.metadb_description_by_id, (11518,), "ContextVariable"),
+    (metadb.metadb_event_history_structure_by_id, (1001,), "Table"),
+    (statbank.statbank_meta_by_table_id, ("03886",), "Variable"),
+    (statbank.statbank_meta_by_table_name, ("Raadyr",), "TableId"),
+    (statbank.statbank_table_ids_by_concept_variable_id, ("1756",), "TableReference"),
+    (vardok.vardok_codelist_by_id, (46,), "Codes"),
+    (vardok.vardok_codelists, (), "Title"),
+    (vardok.vardok_concept_variable_by_id, (123,), "Definition"),
+    (vardok.vardok_concept_variables_by_approved, (True,), "Definition"),
+    (vardok.vardok_concept_variables_by_external_source, (123,), "Definition"),
+    (vardok.vardok_concept_variables_by_internal_source, (123,), "Definition"),
+    (vardok.vardok_concept_variables_by_name_def, ("inntekt",), "Definition"),
+    (vardok.vardok_concept_variables_by_owner, (320,), "Definition"),
+    (vardok.vardok_concept_variables_by_statistical_unit, ("Person",), "Definition"),
+    (vardok.vardok_concept_variables_by_subject_area, ("be",), "Definition"),
+    (vardok.vardok_version_by_concept_variable_id, (2007,), "Definition"),
+]
+
+
+@pytest.mark.parametrize(
+    ("operation", "args", "field"),
+    OPERATIONS,
+    ids=[operation.__name__ for operation, _, _ in OPERATIONS],
+)
+def test_answers_the_operations(
+    standin: Callable[..., StandinServer],
+    operation: Callable[..., Any],
+    args: tuple[Any, ...],
+    field: str,
+) -> None:
+    standin(list_size=3, variables=2)
+    result = operation(*args)
+    first = result[0] if isinstance(result, list) else result
+    assert first[field] is not None
+
+
+def test_file_description_by_path(
+    standin: Callable[..., StandinServer], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(tv, "get_stamme_registry", lambda: StammeRegistry({}))
+    server = standin()
+    result, path = datadok.datadok_file_description_by_path(Path(STANDIN_PATHS[0]))
+    assert path == Path(STANDIN_PATHS[0])
+    assert result["Title"]["_value_1"] == STANDIN_PATHS[0]
+    assert server.calls["datadok", "GetFileDescriptionByPath"] == 1
+
+
+def test_unknown_path_is_a_fault(standin: Callable[..., StandinServer]) -> None:
+    standin(paths=["$KJENT/fil/g2020"])
+    with pytest.raises(zeep.exceptions.Fault, match="Fant ingen filbeskrivelse"):
+        zc.get_zeep_serialize("datadok", "GetFileDescriptionByPath", "$UKJENT/g2020")
+    result = zc.get_zeep_serialize(
+        "datadok", "GetFileDescriptionByPath", "$KJENT/fil/g2020"
+    )
+    assert result["Title"]["_value_1"] == "$KJENT/fil/g2020"
+
+
+def test_payload_sizes(standin: Callable[..., StandinServer]) -> None:
+    standin(list_size=7, variables=11)
+    codelist = zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    assert len(codelist["Codes"]["Code"]) == 7
+    description = zc.get_zeep_serialize("datadok", "GetFileDescriptionById", 1)
+    assert len(description["ContextVariable"]) == 11
+    assert len(vardok.vardok_concept_variables_by_owner(320)) == 7
+
+
+def test_latency(standin: Callable[..., StandinServer]) -> None:
+    server = standin(latency=0.05)
+    zc.get_cached_client("datadok")
+    start = time.perf_counter()
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    assert time.perf_counter() - start >= 0.05
+    assert sum(server.calls.values()) == 1
+
+
+def test_serves_the_wsdls(standin: Callable[..., StandinServer]) -> None:
+    server = standin()
+    urls = server.wsdl_urls()
+    assert set(urls) == {"datadok", "metadb", "statbank", "vardok"}
+    wsdl = requests.get(urls["statbank"], timeout=5)
+    assert wsdl.status_code == 200
+    assert f'location="{server.address}/statbankmetaservice/' in wsdl.text
+    assert requests.get(f"{server.address}/nowhere", timeout=5).status_code == 404
+
+
+def test_percentile() -> None:
+    ordered = [float(i) for i in range(1, 101)]
+    assert load_harness.percentile(ordered, 50) == 50.0
+    assert load_harness.percentile(ordered, 99) == 99.0
+    assert load_harness.percentile([3.0], 95) == 3.0
+
+
+def test_load_harness_threads(
+    standin: Callable[..., StandinServer],
+) -> None:
+    server = standin(list_size=2, variables=2)
+
+    def work(number: int) -> Any:
+        return load_harness.workload(10, fault_every=5, offset=number * 10)
+
+    result = load_harness.run_threads(4, work)
+    assert len(result.latencies) == 40
+    assert result.faults == 8
+    assert result.errors == 0
+    assert result.throughput > 0
+    assert set(result.percentiles()) == {"p50", "p95", "p99"}
+    # Clients asking for the same path at once share a call
+    assert sum(server.calls.values()) + result.coalesced == 40
+
+
+def test_load_harness_async(
+    standin: Callable[..., StandinServer],
+) -> None:
+    server = standin(list_size=2, variables=2)
+
+    def work(number: int) -> Any:
+        return load_harness.workload(8, offset=number * 8)
+
+    result = asyncio.run(load_harness.run_async(3, work))
+    assert len(result.latencies) == 24
+    assert result.faults == result.errors == 0
+    assert sum(server.calls.values()) + result.coalesced == 24
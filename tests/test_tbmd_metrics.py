@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+import zeep
+
+import ssb_tbmd_apis.aio.zeep_client as azc
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis import tbmd_metrics as tm
+from ssb_tbmd_apis.operations.operations_vardok import (
+    iter_vardok_concept_variables_by_approved,
+)
+from tests.utils.standin import CODELIST_RESPONSE
+from tests.utils.standin import concept_variables_chunks
+from tests.utils.standin import serve_canned
+from tests.utils.standin import serve_chunked
+from tests.utils.standin import soap_envelope
+from tests.utils.standin import standin_wsdls
+
+FAULT_RESPONSE = soap_envelope(
+    "<soap:Fault><faultcode>soap:Server</faultcode>"
+    "<faultstring>Fant ikke kodeliste</faultstring></soap:Fault>"
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics() -> Iterator[None]:
+    tm.reset_metrics()
+    yield
+    tm.reset_metrics()
+
+
+@pytest.fixture
+def standin(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Any]:
+    """Point the services at a local server, returning a function to start it."""
+    servers = []
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path))
+
+    def start(server_and_address: tuple[Any, str]) -> None:
+        server, address = server_and_address
+        servers.append(server)
+        for service, wsdl in standin_wsdls(address).items():
+            monkeypatch.setitem(zc.WSDLS, service, wsdl)
+        zc.close_zeep_clients()
+
+    yield start
+    zc.close_zeep_clients()
+    for server in servers:
+        server.shutdown()
+
+
+def test_records_sync_calls(standin: Any) -> None:
+    standin(serve_canned())
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1, use_cache=False)
+    # Answered from the response cache, so not a SOAP call
+    zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+
+    metrics = tm.metrics_snapshot()[("datadok", "GetCodelistById")]
+    assert (metrics.calls, metrics.errors, metrics.faults) == (2, 0, 0)
+    assert metrics.response_bytes == 2 * len(CODELIST_RESPONSE)
+    assert metrics.connect_seconds > 0
+    assert metrics.serialize_seconds > 0
+    assert metrics.parse_seconds > 0
+    phases = (
+        metrics.connect_seconds
+        + metrics.transfer_seconds
+        + metrics.parse_seconds
+        + metrics.serialize_seconds
+    )
+    assert metrics.total_seconds == pytest.approx(phases)
+    assert metrics.max_seconds <= metrics.total_seconds
+    assert metrics.mean_seconds == pytest.approx(metrics.total_seconds / 2)
+
+
+def test_records_faults_and_errors(
+    standin: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    standin(serve_chunked([FAULT_RESPONSE]))
+    with pytest.raises(zeep.exceptions.Fault):
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 1)
+
+    def broken(*args: Any) -> Any:
+        raise ConnectionError("nede")
+
+    monkeypatch.setattr(zc, "_call_operation", broken)
+    with pytest.raises(ConnectionError):
+        zc.get_zeep_serialize("datadok", "GetCodelistById", 2)
+
+    metrics = tm.metrics_snapshot()[("datadok", "GetCodelistById")]
+    assert (metrics.calls, metrics.errors, metrics.faults) == (2, 2, 1)
+
+
+def test_records_streamed_calls(standin: Any) -> None:
+    chunks = concept_variables_chunks(5)
+    standin(serve_chunked(chunks))
+    assert len(list(iter_vardok_concept_variables_by_approved())) == 5
+    metrics = tm.metrics_snapshot()[("vardok", "GetConceptVariablesByApproved")]
+    assert metrics.calls == 1
+    assert metrics.response_bytes == sum(map(len, chunks))
+
+
+def test_records_async_calls(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200, content=CODELIST_RESPONSE, headers={"Content-Type": "text/xml"}
+        )
+
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path))
+    monkeypatch.setitem(azc.WSDLS, "datadok", standin_wsdls()["datadok"])
+    monkeypatch.setattr(
+        azc,
+        "_mk_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+    async def main() -> None:
+        async with azc.AsyncZeepClientRegistry(max_concurrency=1):
+            await azc.get_zeep_serialize_many(
+                "datadok", "GetCodelistById", [(i,) for i in range(3)]
+            )
+
+    asyncio.run(main())
+    metrics = tm.metrics_snapshot()[("datadok", "GetCodelistById")]
+    assert metrics.calls == 3
+    assert metrics.response_bytes == 3 * len(CODELIST_RESPONSE)
+    assert metrics.connect_seconds == 0
+    assert metrics.transfer_seconds > 0
+    assert metrics.queue_seconds >= 0
+
+
+def test_callbacks(caplog: pytest.LogCaptureFixture) -> None:
+    seen: list[tuple[str, str, tm.CallSample]] = []
+
+    def callback(service: str, operation: str, sample: tm.CallSample) -> None:
+        seen.append((service, operation, sample))
+
+    def broken(*args: Any) -> None:
+        raise RuntimeError("exporter nede")
+
+    tm.add_metrics_callback(callback)
+    tm.add_metrics_callback(broken)
+    try:
+        with caplog.at_level(logging.WARNING), tm.measure_call("Vardok", "X"):
+            tm.record_http(0.5, 0.25, 10)
+    finally:
+        tm.remove_metrics_callback(callback)
+        tm.remove_metrics_callback(broken)
+
+    [(service, operation, sample)] = seen
+    assert (service, operation) == ("vardok", "X")
+    assert sample.seconds["connect"] == 0.5
+    assert sample.response_bytes == 10
+    assert "exporter nede" in caplog.text
+
+    with tm.measure_call("vardok", "X"):
+        pass
+    assert len(seen) == 1
+
+
+def test_snapshot_and_reset() -> None:
+    # Outside a measured call there is nothing to record to
+    tm.record_http(1.0, 1.0, 100)
+    with tm.measure_call("metadb", "GetCodelists"):
+        tm.record_http(0.0, 0.0, 100)
+
+    snapshot = tm.metrics_snapshot()
+    snapshot[("metadb", "GetCodelists")].calls = 10
+    assert tm.metrics_snapshot()[("metadb", "GetCodelists")].calls == 1
+    assert tm.metrics_snapshot()[("metadb", "GetCodelists")].response_bytes == 100
+
+    totals = tm.reset_metrics()
+    assert totals[("metadb", "GetCodelists")].calls == 1
+    assert tm.metrics_snapshot() == {}
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+import zeep
+
+import ssb_tbmd_apis.wsdl_snapshots as ws
+from ssb_tbmd_apis.zeep_client import LocalResolverTransport
+
+URL = "http://ws.ssb.no/DatadokService/DatadokService.asmx?WSDL"
+IMPORTED = "http://ws.ssb.no/DatadokService/DatadokService.asmx?schema=schema1"
+STANDIN = Path("tests/data_test_wsdl/datadok.wsdl")
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    monkeypatch.setenv("SSB_TBMD_WSDL_DIR", str(tmp_path))
+    monkeypatch.delenv("SSB_TBMD_WSDL_MODE", raising=False)
+    ws._manifests.clear()
+    yield tmp_path
+    ws.set_wsdl_mode(None)
+    ws._manifests.clear()
+
+
+@pytest.fixture
+def remote(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Stand in for HTTP, recording which URLs were fetched."""
+    fetched: list[str] = []
+
+    def fake_load(self: zeep.transports.Transport, url: str) -> bytes:
+        fetched.append(url)
+        return b"<remote/>"
+
+    monkeypatch.setattr(zeep.transports.Transport, "load", fake_load, raising=True)
+    return fetched
+
+
+def test_snapshot_is_used_before_network(snapshot_dir: Path, remote: list[str]):
+    ws.save_snapshot(URL, b"<snapshot/>", snapshot_dir)
+    transport = LocalResolverTransport()
+    assert transport.load(URL) == b"<snapshot/>"
+    assert remote == []
+    assert ws.snapshot_version(snapshot_dir) is not None
+
+    # Misses fall back to HTTP in the default mode
+    assert transport.load(IMPORTED) == b"<remote/>"
+    assert remote == [IMPORTED]
+
+
+def test_offline_mode_raises_on_miss(snapshot_dir: Path, remote: list[str]):
+    ws.set_wsdl_mode("offline")
+    with pytest.raises(FileNotFoundError):
+        LocalResolverTransport().load(URL)
+    assert remote == []
+
+
+def test_refresh_mode_fetches_and_records(snapshot_dir: Path, remote: list[str]):
+    ws.save_snapshot(URL, b"<old/>", snapshot_dir)
+    transport = LocalResolverTransport(refresh_to=snapshot_dir)
+    assert transport.load(URL) == b"<remote/>"
+    assert transport.refreshed == [URL]
+
+    ws._manifests.clear()
+    assert ws.load_snapshot(URL) == b"<remote/>"
+
+
+def test_refresh_mode_writes_to_the_cache_dir(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, remote: list[str]
+):
+    bundled = tmp_path / "bundled"
+    bundled.mkdir()
+    bundled.chmod(0o555)
+    monkeypatch.setattr(ws, "BUNDLED_SNAPSHOT_DIR", bundled)
+    monkeypatch.setenv("SSB_TBMD_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("SSB_TBMD_WSDL_DIR", raising=False)
+    ws._manifests.clear()
+    ws.set_wsdl_mode("refresh")
+    try:
+        transport = LocalResolverTransport()
+        assert transport.load(URL) == b"<remote/>"
+    finally:
+        ws.set_wsdl_mode(None)
+        ws._manifests.clear()
+        bundled.chmod(0o755)
+
+    assert list(bundled.iterdir()) == []
+    assert ws.load_snapshot(URL) == b"<remote/>"
+    assert (tmp_path / "cache" / "wsdls" / ws.MANIFEST_NAME).is_file()
+
+
+def test_failed_snapshot_write_does_not_fail_the_load(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, remote: list[str]
+):
+    # A file where the directory should be, so writing fails, even for root
+    (tmp_path / "file").touch()
+    monkeypatch.setenv("SSB_TBMD_WSDL_DIR", str(tmp_path / "file" / "wsdls"))
+    ws._manifests.clear()
+    ws.set_wsdl_mode("refresh")
+    try:
+        transport = LocalResolverTransport()
+        assert transport.load(URL) == b"<remote/>"
+    finally:
+        ws.set_wsdl_mode(None)
+        ws._manifests.clear()
+    assert transport.refreshed == []
+
+
+def test_local_files_ignore_mode(snapshot_dir: Path, remote: list[str]):
+    ws.set_wsdl_mode("offline")
+    transport = LocalResolverTransport()
+    transport.load(str(STANDIN))
+    assert remote == [str(STANDIN)]
+
+
+def test_unknown_mode_raises(snapshot_dir: Path):
+    with pytest.raises(ValueError):
+        ws.set_wsdl_mode("sometimes")
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+import zeep
+
+import ssb_tbmd_apis.zeep_client as zc
+
+
+class _FakeService:
+    def GetCodelistById(self, codelist_id: str | int) -> dict[str, Any]:
+        return {"id": f"urn:ssb:codelist:datadok:{codelist_id}"}
+
+
+class _FakeClient:
+    def __init__(self, wsdl: str) -> None:
+        self.wsdl = wsdl
+        self.service = _FakeService()
+
+
+@pytest.fixture
+def built(monkeypatch: pytest.MonkeyPatch) -> Iterator[list[str]]:
+    """Record every WSDL a client is built from, without touching the network."""
+    wsdls: list[str] = []
+
+    def fake_mk_client(wsdl: str, transport: Any) -> _FakeClient:
+        wsdls.append(wsdl)
+        return _FakeClient(wsdl)
+
+    monkeypatch.setattr(zc, "_mk_client", fake_mk_client, raising=True)
+    monkeypatch.setattr(zc, "_serialize_object_ntc", lambda obj: obj, raising=True)
+    zc.close_zeep_clients()
+    yield wsdls
+    zc.close_zeep_clients()
+
+
+def test_client_is_built_once_per_service(built: list[str]) -> None:
+    first = zc.get_cached_client("datadok")
+    second = zc.get_cached_client("DATADOK")
+    assert first is second
+    assert built == [zc.WSDLS["datadok"]]
+
+    zc.get_cached_client("vardok")
+    assert built == [zc.WSDLS["datadok"], zc.WSDLS["vardok"]]
+    assert sorted(zc._CLIENT_REGISTRY.cached_services()) == ["datadok", "vardok"]
+
+
+def test_get_zeep_serialize_reuses_client(built: list[str]) -> None:
+    for i in range(5):
+        result = zc.get_zeep_serialize("datadok", "GetCodelistById", i)
+        assert result == {"id": f"urn:ssb:codelist:datadok:{i}"}
+    assert len(built) == 1
+
+
+def test_invalidate_rebuilds_client_on_shared_session(built: list[str]) -> None:
+    client = zc.get_cached_client("datadok")
+    session = zc.get_http_session()
+    closed: list[bool] = []
+    session.close = lambda: closed.append(True)  # type: ignore[method-assign]
+
+    zc.invalidate_zeep_clients("datadok")
+    assert zc._CLIENT_REGISTRY.cached_services() == []
+    assert zc.get_cached_client("datadok") is not client
+    assert len(built) == 2
+    # The pooled session outlives the clients, until everything is closed
+    assert closed == []
+    assert zc.get_http_session() is session
+    zc.close_zeep_clients()
+    assert closed == [True]
+    assert zc.get_http_session() is not session
+
+
+def test_services_share_one_pooled_session(
+    built: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    transports: list[Any] = []
+
+    def fake_mk_client(wsdl: str, transport: Any) -> _FakeClient:
+        transports.append(transport)
+        return _FakeClient(wsdl)
+
+    monkeypatch.setattr(zc, "_mk_client", fake_mk_client, raising=True)
+    zc.get_cached_client("datadok")
+    zc.get_cached_client("vardok")
+    with zc.get_zeep_client("metadb"):
+        pass
+    assert len(transports) == 3
+    assert all(t.session is zc.get_http_session() for t in transports)
+
+
+def test_configure_http(built: list[str]) -> None:
+    default = zc.get_http_config()
+    zc.get_cached_client("datadok")
+    old_session = zc.get_http_session()
+    try:
+        config = zc.configure_http(pool_maxsize=32, max_retries=3, keep_alive=False)
+        assert config.pool_maxsize == 32
+        # Clients built on the old session are dropped
+        assert zc._CLIENT_REGISTRY.cached_services() == []
+
+        session = zc.get_http_session()
+        assert session is not old_session
+        adapter = session.get_adapter("http://ws.ssb.no/DatadokService")
+        assert adapter._pool_maxsize == 32  # type: ignore[attr-defined]
+        assert adapter.max_retries.total == 3  # type: ignore[attr-defined]
+        assert session.headers["Connection"] == "close"
+
+        with pytest.raises(TypeError):
+            zc.configure_http(pool_size=1)
+    finally:
+        zc.configure_http(**default.__dict__)
+
+
+def test_unknown_service_raises(built: list[str]) -> None:
+    with pytest.raises(NotImplementedError):
+        zc.get_cached_client("klass")
+    assert built == []
+
+
+def test_concurrent_first_use_builds_one_client(built: list[str]) -> None:
+    barrier = threading.Barrier(8)
+    clients: list[Any] = []
+
+    def worker() -> None:
+        barrier.wait()
+        clients.append(zc.get_cached_client("metadb"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(built) == 1
+    assert all(c is clients[0] for c in clients)
+
+
+def test_serialize_many_keeps_order_and_captures_faults(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    lock = threading.Lock()
+    in_flight = [0, 0]  # current, max
+
+    def fake_get_zeep_serialize(tbmd_service: str, operation: str, *args: Any):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        try:
+            # Later items finish first, to shuffle completion order
+            time.sleep(0.002 * (20 - int(args[0])))
+            if int(args[0]) % 5 == 0:
+                raise zeep.exceptions.Fault(f"No such id {args[0]}")
+            return {"id": args[0], "operation": operation}
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    monkeypatch.setattr(zc, "get_zeep_serialize", fake_get_zeep_serialize)
+    results = zc.get_zeep_serialize_many(
+        "datadok", "GetCodelistById", [(i,) for i in range(20)], max_workers=4
+    )
+
+    assert len(results) == 20
+    for i, result in enumerate(results):
+        if i % 5 == 0:
+            assert isinstance(result, zeep.exceptions.Fault)
+        else:
+            assert result == {"id": i, "operation": "GetCodelistById"}
+    assert 1 < in_flight[1] <= 4
+
+
+def test_serialize_many_raises_other_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    def broken(tbmd_service: str, operation: str, *args: Any):
+        raise ConnectionError("ws.ssb.no is down")
+
+    monkeypatch.setattr(zc, "get_zeep_serialize", broken)
+    with pytest.raises(ConnectionError):
+        zc.get_zeep_serialize_many("datadok", "GetCodelistById", [(1,), (2,)])
+    with pytest.raises(ValueError):
+        zc.get_zeep_serialize_many("datadok", "GetCodelistById", [(1,)], 0)
@@ -0,0 +1,193 @@
+"""The load harness of benchmarks/load_test.py, driving a StandinServer.
+
+Kept with the tests, so it is tested without importing from the benchmarks.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections.abc import Callable
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+
+import zeep
+
+import ssb_tbmd_apis.aio.zeep_client as azc
+import ssb_tbmd_apis.zeep_client as zc
+from ssb_tbmd_apis.coalesce import coalesce_stats
+from tests.utils.standin import STANDIN_PATHS
+
+Call = tuple[str, str, tuple[str | int, ...]]
+
+# The mix of operations each client cycles through, as (service, operation)
+MIX: list[tuple[str, str]] = [
+    ("datadok", "GetFileDescriptionByPath"),
+    ("datadok", "GetCodelistById"),
+    ("datadok", "GetContextVariableById"),
+    ("vardok", "GetConceptVariableById"),
+    ("vardok", "GetConceptVariablesByOwner"),
+    ("metadb", "GetCodelistById"),
+    ("metadb", "GetDataDescriptionById"),
+    ("statbank", "GetStatbankMetaByTabelId"),
+]
+
+
+def workload(calls: int, fault_every: int = 0, offset: int = 0) -> list[Call]:
+    """Build the calls of one client.
+
+    Args:
+        calls: The number of calls.
+        fault_every: Look up an unknown path, answered with a Fault, every this
+            many calls. 0 to never do so.
+        offset: Added to the ids, so clients ask for different things.
+
+    Returns:
+        list: The (service, operation, args) of each call.
+    """
+    work: list[Call] = []
+    for i in range(calls):
+        n = offset + i
+        if fault_every and i % fault_every == fault_every - 1:
+            work.append(("datadok", "GetFileDescriptionByPath", (f"$UKJENT/{n}",)))
+            continue
+        service, operation = MIX[n % len(MIX)]
+        if operation == "GetFileDescriptionByPath":
+            args: tuple[str | int, ...] = (STANDIN_PATHS[n % len(STANDIN_PATHS)],)
+        else:
+            args = (n,)
+        work.append((service, operation, args))
+    return work
+
+
+def percentile(ordered: Sequence[float], pct: float) -> float:
+    """Get a percentile of sorted values, by the nearest rank method."""
+    if not ordered:
+        return math.nan
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+@dataclass
+class LoadResult:
+    """The latencies of the calls of a load test, and how long it took."""
+
+    elapsed: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    faults: int = 0
+    errors: int = 0
+    coalesced: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Calls per second."""
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def percentiles(self) -> dict[str, float]:
+        """The p50, p95 and p99 latencies in seconds."""
+        ordered = sorted(self.latencies)
+        return {f"p{p}": percentile(ordered, p) for p in (50, 95, 99)}
+
+    def report(self, label: str) -> None:
+        """Print the latencies in ms, and the throughput."""
+        latencies = "  ".join(
+            f"{name}={value * 1000:8.2f} ms"
+            for name, value in self.percentiles().items()
+        )
+        print(
+            f"{label:<24} n={len(self.latencies):<6} {latencies}"
+            f"  {self.throughput:8.1f} calls/s  faults={self.faults} errors={self.errors}"
+            f" coalesced={self.coalesced}"
+        )
+
+
+def _tally(result: LoadResult, start: float, error: Exception | None) -> None:
+    result.latencies.append(time.perf_counter() - start)
+    if isinstance(error, zeep.exceptions.Fault):
+        result.faults += 1
+    elif error is not None:
+        result.errors += 1
+
+
+def run_threads(
+    clients: int, work: Callable[[int], list[Call]], use_cache: bool = False
+) -> LoadResult:
+    """Run the load test with a thread per client, on the sync clients.
+
+    Args:
+        clients: The number of concurrent clients.
+        work: Builds the calls of a client, from its number.
+        use_cache: Let repeated calls be answered from the response cache.
+
+    Returns:
+        LoadResult: The latencies of all the calls.
+    """
+
+    def client(number: int) -> LoadResult:
+        # One result per client, so the threads never update the same counters
+        own = LoadResult()
+        for service, operation, args in work(number):
+            start = time.perf_counter()
+            error = None
+            try:
+                zc.get_zeep_serialize(service, operation, *args, use_cache=use_cache)
+            except Exception as e:
+                error = e
+            _tally(own, start, error)
+        return own
+
+    coalesced = coalesce_stats().coalesced
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(client, range(clients)))
+    result = LoadResult(
+        elapsed=time.perf_counter() - start,
+        coalesced=coalesce_stats().coalesced - coalesced,
+    )
+    for own in results:
+        result.latencies += own.latencies
+        result.faults += own.faults
+        result.errors += own.errors
+    return result
+
+
+async def run_async(
+    clients: int, work: Callable[[int], list[Call]], use_cache: bool = False
+) -> LoadResult:
+    """Run the load test with a task per client, on the async clients.
+
+    Args:
+        clients: The number of concurrent clients.
+        work: Builds the calls of a client, from its number.
+        use_cache: Let repeated calls be answered from the response cache.
+
+    Returns:
+        LoadResult: The latencies of all the calls.
+    """
+    result = LoadResult()
+
+    async def client(number: int) -> None:
+        for service, operation, args in work(number):
+            start = time.perf_counter()
+            error = None
+            try:
+                await azc.get_zeep_serialize(
+                    service, operation, *args, use_cache=use_cache
+                )
+            except Exception as e:
+                error = e
+            _tally(result, start, error)
+
+    async with azc.AsyncZeepClientRegistry(max_concurrency=clients):
+        # Build the clients before timing
+        for service in zc.WSDLS:
+            await azc.get_async_registry().get(service)
+        coalesced = coalesce_stats().coalesced
+        start = time.perf_counter()
+        await asyncio.gather(*(client(number) for number in range(clients)))
+        result.elapsed = time.perf_counter() - start
+        result.coalesced = coalesce_stats().coalesced - coalesced
+    return result
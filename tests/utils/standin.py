@@ -0,0 +1,591 @@
+"""A local stand-in for the TBMD services, shared by the tests and the benchmarks.
+
+The servers and transports here serve the stand-in WSDLs in tests/data_test_wsdl
+and answer SOAP calls from memory, so nothing needs access to ws.ssb.no.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from collections.abc import Iterable
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from typing import ClassVar
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import requests
+
+from ssb_tbmd_apis.zeep_client import LocalResolverTransport
+
+STANDIN_WSDL_DIR = Path(__file__).resolve().parents[1] / "data_test_wsdl"
+
+CODELIST_RESPONSE = b"""<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+  <soap:Body>
+    <GetCodelistByIdResponse xmlns="urn:ssb:tbmd:standin:datadok">
+      <GetCodelistByIdResult id="urn:ssb:codelist:datadok:228589">
+        <CodelistMeta>
+          <Title>kirkesamfunn</Title>
+          <Description>Kirkesamfunn</Description>
+          <ContactInformation><Person>lfo</Person><Division>360</Division></ContactInformation>
+        </CodelistMeta>
+        <Codes>
+          <Code id="69508"><CodeValue>17</CodeValue><CodeText>Den engelske kirke i Norge</CodeText></Code>
+          <Code id="69507"><CodeValue>16</CodeValue><CodeText>Islam</CodeText></Code>
+        </Codes>
+      </GetCodelistByIdResult>
+    </GetCodelistByIdResponse>
+  </soap:Body>
+</soap:Envelope>
+"""
+
+
+def soap_envelope(body: str) -> bytes:
+    """Wrap the XML of a SOAP Body in an envelope."""
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+        f"<soap:Body>{body}</soap:Body></soap:Envelope>"
+    ).encode()
+
+
+def context_variable(i: int) -> str:
+    """The XML of one stand-in Datadok ContextVariable."""
+    return (
+        f'<ContextVariable id="urn:ssb:contextvariable:datadok:{i}">'
+        f'<Title lang="no">VAR{i}</Title>'
+        f"<Description>Variabel nummer {i}</Description>"
+        "<Properties><Datatype>Tekst</Datatype><Length>2</Length>"
+        f"<StartPosition>{2 * i + 1}</StartPosition><Precision>0</Precision>"
+        "</Properties>"
+        + (
+            '<Codelist id="urn:ssb:codelist:datadok:228589"><CodelistMeta>'
+            "<Title>kirkesamfunn</Title></CodelistMeta><Codes>"
+            '<Code id="69508"><CodeValue>17</CodeValue><CodeText>Annet</CodeText></Code>'
+            '<Code id="69507"><CodeValue>16</CodeValue><CodeText>Islam</CodeText></Code>'
+            "</Codes></Codelist>"
+            if i % 4 == 0
+            else ""
+        )
+        + "</ContextVariable>"
+    )
+
+
+def context_variables(variables: int) -> str:
+    """The XML of many stand-in Datadok ContextVariables."""
+    return "".join(context_variable(i) for i in range(variables))
+
+
+def file_description_response(variables: int) -> bytes:
+    """A GetFileDescriptionByPath response describing a file with many variables."""
+    return soap_envelope(
+        '<GetFileDescriptionByPathResponse xmlns="urn:ssb:tbmd:standin:datadok">'
+        '<GetFileDescriptionByPathResult id="urn:ssb:filedescription:datadok:1">'
+        "<Title>Stand-in fil</Title>"
+        f"{context_variables(variables)}"
+        "</GetFileDescriptionByPathResult></GetFileDescriptionByPathResponse>"
+    )
+
+
+def concept_variable(i: int) -> str:
+    """The XML of one stand-in Vardok ConceptVariable."""
+    return (
+        f'<ConceptVariable id="urn:ssb:conceptvariable:vardok:{i}">'
+        f'<Name lang="nb">Variabel {i}</Name>'
+        f'<Definition lang="nb">Definisjon av variabel {i}, {"lang " * 20}</Definition>'
+        "<StatisticalUnit>Person</StatisticalUnit><SubjectArea>be</SubjectArea>"
+        f"<OwnerSection>{300 + i % 60}</OwnerSection><Version>{i % 3 + 1}</Version>"
+        f"<Sensitive>{'true' if i % 2 else 'false'}</Sensitive>"
+        "<LastChangedDate>2024-01-02T03:04:05</LastChangedDate>"
+        + (
+            f'<CodelistReference id="urn:ssb:codelist:vardok:{i}">'
+            f"<Title>Kodeliste {i}</Title></CodelistReference>"
+            if i % 5 == 0
+            else ""
+        )
+        + "</ConceptVariable>"
+    )
+
+
+def concept_variables_chunks(
+    variables: int, operation: str = "GetConceptVariablesByApproved"
+) -> list[bytes]:
+    """A stand-in Vardok response listing many ConceptVariables, in pieces.
+
+    The first piece opens the envelope, each of the next holds one variable, and
+    the last closes the envelope again.
+    """
+    head, tail = soap_envelope(
+        f'<{operation}Response xmlns="urn:ssb:tbmd:standin:vardok">'
+        f"<{operation}Result>\x00</{operation}Result></{operation}Response>"
+    ).split(b"\x00")
+    return [head, *(concept_variable(i).encode() for i in range(variables)), tail]
+
+
+def standin_wsdls(address: str | None = None) -> dict[str, str]:
+    """Map each TBMD service with a stand-in WSDL to the local file.
+
+    If an address is given, the WSDLs are copied to a temporary folder, pointing
+    the services at that address instead.
+    """
+    wsdls = {}
+    tmp_dir = Path(tempfile.mkdtemp(prefix="tbmd_wsdl_")) if address else None
+    for path in sorted(STANDIN_WSDL_DIR.glob("*.wsdl")):
+        if tmp_dir is None:
+            wsdls[path.stem] = str(path)
+            continue
+        content = re.sub(
+            r'location="http://[^/"]+', f'location="{address}', path.read_text()
+        )
+        (tmp_dir / path.name).write_text(content)
+        wsdls[path.stem] = str(tmp_dir / path.name)
+    return wsdls
+
+
+class _CannedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(CODELIST_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(CODELIST_RESPONSE)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def serve_canned(latency: float = 0.0) -> tuple[ThreadingHTTPServer, str]:
+    """Start a local HTTP/1.1 server answering every POST with CODELIST_RESPONSE.
+
+    Returns the server, to shut it down, and its base address.
+    """
+    handler = type("Handler", (_CannedHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class _ChunkedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    chunks: ClassVar[list[bytes]] = []
+    gate: threading.Event | None = None
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, chunk in enumerate(self.chunks):
+            if i == len(self.chunks) - 1 and self.gate is not None:
+                self.gate.wait(10)
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def serve_chunked(
+    chunks: list[bytes], gate: threading.Event | None = None
+) -> tuple[ThreadingHTTPServer, str]:
+    """Start a local HTTP/1.1 server answering every POST with chunks, one at a time.
+
+    If a gate is given, the last chunk is held back until the gate is set, so the
+    response cannot be complete before then.
+
+    Returns the server, to shut it down, and its base address.
+    """
+    handler = type("Handler", (_ChunkedHandler,), {"chunks": chunks, "gate": gate})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+STANDIN_PATHS = (
+    "$STANDIN/arkiv/personfil/g2020",
+    "$STANDIN/arkiv/personfil/g2021",
+    "$STANDIN/arkiv/bedriftsfil/g2021g2022",
+    "$STANDIN_PII/arkiv/personfil/g2022",
+)
+
+
+def _number(arg: str) -> int:
+    """A stable number for an id, reference or name, to build the fixtures from."""
+    arg = arg.rsplit(":", 1)[-1]
+    return int(arg) if arg.isdigit() else zlib.crc32(arg.encode()) % 100000
+
+
+def _codes(count: int) -> str:
+    return (
+        "<Codes>"
+        + "".join(
+            f'<Code id="{i}"><CodeValue>{i:02d}</CodeValue>'
+            f"<CodeText>Kode nummer {i}</CodeText></Code>"
+            for i in range(count)
+        )
+        + "</Codes>"
+    )
+
+
+def _codelist_references(service: str, count: int) -> str:
+    return "".join(
+        f'<CodelistReference id="urn:ssb:codelist:{service}:{i}">'
+        f"<Title>Kodeliste {i}</Title></CodelistReference>"
+        for i in range(count)
+    )
+
+
+def _metadb_context_variable(i: int) -> str:
+    return (
+        f'<ContextVariable id="urn:ssb:contextvariable:metadb:{i}">'
+        f"<Name>VAR{i}</Name><Title>Variabel nummer {i}</Title>"
+        "<Datatype>Tekst</Datatype><Length>2</Length><Decimals>0</Decimals>"
+        "<ValidFrom>2020-01-01</ValidFrom>"
+        f'<CodelistReference id="urn:ssb:codelist:metadb:{i}">'
+        f"<Title>Kodeliste {i}</Title></CodelistReference>"
+        f"<ConceptVariableReference>urn:ssb:conceptvariable:vardok:{i}"
+        "</ConceptVariableReference></ContextVariable>"
+    )
+
+
+class StandinServer:
+    """Local HTTP server standing in for the four TBMD services.
+
+    It serves the stand-in WSDLs in tests/data_test_wsdl on GET, with the services
+    pointed at the server itself, and answers the operations used in
+    ssb_tbmd_apis.operations with generated fixtures. GetFileDescriptionByPath
+    answers with a SOAP Fault for paths not in paths, like the real service.
+
+    The server starts on a free port when created. Shut it down when done, or use
+    it in a with block.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int | None = None,
+        variables: int = 25,
+        list_size: int = 50,
+        paths: Iterable[str] = STANDIN_PATHS,
+        port: int = 0,
+    ) -> None:
+        """Start the server.
+
+        Args:
+            latency: Seconds to wait before answering each SOAP call.
+            jitter: Up to this many seconds are added to or taken from the latency,
+                at random.
+            seed: Seed for the random jitter, to get the same delays every run.
+            variables: The number of variables in each file description, data
+                description and statbank table.
+            list_size: The number of items in each list, like the codes of a
+                codelist or the variables of a Vardok search.
+            paths: The paths GetFileDescriptionByPath knows about.
+            port: The port to listen on, 0 for any free port.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.variables = variables
+        self.list_size = list_size
+        self.paths = frozenset(paths)
+        self.calls: Counter[tuple[str, str]] = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _StandinHTTPServer(("127.0.0.1", port), _StandinHandler)
+        self._httpd.standin = self
+        self.address = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._wsdls: dict[str, tuple[str, bytes]] = {}
+        for path in sorted(STANDIN_WSDL_DIR.glob("*.wsdl")):
+            content = path.read_text()
+            location = re.search(r'location="http://[^/"]+([^"]*)"', content)
+            assert location is not None, f"No service address in {path}"
+            content = re.sub(
+                r'location="http://[^/"]+', f'location="{self.address}', content
+            )
+            self._wsdls[path.stem] = (location.group(1), content.encode())
+        threading.Thread(
+            target=self._httpd.serve_forever, args=(0.05,), daemon=True
+        ).start()
+
+    def __enter__(self) -> StandinServer:
+        """Use the server in a with block, shutting it down at the end."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Shut the server down."""
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """Stop serving, and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def wsdl_urls(self) -> dict[str, str]:
+        """Map each TBMD service to the URL of its WSDL on the server."""
+        return {
+            service: f"{self.address}{location}?WSDL"
+            for service, (location, _) in self._wsdls.items()
+        }
+
+    def get(self, path: str) -> tuple[int, bytes]:
+        """Answer a GET, with the WSDL of the service at the path."""
+        location = path.split("?", 1)[0]
+        for wsdl_location, content in self._wsdls.values():
+            if location == wsdl_location:
+                return 200, content
+        return 404, b"Not found"
+
+    def post(self, message: bytes) -> tuple[int, bytes]:
+        """Answer a SOAP call, after waiting out the latency."""
+        body = ElementTree.fromstring(message).find(f"{{{_SOAP_ENV}}}Body")
+        request = body[0] if body is not None and len(body) else None
+        if request is None:
+            return 500, _fault("soap:Client", "No operation in the SOAP Body")
+        namespace, operation = request.tag[1:].split("}", 1)
+        service = namespace.rsplit(":", 1)[-1]
+        arg = (request[0].text or "") if len(request) else ""
+        with self._lock:
+            self.calls[service, operation] += 1
+            offset = (
+                self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+            )
+        delay = max(self.latency + offset, 0.0)
+        if delay:
+            time.sleep(delay)
+
+        builder = getattr(self, f"_{service}_{operation}", None)
+        if builder is None and operation.startswith("GetConceptVariablesBy"):
+            builder = self._vardok_concept_variables
+        if builder is None:
+            return 500, _fault("soap:Client", f"Unknown operation {operation}")
+        if operation == "GetFileDescriptionByPath" and arg not in self.paths:
+            return 500, _fault(
+                "soap:Server", f"Fant ingen filbeskrivelse for {escape(arg)}"
+            )
+        result = re.sub(
+            r"^<(\w+)(.*)</\1>$",
+            rf"<{operation}Result\2</{operation}Result>",
+            builder(arg),
+            flags=re.DOTALL,
+        )
+        return 200, soap_envelope(
+            f'<{operation}Response xmlns="{namespace}">{result}</{operation}Response>'
+        )
+
+    def _datadok_GetCodelistById(self, arg: str) -> str:
+        return (
+            f'<Codelist id="urn:ssb:codelist:datadok:{_number(arg)}">'
+            f"<CodelistMeta><Title>Kodeliste {escape(arg)}</Title></CodelistMeta>"
+            f"{_codes(self.list_size)}</Codelist>"
+        )
+
+    _datadok_GetCodelistByReference = _datadok_GetCodelistById
+
+    def _datadok_GetCodelists(self, arg: str) -> str:
+        return (
+            f"<Codelists>{_codelist_references('datadok', self.list_size)}</Codelists>"
+        )
+
+    def _datadok_GetContextVariableById(self, arg: str) -> str:
+        return context_variable(_number(arg))
+
+    _datadok_GetContextVariableByReference = _datadok_GetContextVariableById
+
+    def _datadok_GetFileDescriptionById(self, arg: str) -> str:
+        return (
+            f'<FileDescription id="urn:ssb:filedescription:datadok:{_number(arg)}">'
+            f"<Title>{escape(arg)}</Title>{context_variables(self.variables)}"
+            "</FileDescription>"
+        )
+
+    _datadok_GetFileDescriptionByPath = _datadok_GetFileDescriptionById
+
+    def _vardok_GetCodelistById(self, arg: str) -> str:
+        return (
+            f'<Codelist id="urn:ssb:codelist:vardok:{_number(arg)}">'
+            f"<Title>Kodeliste {escape(arg)}</Title>{_codes(self.list_size)}"
+            "</Codelist>"
+        )
+
+    def _vardok_GetCodelists(self, arg: str) -> str:
+        return (
+            f"<Codelists>{_codelist_references('vardok', self.list_size)}</Codelists>"
+        )
+
+    def _vardok_GetConceptVariableById(self, arg: str) -> str:
+        return concept_variable(_number(arg))
+
+    def _vardok_concept_variables(self, arg: str) -> str:
+        first = _number(arg)
+        return (
+            "<ConceptVariables>"
+            + "".join(concept_variable(first + i) for i in range(self.list_size))
+            + "</ConceptVariables>"
+        )
+
+    def _vardok_GetVersionsByConceptVariableId(self, arg: str) -> str:
+        return (
+            f"<ConceptVariables>{concept_variable(_number(arg)) * 3}</ConceptVariables>"
+        )
+
+    def _metadb_GetCodelistById(self, arg: str) -> str:
+        return (
+            f'<Codelist id="urn:ssb:codelist:metadb:{_number(arg)}">'
+            f"<Title>Kodeliste {escape(arg)}</Title><Description>Stand-in</Description>"
+            f"{_codes(self.list_size)}</Codelist>"
+        )
+
+    def _metadb_GetCodelists(self, arg: str) -> str:
+        return (
+            f"<Codelists>{_codelist_references('metadb', self.list_size)}</Codelists>"
+        )
+
+    def _metadb_GetContextVariableById(self, arg: str) -> str:
+        return _metadb_context_variable(_number(arg))
+
+    def _metadb_GetDataDescriptionById(self, arg: str) -> str:
+        return (
+            f'<DataDescription id="urn:ssb:dataset:metadb:{_number(arg)}">'
+            f"<Name>Tabell {escape(arg)}</Name><Description>Stand-in</Description>"
+            "<MainSubject>be</MainSubject><SubSubject>be01</SubSubject>"
+            "<ValidFrom>2020-01-01</ValidFrom>"
+            + "".join(_metadb_context_variable(i) for i in range(self.variables))
+            + "</DataDescription>"
+        )
+
+    def _metadb_GetEventHistoryStructureById(self, arg: str) -> str:
+        tables = "".join(
+            f"<Table><Name>Tabell {t}</Name>"
+            + "".join(
+                _metadb_context_variable(i) for i in range(max(self.variables // 5, 1))
+            )
+            + "</Table>"
+            for t in range(5)
+        )
+        return (
+            f'<EventHistoryStructure id="urn:ssb:project:metadb:{_number(arg)}">'
+            f"<Name>Prosjekt {escape(arg)}</Name><MainSubject>be</MainSubject>"
+            f"<SubSubject>be01</SubSubject>{tables}</EventHistoryStructure>"
+        )
+
+    def _statbank_GetStatbankMetaByTabelId(self, arg: str) -> str:
+        number = _number(arg)
+        name = escape(arg) if not arg.isdigit() else f"Tabell{number}"
+        variables = "".join(
+            f"<Variable><Name>VAR{i}</Name><Title>Variabel nummer {i}</Title>"
+            f"<CodelistReference>VS_{i}</CodelistReference></Variable>"
+            for i in range(self.variables)
+        )
+        return (
+            f'<StatbankMeta id="urn:ssb:statbanktable:{number:05d}">'
+            f"<TableId>{number:05d}</TableId><TableName>{name}</TableName>"
+            f"<Title>Stand-in tabell {number}</Title>"
+            f"<LastUpdated>2024-01-02T08:00:00</LastUpdated>{variables}</StatbankMeta>"
+        )
+
+    _statbank_GetStatbankMetaByTabelName = _statbank_GetStatbankMetaByTabelId
+
+    def _statbank_GetTableIdsByConceptVariableId(self, arg: str) -> str:
+        tables = "".join(
+            f'<TableReference id="{i:05d}"><TableName>Tabell{i}</TableName>'
+            "</TableReference>"
+            for i in range(self.list_size)
+        )
+        return (
+            "<TableIds><ConceptVariableReference>"
+            f"urn:ssb:conceptvariable:vardok:{_number(arg)}"
+            f"</ConceptVariableReference>{tables}</TableIds>"
+        )
+
+
+_SOAP_ENV = "http://schemas.xmlsoap.org/soap/envelope/"
+
+
+def _fault(code: str, message: str) -> bytes:
+    return soap_envelope(
+        f"<soap:Fault><faultcode>{code}</faultcode>"
+        f"<faultstring>{message}</faultstring></soap:Fault>"
+    )
+
+
+class _StandinHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for many clients connecting at once under load
+    request_queue_size = 512
+    standin: StandinServer
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: _StandinHTTPServer
+
+    def do_GET(self) -> None:
+        self._send(*self.server.standin.get(self.path))
+
+    def do_POST(self) -> None:
+        message = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send(*self.server.standin.post(message))
+
+    def _send(self, status: int, content: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def serve_standin(**options: Any) -> tuple[StandinServer, str]:
+    """Start a StandinServer, passing options on to it.
+
+    Returns the server, to shut it down, and its base address.
+    """
+    server = StandinServer(**options)
+    return server, server.address
+
+
+class CannedTransport(LocalResolverTransport):
+    """Transport answering every SOAP call with the same canned response."""
+
+    def __init__(
+        self,
+        *args: Any,
+        content: bytes = CODELIST_RESPONSE,
+        status_code: int = 200,
+        **kwargs: Any,
+    ) -> None:
+        """Store the response to answer with."""
+        super().__init__(*args, **kwargs)
+        self.content = content
+        self.status_code = status_code
+
+    def post_xml(self, address: str, envelope: Any, headers: Any) -> Any:
+        """Skip the network and answer with the canned response."""
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers["Content-Type"] = "text/xml; charset=utf-8"
+        response._content = self.content
+        return response